@@ -342,11 +342,17 @@ class AboutBox(wx.Dialog):
   Snapshot Keyword Styles: %s
   Additional Videos:  %s
   Filters:  %s
-  Core Data: %s\n  """
+  Core Data: %s\n
+Query Cache:
+  Hits: %s
+  Misses: %s
+  Invalidations: %s\n  """
                 data = (seriesCount, documentCount, episodeCount, transcriptCount, collectionCount, quoteCount,
                         clipCount, clipTranscriptCount,
                         snapshotCount, noteCount, keywordCount, clipKeywordCount, snapshotKeywordCount,
-                        snapshotKeywordStylesCount, addVidCount, filterCount, coreDataCount)
+                        snapshotKeywordStylesCount, addVidCount, filterCount, coreDataCount,
+                        DBInterface.queryCacheStats['hits'], DBInterface.queryCacheStats['misses'],
+                        DBInterface.queryCacheStats['invalidations'])
                 
                 # Eliminate the Credits text
                 self.credits.SetLabel(tmpStr % data)
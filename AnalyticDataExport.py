@@ -466,6 +466,18 @@ class AnalyticDataExport(Dialogs.GenForm):
             # Add a line break to signal the end of the Header line. 
             f.write('\n')
 
+            # Load all the Quotes and Clips to be exported up front, a few queries per object type rather than several
+            # per object.  objectCache is an identity map, so Collections, Documents, Episodes, and Libraries that
+            # several items share are only loaded once.  No need to load the Quote Text or Clip Transcripts.
+            objectCache = {}
+            quotes = Quote.Quote.load_many([quoteLookup[quoteRec[0], quoteRec[1]] for quoteRec in quoteList
+                                            if quoteRec[2] and ((self.collectionNum == 0) or (showNested) or (quoteRec[1] == self.collectionNum))],
+                                           skipText=True, objectCache=objectCache)
+            Document.Document.load_many([quote.source_document_num for quote in quotes.values()], skipText=True, objectCache=objectCache)
+            Clip.Clip.load_many([clipLookup[clipRec[0], clipRec[1]] for clipRec in clipList
+                                 if clipRec[2] and ((self.collectionNum == 0) or (showNested) or (clipRec[1] == self.collectionNum))],
+                                skipText=True, objectCache=objectCache, loadEpisodes=(self.libraryNum != 0))
+
             # Now iterate through the Quote List
             for quoteRec in quoteList:
                 # See if the user has left the Quote "checked" in the filter dialog.
@@ -474,19 +486,19 @@ class AnalyticDataExport(Dialogs.GenForm):
                 if quoteRec[2] and ((self.collectionNum == 0) or (showNested) or (quoteRec[1] == self.collectionNum)):
                     # Load the Quote data.  The QuoteLookup dictionary allows this easily.
                     # No need to load the Quote Text, which can be slow to load.
-                    quote = Quote.Quote(quoteLookup[quoteRec[0], quoteRec[1]], skipText=True)
+                    quote = Quote.Quote.load_cached(quoteLookup[quoteRec[0], quoteRec[1]], objectCache, skipText=True)
                     # Get the collection the Quote is from.
-                    collection = Collection.Collection(quote.collection_num)
+                    collection = Collection.Collection.load_cached(quote.collection_num, objectCache)
                     # Encode string values using the Export Encoding
-                    collectionID = collection.GetNodeString()
+                    collectionID = collection.GetNodeString(objectCache)
                     quoteID = quote.id
                     try:
-                        document = Document.Document(quote.source_document_num)
+                        document = Document.Document.load_cached(quote.source_document_num, objectCache, skipText=True)
                         documentID = document.id
                         quoteSourceFilename = document.imported_file
                         # If we're doing a Library report, we need the Quote's source document and Library for Document Filter comparison.
                         if self.libraryNum != 0:
-                            library = Library.Library(document.library_num)
+                            library = Library.Library.load_cached(document.library_num, objectCache)
                             libraryID = library.id
                     # If we have an orphaned Quote ...
                     except TransanaExceptions.RecordNotFoundError, e:
@@ -526,17 +538,17 @@ class AnalyticDataExport(Dialogs.GenForm):
                 if clipRec[2] and ((self.collectionNum == 0) or (showNested) or (clipRec[1] == self.collectionNum)):
                     # Load the Clip data.  The ClipLookup dictionary allows this easily.
                     # No need to load the Clip Transcripts, which can be slow to load.
-                    clip = Clip.Clip(clipLookup[clipRec[0], clipRec[1]], skipText=True)
+                    clip = Clip.Clip.load_cached(clipLookup[clipRec[0], clipRec[1]], objectCache, skipText=True)
                     # Get the collection the clip is from.
-                    collection = Collection.Collection(clip.collection_num)
+                    collection = Collection.Collection.load_cached(clip.collection_num, objectCache)
                     # Encode string values using the Export Encoding
-                    collectionID = collection.GetNodeString()
+                    collectionID = collection.GetNodeString(objectCache)
                     clipID = clip.id
                     clipMediaFilename = clip.media_filename
                     # If we're doing a Library report, we need the clip's source episode and Library for Episode Filter comparison.
                     if self.libraryNum != 0:
-                        episode = Episode.Episode(clip.episode_num)
-                        library = Library.Library(episode.series_num)
+                        episode = Episode.Episode.load_cached(clip.episode_num, objectCache)
+                        library = Library.Library.load_cached(episode.series_num, objectCache)
                     # Implement Episode filtering if needed.  If we have a Library Report, we need to confirm that the Source Episode
                     # is "checked" in the filter list.  (If we don't have a Library Report, this check isn't needed.)
                     if (self.libraryNum == 0) or ((episode.id, library.id, True) in episodeList):
@@ -26,24 +26,49 @@ import wx
 import ctypes
 # import Transana's Common Dialogs
 import Dialogs
+# import Transana's Media Queue
+import MediaQueue
 # Import Transana's Miscellaneous routines
 import Misc
 # import Transana's Constants
 import TransanaConstants
 # import Transana's Globals
 import TransanaGlobal
+# import Transana's Waveform Cache
+import WaveformCache
 # import Transana's waveform progress routines
 import WaveformProgress
 # import Python's locale module
 import locale
-# import Python's multiprocessing module
-import multiprocessing
 # import Python's os module
 import os
 # import Python's sys module
 import sys
 
-ID_PROCESSTIMER = wx.NewId()
+# Transana's Media Queue, created when it is first needed
+_mediaQueue = None
+
+def GetMediaQueue():
+    """ Get Transana's Media Queue.  The queue file is kept in the user's Transana profile folder, so
+        jobs left unfinished when Transana closes are run the next time the queue is started. """
+    global _mediaQueue
+    # If the Media Queue hasn't been created yet ...
+    if _mediaQueue == None:
+        # ... make sure the profile folder exists ...
+        queuePath = TransanaGlobal.configData.GetDefaultProfilePath()
+        if not os.path.exists(queuePath):
+            # (os.makedirs is a recursive call to create ALL needed folders!)
+            os.makedirs(queuePath)
+        # ... and create the queue
+        _mediaQueue = MediaQueue.MediaQueue(os.path.join(queuePath, MediaQueue.QUEUE_FILENAME),
+                                            TransanaGlobal.programDir, onJobComplete=OnMediaJobComplete)
+    return _mediaQueue
+
+def OnMediaJobComplete(job):
+    """ Called by the Media Queue's worker threads when a job completes """
+    # Add extracted audio to the Waveform Cache
+    if job.jobType == MediaQueue.AUDIO_EXTRACTION:
+        WaveformCache.Store(job.inputFile, job.outputFile)
 
 class BatchFileProcessor(Dialogs.GenForm):
     """ Batch File Processor, used for Batch Waveform Generator and Batch Episode Creation """
@@ -240,64 +265,36 @@ class BatchFileProcessor(Dialogs.GenForm):
             return None     # Cancel
 
     def AudioExtract(self, data):
-        """ Perform Audio Extraction using as many threads as possible """
-        # Set the list of data files to be processed
-        self.processFileList = data
-        # Create a Timer to control the multi-thread audio extraction process
-        self.processTimer = wx.Timer(self, ID_PROCESSTIMER)
-        wx.EVT_TIMER(self, ID_PROCESSTIMER, self.OnTimer)
-        # Run the time every half second
-        self.processTimer.Start(500)
-
-    def OnTimer(self, event):
-        """ Check the threads to see if we need to add more extraction processes """
-        # While there are processors free and files to process ...
-        while (len(self.runningConversions) < multiprocessing.cpu_count()) and (len(self.processFileList) > 0):
-            # Get the current filename
-            filename = self.processFileList[0]
-            # Remember the original File Name that is passed in
-            originalFilename = filename
-            # Split the path off of the file name
-            (path, filename) = os.path.split(filename)
-            # Split the extension off the file name
-            (filenameroot, extension) = os.path.splitext(filename)
-            # Build the progress box's label
-            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-            prompt = unicode(_("Extracting %s\nfrom %s"), 'utf8')
-            # Build the filename for the extracted audio out of the filename parts
-            self.waveFilename = os.path.join(TransanaGlobal.configData.visualizationPath, filenameroot + '.wav')
+        """ Perform Audio Extraction using the Media Queue, which runs as many extractions at once as
+            the computer's processors and disks allow """
+        # Get the Media Queue
+        mediaQueue = GetMediaQueue()
+        # Initialize a list of the jobs we add
+        jobNums = []
+        # For each file to be processed ...
+        for originalFilename in data:
+            # Get the filename for the extracted audio from the Waveform Cache, and whether it's already there
+            (waveFilename, waveFileExists) = Misc.GetWavefileName(originalFilename)
             # If there is no extracted audio file, OR if we're over-writing extracted audio ...
-            if not(os.path.exists(self.waveFilename)) or self.overwrite.GetValue():
-                # Create the Progress Dialog, allowing MULTIPLE THREADS
-                progressDialog = WaveformProgress.WaveformProgress(self,
-                                                                   prompt % (self.waveFilename, originalFilename),
-                                                                   showModally=False)
-                # If there are NO currently-running conversions ...
-                if self.runningConversions == {}:
-                    # ... then set the index to 1
-                    indexNum = 1
-                # If there are currently-running conversions ...
-                else:
-                    # ... then set the index to 1 more than the largest current number
-                    indexNum = max(self.runningConversions) + 1
-                # Have the Progress Dialog remember its index number
-                progressDialog.indexNum = indexNum
-                # Have the Progress Dialog remember the name of the file being converted
-                progressDialog.originalFilename = originalFilename
-                # Add the Progress Dialog to the dictionary that holds the running conversions
-                self.runningConversions[indexNum] = progressDialog
-                # Tell the Waveform Progress Dialog to handle the audio extraction modally.
-                progressDialog.Extract(originalFilename, self.waveFilename)
-            # Remove the file from the list
-            self.processFileList = self.processFileList[1:]
-
-        # If we've requested extractio for all Files, we can stop the timer.
-        if len(self.processFileList) == 0:
-            self.processTimer.Stop()
+            if not waveFileExists or self.overwrite.GetValue():
+                # ... add an audio extraction job to the queue.  If filenames were passed in, someone is waiting
+                # for these files, so they go ahead of any batch jobs.
+                job = mediaQueue.Add(MediaQueue.AUDIO_EXTRACTION, originalFilename, waveFilename,
+                                     priority=int(len(self.filenames) > 0))
+                jobNums.append(job.jobNum)
+        # Show one Progress Dialog for all of the jobs
+        progressDialog = WaveformProgress.MediaQueueProgress(self, mediaQueue, jobNums)
+        # Add the Progress Dialog to the dictionary that holds the running conversions
+        self.runningConversions[1] = progressDialog
+        # Start the queue running.  This also runs any jobs left in the queue from earlier.
+        mediaQueue.Start()
+        # Show the progress of the jobs.  If there are no jobs, this reports completion.
+        progressDialog.Start()
 
     def OnConvertComplete(self, progressDlg):
+        """ Called by the Progress Dialog when all of the extraction jobs are complete """
         # Remove this conversion from the dictionary of running conversions
-        del(self.runningConversions[progressDlg.indexNum])
+        del(self.runningConversions[1])
         # If we have NO MORE running conversions ...
         if len(self.runningConversions) == 0:
             # if filenames were passed in ...
@@ -0,0 +1,623 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+
+#This program is free software; you can redistribute it and/or
+#modify it under the terms of the GNU General Public License
+#as published by the Free Software Foundation; either version 2
+#of the License, or (at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program; if not, write to the Free Software
+#Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+""" This module is a benchmark and profiling harness for Transana's data layer and report generators.
+    It builds a synthetic project of a configurable size in a scratch sqlite database, using the same
+    table definitions Transana uses, and times the DBInterface list helpers, Search query execution,
+    XML Export and Import, Word Frequency counting, RTF parsing, and waveform rendering.
+
+    Usage:  python Benchmark.py [--scale small|medium|large] [--output results.json]
+                                [--baseline baseline.json] [--threshold 1.25] [--profile directory]
+
+    Results are written as JSON.  When a baseline results file is given, any benchmark whose median time
+    exceeds the baseline median by more than the threshold is reported as a regression, and the script
+    exits with a non-zero status so it can be used in automated builds. """
+
+__author__ = "David K. Woods <dwoods@transana.com>"
+
+# import Python's __builtin__ module
+import __builtin__
+# import Python's cProfile module
+import cProfile
+# import Python's json module
+import json
+# import Python's optparse module
+import optparse
+# import Python's os module
+import os
+# import Python's platform module
+import platform
+# import Python's random module
+import random
+# import Python's shutil module
+import shutil
+# import Python's cStringIO module
+import cStringIO
+# import Python's sys module
+import sys
+# import Python's tempfile module
+import tempfile
+# import Python's timeit module, for the most accurate timer on each platform
+import timeit
+# import Python's wave module
+import wave
+# import Python's array module
+import array
+# import Python's math module
+import math
+# import Python's XML modules
+import xml.sax
+import xml.sax.saxutils
+
+# import wxPython
+import wx
+# import wxPython's RichTextCtrl
+import wx.richtext as richtext
+
+# Transana's modules expect a wx.App and the "_" translation method to exist before they are imported
+app = wx.App(False)
+__builtin__._ = wx.GetTranslation
+
+# import Transana's Constants, and configure them for a single-user sqlite database BEFORE importing any
+# module that checks them
+import TransanaConstants
+TransanaConstants.singleUserVersion = True
+TransanaConstants.DBInstalled = 'sqlite3'
+
+# import Transana's Configuration Data
+import ConfigData
+# import Transana's Database Interface
+import DBInterface
+# import Transana's Search processing
+import ProcessSearch
+# import Transana's RTF Parser
+import PyRTFParser
+# import Transana's Globals
+import TransanaGlobal
+# import Transana's Waveform Cache
+import WaveformCache
+# import Transana's Waveform Graphic
+import WaveformGraphic
+# import Transana's Word Counter
+import WordCounter
+# import Transana's XML Export
+import XMLExport
+# import Transana's XML Import
+import XMLImport
+
+# The names of the scratch databases
+BENCHMARK_DATABASE = u'TransanaBenchmark'
+IMPORT_DATABASE = u'TransanaBenchmarkImport'
+
+# Project sizes.  Counts for Episodes, Documents, Clips, Quotes, and Snapshots are per Library or per Collection.
+SCALES = {'small' :  {'libraries' : 2,  'episodes' : 5,  'documents' : 5,  'timeCodes' : 50,  'wordsPerSegment' : 20,
+                      'collections' : 5,  'clips' : 20,  'quotes' : 20,  'snapshots' : 5,
+                      'keywordGroups' : 5,  'keywords' : 10, 'keywordsPerItem' : 3, 'notes' : 50,   'waveSeconds' : 60},
+          'medium' : {'libraries' : 5,  'episodes' : 20, 'documents' : 20, 'timeCodes' : 200, 'wordsPerSegment' : 25,
+                      'collections' : 20, 'clips' : 50,  'quotes' : 50,  'snapshots' : 10,
+                      'keywordGroups' : 10, 'keywords' : 25, 'keywordsPerItem' : 4, 'notes' : 500,  'waveSeconds' : 600},
+          'large' :  {'libraries' : 10, 'episodes' : 50, 'documents' : 50, 'timeCodes' : 500, 'wordsPerSegment' : 30,
+                      'collections' : 50, 'clips' : 100, 'quotes' : 100, 'snapshots' : 20,
+                      'keywordGroups' : 20, 'keywords' : 50, 'keywordsPerItem' : 5, 'notes' : 2000, 'waveSeconds' : 3600}}
+
+# The names of the benchmarks, in the order they are run
+BENCHMARKS = ['listHelpers', 'search', 'xmlRoundTrip', 'wordFrequency', 'xmlToRtf', 'rtfToRichText', 'waveformPeaks', 'waveformRender']
+
+# The default regression threshold.  A benchmark regresses if its median exceeds the baseline median times this.
+DEFAULT_THRESHOLD = 1.25
+# The length of each Clip, Quote, and Snapshot in milliseconds
+ITEM_LENGTH = 30000
+# The sample rate of the synthetic WAV file
+WAVE_SAMPLE_RATE = 11025
+
+# The opening of a Transana-XML (wxRichTextCtrl XML) text
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n' + \
+             '<richtext version="1.0.0.0" xmlns="http://www.wxwidgets.org">\n' + \
+             '<paragraphlayout textcolor="#000000" bgcolor="#FFFFFF" fontpointsize="12" fontstyle="90" fontweight="90" ' + \
+             'fontunderlined="0" fontface="Courier New" alignment="1" leftindent="0" leftsubindent="0" rightindent="0" ' + \
+             'parspacingafter="10" parspacingbefore="0" linespacing="10">\n'
+# The closing of a Transana-XML text
+XML_FOOTER = '</paragraphlayout>\n</richtext>\n'
+# The time code text style
+XML_TIMECODE_STYLE = '<text textcolor="#FF0000" fontpointsize="12" fontstyle="90" fontweight="90" fontunderlined="0" fontface="Courier New">'
+# The hidden time code data style
+XML_TIMECODE_DATA_STYLE = '<text textcolor="#FFFFFF" fontpointsize="1" fontstyle="90" fontweight="90" fontunderlined="0" fontface="Courier New">'
+# The plain text style
+XML_TEXT_STYLE = '<text textcolor="#000000" fontpointsize="12" fontstyle="90" fontweight="90" fontunderlined="0" fontface="Courier New">'
+
+
+class SyntheticProject(object):
+    """ Build a synthetic Transana project in the open database """
+
+    def __init__(self, sizes, seed=0):
+        """ Initialize the project generator.  sizes is one of the SCALES dictionaries.  The seed makes the
+            generated data repeatable, so results from different runs can be compared. """
+        self.sizes = sizes
+        self.random = random.Random(seed)
+        # Build a vocabulary with a realistic spread of word frequencies
+        self.vocabulary = ['word%04d' % num for num in range(2000)]
+        # Lists of the records created, for the benchmarks to use
+        self.libraryNums = []
+        self.episodeNums = []
+        self.documentNums = []
+        self.transcriptNums = []
+        self.collectionNums = []
+        self.clipNums = []
+        self.quoteNums = []
+        self.snapshotNums = []
+        self.keywords = []
+        # A sample transcript text
+        self.sampleXML = ''
+
+    def Words(self, count):
+        """ Return a string of count random words.  Lower-numbered words are more common, as in real text. """
+        return ' '.join([self.vocabulary[int(self.random.paretovariate(1.2)) % len(self.vocabulary)] for num in range(count)])
+
+    def BuildText(self, segments, startTime=0):
+        """ Build Transana-XML and Plain Text with the given number of time-coded segments """
+        xmlText = [XML_HEADER]
+        plainText = []
+        for segment in range(segments):
+            timeCode = startTime + segment * ITEM_LENGTH / max(1, segments)
+            words = self.Words(self.sizes['wordsPerSegment'])
+            xmlText.append('<paragraph>')
+            # Each time code is the time code character followed by the hidden time code value
+            xmlText.append(XML_TIMECODE_STYLE + TransanaConstants.TIMECODE_CHAR.encode('utf8') + '</text>')
+            xmlText.append(XML_TIMECODE_DATA_STYLE + xml.sax.saxutils.escape('<%d>' % timeCode) + '</text>')
+            xmlText.append(XML_TEXT_STYLE + words + '</text>')
+            xmlText.append('</paragraph>\n')
+            plainText.append(words)
+        xmlText.append(XML_FOOTER)
+        return (''.join(xmlText), '\n'.join(plainText))
+
+    def Build(self):
+        """ Create all the records for the project """
+        sizes = self.sizes
+        db = DBInterface.get_db()
+        dbCursor = db.cursor()
+        # Insert everything in a single transaction, which is MUCH faster in sqlite
+        dbCursor.execute('BEGIN')
+        saveTime = '2017-01-01 00:00:00'
+
+        # Keywords
+        rows = []
+        for groupNum in range(sizes['keywordGroups']):
+            for kwNum in range(sizes['keywords']):
+                self.keywords.append(('Group %d' % groupNum, 'Keyword %d' % kwNum))
+                rows.append(('Group %d' % groupNum, 'Keyword %d' % kwNum, '', 'Black', '#000000', 'Solid', 3, 'Solid'))
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO Keywords2
+                                                       (KeywordGroup, Keyword, Definition, LineColorName, LineColorDef,
+                                                        DrawMode, LineWidth, LineStyle)
+                                                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"""), rows)
+        # Keyword codings, as (EpisodeNum, DocumentNum, ClipNum, QuoteNum, SnapshotNum, KeywordGroup, Keyword, Example)
+        codings = []
+
+        def Code(episodeNum=0, documentNum=0, clipNum=0, quoteNum=0, snapshotNum=0):
+            """ Apply keywordsPerItem random keywords to an item """
+            for (kwg, kw) in self.random.sample(self.keywords, min(len(self.keywords), sizes['keywordsPerItem'])):
+                codings.append((episodeNum, documentNum, clipNum, quoteNum, snapshotNum, kwg, kw, 0))
+
+        # Libraries, Episodes, Episode Transcripts, and Documents
+        libraries = []
+        episodes = []
+        transcripts = []
+        documents = []
+        # Remember the source of each Episode Transcript, for the Clips
+        transcriptSources = []
+        for libraryNum in range(1, sizes['libraries'] + 1):
+            self.libraryNums.append(libraryNum)
+            libraries.append((libraryNum, 'Library %d' % libraryNum, '', 'benchmark', 'Group 0'))
+            for epNum in range(sizes['episodes']):
+                episodeNum = len(self.episodeNums) + 1
+                self.episodeNums.append(episodeNum)
+                episodes.append((episodeNum, 'Episode %d' % episodeNum, libraryNum, '2017-01-01', 'episode%d.mp4' % episodeNum,
+                                 sizes['timeCodes'] * ITEM_LENGTH, ''))
+                Code(episodeNum=episodeNum)
+                # Each Episode gets one Transcript, with timeCodes time codes
+                transcriptNum = len(self.transcriptNums) + 1
+                self.transcriptNums.append(transcriptNum)
+                (xmlText, plainText) = self.BuildText(sizes['timeCodes'])
+                if self.sampleXML == '':
+                    self.sampleXML = xmlText
+                transcripts.append((transcriptNum, 'Transcript %d' % transcriptNum, episodeNum, 0, 0, 0, 'benchmark',
+                                    0, sizes['timeCodes'] * ITEM_LENGTH, '', 0, xmlText, plainText, saveTime))
+                transcriptSources.append((episodeNum, transcriptNum))
+            for docNum in range(sizes['documents']):
+                documentNum = len(self.documentNums) + 1
+                self.documentNums.append(documentNum)
+                (xmlText, plainText) = self.BuildText(sizes['timeCodes'])
+                documents.append((documentNum, 'Document %d' % documentNum, libraryNum, 'benchmark', '',
+                                  'document%d.rtf' % documentNum, saveTime, len(plainText), xmlText, plainText, saveTime))
+                Code(documentNum=documentNum)
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO Series2
+                                                       (SeriesNum, SeriesID, SeriesComment, SeriesOwner, DefaultKeywordGroup)
+                                                     VALUES (%s, %s, %s, %s, %s)"""), libraries)
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO Episodes2
+                                                       (EpisodeNum, EpisodeID, SeriesNum, TapingDate, MediaFile, EpLength, EpComment)
+                                                     VALUES (%s, %s, %s, %s, %s, %s, %s)"""), episodes)
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO Documents2
+                                                       (DocumentNum, DocumentID, LibraryNum, Author, Comment, ImportedFile,
+                                                        ImportDate, DocumentLength, XMLText, PlainText, LastSaveTime)
+                                                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""), documents)
+
+        # Collections, Clips, Clip Transcripts, Quotes, and Snapshots
+        collections = []
+        clips = []
+        quotes = []
+        quotePositions = []
+        snapshots = []
+        for collectNum in range(1, sizes['collections'] + 1):
+            self.collectionNums.append(collectNum)
+            # Nest every other Collection inside the one before it, so the Collection tree has some depth
+            parentNum = collectNum - 1 if (collectNum % 2 == 0) else 0
+            collections.append((collectNum, 'Collection %d' % collectNum, parentNum, '', 'benchmark', 'Group 0'))
+            for sortOrder in range(sizes['clips']):
+                clipNum = len(self.clipNums) + 1
+                self.clipNums.append(clipNum)
+                (episodeNum, sourceTranscriptNum) = self.random.choice(transcriptSources)
+                clipStart = self.random.randrange(max(1, sizes['timeCodes'] - 1)) * ITEM_LENGTH
+                clips.append((clipNum, 'Clip %d' % clipNum, collectNum, episodeNum, 'episode%d.mp4' % episodeNum,
+                              clipStart, clipStart + ITEM_LENGTH, 0, 1, '', sortOrder))
+                # Each Clip gets a Clip Transcript with a couple of time codes
+                transcriptNum = len(self.transcriptNums) + 1
+                self.transcriptNums.append(transcriptNum)
+                (xmlText, plainText) = self.BuildText(2, clipStart)
+                transcripts.append((transcriptNum, 'Clip Transcript %d' % transcriptNum, episodeNum, sourceTranscriptNum, clipNum,
+                                    0, 'benchmark', clipStart, clipStart + ITEM_LENGTH, '', 0, xmlText, plainText, saveTime))
+                Code(episodeNum=episodeNum, clipNum=clipNum)
+            if len(self.documentNums) > 0:
+                for sortOrder in range(sizes['quotes']):
+                    quoteNum = len(self.quoteNums) + 1
+                    self.quoteNums.append(quoteNum)
+                    documentNum = self.random.choice(self.documentNums)
+                    (xmlText, plainText) = self.BuildText(1)
+                    startChar = self.random.randrange(1000)
+                    quotes.append((quoteNum, 'Quote %d' % quoteNum, collectNum, documentNum, sortOrder, '', xmlText, plainText, saveTime))
+                    quotePositions.append((quoteNum, documentNum, startChar, startChar + len(plainText)))
+                    Code(documentNum=documentNum, quoteNum=quoteNum)
+            for sortOrder in range(sizes['snapshots']):
+                snapshotNum = len(self.snapshotNums) + 1
+                self.snapshotNums.append(snapshotNum)
+                (episodeNum, transcriptNum) = self.random.choice(transcriptSources)
+                snapshots.append((snapshotNum, 'Snapshot %d' % snapshotNum, collectNum, 'snapshot%d.jpg' % snapshotNum,
+                                  1.0, 0.0, 0.0, 640, 480, episodeNum, transcriptNum,
+                                  self.random.randrange(max(1, sizes['timeCodes'])) * ITEM_LENGTH, ITEM_LENGTH, '', sortOrder, saveTime))
+                Code(snapshotNum=snapshotNum)
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO Transcripts2
+                                                       (TranscriptNum, TranscriptID, EpisodeNum, SourceTranscriptNum, ClipNum,
+                                                        SortOrder, Transcriber, ClipStart, ClipStop, Comment, MinTranscriptWidth,
+                                                        RTFText, PlainText, LastSaveTime)
+                                                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""), transcripts)
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO Collections2
+                                                       (CollectNum, CollectID, ParentCollectNum, CollectComment, CollectOwner,
+                                                        DefaultKeywordGroup)
+                                                     VALUES (%s, %s, %s, %s, %s, %s)"""), collections)
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO Clips2
+                                                       (ClipNum, ClipID, CollectNum, EpisodeNum, MediaFile, ClipStart, ClipStop,
+                                                        ClipOffset, Audio, ClipComment, SortOrder)
+                                                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""), clips)
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO Quotes2
+                                                       (QuoteNum, QuoteID, CollectNum, SourceDocumentNum, SortOrder, Comment,
+                                                        XMLText, PlainText, LastSaveTime)
+                                                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"""), quotes)
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO QuotePositions2
+                                                       (QuoteNum, DocumentNum, StartChar, EndChar)
+                                                     VALUES (%s, %s, %s, %s)"""), quotePositions)
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO Snapshots2
+                                                       (SnapshotNum, SnapshotID, CollectNum, ImageFile, ImageScale, ImageCoordsX,
+                                                        ImageCoordsY, ImageSizeW, ImageSizeH, EpisodeNum, TranscriptNum,
+                                                        SnapshotTimeCode, SnapshotDuration, SnapshotComment, SortOrder, LastSaveTime)
+                                                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""), snapshots)
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO ClipKeywords2
+                                                       (EpisodeNum, DocumentNum, ClipNum, QuoteNum, SnapshotNum, KeywordGroup,
+                                                        Keyword, Example)
+                                                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"""), codings)
+
+        # Notes, spread across the object types
+        notes = []
+        for noteNum in range(1, sizes['notes'] + 1):
+            # (SeriesNum, EpisodeNum, CollectNum, ClipNum, SnapshotNum, TranscriptNum, DocumentNum, QuoteNum)
+            owner = [0] * 8
+            choices = [(0, self.libraryNums), (1, self.episodeNums), (2, self.collectionNums), (3, self.clipNums),
+                       (4, self.snapshotNums), (5, self.transcriptNums), (6, self.documentNums), (7, self.quoteNums)]
+            (index, nums) = self.random.choice([choice for choice in choices if len(choice[1]) > 0])
+            owner[index] = self.random.choice(nums)
+            notes.append(tuple([noteNum, 'Note %d' % noteNum] + owner + ['benchmark', self.Words(sizes['wordsPerSegment'] * 5)]))
+        dbCursor.executemany(DBInterface.FixQuery("""INSERT INTO Notes2
+                                                       (NoteNum, NoteID, SeriesNum, EpisodeNum, CollectNum, ClipNum, SnapshotNum,
+                                                        TranscriptNum, DocumentNum, QuoteNum, NoteTaker, NoteText)
+                                                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""), notes)
+        dbCursor.execute('COMMIT')
+        dbCursor.close()
+        # Build the Text Index for the new records, as Search uses it
+        DBInterface.IndexItemsWithoutTextIndex()
+
+
+def WriteWaveFile(filename, seconds):
+    """ Write a mono 16-bit WAV file of the given length, containing a tone that rises and falls in volume """
+    # Build one second of samples and repeat it, which is much faster than calculating every sample
+    samples = array.array('h', [int(16000 * math.sin(frame * 0.05) * abs(math.sin(frame * math.pi / WAVE_SAMPLE_RATE)))
+                                for frame in range(WAVE_SAMPLE_RATE)])
+    waveFile = wave.open(filename, 'wb')
+    try:
+        waveFile.setnchannels(1)
+        waveFile.setsampwidth(2)
+        waveFile.setframerate(WAVE_SAMPLE_RATE)
+        # WAV data is little-endian
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        data = samples.tostring()
+        for second in range(seconds):
+            waveFile.writeframesraw(data)
+    finally:
+        waveFile.close()
+
+
+class Benchmarks(object):
+    """ The benchmarks.  Each benchmark is a method named for the entry in BENCHMARKS.  The Setup method for a
+        benchmark, if there is one, is run once before timing begins. """
+
+    def __init__(self, project, workDir):
+        """ Initialize the benchmarks for a synthetic project """
+        self.project = project
+        self.workDir = workDir
+
+    def listHelpers(self):
+        """ The DBInterface list helpers used to populate the Database Tree and the reports """
+        # Time the queries, not the query cache
+        DBInterface.InvalidateQueryCache()
+        DBInterface.list_of_series()
+        DBInterface.list_of_episodes()
+        DBInterface.list_of_documents()
+        DBInterface.list_of_episode_transcripts()
+        DBInterface.list_of_all_collections()
+        DBInterface.list_of_clips()
+        DBInterface.list_of_quotes()
+        DBInterface.list_of_snapshots()
+        DBInterface.list_of_all_keywords()
+        DBInterface.list_of_all_notes()
+        for episodeNum in self.project.episodeNums:
+            DBInterface.list_of_clips_by_episode(episodeNum)
+            DBInterface.list_of_keywords(Episode=episodeNum)
+
+    def searchSetup(self):
+        """ Build the Search queries once.  Building them is trivial, running them is not. """
+        (kwg1, kw1) = self.project.keywords[0]
+        (kwg2, kw2) = self.project.keywords[-1]
+        # Search for items with one keyword or another, but not a third, and containing a common word
+        queryText = ['(%s:%s OR' % (kwg1, kw1),
+                     '%s:%s) AND' % (kwg2, kw2),
+                     'NOT %s:%s AND' % self.project.keywords[len(self.project.keywords) / 2],
+                     'Item Text contains "%s"' % self.project.vocabulary[1]]
+        # Create the Search object without its Search Dialog, searching everything
+        search = ProcessSearch.ProcessSearch.__new__(ProcessSearch.ProcessSearch)
+        search.documentList = []
+        search.transcriptList = []
+        search.collectionList = []
+        self.searchQueries = search.BuildQueries(queryText)
+
+    def search(self):
+        """ Execute the Search queries """
+        (documentQuery, episodeQuery, quoteQuery, clipQuery, wholeSnapshotQuery, snapshotCodingQuery, params, textSearchItems) = \
+            self.searchQueries
+        dbCursor = DBInterface.get_db().cursor()
+        for query in (documentQuery, episodeQuery, quoteQuery, clipQuery, wholeSnapshotQuery, snapshotCodingQuery):
+            # The Whole Snapshot query is empty when the search includes text
+            if query != '':
+                dbCursor.execute(DBInterface.FixQuery(query), tuple(params))
+                dbCursor.fetchall()
+        dbCursor.close()
+
+    def xmlRoundTrip(self):
+        """ Export the database to Transana-XML, and import the file into a new database """
+        exportFile = os.path.join(self.workDir, 'benchmark.tra')
+        importFile = os.path.join(TransanaGlobal.configData.databaseDir, IMPORT_DATABASE + '.db')
+        XMLExport.BackupDatabase(exportFile)
+        # Import into an empty database
+        DBInterface.close_db()
+        if os.path.exists(importFile):
+            os.remove(importFile)
+        try:
+            DBInterface.establish_db_exists(IMPORT_DATABASE, usePrompt=False)
+            importDlg = XMLImport.XMLImport(None, -1, _('Transana XML Import'), importData=(exportFile, 'utf8'))
+            try:
+                importDlg.Import()
+            finally:
+                importDlg.Destroy()
+        finally:
+            # Go back to the benchmark database
+            DBInterface.close_db()
+            DBInterface.get_db(BENCHMARK_DATABASE, usePrompt=False)
+
+    def wordFrequency(self):
+        """ Count the words in every Document, Transcript, and Quote, as the Word Frequency Report does """
+        # Time the counting, not the count cache
+        WordCounter._countCache.clear()
+        words = {}
+        for (objectType, objectNums) in (('D', self.project.documentNums), ('T', self.project.transcriptNums), ('Q', self.project.quoteNums)):
+            records = [rec for rec in DBInterface.iterate_plain_text(objectType, objectNums)]
+            for counts in WordCounter.CountTexts([plainText for (objectNum, plainText, lastSaveTime) in records]):
+                WordCounter.ApplySynonyms(counts, {}, words)
+
+    def xmlToRtf(self):
+        """ Convert a Transcript from Transana-XML to RTF """
+        handler = PyRTFParser.XMLToRTFHandler()
+        xml.sax.parseString(self.project.sampleXML, handler)
+        self.rtfText = cStringIO.StringIO()
+        handler.saveFile(self.rtfText)
+
+    def rtfToRichTextSetup(self):
+        """ Create a hidden RichTextCtrl to load RTF into """
+        self.frame = wx.Frame(None, -1, 'Benchmark')
+        self.txtCtrl = richtext.RichTextCtrl(self.frame, -1)
+        # Make sure there's RTF to parse
+        self.xmlToRtf()
+
+    def rtfToRichText(self):
+        """ Parse RTF into a RichTextCtrl, as when a Transcript is loaded """
+        self.txtCtrl.Clear()
+        PyRTFParser.RTFTowxRichTextCtrlParser(self.txtCtrl, buf=self.rtfText.getvalue(), displayProgress=False)
+
+    def waveformPeaksSetup(self):
+        """ Create the WAV file for the waveform benchmarks """
+        self.waveFilename = os.path.join(self.workDir, 'benchmark.wav')
+        if not os.path.exists(self.waveFilename):
+            WriteWaveFile(self.waveFilename, self.project.sizes['waveSeconds'])
+
+    def waveformPeaks(self):
+        """ Build the Peak File for a WAV file, as happens the first time media is loaded """
+        WaveformGraphic._peakCache.clear()
+        peakFilename = WaveformCache.PeakFilename(self.waveFilename)
+        if os.path.exists(peakFilename):
+            os.remove(peakFilename)
+        WaveformGraphic.GetWaveformPeaks(self.waveFilename)
+
+    def waveformRenderSetup(self):
+        """ Make sure the WAV file and its Peak File exist """
+        self.waveformPeaksSetup()
+        WaveformGraphic.GetWaveformPeaks(self.waveFilename)
+
+    def waveformRender(self):
+        """ Draw the whole waveform, then a zoomed-in part of it, as the Visualization Window does """
+        mediaLength = self.project.sizes['waveSeconds'] * 1000
+        waveFilenames = [{'filename' : self.waveFilename, 'offset' : 0, 'length' : mediaLength}]
+        WaveformGraphic.WaveformGraphicCreate(waveFilenames, ':memory:', 0, mediaLength, (800, 100))
+        WaveformGraphic.WaveformGraphicCreate(waveFilenames, ':memory:', mediaLength / 2, min(mediaLength / 2, 30000), (800, 100))
+
+
+def TimeBenchmark(name, function, repeat, profileDir=None):
+    """ Time a benchmark function repeat times, returning a results dictionary.  If profileDir is given,
+        one additional run is profiled and the profile is saved there as name.prof. """
+    times = []
+    for run in range(repeat):
+        start = timeit.default_timer()
+        function()
+        times.append(timeit.default_timer() - start)
+    times.sort()
+    if profileDir != None:
+        profiler = cProfile.Profile()
+        profiler.runcall(function)
+        profiler.dump_stats(os.path.join(profileDir, name + '.prof'))
+    return {'min' : times[0],
+            'median' : times[len(times) / 2],
+            'max' : times[-1],
+            'repeat' : repeat}
+
+
+def FindRegressions(results, baseline, threshold):
+    """ Compare results against a baseline results file.  Returns a list of (name, baseline median, median).
+        The baseline file may include a "thresholds" dictionary to override the threshold for individual benchmarks. """
+    regressions = []
+    thresholds = baseline.get('thresholds', {})
+    for (name, result) in results['benchmarks'].iteritems():
+        baseResult = baseline.get('benchmarks', {}).get(name)
+        # A benchmark that isn't in the baseline can't have regressed
+        if baseResult == None:
+            continue
+        if result['median'] > baseResult['median'] * thresholds.get(name, threshold):
+            regressions.append((name, baseResult['median'], result['median']))
+    return regressions
+
+
+def main(argv):
+    """ Run the benchmarks """
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option('--scale', default='small', choices=sorted(SCALES.keys()), help='project size (%s)' % ', '.join(sorted(SCALES.keys())))
+    # Allow any of the project sizes to be overridden individually
+    for key in sorted(SCALES['small'].keys()):
+        parser.add_option('--%s' % key, type='int', dest=key, help='override the number of %s' % key)
+    parser.add_option('--only', action='append', choices=BENCHMARKS, help='run only this benchmark (may be repeated)')
+    parser.add_option('--repeat', type='int', default=5, help='number of timed runs of each benchmark')
+    parser.add_option('--seed', type='int', default=0, help='random seed for the synthetic project')
+    parser.add_option('--output', help='write the results to this JSON file')
+    parser.add_option('--baseline', help='compare the results to this JSON results file')
+    parser.add_option('--threshold', type='float', default=DEFAULT_THRESHOLD,
+                      help='median time, as a multiple of the baseline median, that counts as a regression')
+    parser.add_option('--profile', metavar='DIRECTORY', help='write a cProfile .prof file for each benchmark to DIRECTORY')
+    parser.add_option('--keep', action='store_true', help='keep the scratch directory')
+    (options, args) = parser.parse_args(argv)
+
+    sizes = SCALES[options.scale].copy()
+    for key in sizes.keys():
+        if getattr(options, key) != None:
+            sizes[key] = getattr(options, key)
+    if options.profile and not os.path.exists(options.profile):
+        os.makedirs(options.profile)
+
+    # Use a scratch directory for the databases and files, and never change the user's saved configuration
+    workDir = tempfile.mkdtemp(prefix='TransanaBenchmark')
+    TransanaGlobal.configData = ConfigData.ConfigData()
+    TransanaGlobal.configData.SaveConfiguration = lambda: None
+    TransanaGlobal.configData.databaseDir = workDir
+    TransanaGlobal.configData.visualizationPath = workDir
+    try:
+        # Create the database with all of Transana's tables and indexes
+        if not DBInterface.establish_db_exists(BENCHMARK_DATABASE, usePrompt=False):
+            print >> sys.stderr, 'Unable to create the benchmark database in %s' % workDir
+            return 2
+        start = timeit.default_timer()
+        project = SyntheticProject(sizes, options.seed)
+        project.Build()
+        buildTime = timeit.default_timer() - start
+
+        results = {'environment' : {'python' : sys.version.split()[0],
+                                    'wxPython' : wx.VERSION_STRING,
+                                    'platform' : platform.platform(),
+                                    'transana' : TransanaConstants.versionNumber},
+                   'scale' : options.scale,
+                   'sizes' : sizes,
+                   'buildTime' : buildTime,
+                   'benchmarks' : {}}
+        benchmarks = Benchmarks(project, workDir)
+        for name in BENCHMARKS:
+            if options.only and not name in options.only:
+                continue
+            if hasattr(benchmarks, name + 'Setup'):
+                getattr(benchmarks, name + 'Setup')()
+            results['benchmarks'][name] = TimeBenchmark(name, getattr(benchmarks, name), options.repeat, options.profile)
+            print '%-16s min %9.4fs   median %9.4fs' % (name, results['benchmarks'][name]['min'], results['benchmarks'][name]['median'])
+    finally:
+        DBInterface.close_db()
+        if not options.keep:
+            shutil.rmtree(workDir, True)
+        else:
+            print 'Scratch files kept in %s' % workDir
+
+    regressions = []
+    if options.baseline:
+        f = open(options.baseline, 'rb')
+        try:
+            baseline = json.load(f)
+        finally:
+            f.close()
+        regressions = FindRegressions(results, baseline, options.threshold)
+        results['regressions'] = [{'name' : name, 'baseline' : baseMedian, 'median' : median} for (name, baseMedian, median) in regressions]
+        for (name, baseMedian, median) in regressions:
+            print 'REGRESSION:  %s median %.4fs, baseline %.4fs' % (name, median, baseMedian)
+    if options.output:
+        f = open(options.output, 'wb')
+        try:
+            json.dump(results, f, indent=2, sort_keys=True)
+        finally:
+            f.close()
+    # Signal regressions to automated builds
+    if len(regressions) > 0:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
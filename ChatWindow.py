@@ -60,6 +60,7 @@ import Dialogs
 import Document
 # import Transana's Library object
 import Library
+import LibraryMap
 # import Transana's Episode object
 import Episode
 # import Transana's Transcript object
@@ -143,6 +144,93 @@ class MessageServerLostEvent(wx.PyEvent):
         if DEBUG:
             print "MessageServerLost Event created"
 
+# Messages from other users are gathered for a short time and processed together, so that a burst of messages
+# (a colleague importing or dragging hundreds of Clips, for example) is applied to the Database Tree in one go.
+
+# The number of milliseconds to gather messages before processing them
+MESSAGE_BATCH_WINDOW = 100
+# Messages that only refresh a display.  Only the last copy of an identical message in a batch needs processing.
+REFRESH_MESSAGES = ['UKL', 'UKV', 'US', 'WFR', 'OC']
+# Messages that don't touch the Database Tree
+CHAT_MESSAGES = ['M', 'C', 'R', 'V', 'D']
+# Messages that add a Database Tree node, with the node type and root node of the node each one adds
+ADD_NODE_MESSAGES = {'AS'    : ('LibraryNode', 'Libraries'),
+                     'AE'    : ('EpisodeNode', 'Libraries'),
+                     'AT'    : ('TranscriptNode', 'Libraries'),
+                     'AD'    : ('DocumentNode', 'Libraries'),
+                     'AC'    : ('CollectionNode', 'Collections'),
+                     'AQ'    : ('QuoteNode', 'Collections'),
+                     'ACl'   : ('ClipNode', 'Collections'),
+                     'AClSO' : ('ClipNode', 'Collections'),
+                     'ASnap' : ('SnapshotNode', 'Collections'),
+                     'AKG'   : ('KeywordGroupNode', 'Keywords'),
+                     'AK'    : ('KeywordNode', 'Keywords')}
+
+def ParseMessage(data):
+    """ Break a message from the Message Server into its header, sender, and message body """
+    messageHeader = data[:data.find(' ')]
+    message = data[data.find(' ') + 1:].strip()
+    # The sender is followed by a colon, except in messages the Message Server generates itself
+    if message[:message.find(' ')][-1:] == ':':
+        messageSender = message[:message.find(' ') - 1]
+    else:
+        messageSender = message[:message.find(' ')]
+    message = message[message.find(' ') + 1:].strip()
+    return (messageHeader, messageSender, message)
+
+def CoalesceMessages(messages, userName):
+    """ Fold a batch of messages together, dropping the ones that would make no difference.
+          - A node that is added and then deleted within the batch is never added, and the delete is dropped.
+          - Only the last of a set of identical display refresh messages is kept.
+        Messages this user sent are left alone, as they aren't processed anyway.  Returns the messages to process. """
+    # Start with all the messages
+    result = list(messages)
+    # Nodes added so far in this batch, keyed by (node type, root node, node path), pointing to the message index.
+    # Different kinds of node (a Clip and a Quote, say) can have the same name, so the node type is part of the key.
+    pendingAdds = {}
+    for index in range(len(result)):
+        (messageHeader, messageSender, message) = ParseMessage(result[index])
+        # Our own messages, chat messages and refresh messages don't change what's been added
+        if (messageSender == userName) or (messageHeader in CHAT_MESSAGES + REFRESH_MESSAGES):
+            continue
+        # If a node is being added ...
+        if messageHeader in ADD_NODE_MESSAGES:
+            nodelist = tuple(message.split(' >|< '))
+            # An add in sort order places the new node before an existing one.  Drop the existing node's name.
+            if messageHeader == 'AClSO':
+                nodelist = nodelist[:-2] + (nodelist[-1],)
+            # Remember where the node was added
+            pendingAdds[ADD_NODE_MESSAGES[messageHeader] + nodelist] = index
+        # If a node is being deleted ...
+        elif messageHeader == 'DN':
+            # The message is the node type, the untranslated root node, then the node path
+            key = tuple(message.split(' >|< '))
+            # If the node was added in this batch ...
+            if pendingAdds.has_key(key):
+                # ... then it, and anything of any type added beneath it, never needs to appear.
+                for addKey in pendingAdds.keys():
+                    if addKey[1:len(key)] == key[1:]:
+                        result[pendingAdds[addKey]] = None
+                        del(pendingAdds[addKey])
+                # Nor does the delete
+                result[index] = None
+        # Any other message (rename, move, note, keyword example ...) may depend on the nodes added so far,
+        # so we can't fold anything across it.
+        else:
+            pendingAdds = {}
+
+    # Now drop all but the LAST copy of identical refresh messages, so the refresh happens after the other changes
+    seen = set()
+    for index in range(len(result) - 1, -1, -1):
+        if (result[index] != None) and (result[index][:result[index].find(' ')] in REFRESH_MESSAGES):
+            if result[index] in seen:
+                result[index] = None
+            else:
+                seen.add(result[index])
+
+    # Return the messages that are left
+    return [data for data in result if data != None]
+
 # Create a Thread Lock object so that we can use thread locking as needed
 threadLock = threading.Lock()
 
@@ -503,6 +591,15 @@ class ChatWindow(wx.Frame):
 ##            self.processMessageQueueTimer.Bind(wx.EVT_TIMER, self.OnProcessMessageQueue)
 ##            self.processMessageQueueTimer.Start(500)
 
+        # Create a queue for messages waiting to be processed
+        self.messageQueue = []
+        # Signal that we're not in the middle of processing a batch of messages
+        self.processingBatch = False
+        # Create a Timer for processing the queued messages as a batch
+        self.messageBatchTimer = wx.Timer()
+        # Assign the Timer's event
+        self.messageBatchTimer.Bind(wx.EVT_TIMER, self.OnMessageBatchTimer)
+
         # Create a Timer to check for Message Server validation.
         # Initialize to unvalidated state
         self.serverValidation = False
@@ -526,6 +623,9 @@ class ChatWindow(wx.Frame):
             # Process Windows Messages, if needed.  (Completes SAVES, in theory!)
             wx.YieldIfNeeded()
             msg = '%s ||| ' % message
+            # If this message reports a change to the data, cached Library Map data may be out of date
+            if not message[:message.find(' ')] in CHAT_MESSAGES:
+                LibraryMap.ClearSeriesCache()
             # If we're using Unicode, we need to encode the messages passed to the socket.
             if 'unicode' in wx.PlatformInfo:
                 self.socketObj.send(msg.encode('utf8'))
@@ -661,7 +761,73 @@ class ChatWindow(wx.Frame):
         tmpDlg.Destroy()
         
     def OnPostMessage(self, event):
-        """ Post Message handler """
+        """ Post Message handler.  Messages are queued, then processed in batches by OnMessageBatchTimer(). """
+        # If there is data in the message event ...
+        if event.data != None:
+            # ... add it to the queue
+            self.messageQueue.append(event.data)
+            # If a batch isn't already being gathered ...
+            if not self.messageBatchTimer.IsRunning():
+                # ... process the queue once the batch window has passed
+                self.messageBatchTimer.Start(MESSAGE_BATCH_WINDOW, wx.TIMER_ONE_SHOT)
+
+    def OnMessageBatchTimer(self, event):
+        """ Process the queued messages as a single batch """
+        # Fold the queued messages together, and clear the queue
+        messages = CoalesceMessages(self.messageQueue, self.userName)
+        self.messageQueue = []
+
+        # See which messages from other users will touch the Database Tree
+        treeMessages = [ParseMessage(data) for data in messages]
+        treeMessages = [msg for msg in treeMessages if (not msg[0] in CHAT_MESSAGES) and (msg[1] != self.userName)]
+        # If other users have changed the data, cached Library Map data may be out of date
+        if len(treeMessages) > 0:
+            LibraryMap.ClearSeriesCache()
+        # Clear the cached query results each change affects
+        for (messageHeader, sender, message) in treeMessages:
+            DBInterface.InvalidateQueryCacheForMessage(messageHeader)
+        # If there are any, and the Database Tree is available ...
+        if (len(treeMessages) > 0) and (self.ControlObject != None) and (self.ControlObject.DataWindow != None):
+            tree = self.ControlObject.DataWindow.DBTab.tree
+        else:
+            tree = None
+
+        # If we're updating the Database Tree ...
+        if tree != None:
+            # We can't have the tree selection changing because of the activity of other users.  Note the
+            # current selection once for the whole batch.
+            currentSelection = tree.GetSelections()
+            # Freeze the tree so it is only redrawn once
+            tree.Freeze()
+        # Signal that we're processing a batch
+        self.processingBatch = True
+        try:
+            # Process the messages in the order they were received
+            for data in messages:
+                try:
+                    self.ProcessMessage(PostMessageEvent(data))
+                # One bad message shouldn't stop the rest of the batch
+                except:
+                    print "ChatWindow.OnMessageBatchTimer():  Message processing failed:"
+                    print sys.exc_info()[0], sys.exc_info()[1]
+                    import traceback
+                    traceback.print_exc(file=sys.stdout)
+        finally:
+            # The batch is done
+            self.processingBatch = False
+            if tree != None:
+                tree.Thaw()
+
+        # If we updated the tree, restore the selection, unless nodes were deleted.  (The selection might be gone!)
+        if (tree != None) and not ('DN' in [msg[0] for msg in treeMessages]):
+            # First, de-select all items
+            tree.UnselectAll()
+            for currNode in currentSelection:
+                # ... now that we're done, we should re-select the originally-selected tree item
+                tree.SelectItem(currNode)
+
+    def ProcessMessage(self, event):
+        """ Process a single message from the Message Server """
 
         def ConvertMessageToNodeList(message):
             """ Take a message from the Transana Message Server and convert it to a NodeList for use with the DB Tree
@@ -1620,8 +1786,8 @@ class ChatWindow(wx.Frame):
                             # Inform the user of the unknown message.  This should never occur.
                             self.memo.AppendText('Unprocessed Message: "%s"\n' % event.data)
 
-                    # Unless we've just deleted it ...
-                    if messageHeader != 'DN':
+                    # Unless we've just deleted it, or a batch is being processed (which restores the selection at the end) ...
+                    if (messageHeader != 'DN') and not self.processingBatch:
                         # First, de-select all items
                         self.ControlObject.DataWindow.DBTab.tree.UnselectAll()
                         for currNode in currentSelection:
@@ -1704,6 +1870,8 @@ class ChatWindow(wx.Frame):
             print traceback.print_exc(file=sys.stdout)
         # Try to tell the listener thread to abort (probably does nothing.)
         self.listener.abort()
+        # Stop processing queued messages
+        self.messageBatchTimer.Stop()
         # Destroy the Chat Sound player
         self.soundplayer.Destroy()
         # Go on and close the form.
@@ -154,21 +154,11 @@ class Clip(DataObject.DataObject):
         
     def GetTranscriptWithoutTimeCodes(self):
         """ Returns a copy of the Transcript Text with the Time Code information removed. """
-        newText = self.text
-        while True:
-            timeCodeStart = newText.find(TIMECODE_CHAR)
-            if timeCodeStart == -1:
-                break
-            timeCodeEnd = newText.find('>', timeCodeStart)
-
-            newText = newText[:timeCodeStart] + newText[timeCodeEnd + 1:]
+        # Remove the Time Codes in a single pass
+        newText = Transcript.TIMECODE_REGEXP.sub('', self.text)
 
         # We should also replace TAB characters with spaces        
-        while True:
-            tabStart = newText.find(chr(wx.WXK_TAB), 0)
-            if tabStart == -1:
-                break
-            newText = newText[:tabStart] + '  ' + newText[tabStart + 1:]
+        newText = newText.replace(chr(wx.WXK_TAB), '  ')
 
         return newText
 
@@ -281,6 +271,46 @@ class Clip(DataObject.DataObject):
         # Close the database cursor
         c.close()
 
+    def load_many(cls, nums, skipText=False, objectCache=None, loadEpisodes=False):
+        """ Load a list of Clips, with their keywords, additional media files, and (unless skipText is set)
+            Clip Transcripts, in a few queries rather than several queries per Clip.  objectCache is an optional
+            identity map (see DataObject.load_cached()) shared with other loads.  If loadEpisodes is set, the
+            source Episodes are loaded too so the Clips' series_id and episode_id are ready.  Returns a dictionary
+            of the Clips found, keyed by Clip Number. """
+        query = """
+        SELECT a.*, b.*
+          FROM Clips2 a, Collections2 b
+          WHERE a.ClipNum IN (%s) AND
+                a.CollectNum = b.CollectNum
+        """
+        # Load the Clip records without Transcripts, which are loaded all at once below
+        (clips, loaded) = cls._load_many_rows(nums, query, objectCache, needText=not skipText, skipText=True)
+        loadedNums = [clip.number for clip in loaded]
+        keywords = DBInterface.dict_of_keywords('Clip', loadedNums)
+        additionalVids = DBInterface.dict_of_additional_vids('Clip', loadedNums)
+        if not skipText:
+            clipTranscripts = DBInterface.dict_of_clip_transcripts(loadedNums)
+            transcriptNums = []
+            for clip in loaded:
+                transcriptNums += clipTranscripts[clip.number]
+            transcripts = Transcript.Transcript.load_many(transcriptNums, objectCache=objectCache)
+        for clip in loaded:
+            clip.skipText = skipText
+            clip._load_additional_vids(additionalVids[clip.number])
+            clip._load_keywords(keywords[clip.number])
+            if not skipText:
+                clip.transcripts = [transcripts[num] for num in clipTranscripts[clip.number] if transcripts.has_key(num)]
+        # If requested, fill in the Library and Episode IDs from the source Episodes
+        if loadEpisodes:
+            episodes = Episode.Episode.load_many([clip.episode_num for clip in clips.values()], objectCache=objectCache)
+            for clip in clips.values():
+                if episodes.has_key(clip.episode_num):
+                    clip._series_id = episodes[clip.episode_num].series_id
+                    clip._episode_id = episodes[clip.episode_num].id
+        return clips
+    # Make load_many() a class method
+    load_many = classmethod(load_many)
+
     def db_save(self, use_transactions=True):
         """Save the record to the database using Insert or Update as appropriate."""
 
@@ -736,8 +766,11 @@ class Clip(DataObject.DataObject):
         
     def refresh_keywords(self):
         """Clear the keyword list and refresh it from the database."""
+        self._load_keywords(DBInterface.list_of_keywords(Clip=self.number))
+
+    def _load_keywords(self, kwpairs):
+        """Replace the keyword list with the keyword data from the database."""
         self._kwlist = []
-        kwpairs = DBInterface.list_of_keywords(Clip=self.number)
         for data in kwpairs:
             tempClipKeyword = ClipKeywordObject.ClipKeyword(data[0], data[1], clipNum=self.number, example=data[2])
             self._kwlist.append(tempClipKeyword)
@@ -833,8 +866,15 @@ class Clip(DataObject.DataObject):
         query = DBInterface.FixQuery(query)
         # Execute the query
         c.execute(query, (self.number, ))
+        # Add the videos to the additional media files list
+        self._load_additional_vids(c.fetchall())
+        # Close the database cursor
+        c.close()
+
+    def _load_additional_vids(self, rows):
+        """Add additional media files from (MediaFile, VidLength, Offset, Audio) database rows."""
         # For each video in the query results ...
-        for (vidFilename, vidLength, vidOffset, audio) in c.fetchall():
+        for (vidFilename, vidLength, vidOffset, audio) in rows:
             # Detection of the use of the Video Root Path is platform-dependent and must be done for EACH filename!
             if wx.Platform == "__WXMSW__":
                 # On Windows, check for a colon in the position, which signals the presence or absence of a drive letter
@@ -852,8 +892,6 @@ class Clip(DataObject.DataObject):
                                            'length'   : vidLength,
                                            'offset'   : vidOffset,
                                            'audio'    : audio}
-        # Close the database cursor
-        c.close()
 
     def remove_an_additional_vid(self, indx):
         """ remove ONE additional media file from the list of additional media files """
@@ -89,12 +89,9 @@ class ClipKeyword(object):
         """ Determine object equality """
         return self.__dict__ == other.__dict__
 
-    def db_save(self):
-        """ Saves ClipKeyword record to Database """
-        # NOTE:  This routine, at present, is ONLY used by the Database Import routine.
-        #        Therefore, it does no checking for duplicate records.  If you want to
-        #        use it for other purposes, you probably have to make it smarter!
-
+    def GetSaveQueryAndValues(self):
+        """ Return the Insert Query and the Data Values needed to save this ClipKeyword record, so that
+            the Database Import routine can save many records in a single batch """
         # If we're using Unicode ...
         if 'unicode' in wx.PlatformInfo:
             # ... encode the text fields for this object
@@ -105,8 +102,6 @@ class ClipKeyword(object):
             # ... no encoding is needed
             keywordGroup = self.keywordGroup
             keyword = self.keyword
-        # Get a Database Cursor
-        dbCursor = DBInterface.get_db().cursor()
         # Create the Insert Query
         SQLText = """ INSERT INTO ClipKeywords2
                         (DocumentNum, EpisodeNum, QuoteNum, ClipNum, SnapshotNum, KeywordGroup, Keyword, Example)
@@ -116,6 +111,18 @@ class ClipKeyword(object):
         SQLText = DBInterface.FixQuery(SQLText)
         # Prepare the Data Values for the query
         values = (self.documentNum, self.episodeNum, self.quoteNum, self.clipNum, self.snapshotNum, keywordGroup, keyword, self.example)
+        return (SQLText, values)
+
+    def db_save(self):
+        """ Saves ClipKeyword record to Database """
+        # NOTE:  This routine, at present, is ONLY used by the Database Import routine.
+        #        Therefore, it does no checking for duplicate records.  If you want to
+        #        use it for other purposes, you probably have to make it smarter!
+
+        # Get the Insert Query and the Data Values for this record
+        (SQLText, values) = self.GetSaveQueryAndValues()
+        # Get a Database Cursor
+        dbCursor = DBInterface.get_db().cursor()
         # Execute the Query
         dbCursor.execute(SQLText, values)
         # Close the Database Cursor
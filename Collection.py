@@ -368,32 +368,33 @@ class Collection(DataObject.DataObject):
             print
         return result
 
-    def GetNodeData(self):
-        """ Returns the Node Data list (list of parent collections) needed for Database Tree Manipulation """
+    def GetNodeData(self, objectCache=None):
+        """ Returns the Node Data list (list of parent collections) needed for Database Tree Manipulation.
+            objectCache is an optional identity map (see DataObject.load_cached()) for the parent collections. """
         # Initialize the nodeData structure
         nodeData = ()
         # If this is a nested collection (parent != 0), we have to load the full nesting structure here
         if self.parent != 0:
             # Load the parent collection
-            parentColl = Collection(self.parent)
+            parentColl = Collection.load_cached(self.parent, objectCache)
             # add the parent's name to the data structure
             nodeData = (parentColl.id,) + nodeData
             # repeat until we get to the root, where the parent is 0
             while parentColl.parent != 0:
                 # Load the parent collection
-                parentColl = Collection(parentColl.parent)
+                parentColl = Collection.load_cached(parentColl.parent, objectCache)
                 # add the parent's name to the data structure
                 nodeData = (parentColl.id,) + nodeData
         # Complete the nodeData structure by the Collection Name to the end
         nodeData = nodeData + (self.id,)
         return nodeData
 
-    def GetNodeString(self):
+    def GetNodeString(self, objectCache=None):
         """ Returns a string that delineates the full nested collection structure for the present collection """
         # Initialize a string variable
         st = ''
         # Get the collection's Node Data
-        nodeData = self.GetNodeData()
+        nodeData = self.GetNodeData(objectCache)
         # For each node in the Node Data ...
         for node in nodeData:
             # ... if this isn't the first node, ...
@@ -86,6 +86,7 @@ class ConfigData(object):
         str += 'wordWrap = %s\n' % self.wordWrap
         str += 'autoSave = %s\n' % self.autoSave
         str += 'maxTranscriptImageWidth = %s\n' % self.maxTranscriptImageWidth
+        str += 'waveformCacheSize = %s\n' % self.waveformCacheSize
         str = str + 'defaultFontFace = %s\n' % self.defaultFontFace
         str = str + 'defaultFontSize = %s\n' % self.defaultFontSize
         str = str + 'specialFontFace = %s\n' % self.specialFontFace
@@ -221,6 +222,8 @@ class ConfigData(object):
             self.autoSave = config.ReadInt('2.0/AutoSave', True)
             # Load Max Transcript Image Width
             self.maxTranscriptImageWidth = config.ReadInt('2.0/MaxTranscriptImageWidth', 1)
+            # Load the Waveform Cache Size limit, in megabytes
+            self.waveformCacheSize = config.ReadInt('/2.0/WaveformCacheSize', 2048)
             # Load Default Font Face Setting
             self.defaultFontFace = config.Read('/2.0/FontFace', self.defaultFontFace)
             # Load Default Font Size Setting
@@ -331,6 +334,8 @@ class ConfigData(object):
             self.autoSave = True
             # Max Transcript Image Width
             self.maxTranscriptImageWidth = 1
+            # Waveform Cache Size limit, in megabytes
+            self.waveformCacheSize = 2048
             # Language setting
             self.language = ''
             # Format Units
@@ -586,6 +591,8 @@ class ConfigData(object):
         config.WriteInt('/2.0/AutoSave', self.autoSave)
         # Save the Max Transcript Image Width Setting
         config.WriteInt('/2.0/MaxTranscriptImageWidth', self.maxTranscriptImageWidth)
+        # Save the Waveform Cache Size limit
+        config.WriteInt('/2.0/WaveformCacheSize', self.waveformCacheSize)
         # Save Default Font Face Setting
         config.Write('/2.0/FontFace', self.defaultFontFace)
         # Save Default Font Size Setting
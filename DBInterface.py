@@ -62,8 +62,20 @@ import array
 import cPickle
 # import Python's os module
 import os
+# import Python's regular expression module
+import re
 # import Python's sys module
 import sys
+# import Python's threading module
+import threading
+# import Python's time module
+import time
+# import Python's collections module
+import collections
+# import Python's copy module
+import copy
+# import Python's unicodedata module
+import unicodedata
 # import Python's warnings module
 import warnings
 # import Python's string module
@@ -96,6 +108,112 @@ import Transcript
 # Declare Global Variables
 # Database Reference
 _dbref = None
+# Connection parameters for the open database, so that additional connections can be opened for worker threads
+_dbParameters = None
+# Database connections that belong to individual worker threads
+_threadDB = threading.local()
+# Idle worker thread connections, kept open so the next worker thread doesn't have to connect again
+_dbPool = []
+_dbPoolLock = threading.Lock()
+# The largest number of idle worker thread connections to keep open
+DB_POOL_SIZE = 4
+# When the main connection has been idle this many seconds, check that the server hasn't dropped it before using it
+DB_IDLE_CHECK = 60
+# When the main connection was last requested
+_dbLastUsed = 0
+# The number of compiled statements sqlite keeps for each connection.  (Its default is 100.)
+DB_STATEMENT_CACHE_SIZE = 250
+# FixQuery() results, by original query.  The same few hundred queries are converted over and over.
+_fixQueryCache = {}
+# The largest number of FixQuery() results to keep.  (Some queries are built with their values in them.)
+FIX_QUERY_CACHE_SIZE = 2000
+# Streaming cursors read this many rows from the server at a time
+STREAM_FETCH_SIZE = 500
+# Paged queries read this many rows per query
+QUERY_PAGE_SIZE = 500
+# Short strings such as IDs, Keyword Groups and Keywords are read from the database over and over.  Keep a small
+# Least-Recently-Used cache of their decoded values.
+DECODE_CACHE_SIZE = 4096
+# Only strings this long or shorter are cached
+DECODE_CACHE_MAXLEN = 100
+_decodeCache = collections.OrderedDict()
+_decodeCacheLock = threading.Lock()
+# Keyword lists, keyword colors, collection lists and the like are requested over and over by the keyword panels,
+# visualizations and property forms.  Keep their results, keyed by (function name, arguments), holding the tables
+# the results came from and the results themselves.  Saving or deleting data, locally or by other users (reported
+# by the Message Server), clears the results that used the affected tables.
+_queryCache = {}
+_queryCacheLock = threading.Lock()
+# Query cache statistics, shown with the component information in the About box
+queryCacheStats = {'hits' : 0, 'misses' : 0, 'invalidations' : 0}
+# This counts the data changes that have invalidated the query cache, so other caches of database data can tell
+# whether they are out of date.  (See QueryCacheGeneration().)
+_queryCacheGeneration = 0
+# The tables changed by the data changes each Message Server message reports.
+# Messages not listed here clear the whole query cache.
+QUERY_CACHE_MESSAGE_TABLES = {'AS'    : ['Series2'],
+                              'AD'    : ['Documents2', 'ClipKeywords2'],
+                              'AE'    : ['Episodes2', 'ClipKeywords2'],
+                              'AT'    : ['Transcripts2'],
+                              'AC'    : ['Collections2'],
+                              'AQ'    : ['Quotes2', 'ClipKeywords2'],
+                              'ACl'   : ['Clips2', 'ClipKeywords2'],
+                              'AClSO' : ['Clips2'],
+                              'ASnap' : ['Snapshots2', 'ClipKeywords2'],
+                              'ASN'   : ['Notes2'],
+                              'ADN'   : ['Notes2'],
+                              'AEN'   : ['Notes2'],
+                              'ATN'   : ['Notes2'],
+                              'ACN'   : ['Notes2'],
+                              'AQN'   : ['Notes2'],
+                              'AClN'  : ['Notes2'],
+                              'ASnN'  : ['Notes2'],
+                              'AKG'   : ['Keywords2'],
+                              'AK'    : ['Keywords2'],
+                              'AKE'   : ['ClipKeywords2'],
+                              'UKL'   : ['ClipKeywords2'],
+                              'UKV'   : ['ClipKeywords2'],
+                              'US'    : ['Snapshots2'],
+                              'OC'    : ['Collections2', 'Clips2'],
+                              'DQPOD' : ['Quotes2'],
+                              'WFR'   : []}
+
+def GetCachedQuery(name, args=()):
+    """ Get a copy of the cached results of a query function, or None if they aren't cached """
+    with _queryCacheLock:
+        entry = _queryCache.get((name, args))
+        if entry == None:
+            queryCacheStats['misses'] += 1
+            return None
+        queryCacheStats['hits'] += 1
+    # Callers are free to change the results they get, so give them a copy
+    return copy.deepcopy(entry[1])
+
+def CacheQuery(name, args, tables, results):
+    """ Remember the results of a query function, and the tables they came from.  Returns the results. """
+    with _queryCacheLock:
+        _queryCache[(name, args)] = (tables, copy.deepcopy(results))
+    return results
+
+def InvalidateQueryCache(tables=None):
+    """ Clear the cached query results that came from any of the listed tables, or all results if no tables are given """
+    global _queryCacheGeneration
+    with _queryCacheLock:
+        _queryCacheGeneration += 1
+        if tables == None:
+            _queryCache.clear()
+        else:
+            for key in [key for (key, (keyTables, results)) in _queryCache.iteritems() if set(keyTables) & set(tables)]:
+                del(_queryCache[key])
+        queryCacheStats['invalidations'] += 1
+
+def QueryCacheGeneration():
+    """ Get a number that changes whenever saved data changes, for caches that don't track individual tables """
+    return _queryCacheGeneration
+
+def InvalidateQueryCacheForMessage(messageHeader):
+    """ Clear the cached query results affected by the data change a Message Server message reports """
+    InvalidateQueryCache(QUERY_CACHE_MESSAGE_TABLES.get(messageHeader, None))
 
 def InitializeSingleUserDatabase():
     """ For single-user Transana only, this initializes (starts) the embedded MySQL Server. """
@@ -915,6 +1033,38 @@ def CreateSynonymsTableQuery(num):
     return query % num
 
 
+def CreateTextIndexTableQuery(num):
+    """ Create query for the Text Index Table, the inverted word index over the PlainText of
+        Documents, Transcripts (Episode and Clip) and Quotes used by Text Search """
+
+    # Text Index Table: Test for existence and create if needed.
+    #   Term        is the lower-case, accent-folded word.  The empty string is used as a marker
+    #               that an object has been indexed, even if its text contains no words.
+    #   ObjectType  is 'D' for Documents, 'T' for Transcripts, and 'Q' for Quotes
+    #   ObjectNum   is the DocumentNum, TranscriptNum or QuoteNum
+    #   Positions   is a comma-separated list of the word positions of Term in the object's PlainText
+    query = """
+              CREATE TABLE IF NOT EXISTS TextIndex%d
+                (Term         VARCHAR(100) NOT NULL, 
+                 ObjectType   CHAR(1) NOT NULL, 
+                 ObjectNum    INTEGER NOT NULL, 
+                 Positions    LONGBLOB, 
+                 PRIMARY KEY (ObjectType, Term, ObjectNum)"""
+    # Add MySQL-specific SQL if appropriate
+    if TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server', 'PyMySQL']:
+        query += """,
+                 KEY ObjectKey (ObjectType, ObjectNum))
+                 DEFAULT CHARACTER SET utf8
+                 COLLATE utf8_bin
+            """
+        # Add the appropriate Table Type to the CREATE Query
+        query = SetTableType(TransanaGlobal.hasInnoDB, query)
+    elif TransanaConstants.DBInstalled in ['sqlite3']:
+        query += ')'
+    # Return the query to the calling routine
+    return query % num
+
+
 def establish_db_exists(dbToOpen=None, usePrompt=True):
     """ Check for the existence of all database tables and create them
         if necessary.  dbToOpen is passed if we are automatically importing a database
@@ -1538,6 +1688,16 @@ def establish_db_exists(dbToOpen=None, usePrompt=True):
         # Execute the Query
         dbCursor.execute(query)
 
+        # TextIndex2 Table: Test for existence and create if needed
+        query = CreateTextIndexTableQuery(2)
+        # Execute the Query
+        dbCursor.execute(query)
+        # sqlite can't declare a secondary key in CREATE TABLE, so we add the object index separately.
+        if TransanaConstants.DBInstalled in ['sqlite3']:
+            query = "CREATE INDEX IF NOT EXISTS TextIndex2Object ON TextIndex2 (ObjectType, ObjectNum)"
+            # Execute the Query
+            dbCursor.execute(query)
+
         if TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server', 'PyMySQL']:
             # Let's test for COLLATION.  ** NOTE:  THIS DOESN'T WORK for CHINESE!! **
             # Create a list of table to check
@@ -1701,12 +1861,21 @@ def FixQuery(query):
         This method converts the SQL query string as needed. """
     # If we're using sqlite ...
     if TransanaConstants.DBInstalled in ['sqlite3']:
+        # If we've converted this query before, use the result from last time
+        query2 = _fixQueryCache.get(query)
+        if query2 != None:
+            return query2
         # ... replace all "%s" parameters with "?" parameters
         query2 = query.replace('%s', '?')
         # Check the query for apostrophes around paramters or the presence of the "%" character (from %d parameters, for example)
         if (query2.find("'?") > -1) or (query2.find('%') > -1):
             # If found, raise a ProgrammingError exception.  We will need to fix the query
             raise TransanaExceptions.ProgrammingError('Query Format Error')
+        # If the cache is full, start it over
+        if len(_fixQueryCache) >= FIX_QUERY_CACHE_SIZE:
+            _fixQueryCache.clear()
+        # Remember the converted query
+        _fixQueryCache[query] = query2
         # Return the modified query
         return query2
     # If we're NOT using sqlite ...
@@ -1791,6 +1960,13 @@ def get_db(dbToOpen=None, usePrompt=True):
     """ Get a connection object reference to the database.  If a connection has not yet been established, then create the connection.
         dbToOpen is passed if we are automatically importing a database following 2.42 to 2.50 Data Conversion. """
     global _dbref
+    global _dbParameters
+    global _dbLastUsed
+    # If the calling thread has opened its own database connection (see open_thread_db()) ...
+    threadDB = getattr(_threadDB, 'dbref', None)
+    if threadDB != None:
+        # ... then that's the connection the thread should use
+        return threadDB
     # If a database reference is not defined ...
     if (_dbref == None):
         # If we are NOT passed a database name, we need to get information from the user.
@@ -1882,7 +2058,7 @@ def get_db(dbToOpen=None, usePrompt=True):
                 # If we should connect to the database ...
                 if result == wx.ID_YES:
                     # ... connect to it.
-                    _dbref = sqlite3.connect(dbName.encode('utf8'))
+                    _dbref = sqlite3.connect(dbName.encode('utf8'), cached_statements=DB_STATEMENT_CACHE_SIZE)
                     # Enable AutoCommit
                     _dbref.isolation_level = None
                     # Have sqlite use Strings rather than Unicode, as all fields in Transana are manually encoded
@@ -2405,9 +2581,231 @@ def get_db(dbToOpen=None, usePrompt=True):
 
             else:
                 TransanaExceptions.ProgrammingError('Database Undefined in DBInterface.get_db()')
+
+        # If we connected, remember how so that open_thread_db() can open additional connections
+        if _dbref != None:
+            _dbParameters = (databaseName, userName, password, dbServer, port)
+    # If the connection has been idle for a while, the server may have dropped it ("MySQL server has gone away").
+    elif (time.time() - _dbLastUsed > DB_IDLE_CHECK) and not ping_connection(_dbref):
+        # If so, connect again
+        reconnect_db()
+    # Note when the connection was last used
+    _dbLastUsed = time.time()
     # Return the database reference
     return _dbref
 
+def ping_connection(db):
+    """ Check that a database connection is still alive """
+    # sqlite and embedded MySQL connections can't be dropped by a server
+    if TransanaConstants.DBInstalled in ['sqlite3', 'MySQLdb-embedded']:
+        return True
+    # Start exception handling
+    try:
+        # Ping the server
+        db.ping()
+        return True
+    # If the ping fails, the connection has been lost
+    except:
+        return False
+
+def reconnect_db():
+    """ Replace the main database connection when the server has dropped it.  Returns True if successful. """
+    global _dbref
+    # If we don't know how to connect, we can't reconnect
+    if _dbParameters == None:
+        return False
+    # Start exception handling
+    try:
+        # Open a new connection, set up the way the original was
+        db = _open_connection()
+    # If the connection can't be made ...
+    except:
+        print "DBInterface.reconnect_db():  Connection failed."
+        print sys.exc_info()[0], sys.exc_info()[1]
+        # ... leave the old connection in place.  Using it will report the lost connection as before.
+        return False
+    # Close the old connection, which the server has already dropped
+    try:
+        _dbref.close()
+    except:
+        pass
+    # Use the new connection
+    _dbref = db
+    return True
+
+def keep_alive():
+    """ Called periodically so an idle Transana doesn't lose its database connection.  Checks the main connection,
+        reconnecting if needed, and closes the worker thread connections that have been sitting idle. """
+    # If there's no database open, there's nothing to do
+    if _dbref == None:
+        return
+    # Check the main connection, reconnecting if the server has dropped it
+    if not ping_connection(_dbref):
+        reconnect_db()
+    # Close the idle worker thread connections.  They'll be opened again when needed.
+    with _dbPoolLock:
+        pool = _dbPool[:]
+        del(_dbPool[:])
+    for db in pool:
+        try:
+            db.close()
+        except:
+            pass
+
+def thread_db_available():
+    """ Report whether open_thread_db() can open an additional database connection """
+    # We need an open database to copy the connection from, and embedded MySQL only supports one connection.
+    return (_dbParameters != None) and (TransanaConstants.DBInstalled not in ['MySQLdb-embedded'])
+
+def _open_connection():
+    """ Open a new connection to the current database, set up the same way as the main connection.
+        Raises an exception if the connection can't be made. """
+    (databaseName, userName, password, dbServer, port) = _dbParameters
+    # If we're using sqlite ...
+    if TransanaConstants.DBInstalled in ['sqlite3']:
+        # ... open the same database file, with the same settings as the main connection
+        db = sqlite3.connect(os.path.join(TransanaGlobal.configData.databaseDir, databaseName + '.db').encode('utf8'),
+                             cached_statements=DB_STATEMENT_CACHE_SIZE)
+        db.isolation_level = None
+        db.text_factory = str
+    # If we're using MySQL ...
+    else:
+        # ... build the connection parameters used by get_db()
+        params = {'host' : dbServer, 'user' : userName, 'passwd' : password, 'port' : int(port), 'use_unicode' : True}
+        if TransanaConstants.DBInstalled in ['PyMySQL']:
+            params['charset'] = 'utf8'
+        if TransanaGlobal.configData.ssl:
+            params['ssl'] = {'cert': TransanaGlobal.configData.sslClientCert, 'key': TransanaGlobal.configData.sslClientKey}
+        # Connect to the Database Server
+        db = MySQLdb.connect(**params)
+        # Get a Database Cursor
+        dbCursor = db.cursor()
+        # If we have MySQL 4.1 or later, match the main connection's UTF-8 settings
+        if float(TransanaGlobal.DBVersion) >= 4.1:
+            # Suppress database warnings while we do this
+            warnings.filterwarnings('ignore', category = MySQLdb.Warning)
+            for query in ['SET CHARACTER SET utf8', 'SET character_set_connection = utf8',
+                          'SET character_set_client = utf8', 'SET character_set_server = utf8',
+                          'SET character_set_database = utf8', 'SET character_set_results = utf8',
+                          'SET collation_connection = utf8_general_ci', 'SET collation_database = utf8_general_ci',
+                          'SET collation_server = utf8_general_ci']:
+                dbCursor.execute(query)
+            warnings.resetwarnings()
+        # Select the database and the session mode used by the main connection
+        dbCursor.execute('USE %s' % databaseName.encode(TransanaGlobal.encoding))
+        dbCursor.execute("set session sql_mode = 'STRICT_TRANS_TABLES,NO_ZERO_IN_DATE,NO_ZERO_DATE,ERROR_FOR_DIVISION_BY_ZERO,NO_AUTO_CREATE_USER,NO_ENGINE_SUBSTITUTION'")
+        dbCursor.close()
+    return db
+
+def open_thread_db():
+    """ Get an additional connection to the current database for the calling thread, so work can be done off
+        the main thread without sharing its connection.  Until close_thread_db() is called, get_db() returns
+        this connection when called from this thread.  Connections are reused from a small pool when possible.
+        Returns None if a second connection is not possible. """
+    # If we can't open another connection ...
+    if not thread_db_available():
+        # ... signal that the caller needs to do without
+        return None
+    # If this thread already has a connection, keep using it
+    db = getattr(_threadDB, 'dbref', None)
+    if db != None:
+        return db
+    # Take an idle connection from the pool, if there is one
+    with _dbPoolLock:
+        if len(_dbPool) > 0:
+            db = _dbPool.pop()
+    # If the server has dropped the pooled connection ...
+    if (db != None) and not ping_connection(db):
+        # ... discard it
+        try:
+            db.close()
+        except:
+            pass
+        db = None
+    # If we don't have a connection yet ...
+    if db == None:
+        # Start exception handling
+        try:
+            # ... open a new one
+            db = _open_connection()
+        # If the connection can't be made ...
+        except:
+            print "DBInterface.open_thread_db():  Connection failed."
+            print sys.exc_info()[0], sys.exc_info()[1]
+            # ... signal that the caller needs to do without.
+            return None
+    # Register the connection for this thread
+    _threadDB.dbref = db
+    # Return the connection
+    return db
+
+def close_thread_db():
+    """ Release the calling thread's own database connection, obtained by open_thread_db() """
+    # Get the connection registered for this thread, if there is one
+    db = getattr(_threadDB, 'dbref', None)
+    # If there is one ...
+    if db != None:
+        # ... stop using it ...
+        _threadDB.dbref = None
+        # Start exception handling
+        try:
+            # ... abandon any transaction the thread left open, so it doesn't hold locks while the connection is idle ...
+            db.rollback()
+            # ... and if the database is still open and the pool isn't full ...
+            with _dbPoolLock:
+                if (_dbParameters != None) and (len(_dbPool) < DB_POOL_SIZE):
+                    # ... put the connection back in the pool for the next thread.
+                    _dbPool.append(db)
+                    db = None
+        except:
+            pass
+        # If the connection wasn't pooled, close it.
+        if db != None:
+            db.close()
+
+def open_streaming_db():
+    """ Open a separate connection for a MySQL streaming cursor.  MySQL can't run any other query on a connection
+        while a server-side cursor is reading from it, so a long read that lets the GUI process events (where the
+        Message Server handlers and the keep-alive ping use the main connection) needs its own connection.
+        Close it with close_streaming_db().  Returns None if no separate connection is needed (sqlite) or possible. """
+    # sqlite can run other queries while a cursor steps through its results, and embedded MySQL only allows one connection
+    if (TransanaConstants.DBInstalled not in ['MySQLdb-server', 'PyMySQL']) or not thread_db_available():
+        return None
+    # Start exception handling
+    try:
+        # Open the connection
+        return _open_connection()
+    # If the connection can't be made ...
+    except:
+        print "DBInterface.open_streaming_db():  Connection failed."
+        print sys.exc_info()[0], sys.exc_info()[1]
+        # ... signal that the caller needs to do without.
+        return None
+
+def close_streaming_db(db):
+    """ Close a connection opened by open_streaming_db() """
+    # Start exception handling
+    try:
+        # The connection was only used for reading
+        db.close()
+    except:
+        pass
+
+def get_streaming_cursor(db=None):
+    """ Return a cursor that reads rows from the server as they are fetched rather than loading the whole
+        result set into memory.  Use fetchmany() on it, and run nothing else on the connection until all
+        rows have been read. """
+    # If no database connection is passed in ...
+    if db == None:
+        # ... use the default connection
+        db = get_db()
+    # MySQL needs a Server-Side Cursor to avoid buffering the whole result set on the client
+    if TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server', 'PyMySQL']:
+        return db.cursor(MySQLdb.cursors.SSCursor)
+    # sqlite cursors already step through results as they are fetched
+    else:
+        return db.cursor()
+
 def GetDBNamesMU(username, password, server, port, useSSL, SSLClient, SSLKey):
     """ Get all Transana database names on the specified server for which the User has permission """
     # Start with a blank list
@@ -2470,8 +2868,23 @@ def close_db():
         db.close()
 
     global _dbref
+    global _dbParameters
     # Remove all reference to the database
     _dbref = None
+    _dbParameters = None
+    # Cached query results belong to the database being closed
+    InvalidateQueryCache()
+    # The next database opened needs its own check for items without Text Index entries
+    InvalidateTextIndex()
+    # Close the idle worker thread connections too
+    with _dbPoolLock:
+        pool = _dbPool[:]
+        del(_dbPool[:])
+    for db in pool:
+        try:
+            db.close()
+        except:
+            pass
 
 
 def get_username():
@@ -2483,12 +2896,10 @@ def list_of_series():
     """Get a list of all Library record names."""
     l = []
     query = "SELECT SeriesNum, SeriesID FROM Series2 ORDER BY SeriesID"
-    DBCursor = get_db().cursor()
+    DBCursor = get_decoding_cursor(['SeriesID'])
     DBCursor.execute(query)
     for row in fetchall_named(DBCursor):
         id = row['SeriesID']
-        if 'unicode' in wx.PlatformInfo:
-            id = ProcessDBDataForUTF8Encoding(id)
         l.append((row['SeriesNum'], id))
     DBCursor.close()
     return l
@@ -2500,17 +2911,13 @@ def list_of_episodes():
     # Define the Query
     query = "SELECT EpisodeNum, EpisodeID, SeriesNum FROM Episodes2 ORDER BY EpisodeID"
     # Get a Database Cursor
-    DBCursor = get_db().cursor()
+    DBCursor = get_decoding_cursor(['EpisodeID'])
     # Execute the Query
     DBCursor.execute(query)
     # Iterate through the Results set
     for row in fetchall_named(DBCursor):
         # Get the Episode ID
         id = row['EpisodeID']
-        # If we're using Unicode ...
-        if 'unicode' in wx.PlatformInfo:
-            # ... we need to handle the Unicode decoding
-            id = ProcessDBDataForUTF8Encoding(id)
         # Add the results to the list
         l.append((row['EpisodeNum'], id, row['SeriesNum']))
     # Close the Database Cursor
@@ -2542,8 +2949,25 @@ def list_of_episodes_for_series(LibraryName):
     DBCursor.close()
     return l
 
-def list_of_episode_transcripts(withoutPlainText = False):
-    """ Get a list of all Episode Transcript records, potentially only those missing extracted Plain Text. """
+def iterate_episode_transcripts(withoutPlainText = False, episodeNum = None):
+    """ Generate (TranscriptNum, TranscriptID, EpisodeNum) for all Episode Transcript records, or only those for the
+        specified Episode, potentially only those missing extracted Plain Text, in Transcript Number order.  Transcripts
+        are read a page at a time, so the Transcripts can be changed while iterating. """
+    # We only want Episode Transcripts, not Clip Transcripts.
+    conditions = ["ClipNum = 0"]
+    # If we ONLY want Episode Transcripts that are missing PlainText ...
+    if withoutPlainText:
+        conditions.append("PlainText IS NULL")
+    # If we ONLY want the Transcripts for one Episode ...
+    if episodeNum != None:
+        conditions.append("EpisodeNum = %d" % episodeNum)
+    for row in iterate_pages("SELECT TranscriptNum, TranscriptID, EpisodeNum FROM Transcripts2", conditions,
+                             'TranscriptNum', decodeColumns=['TranscriptID']):
+        yield (row['TranscriptNum'], row['TranscriptID'], row['EpisodeNum'])
+
+def list_of_episode_transcripts(withoutPlainText = False, episodeNum = None):
+    """ Get a list of all Episode Transcript records, or only those for the specified Episode, potentially
+        only those missing extracted Plain Text. """
     # Create an empty list
     l = []
     # Define the Query.  We only want Episode Transcripts, not Clip Transcripts.
@@ -2551,19 +2975,18 @@ def list_of_episode_transcripts(withoutPlainText = False):
     # If we ONLY want Episode Transcripts that are missing PlainText ...
     if withoutPlainText:
         query += " AND PlainText IS NULL "
+    # If we ONLY want the Transcripts for one Episode ...
+    if episodeNum != None:
+        query += " AND EpisodeNum = %d " % episodeNum
     query += "ORDER BY TranscriptID"
     # Get a Database Cursor
-    DBCursor = get_db().cursor()
+    DBCursor = get_decoding_cursor(['TranscriptID'])
     # Execute the Query
     DBCursor.execute(query)
     # Iterate through the Results Set
     for row in fetchall_named(DBCursor):
         # Get the Transcript ID
         id = row['TranscriptID']
-        # If we're using Unicode ...
-        if 'unicode' in wx.PlatformInfo:
-            # ... then we need to decode the Transcript ID
-            id = ProcessDBDataForUTF8Encoding(id)
         # Add the results to the list
         l.append((row['TranscriptNum'], id, row['EpisodeNum']))
     # Close the Database Cursor
@@ -2615,6 +3038,49 @@ def list_clip_transcripts(clipNum):
     DBCursor.close()
     return l
 
+# Object numbers are put into "IN (...)" lists this many at a time when many objects are loaded at once
+IN_LIST_SIZE = 500
+
+def NumberLists(objectNums):
+    """ Break a list of object numbers into SQL lists of at most IN_LIST_SIZE numbers, for "IN (...)" conditions.
+        Duplicate numbers are only included once. """
+    objectNums = sorted(set(objectNums))
+    for start in range(0, len(objectNums), IN_LIST_SIZE):
+        yield ', '.join(['%d' % num for num in objectNums[start:start + IN_LIST_SIZE]])
+
+def dict_of_clip_transcripts(clipNums):
+    """ Get the Clip Transcript numbers for each of a list of Clips at once.  Returns a dictionary keyed by
+        Clip Number, holding lists of Transcript Numbers in Sort Order, as list_clip_transcripts() would. """
+    # Every Clip gets an entry, even if it has no Transcripts
+    d = {}
+    for clipNum in clipNums:
+        d[clipNum] = []
+    DBCursor = get_db().cursor()
+    for numList in NumberLists(clipNums):
+        query = """ SELECT TranscriptNum, ClipNum
+                      FROM Transcripts2
+                      WHERE ClipNum IN (%s)
+                      ORDER BY SortOrder """ % numList
+        DBCursor.execute(query)
+        for (transcriptNum, clipNum) in DBCursor.fetchall():
+            d[clipNum].append(transcriptNum)
+    DBCursor.close()
+    return d
+
+def iterate_documents(libraryNum = None, withoutPlainText = False):
+    """ Generate (DocumentNum, DocumentID, LibraryNum) for all Document records, or only those for the specified
+        Library, potentially only those missing extracted Plain Text, in Document Number order.  Documents are
+        read a page at a time, so the Documents can be changed while iterating. """
+    conditions = []
+    if libraryNum != None:
+        conditions.append("LibraryNum = %d" % libraryNum)
+    # If we ONLY want Documents that are missing PlainText ...
+    if withoutPlainText:
+        conditions.append("PlainText IS NULL")
+    for row in iterate_pages("SELECT DocumentNum, DocumentID, LibraryNum FROM Documents2", conditions,
+                             'DocumentNum', decodeColumns=['DocumentID']):
+        yield (row['DocumentNum'], row['DocumentID'], row['LibraryNum'])
+
 def list_of_documents(libraryNum = None, withoutPlainText = False):
     """ Get a list of all Document records, or only those for the specified Library, potentially
         only those missing extracted Plain Text. """
@@ -2633,17 +3099,13 @@ def list_of_documents(libraryNum = None, withoutPlainText = False):
         query += "PlainText IS NULL "
     query += "ORDER BY DocumentID"
     # Get a Database Cursor
-    DBCursor = get_db().cursor()
+    DBCursor = get_decoding_cursor(['DocumentID'])
     # Execute the Query
     DBCursor.execute(query)
     # Iterate through the Results set
     for row in fetchall_named(DBCursor):
         # Get the Episode ID
         id = row['DocumentID']
-        # If we're using Unicode ...
-        if 'unicode' in wx.PlatformInfo:
-            # ... we need to handle the Unicode decoding
-            id = ProcessDBDataForUTF8Encoding(id)
         # Add the results to the list
         l.append((row['DocumentNum'], id, row['LibraryNum']))
     # Close the Database Cursor
@@ -2733,10 +3195,14 @@ def list_of_collections(ParentNum=0):
 
 def list_of_all_collections():
     """Get a list of all collections."""
+    # If the list is cached, use it
+    l = GetCachedQuery('list_of_all_collections')
+    if l != None:
+        return l
     # Create an empty list
     l = []
     # Get a Database Cursor
-    DBCursor = get_db().cursor()
+    DBCursor = get_decoding_cursor(['CollectID'])
     # Define the Query
     query = """ SELECT CollectNum, CollectID, ParentCollectNum FROM Collections2
                   ORDER BY ParentCollectNum, CollectID """
@@ -2747,16 +3213,48 @@ def list_of_all_collections():
     for row in fetchall_named(DBCursor):
         # Get the Collection ID
         id = row['CollectID']
-        # If we're using Unicode ...
-        if 'unicode' in wx.PlatformInfo:
-            # ... we need to decode the Collection ID
-            id = ProcessDBDataForUTF8Encoding(id)
         # Add the results to the list
         l.append((row['CollectNum'], id, row['ParentCollectNum']))
     # Close the Database Cursor
     DBCursor.close()
-    # Return the List as the function result
-    return l
+    # Return the List as the function result, remembering it for next time
+    return CacheQuery('list_of_all_collections', (), ['Collections2'], l)
+
+def dictionary_of_tree_child_counts():
+    """ Count the children each Library, Document, Episode, Transcript, Collection, Quote, Clip and Snapshot
+        has in the Database Tree, using a single query.  Returns a dictionary keyed by (node type, record number). """
+    # Each part of the query counts one kind of child, grouped by its parent record
+    queries = [ "SELECT 'LibraryNode' AS NodeType, SeriesNum AS RecNum, COUNT(*) AS Children FROM Episodes2 GROUP BY SeriesNum",
+                "SELECT 'EpisodeNode', EpisodeNum, COUNT(*) FROM Transcripts2 WHERE ClipNum = 0 GROUP BY EpisodeNum",
+                "SELECT 'CollectionNode', ParentCollectNum, COUNT(*) FROM Collections2 GROUP BY ParentCollectNum",
+                "SELECT 'CollectionNode', CollectNum, COUNT(*) FROM Clips2 GROUP BY CollectNum" ]
+    # Notes can be attached to any of these objects.  Map the node type to the Notes table's column.
+    noteColumns = [('LibraryNode', 'SeriesNum'), ('EpisodeNode', 'EpisodeNum'), ('TranscriptNode', 'TranscriptNum'),
+                   ('CollectionNode', 'CollectNum'), ('ClipNode', 'ClipNum')]
+    # Documents, Quotes, and Snapshots are only shown in the Pro version
+    if TransanaConstants.proVersion:
+        queries += [ "SELECT 'LibraryNode', LibraryNum, COUNT(*) FROM Documents2 GROUP BY LibraryNum",
+                     "SELECT 'CollectionNode', CollectNum, COUNT(*) FROM Quotes2 GROUP BY CollectNum",
+                     "SELECT 'CollectionNode', CollectNum, COUNT(*) FROM Snapshots2 GROUP BY CollectNum" ]
+        noteColumns += [('DocumentNode', 'DocumentNum'), ('QuoteNode', 'QuoteNum'), ('SnapshotNode', 'SnapshotNum')]
+    for (nodeType, column) in noteColumns:
+        queries.append("SELECT '%s', %s, COUNT(*) FROM Notes2 WHERE %s <> 0 GROUP BY %s" % (nodeType, column, column, column))
+    # Initialize a Dictionary
+    d = {}
+    # Get a Database Cursor
+    DBCursor = get_db().cursor()
+    # Execute all the counts as a single Query
+    DBCursor.execute(" UNION ALL ".join(queries))
+    # Iterate through the Results Set
+    for (nodeType, recNum, children) in DBCursor.fetchall():
+        # Skip empty parent numbers, such as top-level Collections
+        if recNum != None:
+            # A Library or Collection has several kinds of children, so add the counts together
+            d[(nodeType, recNum)] = d.get((nodeType, recNum), 0) + children
+    # Close the Database Cursor
+    DBCursor.close()
+    # Return the Dictionary
+    return d
 
 def locate_quick_quotes_and_clips_collection():
     """ Determine the collection number of the Quick Quotes and Clips Collection, creating it if necessary. """
@@ -2796,28 +3294,47 @@ def locate_quick_quotes_and_clips_collection():
         tempCollection.db_save()
         return (tempCollection.number, collectionName, True)    
 
-def list_of_quotes(withoutPlainText = False):
-    """ Get a list of all Quotes, regardless of collection, potentially only those missing extracted Plain Text. """
+def iterate_quotes(withoutPlainText = False, collectionNum = None):
+    """ Generate (QuoteNum, QuoteID, CollectNum, SourceDocumentNum, SortOrder) for all Quotes, or only those in the
+        specified Collection, potentially only those missing extracted Plain Text, in Quote Number order.  Quotes are
+        read a page at a time, so the Quotes can be changed while iterating. """
+    conditions = []
+    # If we ONLY want Quotes that are missing PlainText ...
+    if withoutPlainText:
+        conditions.append("PlainText IS NULL")
+    # If we ONLY want the Quotes in one Collection ...
+    if collectionNum != None:
+        conditions.append("CollectNum = %d" % collectionNum)
+    for row in iterate_pages("SELECT QuoteNum, QuoteID, CollectNum, SourceDocumentNum, SortOrder FROM Quotes2", conditions,
+                             'QuoteNum', decodeColumns=['QuoteID']):
+        yield (row['QuoteNum'], row['QuoteID'], row['CollectNum'], row['SourceDocumentNum'], row['SortOrder'])
+
+def list_of_quotes(withoutPlainText = False, collectionNum = None):
+    """ Get a list of all Quotes, regardless of collection, or only those in the specified Collection,
+        potentially only those missing extracted Plain Text. """
     # Create an empty list
     l = []
     # Define the Query
     query = "SELECT QuoteNum, QuoteID, CollectNum, SourceDocumentNum, SortOrder FROM Quotes2 "
+    if withoutPlainText or (collectionNum != None):
+        query += "WHERE "
     # If we ONLY want Quotes that are missing PlainText ...
     if withoutPlainText:
-        query += "WHERE PlainText IS NULL "
+        query += "PlainText IS NULL "
+        if collectionNum != None:
+            query += "AND "
+    # If we ONLY want the Quotes in one Collection ...
+    if collectionNum != None:
+        query += "CollectNum = %d " % collectionNum
     query += "ORDER BY SortOrder, QuoteID "
     # Get a Database Cursor
-    DBCursor = get_db().cursor()
+    DBCursor = get_decoding_cursor(['QuoteID'])
     # Execute the Query
     DBCursor.execute(query)
     # Iterate through the Results
     for row in fetchall_named(DBCursor):
         # Get the Quote ID
         id = row['QuoteID']
-        # If we're using Unicode ...
-        if 'unicode' in wx.PlatformInfo:
-            # ... we need to decode the ClipID
-            id = ProcessDBDataForUTF8Encoding(id)
         # Add the results to the list
         l.append((row['QuoteNum'], id, row['CollectNum'], row['SourceDocumentNum'], row['SortOrder']))
     # Close the Database Cursor
@@ -2897,8 +3414,27 @@ def list_of_quotes_by_collectionnum(collectionNum, includeSortOrder=False):
     cursor.close()
     return quoteList
 
-def list_of_clips(withoutPlainText = False):
-    """ Get a list of all Clips, regardless of collection, potentially only those missing extracted Plain Text. """
+def iterate_clips(withoutPlainText = False, collectionNum = None):
+    """ Generate (ClipNum, ClipID, CollectNum, EpisodeNum, SortOrder) for all Clips, or only those in the specified
+        Collection, potentially only those with a Transcript missing extracted Plain Text, in Clip Number order.  Clips
+        are read a page at a time, so the Clips can be changed while iterating. """
+    conditions = []
+    # If we ONLY want Clips that are missing PlainText ...
+    if withoutPlainText:
+        # A Clip with several Transcripts missing PlainText is only listed once
+        query = "SELECT DISTINCT c.ClipNum, c.ClipID, c.CollectNum, c.EpisodeNum, c.SortOrder FROM Clips2 c, Transcripts2 t"
+        conditions += ["c.ClipNum = t.ClipNum", "t.PlainText IS NULL"]
+    else:
+        query = "SELECT c.ClipNum, c.ClipID, c.CollectNum, c.EpisodeNum, c.SortOrder FROM Clips2 c"
+    # If we ONLY want the Clips in one Collection ...
+    if collectionNum != None:
+        conditions.append("c.CollectNum = %d" % collectionNum)
+    for row in iterate_pages(query, conditions, 'c.ClipNum', decodeColumns=['ClipID']):
+        yield (row['ClipNum'], row['ClipID'], row['CollectNum'], row['EpisodeNum'], row['SortOrder'])
+
+def list_of_clips(withoutPlainText = False, collectionNum = None):
+    """ Get a list of all Clips, regardless of collection, or only those in the specified Collection,
+        potentially only those missing extracted Plain Text. """
     # Create an empty list
     l = []
     # Define the Query
@@ -2906,19 +3442,22 @@ def list_of_clips(withoutPlainText = False):
     # If we ONLY want Clips that are missing PlainText ...
     if withoutPlainText:
         query += ", Transcripts2 t WHERE c.ClipNum = t.ClipNum AND t.PlainText IS NULL "
+        if collectionNum != None:
+            query += "AND "
+    elif collectionNum != None:
+        query += " WHERE "
+    # If we ONLY want the Clips in one Collection ...
+    if collectionNum != None:
+        query += "c.CollectNum = %d " % collectionNum
     query += " ORDER BY c.SortOrder, c.ClipID "
     # Get a Database Cursor
-    DBCursor = get_db().cursor()
+    DBCursor = get_decoding_cursor(['ClipID'])
     # Execute the Query
     DBCursor.execute(query)
     # Iterate through the Results
     for row in fetchall_named(DBCursor):
         # Get the Clip ID
         id = row['ClipID']
-        # If we're using Unicode ...
-        if 'unicode' in wx.PlatformInfo:
-            # ... we need to decode the ClipID
-            id = ProcessDBDataForUTF8Encoding(id)
         # Add the results to the list
         l.append((row['ClipNum'], id, row['CollectNum'], row['EpisodeNum'], row['SortOrder']))
     # Close the Database Cursor
@@ -2983,6 +3522,10 @@ def list_of_clips_by_collectionnum(collectionNum, includeSortOrder=False):
 def list_of_clips_by_episode(EpisodeNum, TimeCode=None):
     """Get a list of all Clips that have been created from a given Episode
     Number.  Optionally restrict list to contain only a given timecode."""
+    # If the list is cached, use it
+    l = GetCachedQuery('list_of_clips_by_episode', (EpisodeNum, TimeCode))
+    if l != None:
+        return l
     l = []
     if TimeCode == None:
         query = """
@@ -3023,7 +3566,7 @@ def list_of_clips_by_episode(EpisodeNum, TimeCode=None):
                   'Comment' : row['ClipComment']})
 
     DBCursor.close()
-    return l
+    return CacheQuery('list_of_clips_by_episode', (EpisodeNum, TimeCode), ['Clips2', 'Collections2'], l)
 
 def list_of_clips_by_transcriptnum(TranscriptNum):
     """  Get a list of all Clips that have been created from a given Transcript Number.  """
@@ -3127,25 +3670,24 @@ def list_of_clip_copies(clipID, sourceTranscriptNum, clipStart, clipStop):
     # Return the data list to the calling routine
     return clipList
 
-def list_of_snapshots():
-    """ Get a list of all Snapshots, regardless of collection. """
+def list_of_snapshots(collectionNum = None):
+    """ Get a list of all Snapshots, regardless of collection, or only those in the specified Collection. """
     # Create an empty list
     l = []
     # Define the Query
-    query = """ SELECT SnapshotNum, SnapshotID, CollectNum, SortOrder FROM Snapshots2
-                  ORDER BY SortOrder, SnapshotID """
+    query = "SELECT SnapshotNum, SnapshotID, CollectNum, SortOrder FROM Snapshots2 "
+    # If we ONLY want the Snapshots in one Collection ...
+    if collectionNum != None:
+        query += "WHERE CollectNum = %d " % collectionNum
+    query += "ORDER BY SortOrder, SnapshotID"
     # Get a Database Cursor
-    DBCursor = get_db().cursor()
+    DBCursor = get_decoding_cursor(['SnapshotID'])
     # Execute the Query
     DBCursor.execute(query)
     # Iterate through the Results
     for row in fetchall_named(DBCursor):
         # Get the Snapshot ID
         id = row['SnapshotID']
-        # If we're using Unicode ...
-        if 'unicode' in wx.PlatformInfo:
-            # ... we need to decode the ClipID
-            id = ProcessDBDataForUTF8Encoding(id)
         # Add the results to the list
         l.append((row['SnapshotNum'], id, row['CollectNum'], row['SortOrder']))
     # Close the Database Cursor
@@ -3239,29 +3781,442 @@ def list_of_snapshots_by_collectionnum(collectionNum, includeSortOrder=False):
     cursor.close()
     return snapshotList
 
-def CountItemsWithoutPlainText():
-    """ Return the number of Documents, Episode Transcripts, Quote, and Clip Transcripts that have NULL in their PlainText Column.
-        This indicates the need to update the PlainText data! """
-    # Get a list of Documents without Plain Text
-    documents = list_of_documents(withoutPlainText=True)
-    # Get a list of Episode Transcripts without Plain Text
-    episodeTranscripts = list_of_episode_transcripts(withoutPlainText=True)
-    # Get a list of Quotes without Plain Text
-    quotes = list_of_quotes(withoutPlainText=True)
-    # Get a list of Clips without Plain Text
-    clips = list_of_clips(withoutPlainText=True)
-
-##    for x in documents:
-##        print "Document:", x
-##    for x in episodeTranscripts:
-##        print "Episode Transcript:", x
-##    for x in quotes:
-##        print "Quote:", x
-##    for x in clips:
-##        print "Clip:", x
-        
-    # Return the sum of the lengths of these lists
-    return len(documents) + len(episodeTranscripts) + len(quotes) + len(clips)
+# Queries counting the Documents, Episode Transcripts, Quotes, and Clips that are missing extracted Plain Text
+PLAIN_TEXT_MISSING_QUERIES = {'D' : "SELECT COUNT(*) FROM Documents2 WHERE PlainText IS NULL",
+                              'T' : "SELECT COUNT(*) FROM Transcripts2 WHERE ClipNum = 0 AND PlainText IS NULL",
+                              'Q' : "SELECT COUNT(*) FROM Quotes2 WHERE PlainText IS NULL",
+                              'C' : "SELECT COUNT(DISTINCT c.ClipNum) FROM Clips2 c, Transcripts2 t WHERE c.ClipNum = t.ClipNum AND t.PlainText IS NULL"}
+
+def CountItemsWithoutPlainText(objectType = None):
+    """ Return the number of Documents, Episode Transcripts, Quotes, and Clips that have NULL in their PlainText Column,
+        or only those of one type ('D', 'T', 'Q' or 'C').  This indicates the need to update the PlainText data! """
+    # If no type is specified, count them all
+    if objectType == None:
+        objectTypes = ['D', 'T', 'Q', 'C']
+    else:
+        objectTypes = [objectType]
+    count = 0
+    # Get a Database Cursor
+    DBCursor = get_db().cursor()
+    # Count the records of each type without reading them
+    for objectType in objectTypes:
+        DBCursor.execute(PLAIN_TEXT_MISSING_QUERIES[objectType])
+        count += DBCursor.fetchone()[0]
+    # Close the Database Cursor
+    DBCursor.close()
+    # Return the total
+    return count
+
+# Text Index object types, mapped to the table and key field holding the PlainText being indexed
+TEXT_INDEX_OBJECTS = {'D' : ('Documents2', 'DocumentNum'),
+                      'T' : ('Transcripts2', 'TranscriptNum'),
+                      'Q' : ('Quotes2', 'QuoteNum')}
+# Words longer than the Term field are not indexed.  Searches for them fall back to scanning the PlainText.
+TEXT_INDEX_MAX_TERM_LENGTH = 100
+# If a search term matches more objects than this, the candidate list is no help and we scan the PlainText instead.
+TEXT_INDEX_MAX_CANDIDATES = 5000
+# Words are runs of Unicode letters and digits, the same way the Word Frequency Report splits text
+TEXT_INDEX_WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+# Search text containing LIKE wildcards, or regular expression characters for whole-word searches, can't be
+# looked up in the Text Index.  Those searches scan the PlainText.
+TEXT_INDEX_LIKE_WILDCARDS = '%_'
+TEXT_INDEX_REGEXP_CHARACTERS = '.^$*+?()[]{}|\\'
+
+# Items without Text Index entries (from databases created before the Text Index existed, or added by XML Import)
+# are indexed once per database, in the background.  Text Search doesn't use the Text Index until that's done.
+# The generation changes when the check must be done again, so an indexing thread started for an earlier
+# generation doesn't mark the Text Index ready.
+_textIndexState = {'ready' : False, 'generation' : 0, 'thread' : None}
+_textIndexLock = threading.Lock()
+
+# Plain Text is read in groups of this many object numbers per query
+PLAIN_TEXT_QUERY_SIZE = 500
+
+def PlainTextQueryParts(objectType, objectNums):
+    """ Break a list of object numbers into groups for PlainText queries.  Yields (key field, table, SQL list of numbers).
+        objectType is 'D', 'T', or 'Q' for Documents, Transcripts, and Quotes, or 'C' for the Transcripts of Clips. """
+    # Clip Transcripts are found through their Clip Number
+    if objectType == 'C':
+        (tableName, keyField, selectField) = ('Transcripts2', 'ClipNum', 'TranscriptNum')
+    else:
+        (tableName, keyField) = TEXT_INDEX_OBJECTS[objectType]
+        selectField = keyField
+    for start in range(0, len(objectNums), PLAIN_TEXT_QUERY_SIZE):
+        yield (selectField, tableName, keyField, ', '.join(['%d' % num for num in objectNums[start:start + PLAIN_TEXT_QUERY_SIZE]]))
+
+def dictionary_of_plain_text_save_times(objectType, objectNums):
+    """ Get the Last Save Time of each of a list of Documents ('D'), Transcripts ('T'), or Quotes ('Q'), or of each
+        Transcript of a list of Clips ('C'), without reading any text.  Returns a dictionary keyed by the Document,
+        Transcript, or Quote number, holding (Last Save Time, Document, Transcript, Quote, or Clip number). """
+    # Initialize a Dictionary
+    d = {}
+    # Get a Database Cursor
+    DBCursor = get_db().cursor()
+    for (selectField, tableName, keyField, numList) in PlainTextQueryParts(objectType, objectNums):
+        query = "SELECT %s, LastSaveTime, %s FROM %s WHERE %s IN (%s)" % (selectField, keyField, tableName, keyField, numList)
+        DBCursor.execute(query)
+        for (objectNum, lastSaveTime, keyNum) in DBCursor.fetchall():
+            d[objectNum] = (lastSaveTime, keyNum)
+    # Close the Database Cursor
+    DBCursor.close()
+    # Return the Dictionary
+    return d
+
+def iterate_plain_text(objectType, objectNums, batchSize=50):
+    """ Generate (object number, Plain Text, Last Save Time) for each of a list of Documents ('D'), Transcripts ('T'),
+        or Quotes ('Q'), or each Transcript of a list of Clips ('C').  Only the Plain Text is read, not the XML or
+        RTF text, and rows are read from the server batchSize at a time rather than all at once.
+        Read all the results before running other queries. """
+    # Get a cursor that reads rows as they are fetched
+    DBCursor = get_streaming_cursor()
+    try:
+        for (selectField, tableName, keyField, numList) in PlainTextQueryParts(objectType, objectNums):
+            query = "SELECT %s, PlainText, LastSaveTime FROM %s WHERE %s IN (%s)" % (selectField, tableName, keyField, numList)
+            DBCursor.execute(query)
+            rows = DBCursor.fetchmany(batchSize)
+            while len(rows) > 0:
+                for (objectNum, plainText, lastSaveTime) in rows:
+                    # Plain Text may come back as an array or a buffer rather than a string
+                    if type(plainText).__name__ == 'array':
+                        plainText = plainText.tostring()
+                    elif isinstance(plainText, buffer):
+                        plainText = str(plainText)
+                    # Decode it
+                    if isinstance(plainText, str):
+                        plainText = ProcessDBDataForUTF8Encoding(plainText)
+                    yield (objectNum, plainText, lastSaveTime)
+                rows = DBCursor.fetchmany(batchSize)
+    finally:
+        # Close the Database Cursor
+        DBCursor.close()
+
+# The column holding the XML or RTF text that Plain Text is extracted from, for each kind of object
+PLAIN_TEXT_SOURCE_COLUMNS = {'D' : 'XMLText',
+                             'T' : 'RTFText',
+                             'Q' : 'XMLText',
+                             'C' : 'RTFText'}
+
+def dictionary_of_text_without_plain_text(objectType, objectNums):
+    """ Get the XML or RTF text of each of a list of Documents ('D'), Transcripts ('T'), or Quotes ('Q'), or of each
+        Transcript of a list of Clips ('C'), that is missing its Plain Text.  Returns a dictionary keyed by the Document,
+        Transcript, or Quote number.  The text is left encoded, as the Plain Text extractor expects. """
+    # Initialize a Dictionary
+    d = {}
+    # Get a Database Cursor
+    DBCursor = get_db().cursor()
+    for (selectField, tableName, keyField, numList) in PlainTextQueryParts(objectType, objectNums):
+        query = "SELECT %s, %s FROM %s WHERE %s IN (%s) AND PlainText IS NULL" % \
+                (selectField, PLAIN_TEXT_SOURCE_COLUMNS[objectType], tableName, keyField, numList)
+        DBCursor.execute(query)
+        for (objectNum, text) in DBCursor.fetchall():
+            # The text may come back as an array or a buffer rather than a string
+            if type(text).__name__ == 'array':
+                if text.typecode == 'u':
+                    text = text.tounicode()
+                else:
+                    text = text.tostring()
+            elif isinstance(text, buffer):
+                text = str(text)
+            elif text == None:
+                text = ''
+            d[objectNum] = text
+    # Close the Database Cursor
+    DBCursor.close()
+    # Return the Dictionary
+    return d
+
+def UpdatePlainText(objectType, plainTexts):
+    """ Save extracted Plain Text for a list of Documents ('D'), Transcripts ('T' or 'C'), or Quotes ('Q'), and update
+        their Text Index entries, in a single transaction.  plainTexts is a list of (object number, Plain Text, length),
+        where length is the Document Length in characters (used for Documents only).  Records that have been given Plain
+        Text since they were read are not changed. """
+    # Clip Transcripts are Transcripts
+    if objectType == 'C':
+        objectType = 'T'
+    (tableName, keyField) = TEXT_INDEX_OBJECTS[objectType]
+    # Documents also record their length
+    if objectType == 'D':
+        query = "UPDATE %s SET PlainText = %%s, DocumentLength = %%s WHERE %s = %%s AND PlainText IS NULL" % (tableName, keyField)
+    else:
+        query = "UPDATE %s SET PlainText = %%s WHERE %s = %%s AND PlainText IS NULL" % (tableName, keyField)
+    # Adjust the query for sqlite if needed
+    query = FixQuery(query)
+    # Get a Database Cursor
+    DBCursor = get_db().cursor()
+    DBCursor.execute("BEGIN")
+    try:
+        for (objectNum, plainText, length) in plainTexts:
+            # Encode the Plain Text for the database if needed
+            if 'unicode' in wx.PlatformInfo:
+                dbPlainText = plainText.encode(TransanaGlobal.encoding)
+            else:
+                dbPlainText = plainText
+            if objectType == 'D':
+                DBCursor.execute(query, (dbPlainText, length, objectNum))
+            else:
+                DBCursor.execute(query, (dbPlainText, objectNum))
+            # If the record was updated, index its new Plain Text.  If it was given Plain Text (and indexed) by a save
+            # since it was read, its Text Index entries are already right.
+            if DBCursor.rowcount == 1:
+                UpdateTextIndex(objectType, objectNum, plainText, DBCursor)
+        DBCursor.execute("COMMIT")
+    except:
+        DBCursor.execute("ROLLBACK")
+        raise
+    finally:
+        # Close the Database Cursor
+        DBCursor.close()
+
+def TextIndexWords(text):
+    """ Split text into the list of lower-case, accent-folded words used by the Text Index.  The same
+        folding is applied to indexed text and to search text, so the index always finds a superset
+        of what the case-insensitive PlainText comparisons in Search will accept. """
+    # If we have no text, we have no words
+    if not text:
+        return []
+    # Text from the database may still be UTF-8 encoded
+    if not isinstance(text, unicode):
+        text = text.decode('utf8', 'replace')
+    # Decompose accented characters and drop the combining marks, so "Caf" is indexed as "cafe"
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = u''.join([c for c in text if not unicodedata.combining(c)])
+    # Return the list of words, in order
+    return TEXT_INDEX_WORD_PATTERN.findall(text)
+
+def UpdateTextIndex(objectType, objectNum, plainText, dbCursor=None):
+    """ Replace the Text Index entries for a Document ('D'), Transcript ('T') or Quote ('Q').
+        Pass the save routine's cursor so the index is updated inside the save transaction. """
+    # If we weren't passed a cursor, get one
+    if dbCursor == None:
+        cursor = get_db().cursor()
+    else:
+        cursor = dbCursor
+    # Remove the object's old index entries
+    DeleteTextIndex(objectType, objectNum, cursor)
+    # Objects without Plain Text (not yet extracted) are left un-indexed.  The Plain Text extraction will index them.
+    if plainText != None:
+        # Build a dictionary of words and the positions where they occur
+        positions = {}
+        for (pos, word) in enumerate(TextIndexWords(plainText)):
+            if len(word) <= TEXT_INDEX_MAX_TERM_LENGTH:
+                positions.setdefault(word, []).append(pos)
+        # The empty Term marks the object as indexed, even if it contains no words
+        values = [('', objectType, objectNum, '')]
+        for (word, wordPositions) in positions.iteritems():
+            # Encode the term for the database if needed
+            if 'unicode' in wx.PlatformInfo:
+                word = word.encode(TransanaGlobal.encoding)
+            values.append((word, objectType, objectNum, ','.join(map(str, wordPositions))))
+        # Define the insert query
+        query = """ INSERT INTO TextIndex2
+                      (Term, ObjectType, ObjectNum, Positions)
+                    VALUES
+                      (%s, %s, %s, %s) """
+        # Adjust the query for sqlite if needed
+        query = FixQuery(query)
+        # Insert all the terms in a single batch
+        cursor.executemany(query, values)
+    # If we created the cursor, close it
+    if dbCursor == None:
+        cursor.close()
+
+def DeleteTextIndex(objectType, objectNum, dbCursor=None):
+    """ Remove the Text Index entries for a Document ('D'), Transcript ('T') or Quote ('Q') """
+    # If we weren't passed a cursor, get one
+    if dbCursor == None:
+        cursor = get_db().cursor()
+    else:
+        cursor = dbCursor
+    # Define the delete query
+    query = "DELETE FROM TextIndex2 WHERE ObjectType = %s AND ObjectNum = %s"
+    # Adjust the query for sqlite if needed
+    query = FixQuery(query)
+    # Execute the query
+    cursor.execute(query, (objectType, objectNum))
+    # If we created the cursor, close it
+    if dbCursor == None:
+        cursor.close()
+
+def IndexItemsWithoutTextIndex():
+    """ Add Text Index entries for any Documents, Transcripts, and Quotes that have Plain Text but have not been indexed,
+        such as records from databases created before the Text Index existed or added by XML Import.
+        Returns the number of items indexed. """
+    # Initialize the count
+    count = 0
+    # Get a Database Cursor
+    DBCursor = get_db().cursor()
+    # For each kind of object in the index ...
+    for objectType in TEXT_INDEX_OBJECTS.keys():
+        (tableName, keyField) = TEXT_INDEX_OBJECTS[objectType]
+        # ... records that have Plain Text but lack the empty "indexed" marker Term need indexing
+        whereSQL = """ WHERE PlainText IS NOT NULL AND
+                             %s NOT IN (SELECT ObjectNum FROM TextIndex2
+                                          WHERE ObjectType = '%s' AND Term = '') """ % (keyField, objectType)
+        # Get the record numbers first, as indexing uses the same connection
+        DBCursor.execute("SELECT %s FROM %s %s" % (keyField, tableName, whereSQL))
+        objectNums = [rec[0] for rec in DBCursor.fetchall()]
+        # Define the query to get one record's Plain Text
+        query = "SELECT PlainText FROM %s %s AND %s = %%s" % (tableName, whereSQL, keyField)
+        # Adjust the query for sqlite if needed
+        query = FixQuery(query)
+        # Index each record in its own transaction.  The record may have been saved (and indexed) since the list
+        # was made, so get its Plain Text only if it still needs indexing.
+        for objectNum in objectNums:
+            DBCursor.execute("BEGIN")
+            try:
+                DBCursor.execute(query, (objectNum,))
+                rec = DBCursor.fetchone()
+                if rec != None:
+                    UpdateTextIndex(objectType, objectNum, rec[0], DBCursor)
+                    count += 1
+                DBCursor.execute("COMMIT")
+            except:
+                DBCursor.execute("ROLLBACK")
+                raise
+    # Close the Database Cursor
+    DBCursor.close()
+    # Return the number of items indexed
+    return count
+
+def TextIndexReady():
+    """ Report whether every item with Plain Text has Text Index entries, so Text Search can use the Text Index.
+        If that hasn't been checked yet, start indexing the missing items in the background and return False. """
+    with _textIndexLock:
+        # If the check has been done, the Text Index is ready
+        if _textIndexState['ready']:
+            return True
+        # If the missing items are being indexed, the Text Index isn't ready yet
+        if (_textIndexState['thread'] != None) and _textIndexState['thread'].isAlive():
+            return False
+        # If we can open another database connection ...
+        if thread_db_available():
+            # ... index the missing items in the background
+            thread = threading.Thread(target=_IndexItemsWithoutTextIndexThread, args=(_textIndexState['generation'], ))
+            # prevent the application from hanging on Close
+            thread.setDaemon(1)
+            thread.start()
+            _textIndexState['thread'] = thread
+            return False
+    # Without a second connection (embedded MySQL), index the missing items now, once
+    IndexItemsWithoutTextIndex()
+    with _textIndexLock:
+        _textIndexState['ready'] = True
+    return True
+
+def _IndexItemsWithoutTextIndexThread(generation):
+    """ Index the items without Text Index entries on a background thread's own database connection """
+    # Start exception handling.  (No GUI from inside the thread.)
+    try:
+        # Open this thread's own database connection
+        if open_thread_db() == None:
+            return
+        try:
+            count = IndexItemsWithoutTextIndex()
+        finally:
+            # Close the thread's database connection
+            close_thread_db()
+        with _textIndexLock:
+            # If nothing has happened since the thread started to require another check, the Text Index is ready
+            if _textIndexState['generation'] == generation:
+                _textIndexState['ready'] = True
+        if DEBUG:
+            print "DBInterface._IndexItemsWithoutTextIndexThread():  %d items indexed" % count
+    except:
+        # Note the failure in the Error Log.  The next Text Search will try again.
+        print "DBInterface._IndexItemsWithoutTextIndexThread():"
+        print sys.exc_info()[0]
+        print sys.exc_info()[1]
+
+def InvalidateTextIndex():
+    """ Note that items may have been saved without Text Index entries (by XML Import, for example), or that a
+        different database is open, so the next Text Search must check for items that need indexing """
+    with _textIndexLock:
+        _textIndexState['ready'] = False
+        _textIndexState['generation'] += 1
+        _textIndexState['thread'] = None
+
+def TextIndexCandidates(objectType, searchText, wholeWords=False):
+    """ Use the Text Index to find the Documents ('D'), Transcripts ('T') or Quotes ('Q') whose Plain Text could
+        contain searchText.  If wholeWords is False, the first and last words of searchText may be fragments of
+        longer words, the way "PlainText LIKE '%searchText%'" works.  Returns a set of object numbers that
+        includes every match (the caller must still confirm the exact match), or None if the index can't
+        narrow the search. """
+    # Wildcards in the search text can match any text, so the Text Index can't narrow the search
+    if wholeWords:
+        wildcards = TEXT_INDEX_REGEXP_CHARACTERS
+    else:
+        wildcards = TEXT_INDEX_LIKE_WILDCARDS
+    for c in wildcards:
+        if c in searchText:
+            return None
+    # Break the search text into words
+    words = TextIndexWords(searchText)
+    # If there are no words, or a word we don't index, the index can't help
+    if (len(words) == 0) or (max([len(word) for word in words]) > TEXT_INDEX_MAX_TERM_LENGTH):
+        return None
+    # If the search text starts or ends in the middle of a word, the edge words may be word fragments
+    if isinstance(searchText, unicode):
+        partialStart = TEXT_INDEX_WORD_PATTERN.match(searchText[0]) != None
+        partialEnd = TEXT_INDEX_WORD_PATTERN.match(searchText[-1]) != None
+    else:
+        partialStart = partialEnd = True
+    # Get a Database Cursor
+    DBCursor = get_db().cursor()
+    # Candidates maps object numbers to the word positions where the phrase could start
+    candidates = None
+    for (wordNum, word) in enumerate(words):
+        # Fragments need a LIKE comparison
+        isSuffix = (not wholeWords) and partialStart and (wordNum == 0)
+        isPrefix = (not wholeWords) and partialEnd and (wordNum == len(words) - 1)
+        # Build the Term comparison
+        if isSuffix or isPrefix:
+            termSQL = 'Term LIKE %s'
+            term = word
+            if isSuffix:
+                term = u'%' + term
+            if isPrefix:
+                term = term + u'%'
+        else:
+            termSQL = 'Term = %s'
+            term = word
+        # Encode the term for the database if needed
+        if 'unicode' in wx.PlatformInfo:
+            term = term.encode(TransanaGlobal.encoding)
+        query = "SELECT ObjectNum, Positions FROM TextIndex2 WHERE ObjectType = %s AND " + termSQL
+        # Adjust the query for sqlite if needed
+        query = FixQuery(query)
+        DBCursor.execute(query, (objectType, term))
+        # Collect the possible phrase starting positions for each object containing this word
+        wordStarts = {}
+        for (objectNum, positions) in DBCursor.fetchall():
+            # Only objects that contained all the earlier words are of interest
+            if (candidates != None) and (not candidates.has_key(objectNum)):
+                continue
+            # Convert Positions from a BLOB if needed
+            if type(positions).__name__ == 'array':
+                positions = positions.tostring()
+            # The phrase would start wordNum words before this word
+            starts = wordStarts.setdefault(objectNum, set())
+            starts.update([int(pos) - wordNum for pos in str(positions).split(',')])
+        # Keep only objects where this word follows the earlier words
+        if candidates == None:
+            candidates = wordStarts
+        else:
+            for objectNum in wordStarts.keys():
+                wordStarts[objectNum] &= candidates[objectNum]
+                if len(wordStarts[objectNum]) == 0:
+                    del(wordStarts[objectNum])
+            candidates = wordStarts
+        # If nothing is left, we don't need to look at the rest of the words
+        if len(candidates) == 0:
+            break
+    # Close the Database Cursor
+    DBCursor.close()
+    # If the index couldn't narrow the search enough to be worth it, signal that
+    if (candidates == None) or (len(candidates) > TEXT_INDEX_MAX_CANDIDATES):
+        return None
+    # Return the set of object numbers
+    return set(candidates.keys())
 
 def GetSortOrderData(collectionNum):
     """ Get the Sort Order information for a Collection's Quotes, Clips and Snapshots.
@@ -3768,7 +4723,7 @@ def list_of_node_notes(** kwargs):
     # Finish the Query
     query = query + "   ORDER BY NoteID\n"
     # Get a Database Cursor
-    DBCursor = get_db().cursor()
+    DBCursor = get_decoding_cursor(['NoteID'])
     # Execute the Query
     DBCursor.execute(query)
     # Get the results set
@@ -3777,10 +4732,6 @@ def list_of_node_notes(** kwargs):
     for tup in r:
         # Get the Note ID
         id = tup[1]
-        # If we're working with Unicode ...
-        if 'unicode' in wx.PlatformInfo:
-            # ... we need to decode the Note ID
-            id = ProcessDBDataForUTF8Encoding(id)
         # Add the results to the list
         notelist.append((tup[0], id) + tup[2:])
     # Close the Database Cursor
@@ -3788,11 +4739,10 @@ def list_of_node_notes(** kwargs):
     # Return the list as the function results
     return notelist
 
-def list_of_all_notes(reportType=None, searchText=None):
-    """ Get a list of all Notes for the Notes Browser """
-    # initialize the Notes List as empty
-    notelist = []
-
+def iterate_all_notes(reportType=None, searchText=None):
+    """ Generate all Notes for the Notes Browser and the Notes Report.  Notes are read from the server as they
+        are needed.  On MySQL they are read on a separate connection, so the caller can load the Notes' parent
+        objects while iterating. """
     # We want to display all the Notes in each section in alphabetical order.
 
     # Query for ALL Notes in order of NoteID.
@@ -3834,42 +4784,52 @@ def list_of_all_notes(reportType=None, searchText=None):
         
     # We always want to sort by NoteID
     query += " ORDER BY NoteID"
-    # Make sure we have a Database connection
-    db = get_db()
-    # Get a database cursor
-    DBCursor = db.cursor()
-    # Execute the query
-    DBCursor.execute(query)
-    # Get the Results Set
-    results = DBCursor.fetchall()
-    # For each row in the results set ...
-    for row in results:
-        # Pull out the elements that need to be encoded
-        ID = row[1]
-        noteTaker = row[10]
-        # Encode the elements, if needed
-        if 'unicode' in wx.PlatformInfo:
-            ID = ProcessDBDataForUTF8Encoding(ID)
-            noteTaker = ProcessDBDataForUTF8Encoding(noteTaker)
-        # Create a Dictionary Object to be added to the Notes List
-        notelist.append({'NoteNum' : row[0],
-                         'NoteID' : ID,
-                         'SeriesNum' : row[2],
-                         'EpisodeNum' : row[3],
-                         'TranscriptNum' : row[4],
-                         'CollectNum' : row[5],
-                         'ClipNum' : row[6],
-                         'SnapshotNum' : row[7],
-                         'DocumentNum' : row[8],
-                         'QuoteNum' : row[9],
-                         'NoteTaker' : noteTaker})
-    # Close the Database Cursor
-    DBCursor.close()
+    # MySQL can't run other queries on a connection while a server-side cursor is reading from it, so stream the
+    # Notes from a separate connection.  (sqlite can stream from the main connection.)
+    streamDb = None
+    streaming = True
+    if TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server', 'PyMySQL']:
+        streamDb = open_streaming_db()
+        # If we can't have a separate connection, read the Notes the regular way rather than tie up the main one
+        if streamDb == None:
+            streaming = False
+    # Get a database cursor that decodes the Note ID and Note Taker
+    DBCursor = get_decoding_cursor(['NoteID', 'NoteTaker'], db=streamDb, streaming=streaming)
+    try:
+        # Execute the query
+        DBCursor.execute(query)
+        # For each row in the results set ...
+        for row in iterate_named(DBCursor):
+            # Create a Dictionary Object for the Note
+            yield {'NoteNum' : row['NoteNum'],
+                   'NoteID' : row['NoteID'],
+                   'SeriesNum' : row['SeriesNum'],
+                   'EpisodeNum' : row['EpisodeNum'],
+                   'TranscriptNum' : row['TranscriptNum'],
+                   'CollectNum' : row['CollectNum'],
+                   'ClipNum' : row['ClipNum'],
+                   'SnapshotNum' : row['SnapshotNum'],
+                   'DocumentNum' : row['DocumentNum'],
+                   'QuoteNum' : row['QuoteNum'],
+                   'NoteTaker' : row['NoteTaker']}
+    finally:
+        # Close the Database Cursor
+        DBCursor.close()
+        # Close the separate streaming connection, if we opened one
+        if streamDb != None:
+            close_streaming_db(streamDb)
+
+def list_of_all_notes(reportType=None, searchText=None):
+    """ Get a list of all Notes for the Notes Browser """
     # Return the Note List as the Function Result
-    return notelist
+    return list(iterate_all_notes(reportType, searchText))
 
 def list_of_keyword_groups():
     """Get a list of all keyword groups."""
+    # If the list is cached, use it
+    l = GetCachedQuery('list_of_keyword_groups')
+    if l != None:
+        return l
     l = []
     query = "SELECT KeywordGroup FROM Keywords2 GROUP BY KeywordGroup"
     DBCursor = get_db().cursor()
@@ -3880,10 +4840,16 @@ def list_of_keyword_groups():
             id = ProcessDBDataForUTF8Encoding(id)
         l.append(id)
     DBCursor.close()
-    return l
+    return CacheQuery('list_of_keyword_groups', (), ['Keywords2'], l)
 
 def list_of_keywords_by_group(KeywordGroup):
     """Get a list of all keywords for the named Keyword group."""
+    # If the list is cached, use it
+    l = GetCachedQuery('list_of_keywords_by_group', (KeywordGroup, ))
+    if l != None:
+        return l
+    # Remember the Keyword Group as passed in for the cache
+    cacheArgs = (KeywordGroup, )
     if 'unicode' in wx.PlatformInfo:
         KeywordGroup = KeywordGroup.encode(TransanaGlobal.encoding)
     l = []
@@ -3898,10 +4864,14 @@ def list_of_keywords_by_group(KeywordGroup):
             id = ProcessDBDataForUTF8Encoding(id)
         l.append(id)
     DBCursor.close()
-    return l
+    return CacheQuery('list_of_keywords_by_group', cacheArgs, ['Keywords2'], l)
 
 def list_of_all_keywords():
     """Get a list of all keywords in the Transana database."""
+    # If the list is cached, use it
+    l = GetCachedQuery('list_of_all_keywords')
+    if l != None:
+        return l
     # Create an empty list
     l = []
     # Define the Query
@@ -3925,8 +4895,8 @@ def list_of_all_keywords():
         l.append((kwg, kw))
     # Close the database cursor
     DBCursor.close()
-    # return the list as the function results
-    return l
+    # return the list as the function results, remembering it for next time
+    return CacheQuery('list_of_all_keywords', (), ['Keywords2'], l)
    
 def list_of_keywords(** kwargs):
     """Get a list of all keywordgroup/keyword pairs for the specified
@@ -3939,6 +4909,11 @@ def list_of_keywords(** kwargs):
               list_of_keywords(Clip=1)
               list_of_keywords(Snapshot=3)
     """
+    # If the list is cached, use it
+    cacheArgs = tuple(sorted(kwargs.items()))
+    kwlist = GetCachedQuery('list_of_keywords', cacheArgs)
+    if kwlist != None:
+        return kwlist
     
     count = len(kwargs)
     i = 1
@@ -3968,10 +4943,62 @@ def list_of_keywords(** kwargs):
         else:
             kwlist.append((tup[5], tup[6], tup[7]))
     DBCursor.close()
-    return kwlist
+    return CacheQuery('list_of_keywords', cacheArgs, ['ClipKeywords2'], kwlist)
+
+def dict_of_keywords(objectType, objectNums):
+    """ Get the keywordgroup/keyword pairs for each of a list of objects at once.  objectType is 'Episode',
+        'Document', 'Clip', 'Quote', or 'Snapshot'.  Returns a dictionary keyed by object number, holding lists
+        in the form list_of_keywords() returns.
+
+        example: dict_of_keywords('Clip', [1, 2, 3])
+    """
+    # Every object gets an entry, even if it has no keywords
+    d = {}
+    for objectNum in objectNums:
+        d[objectNum] = []
+    DBCursor = get_db().cursor()
+    for numList in NumberLists(objectNums):
+        query = """SELECT %sNum, KeywordGroup, Keyword, Example
+                     FROM ClipKeywords2
+                     WHERE %sNum IN (%s)
+                     ORDER BY KeywordGroup, Keyword""" % (objectType, objectType, numList)
+        DBCursor.execute(query)
+        for (objectNum, kwg, kw, example) in DBCursor.fetchall():
+            if 'unicode' in wx.PlatformInfo:
+                d[objectNum].append((ProcessDBDataForUTF8Encoding(kwg),
+                                     ProcessDBDataForUTF8Encoding(kw),
+                                     ProcessDBDataForUTF8Encoding(example)))
+            else:
+                d[objectNum].append((kwg, kw, example))
+    DBCursor.close()
+    return d
+
+def dict_of_additional_vids(objectType, objectNums):
+    """ Get the Additional Media File records for each of a list of Episodes or Clips at once.  objectType is
+        'Episode' or 'Clip'.  Returns a dictionary keyed by object number, holding lists of
+        (MediaFile, VidLength, Offset, Audio) tuples in the order the files were added. """
+    # Every object gets an entry, even if it has no additional media files
+    d = {}
+    for objectNum in objectNums:
+        d[objectNum] = []
+    DBCursor = get_db().cursor()
+    for numList in NumberLists(objectNums):
+        query = """SELECT %sNum, MediaFile, VidLength, Offset, Audio
+                     FROM AdditionalVids2
+                     WHERE %sNum IN (%s)
+                     ORDER BY AddVidNum""" % (objectType, objectType, numList)
+        DBCursor.execute(query)
+        for row in DBCursor.fetchall():
+            d[row[0]].append(tuple(row[1:]))
+    DBCursor.close()
+    return d
 
 def dict_of_keyword_colors():
     """ Get a dictionary of Keyword Colors for all Keyword Group : Keyword pairs """
+    # If the dictionary is cached, use it
+    d = GetCachedQuery('dict_of_keyword_colors')
+    if d != None:
+        return d
     # Initialize a Dictionary
     d = {}
     # Define the Query
@@ -4005,8 +5032,8 @@ def dict_of_keyword_colors():
                                          'colorDef' :  colorDef  }
     # Close the database cursor
     DBCursor.close()
-    # return the dictionary as the function results
-    return d
+    # return the dictionary as the function results, remembering it for next time
+    return CacheQuery('dict_of_keyword_colors', (), ['Keywords2'], d)
 
 def list_of_snapshot_detail_keywords(** kwargs):
     """Get a list of all Snapshot Detail keywordgroup/keyword pairs for the specified
@@ -4076,6 +5103,8 @@ def SetKeywordExampleStatus(kwg, kw, clipNum, exampleValue):
         Example value in the ClipKeywords table for the appropriate KWG, KW, Clip
         combination.  Set Example to 1 to specify a Keyword Example, 0 to remove
         it from being an example without deleting the keyword for the Clip. """
+    # Cached query results from the changed tables will be out of date
+    InvalidateQueryCache(['ClipKeywords2'])
     if 'unicode' in wx.PlatformInfo:
         tempkwg = kwg.encode(TransanaGlobal.encoding)
         tempkw = kw.encode(TransanaGlobal.encoding)
@@ -4490,6 +5519,51 @@ def fetchall_named(cursor):
         l.append(dict)
     return l
 
+def iterate_named(cursor, batchSize=STREAM_FETCH_SIZE):
+    """ Generate the remaining row results from the cursor object as dictionaries including the database
+        field names, fetching batchSize rows at a time rather than all at once.  With a streaming cursor,
+        only one batch of rows is held in memory. """
+    d = cursor.description
+    if not d:
+        return
+    names = [c[0] for c in d]
+    rows = cursor.fetchmany(batchSize)
+    while len(rows) > 0:
+        for row in rows:
+            yield dict(zip(names, row))
+        rows = cursor.fetchmany(batchSize)
+
+def iterate_pages(query, conditions, keyField, decodeColumns=(), pageSize=QUERY_PAGE_SIZE):
+    """ Generate the row results of a query as dictionaries, in order of a unique numeric keyField, reading
+        pageSize rows per query.  query is the SELECT and FROM part of the query, and conditions is a list of
+        its WHERE conditions.  Each page is read completely before its rows are passed on, so other queries
+        can be run, and the rows themselves can be changed, while iterating. """
+    # The key's name in the results doesn't include any table alias
+    keyName = keyField.split('.')[-1]
+    lastKey = None
+    while True:
+        # Each page starts after the last key of the page before it
+        pageConditions = list(conditions)
+        if lastKey != None:
+            pageConditions.append("%s > %d" % (keyField, lastKey))
+        pageQuery = query
+        if len(pageConditions) > 0:
+            pageQuery += " WHERE " + " AND ".join(pageConditions)
+        pageQuery += " ORDER BY %s LIMIT %d" % (keyField, pageSize)
+        # Get a Database Cursor
+        DBCursor = get_decoding_cursor(list(decodeColumns))
+        # Execute the Query
+        DBCursor.execute(pageQuery)
+        rows = fetchall_named(DBCursor)
+        # Close the Database Cursor
+        DBCursor.close()
+        for row in rows:
+            yield row
+        # A short page is the last page
+        if len(rows) < pageSize:
+            break
+        lastKey = rows[-1][keyName]
+
 def list_all_keyword_examples_for_all_clips_in_a_collection(collectionNum):
     """ Lists all Keyword Examples for all Clips in the specified Collection and all
         nested Collections recursively """
@@ -4540,6 +5614,8 @@ def list_all_keyword_examples_for_a_clip(clipnum):
 
 def delete_all_keywords_for_a_group(epnum, docnum, clipnum, quotenum, snapshotnum):
     """ Given an Episode, Document, Clip, Quote, or Snapshot number, delete the appropriate keywordgroup/word pairs. """
+    # Cached query results from the changed tables will be out of date
+    InvalidateQueryCache(['ClipKeywords2'])
     # If we have an Episode Number ...
     if epnum != 0:
         # .. delete the Episode Keywords
@@ -4583,6 +5659,8 @@ def delete_all_keywords_for_a_group(epnum, docnum, clipnum, quotenum, snapshotnu
 
 def insert_clip_keyword(ep_num, doc_num, clip_num, quote_num, snapshot_num, kw_group, kw, exampleValue=0):
     """Insert a new record in the Clip Keywords table."""
+    # Cached query results from the changed tables will be out of date
+    InvalidateQueryCache(['ClipKeywords2'])
     if 'unicode' in wx.PlatformInfo:
         kw_group = kw_group.encode(TransanaGlobal.encoding)
         kw = kw.encode(TransanaGlobal.encoding)
@@ -4623,6 +5701,8 @@ def insert_clip_keyword(ep_num, doc_num, clip_num, quote_num, snapshot_num, kw_g
 
 def add_keyword(group, kw_name):
     """Add a keyword to the database."""
+    # Cached query results from the changed tables will be out of date
+    InvalidateQueryCache(['Keywords2'])
     DBCursor = get_db().cursor()
     query = """INSERT INTO Keywords2
         (KeywordGroup, Keyword)
@@ -4636,6 +5716,8 @@ def add_keyword(group, kw_name):
 def delete_keyword_group(name):
     """Delete a Keyword Group from the database, including all associated
     keywords."""
+    # Cached query results from the changed tables will be out of date
+    InvalidateQueryCache(['Keywords2', 'ClipKeywords2'])
 
     if 'unicode' in wx.PlatformInfo:
         kwg = name.encode(TransanaGlobal.encoding)
@@ -4857,6 +5939,8 @@ def delete_keyword_group(name):
 
 def delete_keyword(group, kw_name):
     """Delete a Keyword from the database."""
+    # Cached query results from the changed tables will be out of date
+    InvalidateQueryCache(['Keywords2', 'ClipKeywords2'])
     if 'unicode' in wx.PlatformInfo:
         kwg = group.encode(TransanaGlobal.encoding)
         kw = kw_name.encode(TransanaGlobal.encoding)
@@ -5219,6 +6303,8 @@ def ClearAllSynonyms():
 
 def ClearSourceEpisodeRecords(episodeNum):
     """ When an Episode is deleted, it must be removed from any Clips and Snapshots that claim it. """
+    # Cached query results from the changed tables will be out of date
+    InvalidateQueryCache(['Clips2'])
 
     # NOTE:  This routine is not perfect.  If a Snapshot record is locked by another user, the record WILL be changed
     #        here but that change will be wiped out when the user with the record lock saves (thus restoring the
@@ -5368,109 +6454,160 @@ def ProcessDBDataForUTF8Encoding(text):
         return text
     # If we are using a unicode version of wxPython ...
     else:
-        # If we're using MySQLdb (either server or embedded) ...
-        if TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server']:
-            # Initialize a unicode object to build the function's result
-            result = unicode('', TransanaGlobal.encoding)
-            # Because some Unicode characters are more than one byte wide, but the STC doesn't recognize this,
-            # we will need to skip the processing of the later parts of multi-byte characters.  skipNext allows this.
-            skipNext = 0
-            # process each character in the StyledText.  The GetStyledText() call has returned a string
-            # with the data in two-character chunks, the text char and the styling char.  This for loop
-            # allows up to process these character pairs.
+        # If we have a short string, it may already be in the cache
+        if isinstance(text, str) and (len(text) <= DECODE_CACHE_MAXLEN):
+            key = (TransanaGlobal.encoding, text)
+            _decodeCacheLock.acquire()
             try:
-                for x in range(len(text)):
-                    # If we are looking at the second character of a Unicode character pair, we can skip
-                    # this processing, as it has already been handled.
-                    if skipNext > 0:
-                        # We need to reset the skipNext flag so we won't skip too many characters.
-                        skipNext -= 1
-                    else:
-                        # Check for a Unicode character pair by looking to see if the first character is above 128
-                        if ord(text[x]) > 127:
-                                
-                            # UTF-8 characters are variable length.  We need to figure out the correct number of bytes.
-                            # Note the current position
-                            pos = x
-                            # Initialize the final character variable
-                            c = ''
-
-                            # Begin processing of unicode characters, continue until we have a legal character.
-                            while (pos < len(text)):
-
-                                # Add the current character to the character variable
-                                c += chr(ord(text[pos]))  # "Un-Unicode" the character ????
-                                # Try to encode the character.
-                                try:
-                                    # See if we have a legal UTF-8 character yet.
-                                    d = unicode(c, TransanaGlobal.encoding)
-                                    # If so, break out of the while loop
-                                    break
-                                # If we don't have a legal UTF-8 character, we'll get a UnicodeDecodeError exception
-                                except UnicodeDecodeError:
-                                    # We need to signal the need to skip a charater in overall processing
-                                    skipNext += 1
-                                    # We need to update the current position and keep processing until we have a legal UTF-8 character
-                                    pos += 1
-
-                            result += unicode(c, TransanaGlobal.encoding)
-                        else:
-                            c = text[x]
-                            result += c
-
-            except TypeError:
-                result = text
-            except UnicodeDecodeError:
-                # If we are reading Unicode text from Transana 2.05 or earlier, the line above that reads:
-                # result += unicode(c, TransanaGlobal.encoding)
-                # throws a UnicodeDecodeError when it can't interpret Latin-1 encoded characters using UTF-8.
-                # When that happens, we need to use Latin-1 encoding instead of UTF-8.
-
-                # The text doesn't need to be encoded in this circumstance.
-                result = text
-                # If we're in Russian, change the encoding to KOI8r
-                if TransanaGlobal.configData.language == 'ru':
-                    TransanaGlobal.encoding = 'koi8_r'
-                # If we're in Chinese, change the encoding to the appropriate Chinese encoding
-                elif TransanaGlobal.configData.language == 'zh':
-                    TransanaGlobal.encoding = TransanaConstants.chineseEncoding
-                # If we're in Eastern European Encoding, change the encoding to 'iso8859_2'
-                elif TransanaGlobal.configData.language == 'easteurope':
-                    TransanaGlobal.encoding = 'iso8859_2'
-                # If we're in Greek, change the encoding to 'iso8859_7'
-                elif TransanaGlobal.configData.language == 'el':
-                    TransanaGlobal.encoding = 'iso8859_7'
-                # If we're in Japanese, change the encoding to cp932
-                elif TransanaGlobal.configData.language == 'ja':
-                    TransanaGlobal.encoding = 'cp932'
-                # If we're in Korean, change the encoding to cp949
-                elif TransanaGlobal.configData.language == 'ko':
-                    TransanaGlobal.encoding = 'cp949'
-                # Otherwise, fall back to UTF8, not Latin-1 as of 2.50
-                else:
-                    TransanaGlobal.encoding = 'utf8'  # 'latin1'
-
-        # If we're NOT using MySQLdb ...
+                # If it's there ...
+                if _decodeCache.has_key(key):
+                    # ... move it to the most-recently-used end and return it
+                    result = _decodeCache.pop(key)
+                    _decodeCache[key] = result
+                    return result
+            finally:
+                _decodeCacheLock.release()
+            # Decode the string
+            result = DecodeDBString(text)
+            # If the decoding didn't change the encoding, remember the result
+            if key[0] == TransanaGlobal.encoding:
+                _decodeCacheLock.acquire()
+                try:
+                    _decodeCache[key] = result
+                    # Drop the least-recently-used string if the cache is full
+                    if len(_decodeCache) > DECODE_CACHE_SIZE:
+                        _decodeCache.popitem(last=False)
+                finally:
+                    _decodeCacheLock.release()
+            return result
+        # Longer strings and other data types are decoded directly
         else:
-            # if we have a unicode object already ...
-            if isinstance(text, unicode):
-                # ... we can just return it
-                result = text
-            # If we have a string object ...
-            elif isinstance(text, str):
-                # ... decode it using UTF8
-                result = text.decode('utf8')
-            # If we have an Integer ...
-            elif isinstance(text, int):
-                # ... convert it to a unicode object using UTF8
-                result = unicode(str(text), 'utf8')
-            # if we have none of those things ...
+            return DecodeDBString(text)
+
+def DecodeDBString(text):
+    """ Decode a single value read from the database for ProcessDBDataForUTF8Encoding() """
+    # If we're using MySQLdb (either server or embedded) ...
+    if TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server']:
+        # Only strings need decoding.  Unicode objects, None, and numbers are returned unchanged.
+        if not isinstance(text, str):
+            return text
+        # Decode the whole string at once.  UTF-8's multi-byte characters are handled by the codec.
+        try:
+            return text.decode(TransanaGlobal.encoding)
+        except UnicodeDecodeError:
+            # If we are reading Unicode text from Transana 2.05 or earlier, we get a UnicodeDecodeError
+            # when UTF-8 can't interpret Latin-1 encoded characters.
+            # When that happens, we need to use the language's encoding instead of UTF-8.
+
+            # If we're in Russian, change the encoding to KOI8r
+            if TransanaGlobal.configData.language == 'ru':
+                TransanaGlobal.encoding = 'koi8_r'
+            # If we're in Chinese, change the encoding to the appropriate Chinese encoding
+            elif TransanaGlobal.configData.language == 'zh':
+                TransanaGlobal.encoding = TransanaConstants.chineseEncoding
+            # If we're in Eastern European Encoding, change the encoding to 'iso8859_2'
+            elif TransanaGlobal.configData.language == 'easteurope':
+                TransanaGlobal.encoding = 'iso8859_2'
+            # If we're in Greek, change the encoding to 'iso8859_7'
+            elif TransanaGlobal.configData.language == 'el':
+                TransanaGlobal.encoding = 'iso8859_7'
+            # If we're in Japanese, change the encoding to cp932
+            elif TransanaGlobal.configData.language == 'ja':
+                TransanaGlobal.encoding = 'cp932'
+            # If we're in Korean, change the encoding to cp949
+            elif TransanaGlobal.configData.language == 'ko':
+                TransanaGlobal.encoding = 'cp949'
+            # Otherwise, fall back to UTF8, not Latin-1 as of 2.50
             else:
-                # ... print a message
-                print "DBInterface.ProcessDBDataforUTF8Encoding():", type(text), text
-        # Return the results
+                TransanaGlobal.encoding = 'utf8'  # 'latin1'
+            # The text doesn't need to be encoded in this circumstance.
+            return text
+
+    # If we're NOT using MySQLdb ...
+    else:
+        # if we have a unicode object already ...
+        if isinstance(text, unicode):
+            # ... we can just return it
+            return text
+        # If we have a string object ...
+        elif isinstance(text, str):
+            # ... decode it using UTF8
+            return text.decode('utf8')
+        # If we have an Integer ...
+        elif isinstance(text, int):
+            # ... convert it to a unicode object using UTF8
+            return unicode(str(text), 'utf8')
+        # if we have none of those things ...
+        else:
+            # ... print a message
+            print "DBInterface.ProcessDBDataforUTF8Encoding():", type(text), text
+            return text
+
+class DecodingCursor(object):
+    """ A Database Cursor that decodes the named text columns of each row as it is fetched, so that
+        query results don't have to be decoded one value at a time.  Everything else is passed to the
+        underlying cursor. """
+
+    def __init__(self, cursor, columns):
+        """ Wrap a cursor, decoding the columns in the columns list """
+        self.cursor = cursor
+        self.columns = columns
+
+    def __getattr__(self, name):
+        """ Pass everything we don't handle on to the real cursor """
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        """ Iterate through the remaining rows """
+        return iter(self.fetchall())
+
+    def DecodeRows(self, rows):
+        """ Decode the text columns of a list of rows """
+        # If we're not using a unicode version of wxPython, or there's nothing to do ...
+        if (not 'unicode' in wx.PlatformInfo) or (len(rows) == 0) or (self.cursor.description == None):
+            # ... just return the rows
+            return rows
+        # Find the positions of the columns to decode in the Results Set
+        names = [col[0] for col in self.cursor.description]
+        positions = [names.index(col) for col in self.columns if col in names]
+        # Decode the columns in each row
+        result = []
+        for row in rows:
+            row = list(row)
+            for pos in positions:
+                row[pos] = ProcessDBDataForUTF8Encoding(row[pos])
+            result.append(tuple(row))
         return result
 
+    def fetchone(self):
+        """ Fetch the next row """
+        row = self.cursor.fetchone()
+        if row == None:
+            return None
+        return self.DecodeRows([row])[0]
+
+    def fetchmany(self, size=None):
+        """ Fetch the next set of rows """
+        if size == None:
+            return self.DecodeRows(self.cursor.fetchmany())
+        return self.DecodeRows(self.cursor.fetchmany(size))
+
+    def fetchall(self):
+        """ Fetch all remaining rows """
+        return self.DecodeRows(self.cursor.fetchall())
+
+def get_decoding_cursor(columns, db=None, streaming=False):
+    """ Return a cursor that decodes the named text columns of each row it fetches.  If streaming is True,
+        the cursor is a streaming cursor (see get_streaming_cursor()). """
+    # If no database connection is passed in ...
+    if db == None:
+        # ... use the default connection
+        db = get_db()
+    # If a streaming cursor is requested ...
+    if streaming:
+        return DecodingCursor(get_streaming_cursor(db), columns)
+    return DecodingCursor(db.cursor(), columns)
+
 
 def UpdateDBFilenames(parent, filePath, fileList, newName=''):
     """ Update the Database Filenames """
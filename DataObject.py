@@ -27,6 +27,7 @@ if DEBUG:
     lock_record()
     unlock_record()
     get_note_nums()
+    load_cached()        (class method)
 """
 
 __author__ = 'Nathaniel Case, David Woods <dwoods@transana.com>'
@@ -179,9 +180,74 @@ class DataObject(object):
         c.close()
         return notelist
 
+    def load_cached(cls, num, objectCache=None, **kwargs):
+        """ Get the object with the given record number from objectCache, a dictionary that reports and exports
+            share as an identity map so objects used over and over are only loaded once.  If the object isn't in
+            the cache yet, it is loaded (passing kwargs to the constructor) and added.  Records that don't exist
+            raise RecordNotFoundError every time they are asked for.  With no objectCache, the object is just loaded. """
+        # Without an identity map, just load the object
+        if objectCache == None:
+            return cls(num, **kwargs)
+        key = (cls.__name__, num)
+        # If we don't have the object, or have it without the text that's now needed ...
+        if (not objectCache.has_key(key)) or \
+           ((objectCache[key] != None) and getattr(objectCache[key], 'skipText', False) and not kwargs.get('skipText', False)):
+            try:
+                objectCache[key] = cls(num, **kwargs)
+            # Remember records that aren't there, so we don't look for them again
+            except RecordNotFoundError:
+                objectCache[key] = None
+        # If the record doesn't exist, say so
+        if objectCache[key] == None:
+            raise RecordNotFoundError, (num, 0)
+        return objectCache[key]
+    # Make load_cached() a class method
+    load_cached = classmethod(load_cached)
+
 
 # Private methods
 
+    def _load_many_rows(cls, objectNums, query, objectCache=None, needText=False, **kwargs):
+        """ Load many objects of this class with a single query per IN_LIST_SIZE objects.  The query must
+            contain one "%s", where the SQL list of record numbers goes.  Objects already in objectCache are
+            not loaded again, unless they were loaded without text and needText is set.  New objects are
+            created with kwargs passed to the constructor, loaded with _load_row(), and added to objectCache.
+            Returns a dictionary of all the objects found, keyed by record number, and a list of the objects
+            just loaded, which the caller still needs to finish loading (keywords, etc.). """
+        objects = {}
+        loaded = []
+        numsToLoad = []
+        for num in objectNums:
+            # Record number 0 means "no record", so there's nothing to load
+            if not num:
+                continue
+            key = (cls.__name__, num)
+            # If the object is in the identity map, with text if we need it, use it
+            if (objectCache != None) and objectCache.has_key(key) and \
+               ((objectCache[key] == None) or not (needText and getattr(objectCache[key], 'skipText', False))):
+                if objectCache[key] != None:
+                    objects[num] = objectCache[key]
+            else:
+                numsToLoad.append(num)
+        if len(numsToLoad) > 0:
+            c = DBInterface.get_db().cursor()
+            for numList in DBInterface.NumberLists(numsToLoad):
+                c.execute(query % numList)
+                for row in DBInterface.fetchall_named(c):
+                    # Create an empty object and load the record into it
+                    obj = cls(**kwargs)
+                    obj._load_row(row)
+                    objects[obj.number] = obj
+                    loaded.append(obj)
+            c.close()
+            if objectCache != None:
+                for num in numsToLoad:
+                    # Records that weren't found are remembered as None
+                    objectCache[(cls.__name__, num)] = objects.get(num, None)
+        return (objects, loaded)
+    # Make _load_many_rows() a class method
+    _load_many_rows = classmethod(_load_many_rows)
+
     def _table(self):
         """Return the SQL table name."""
         # general case
@@ -330,6 +396,8 @@ class DataObject(object):
                 prompt = _("Cannot save a %s with a blank %s ID")
             raise SaveError, prompt % (tname.decode('utf8'), tname.decode('utf8'))
         else:
+            # Cached query results from this object's table, and from the keywords saved with it, will be out of date
+            DBInterface.InvalidateQueryCache([self._table(), 'ClipKeywords2'])
             # Verify record lock is still good
             if (self.number == 0) or \
                 ((self.record_lock == DBInterface.get_username()) and
@@ -356,6 +424,9 @@ class DataObject(object):
         if DEBUG:
             print "Record '%s' locked" % self.id
 
+        # Cached query results from this object's table, and from the keywords deleted with it, will be out of date
+        DBInterface.InvalidateQueryCache([self._table(), 'ClipKeywords2'])
+
         db = DBInterface.get_db()
         c = db.cursor()
  
@@ -380,6 +451,8 @@ class DataObject(object):
         query = DBInterface.FixQuery(query)
         # Execute the query
         c.execute(query, (self.number, ))
+        # Clear any query results cached while the delete was under way
+        DBInterface.InvalidateQueryCache([tablename, 'ClipKeywords2'])
         # If we're using Transactions ...
         if (use_transactions):
             # ... and the result exists ...
@@ -81,6 +81,19 @@ import sys
 import string
 import time
 
+# Databases with more than this many objects below the Libraries and Collections nodes are loaded into the
+# Database Tree lazily, with each node's children loaded from the database the first time they are needed.
+LAZY_TREE_THRESHOLD = 10000
+# The images used for nodes that are loaded lazily
+LAZY_NODE_IMAGES = {'LibraryNode' : 'Library16', 'DocumentNode' : 'Document16', 'EpisodeNode' : 'Episode16',
+                    'TranscriptNode' : 'Transcript16', 'CollectionNode' : 'Collection16', 'QuoteNode' : 'Quote16',
+                    'ClipNode' : 'Clip16', 'SnapshotNode' : 'Snapshot16'}
+# The list_of_notes() parameter and Note Node type for each kind of node that can have Notes
+LAZY_NOTE_TYPES = {'LibraryNode' : ('Library', 'LibraryNoteNode'), 'DocumentNode' : ('Document', 'DocumentNoteNode'),
+                   'EpisodeNode' : ('Episode', 'EpisodeNoteNode'), 'TranscriptNode' : ('Transcript', 'TranscriptNoteNode'),
+                   'CollectionNode' : ('Collection', 'CollectionNoteNode'), 'QuoteNode' : ('Quote', 'QuoteNoteNode'),
+                   'ClipNode' : ('Clip', 'ClipNoteNode'), 'SnapshotNode' : ('Snapshot', 'SnapshotNoteNode')}
+
 class DatabaseTreeTab(wx.Panel):
     """This class defines the object for the "Database" tab of the Data
     window."""
@@ -2324,6 +2337,13 @@ class _DBTreeCtrl(wx.TreeCtrl):
         # Track the number of Searches that have been requested
         self.searchCount = 1
 
+        # Initialize lazy loading.  refresh_tree() decides whether it's used for the current database.
+        self.lazyMode = False
+        # Nodes whose children have not been loaded from the database yet, keyed by (node type, record number)
+        self.lazyNodes = {}
+        # The number of children each node had in the database when the tree was built
+        self.childCounts = {}
+
         # Create image list of 16x16 object icons
         self.icon_list = ["Clip16", "Collection16", "Document16", "Episode16", "Keyword16",
                         "KeywordGroup16", "KeywordRoot16", 'Library16', 'LibraryRoot16', "Note16",
@@ -2383,6 +2403,9 @@ class _DBTreeCtrl(wx.TreeCtrl):
         # Process Database Tree Label Edits
         wx.EVT_TREE_END_LABEL_EDIT(self, id, self.OnEndLabelEdit)
 
+        # Load a node's children, if needed, as it is expanded
+        wx.EVT_TREE_ITEM_EXPANDING(self, id, self.OnItemExpanding)
+
         # Process Key Presses
         self.Bind(wx.EVT_KEY_DOWN, self.OnKeyDown)
 
@@ -2467,6 +2490,12 @@ class _DBTreeCtrl(wx.TreeCtrl):
     def refresh_tree(self, evt=None):
         """Load information from database and re-create the tree."""
         self.DeleteAllItems()
+        # Clear the list of nodes waiting for their children
+        self.lazyNodes = {}
+        # Count the children of every object with a single query
+        self.childCounts = DBInterface.dictionary_of_tree_child_counts()
+        # For a large database, only load nodes as they are needed
+        self.lazyMode = (sum(self.childCounts.values()) > LAZY_TREE_THRESHOLD)
         self.create_root_node()
         self.create_series_node()
         self.create_collections_node()
@@ -2476,6 +2505,108 @@ class _DBTreeCtrl(wx.TreeCtrl):
         self.UnselectAll()
         self.SelectItem(self.GetRootItem())
 
+    def GetFirstChild(self, item):
+        """ Get the first child of a node, loading the node's children from the database first if needed """
+        self.LoadChildren(item)
+        return wx.TreeCtrl.GetFirstChild(self, item)
+
+    def GetLastChild(self, item):
+        """ Get the last child of a node, loading the node's children from the database first if needed """
+        self.LoadChildren(item)
+        return wx.TreeCtrl.GetLastChild(self, item)
+
+    def GetChildrenCount(self, item, recursively=True):
+        """ Count the children of a node, loading the node's children from the database first if needed """
+        self.LoadChildren(item)
+        return wx.TreeCtrl.GetChildrenCount(self, item, recursively)
+
+    def OnItemExpanding(self, event):
+        """ Load a node's children from the database, if needed, as the node is expanded """
+        self.LoadChildren(event.GetItem())
+        event.Skip()
+
+    def AppendLazyItem(self, parentItem, text, nodeType, recNum, parent=0, sortOrder=None, sourceObj=0):
+        """ Add a node whose children will be loaded from the database when they are first needed """
+        # Create the tree node
+        item = self.AppendItem(parentItem, text)
+        # Add the node's image and node data
+        nodedata = _NodeData(nodetype=nodeType, recNum=recNum, parent=parent, sortOrder=sortOrder, sourceObj=sourceObj)
+        self.SetPyData(item, nodedata)
+        self.set_image(item, LAZY_NODE_IMAGES[nodeType])
+        # Note that the node's children still need to be loaded
+        self.lazyNodes[(nodeType, recNum)] = True
+        # If the node has children in the database, show the expand button without loading them
+        if self.childCounts.get((nodeType, recNum), 0) > 0:
+            self.SetItemHasChildren(item, True)
+        return item
+
+    def LoadChildren(self, item):
+        """ Load a node's children from the database, if they haven't been loaded yet.  This lets all the code
+            that walks the tree (select_Node(), add_Node(), delete_Node(), Drag and Drop, etc.) work on nodes
+            that haven't been opened yet.  Returns True if children were loaded. """
+        # If we're not waiting on any nodes, there's nothing to do
+        if (len(self.lazyNodes) == 0) or (not item.IsOk()):
+            return False
+        # Get the node's data
+        nodeData = self.GetPyData(item)
+        # If this node isn't waiting for its children, there's nothing to do
+        if (nodeData == None) or (not self.lazyNodes.has_key((nodeData.nodetype, nodeData.recNum))):
+            return False
+        # Remove the node from the waiting list BEFORE adding children, so we don't try to load them twice
+        del(self.lazyNodes[(nodeData.nodetype, nodeData.recNum)])
+
+        # If we have a Library node ...
+        if nodeData.nodetype == 'LibraryNode':
+            # ... get its Documents and Episodes
+            tmpDict = DBInterface.dictionary_of_documents_and_episodes((nodeData.recNum, self.GetItemText(item)))
+            keys = tmpDict.keys()
+            keys.sort()
+            for key in keys:
+                (objType, objNum, objParentNum) = tmpDict[key]
+                # Exclude Documents in Transana Basic
+                if TransanaConstants.proVersion or objType != 'Document':
+                    self.AppendLazyItem(item, key[0], '%sNode' % objType, objNum, parent=objParentNum)
+        # If we have an Episode node ...
+        elif nodeData.nodetype == 'EpisodeNode':
+            # ... get its Transcripts
+            for (transcriptNo, transcriptID, transcriptEpisodeNo) in DBInterface.list_of_episode_transcripts(episodeNum=nodeData.recNum):
+                self.AppendLazyItem(item, transcriptID, 'TranscriptNode', transcriptNo, parent=transcriptEpisodeNo)
+        # If we have a Collection node ...
+        elif nodeData.nodetype == 'CollectionNode':
+            # ... get its nested Collections
+            for (collNo, collID, parentCollNo) in DBInterface.list_of_collections(nodeData.recNum):
+                self.AppendLazyItem(item, collID, 'CollectionNode', collNo, parent=parentCollNo)
+            # ... its Clips
+            for (clipNo, clipID, collNo, sourceNo, sortOrder) in DBInterface.list_of_clips(collectionNum=nodeData.recNum):
+                self.AppendLazyItem(item, clipID, 'ClipNode', clipNo, parent=collNo, sortOrder=sortOrder, sourceObj=sourceNo)
+            # If we're in a Pro version, not the Basic Version ...
+            if TransanaConstants.proVersion:
+                # ... its Quotes
+                for (quoteNum, quoteID, collNum, sourceDoc, sortOrder) in DBInterface.list_of_quotes(collectionNum=nodeData.recNum):
+                    self.AppendLazyItem(item, quoteID, 'QuoteNode', quoteNum, parent=collNum, sortOrder=sortOrder, sourceObj=sourceDoc)
+                # ... and its Snapshots
+                for (snapshotNo, snapshotID, collNo, sortOrder) in DBInterface.list_of_snapshots(collectionNum=nodeData.recNum):
+                    self.AppendLazyItem(item, snapshotID, 'SnapshotNode', snapshotNo, parent=collNo, sortOrder=sortOrder)
+            # Sort the collection's children
+            self.SortChildren(item)
+
+        # Now add the node's Notes, if it can have them
+        if LAZY_NOTE_TYPES.has_key(nodeData.nodetype) and \
+           (TransanaConstants.proVersion or not nodeData.nodetype in ['DocumentNode', 'QuoteNode', 'SnapshotNode']):
+            (noteParam, noteNodeType) = LAZY_NOTE_TYPES[nodeData.nodetype]
+            for (noteNum, noteID) in DBInterface.list_of_notes(includeNumber=True, **{noteParam : nodeData.recNum}):
+                # Create the tree node
+                noteitem = self.AppendItem(item, noteID)
+                # Add the node's image and node data
+                nodedata = _NodeData(nodetype=noteNodeType, recNum=noteNum)  # Identify this as a Note node
+                self.SetPyData(noteitem, nodedata)                  # Associate this data with the node
+                self.set_image(noteitem, "Note16")
+
+        # If nothing turned up, remove the expand button
+        if wx.TreeCtrl.GetChildrenCount(self, item, False) == 0:
+            self.SetItemHasChildren(item, False)
+        return True
+
     def OnMotion(self, event):
         """ Detects Mouse Movement in the Database Tree Tab so that we can scroll as needed
             during Drag-and-Drop operations. """
@@ -2753,6 +2884,13 @@ class _DBTreeCtrl(wx.TreeCtrl):
         self.SetPyData(root_item, nodedata)                      # Associate this data with the node
         self.set_image(root_item, "LibraryRoot16")
 
+        # If we're loading the tree lazily ...
+        if self.lazyMode:
+            # ... just add the Library records.  Their children will be loaded when they're needed.
+            for (libraryNo, libraryID) in DBInterface.list_of_series():
+                self.AppendLazyItem(root_item, libraryID, 'LibraryNode', libraryNo)
+            return
+
         # The following code is RADICALLY faster than the original version, like 1000% faster.  It accomplishes this by
         # minimizing the number of database calls and tracking the tree nodes with a map dictionary so that we can
         # easily locate the node we want to add a child node to.
@@ -2860,6 +2998,14 @@ class _DBTreeCtrl(wx.TreeCtrl):
         # so that first-level nodes can find it as their parent
         mapDict['Collection'][0] = root_item
 
+        # If we're loading the tree lazily ...
+        if self.lazyMode:
+            # ... just add the top-level Collection records.  Their children will be loaded when they're needed.
+            for (collNo, collID, parentCollNo) in DBInterface.list_of_collections():
+                self.AppendLazyItem(root_item, collID, 'CollectionNode', collNo, parent=0)
+            self.SortChildren(root_item)
+            return
+
         # The following code is RADICALLY faster than the original version, like 1000% faster.  It accomplishes this by
         # minimizing the number of database calls and tracking the tree nodes with a map dictionary so that we can
         # easily locate the node we want to add a child node to.
@@ -3342,7 +3488,17 @@ class _DBTreeCtrl(wx.TreeCtrl):
 
             if DEBUG:
                 print "Getting children for ", self.GetItemText(currentNode)
-                
+
+            # In lazy mode, walking to the new node's parent may have just loaded the parent's children from the
+            # database, and the new record has already been saved.  If it's already there, we're done.
+            if self.lazyMode and (nodeListPos == len(nodeData) - 1) and LAZY_NODE_IMAGES.has_key(nodeType) and \
+               (self.FindChildNode(currentNode, nodeType, nodeRecNum) != None):
+                # If we're supposed to expand the node ...
+                if expandNode:
+                    # ... expand it!
+                    self.Expand(currentNode)
+                break
+
             (childNode, cookieItem) = self.GetFirstChild(currentNode)
 
             if DEBUG:
@@ -3809,6 +3965,16 @@ class _DBTreeCtrl(wx.TreeCtrl):
             except:
                 pass
 
+    def FindChildNode(self, node, nodeType, recNum):
+        """ Find the child of a node with the given node type and record number.  Returns None if there isn't one. """
+        (childNode, cookieItem) = self.GetFirstChild(node)
+        while childNode.IsOk():
+            childNodeData = self.GetPyData(childNode)
+            if (childNodeData.nodetype == nodeType) and (childNodeData.recNum == recNum):
+                return childNode
+            (childNode, cookieItem) = self.GetNextChild(node, cookieItem)
+        return None
+
     def select_Node(self, nodeData, nodeType, ensureVisible=True):
         """ This method is used to select nodes in the tree.
             nodeData is a list that gives the tree structure that describes where the node should be selected. """
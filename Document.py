@@ -263,6 +263,51 @@ class Document(DataObject.DataObject):
         # Close the database cursor
         c.close()
 
+    def load_many(cls, nums, skipText=False, objectCache=None):
+        """ Load a list of Documents, with their keywords and Quote positions, in a few queries rather than
+            three queries per Document.  objectCache is an optional identity map (see DataObject.load_cached())
+            shared with other loads.  Returns a dictionary of the Documents found, keyed by Document Number. """
+        # If we're skipping the XML Text ...
+        if skipText:
+            # Define the query to load Documents without text
+            query = """SELECT DocumentNum, DocumentID, LibraryNum, SeriesID, Author, Comment,
+                              ImportedFile, ImportDate, DocumentLength, 
+                              a.RecordLock, a.LockTime, LastSaveTime
+                         FROM Documents2 a, Series2 b
+                         WHERE   DocumentNum IN (%s) AND
+                                 a.LibraryNum = b.SeriesNum
+                    """
+        # If we're NOT skipping the XML Text ...
+        else:
+            # Define the query to load Documents with everything
+            query = """SELECT DocumentNum, DocumentID, LibraryNum, SeriesID, Author, Comment,
+                              ImportedFile, ImportDate, DocumentLength, XMLText, PlainText,
+                              a.RecordLock, a.LockTime, LastSaveTime
+                         FROM Documents2 a, Series2 b
+                         WHERE   DocumentNum IN (%s) AND
+                                 a.LibraryNum = b.SeriesNum
+                    """
+        (documents, loaded) = cls._load_many_rows(nums, query, objectCache, needText=not skipText, skipText=skipText)
+        loadedNums = [document.number for document in loaded]
+        keywords = DBInterface.dict_of_keywords('Document', loadedNums)
+        for document in loaded:
+            document._load_keywords(keywords[document.number])
+        # Get the Quote Positions for all the Documents
+        c = DBInterface.get_db().cursor()
+        for numList in DBInterface.NumberLists(loadedNums):
+            c.execute("SELECT DocumentNum, QuoteNum, StartChar, EndChar FROM QuotePositions2 WHERE DocumentNum IN (%s)" % numList)
+            for (documentNum, quoteNum, startChar, endChar) in c.fetchall():
+                documents[documentNum].add_quote(quoteNum, startChar, endChar)
+        c.close()
+        # If we have text ...
+        if not skipText:
+            for document in loaded:
+                # ... set up data structures needed for editing large paragraphs, as loading a single Document does
+                document.UpdateParagraphs()
+        return documents
+    # Make load_many() a class method
+    load_many = classmethod(load_many)
+
     def UpdateParagraphs(self):
         """ This method divides XML text up into paragraphs, needed for editing LONG documents """
         # Initialize (or re-initialize) the paragraph pointers dictionary
@@ -661,6 +706,9 @@ class Document(DataObject.DataObject):
                 raise SaveError, prompt
             # If there's no error prompt ...
             else:
+                # If the Plain Text was saved, update the Document's Text Index entries
+                if numberChanged or not self.skipText:
+                    DBInterface.UpdateTextIndex('D', self.number, self.plaintext, c)
                 if use_transactions:
                     # ... Commit the database transaction
                     c.execute('COMMIT')
@@ -746,6 +794,10 @@ class Document(DataObject.DataObject):
             if result:
                 DBInterface.delete_all_keywords_for_a_group(0, self.number, 0, 0, 0)
 
+            # Remove the Document from the Text Index
+            if result:
+                DBInterface.DeleteTextIndex('D', self.number, c)
+
             # Delete the actual record.
             self._db_do_delete(use_transactions, c, result)
 
@@ -785,8 +837,11 @@ class Document(DataObject.DataObject):
         
     def refresh_keywords(self):
         """Clear the keyword list and refresh it from the database."""
+        self._load_keywords(DBInterface.list_of_keywords(Document=self.number))
+
+    def _load_keywords(self, kwpairs):
+        """Replace the keyword list with the keyword data from the database."""
         self._kwlist = []
-        kwpairs = DBInterface.list_of_keywords(Document=self.number)
         for data in kwpairs:
             tempClipKeyword = ClipKeywordObject.ClipKeyword(data[0], data[1], documentNum=self.number, example=data[2])
             self._kwlist.append(tempClipKeyword)
@@ -221,6 +221,25 @@ class Episode(DataObject.DataObject):
         # Close the Database cursor
         c.close()
 
+    def load_many(cls, nums, objectCache=None):
+        """ Load a list of Episodes, with their keywords and additional media files, in a few queries rather than
+            several queries per Episode.  objectCache is an optional identity map (see DataObject.load_cached())
+            shared with other loads.  Returns a dictionary of the Episodes found, keyed by Episode Number. """
+        query = """SELECT * FROM Episodes2 a, Series2 b
+            WHERE   EpisodeNum IN (%s) AND
+                    a.SeriesNum = b.SeriesNum
+        """
+        (episodes, loaded) = cls._load_many_rows(nums, query, objectCache)
+        loadedNums = [episode.number for episode in loaded]
+        keywords = DBInterface.dict_of_keywords('Episode', loadedNums)
+        additionalVids = DBInterface.dict_of_additional_vids('Episode', loadedNums)
+        for episode in loaded:
+            episode._load_additional_vids(additionalVids[episode.number])
+            episode._load_keywords(keywords[episode.number])
+        return episodes
+    # Make load_many() a class method
+    load_many = classmethod(load_many)
+
     def db_save(self, use_transactions=True):
         """Save the record to the database using Insert or Update as
         appropriate."""
@@ -539,8 +558,11 @@ class Episode(DataObject.DataObject):
         
     def refresh_keywords(self):
         """Clear the keyword list and refresh it from the database."""
+        self._load_keywords(DBInterface.list_of_keywords(Episode=self.number))
+
+    def _load_keywords(self, kwpairs):
+        """Replace the keyword list with the keyword data from the database."""
         self._kwlist = []
-        kwpairs = DBInterface.list_of_keywords(Episode=self.number)
         for data in kwpairs:
             tempClipKeyword = ClipKeywordObject.ClipKeyword(data[0], data[1], episodeNum=self.number, example=data[2])
             self._kwlist.append(tempClipKeyword)
@@ -606,8 +628,15 @@ class Episode(DataObject.DataObject):
         query = DBInterface.FixQuery(query)
         # Execute the query
         c.execute(query, (self.number, ))
+        # Add the videos to the additional media files list
+        self._load_additional_vids(c.fetchall())
+        # Close the database cursor
+        c.close()
+
+    def _load_additional_vids(self, rows):
+        """Add additional media files from (MediaFile, VidLength, Offset, Audio) database rows."""
         # For each video in the query results ...
-        for (vidFilename, vidLength, vidOffset, audio) in c.fetchall():
+        for (vidFilename, vidLength, vidOffset, audio) in rows:
             # Detection of the use of the Video Root Path is platform-dependent and must be done for EACH filename!
             if wx.Platform == "__WXMSW__":
                 # On Windows, check for a colon in the position, which signals the presence or absence of a drive letter
@@ -629,8 +658,6 @@ class Episode(DataObject.DataObject):
             if (vidOffset < 0) and (vidOffset < -self.offset):
                 # ... then use this video offset as the global offset
                 self.offset = abs(vidOffset)
-        # Close the database cursor
-        c.close()
 
     def remove_an_additional_vid(self, indx):
         """ remove ONE additional media file from the list of additional media files """
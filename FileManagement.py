@@ -23,6 +23,7 @@
 __author__ = 'David Woods <dwoods@transana.com>, Rajas Sambhare'
 
 import wx  # Import wxPython
+import wx.lib.dialogs    # Import wxPython's Scrolled Message Dialog
 
 if __name__ == '__main__':
     __builtins__._ = wx.GetTranslation
@@ -40,6 +41,7 @@ import shutil            # used to copy files on the local file system
 import stat              # file information (used with paramiko)
 import string            # String manipulation
 import sys               # Python sys module, used in exception reporting
+import threading         # used to build synchronization manifests without blocking the interface
 import time              # time processing (used with paramiko)
 # import paramiko for ssh/sFTP functionality
 import paramiko
@@ -52,6 +54,7 @@ import sFTPConnection    # sFTP Connection Parameters dialog box
 import sFTPFileTransfer  # sFTP File Transfer Progress Box and File Transfer Logic
 import SRBConnection     # SRB Connection Parameters dialog box
 import SRBFileTransfer   # SRB File Transfer Progress Box and File Tranfer Logic
+import SyncManifest      # Directory tree manifests for synchronizing folders
 import TransanaConstants # used for getting list of fileTypes
 import TransanaGlobal    # get Transana's globals, used to get current encoding
 import TransanaImages    # Get Transana's images
@@ -119,30 +122,10 @@ class FMFileDropTarget(wx.FileDropTarget):
             if targetLbl.GetLabel() == self.FileManagementWindow.LOCAL_LABEL:
                 if targetDir != '':
                     self.FileManagementWindow.SetCursor(wx.StockCursor(wx.CURSOR_WAIT))
-                    # for each file in the list...
-                    for fileNm in filenames:
-                        prompt = _('Copying %s to %s')
-                        if 'unicode' in wx.PlatformInfo:
-                            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-                            prompt = unicode(prompt, 'utf8')
-                        self.FileManagementWindow.SetStatusText(prompt % (fileNm, targetDir))
-                        # extract the file name...
-                        (dir, fn) = os.path.split(fileNm)
-
-                        if os.stat(fileNm)[6] < 5000000:
-                            # copy the file to the destination path
-                            shutil.copyfile(fileNm, os.path.join(targetDir, fn))
-                        else:
-                            dlg = LocalFileTransfer.LocalFileTransfer(self.FileManagementWindow, _("Local File Transfer"), fileNm, targetDir)
-                            success = dlg.TransferSuccessful()
-                            dlg.Destroy()
-                            
-                        # Update the File Window where the files were dropped.
-                        self.FileManagementWindow.RefreshFileList(targetLbl.GetLabel(), targetDir, target, filter)
-                        # Let's update the target control after every file so that the new files show up in the list ASAP.
-                        # wxYield allows the Windows Message Queue to update the display.
-                        wx.Yield()
-                    self.FileManagementWindow.SetStatusText(_('Copy complete.'))
+                    # Copy all the files to the destination path together
+                    self.FileManagementWindow.LocalTransferFiles([(fileNm, targetDir) for fileNm in filenames])
+                    # Update the File Window where the files were dropped.
+                    self.FileManagementWindow.RefreshFileList(targetLbl.GetLabel(), targetDir, target, filter)
                     self.FileManagementWindow.SetCursor(wx.StockCursor(wx.CURSOR_ARROW))
                     # If both sides of the File Manager are pointed to the same folder, we need to update the other
                     # side too!
@@ -155,6 +138,21 @@ class FMFileDropTarget(wx.FileDropTarget):
                     dlg.ShowModal()
                     dlg.Destroy()
                     return(False)
+            # If we are connected to an sFTP Server ...
+            elif self.FileManagementWindow.connectionType == 'sFTP':
+                # Add all the files to one transfer.  (The source directory comes from each file name.)
+                transferFiles = []
+                for fileName in filenames:
+                    (sourceDir, fileNm) = os.path.split(fileName)
+                    transferFiles.append((sFTPFileTransfer.sFTP_UPLOAD, sourceDir, targetDir, fileNm))
+                # Transfer the files
+                self.FileManagementWindow.sFTPTransferFiles(False, transferFiles)
+                # Update the File Window where the files were dropped.
+                self.FileManagementWindow.RefreshFileList(targetLbl.GetLabel(), targetDir, target, filter)
+                # If both sides of the File Manager are pointed to the same folder, we need to update the other
+                # side too!
+                if targetDir == otherDir:
+                    self.FileManagementWindow.RefreshFileList(otherLbl.GetLabel(), otherDir, othertarget, otherfilter)
             else:
                 cancelPressed = False
                 # For each file in the fileList ...
@@ -177,12 +175,6 @@ class FMFileDropTarget(wx.FileDropTarget):
                         dlg = SRBFileTransfer.SRBFileTransfer(self.FileManagementWindow, _("SRB File Transfer"), fileNm, fileSize, sourceDir, self.FileManagementWindow.srbConnectionID, targetDir, SRBFileTransfer.srb_UPLOAD, self.FileManagementWindow.srbBuffer)
                         success = dlg.TransferSuccessful()
                         dlg.Destroy()
-                    # If we are connected to an sFTP Server ...
-                    elif self.FileManagementWindow.connectionType == 'sFTP':
-                        # The sFTPFileTransfer class handles file transfers and provides Progress Feedback
-                        dlg = sFTPFileTransfer.sFTPFileTransfer(self.FileManagementWindow, _("sFTP File Transfer"), fileNm, sourceDir, targetDir, sFTPFileTransfer.sFTP_UPLOAD)
-                        success = dlg.TransferSuccessful()
-                        dlg.Destroy()
 
                     # If the copy was successful ...
                     if success:
@@ -1640,6 +1632,87 @@ class FileManagement(wx.Dialog):
         # Return the result
         return success
 
+    def LocalTransferFiles(self, files, verify=False):
+        """ Copy a list of LOCAL FILES as a single transfer.  files is a list of (file to copy, destination directory).
+            If verify is True, the copies are checked against the originals.  Returns True if all the files were
+            copied, and the list of files that were copied. """
+        # If there's nothing to copy, we're done
+        if len(files) == 0:
+            return (True, [])
+        # The LocalTransferQueue class copies several files at once and provides Progress Feedback
+        dlg = LocalFileTransfer.LocalTransferQueue(self, _("Local File Transfer"), verify=verify)
+        for (copyFrom, copyTo) in files:
+            dlg.AddFile(copyFrom, copyTo)
+        # Copy the files
+        dlg.Run()
+        success = dlg.TransferSuccessful()
+        completedFiles = dlg.GetCompletedFiles()
+        dlg.Destroy()
+        # Report the outcome in the status bar
+        if success:
+            self.SetStatusText(_('Copy complete.'))
+        else:
+            self.SetStatusText(_('Copy cancelled.'))
+        # Return the results
+        return (success, completedFiles)
+
+    def sFTPTransferFiles(self, moveFlag, files):
+        """ Copy or Move a list of FILES between LOCAL and REMOTE (sFTP) as a single transfer.  files is a list of
+            (direction, local directory, remote directory, file name).  Returns True if all the files were transferred,
+            and the list of files that were transferred. """
+        # If there's nothing to transfer, we're done
+        if len(files) == 0:
+            return (True, [])
+        # The sFTPTransferQueue class transfers several files at once and provides Progress Feedback
+        dlg = sFTPFileTransfer.sFTPTransferQueue(self, _("sFTP File Transfer"))
+        # Assume all the files can be found
+        filesFound = True
+        for (direction, localDir, remoteDir, fileName) in files:
+            # Confirm that files being uploaded exist
+            if (direction == sFTPFileTransfer.sFTP_UPLOAD) and not os.path.exists(os.path.join(localDir, fileName)):
+                # If not, inform the user ...
+                prompt = unicode(_('File "%s" not found.')) + u'\n' + unicode(_('Please press "Refresh".'), 'utf8')
+                errDlg = Dialogs.ErrorDialog(self, prompt % os.path.join(localDir, fileName))
+                errDlg.ShowModal()
+                errDlg.Destroy()
+                # ... and skip the file
+                filesFound = False
+                continue
+            dlg.AddFile(direction, localDir, remoteDir, fileName)
+        # Transfer the files
+        dlg.Run()
+        success = filesFound and dlg.TransferSuccessful()
+        completedFiles = dlg.GetCompletedFiles()
+        dlg.Destroy()
+        # Report the outcome in the status bar.  If we MOVED ...
+        if moveFlag:
+            # ... delete the SOURCE of each file that was transferred to complete the MOVE ...
+            for (direction, localDir, remoteDir, fileName) in completedFiles:
+                if direction == sFTPFileTransfer.sFTP_UPLOAD:
+                    self.DeleteFile(self.LOCAL_LABEL, localDir, fileName)
+                else:
+                    self.DeleteFile(self.REMOTE_LABEL, remoteDir, fileName)
+            # ... and if we succeeded ...
+            if success:
+                # ... report success
+                self.SetStatusText(_('Move complete.'))
+            # ... and failed ...
+            else:
+                # ... report the failure
+                self.SetStatusText(_('Move cancelled.'))
+        # If we COPIED ...
+        else:
+            # ... and succeeded ...
+            if success:
+                # ... report the success
+                self.SetStatusText(_('Copy complete.'))
+            # ... and failed ...
+            else:
+                # ... report the failure
+                self.SetStatusText(_('Copy cancelled.'))
+        # Return the results
+        return (success, completedFiles)
+
     def FileCopyMoveRemoteToRemote(self, moveFlag, sourceDir, destDir, fileName):
         """ Copy or Move a FILE from REMOTE (SRB) to REMOTE (SRB) """
         # Build the full File Name by joining the source path with the file name from the list
@@ -1838,10 +1911,17 @@ class FileManagement(wx.Dialog):
         # Copy or Move from Local Drive to Local Drive
         if (sourceLbl == self.LOCAL_LABEL) and \
            (destLbl == self.LOCAL_LABEL):
+            # Copied files are gathered up and copied together.  (Moves are fast renames.)
+            copyFiles = []
             # For each file in the fileList ...
             for fileNm in fileList:
                 # See if the file is already in the destination list.  If NOT ...
                 if destFile.FindItem(-1, fileNm) == -1:
+                    # If we're copying and the file exists ...
+                    if not moveFlag and os.path.exists(os.path.join(sourceDir, fileNm)):
+                        # ... add the file to the copy
+                        copyFiles.append((os.path.join(sourceDir, fileNm), destDir))
+                        continue
                     # ... call the Local to Local File Copy routine
                     success = self.FileCopyMoveLocalToLocal(moveFlag, sourceDir, destDir, fileNm)
                     # Let's update the dest control after every file so that the new files show up in the list ASAP.
@@ -1859,14 +1939,26 @@ class FileManagement(wx.Dialog):
                     # Display the error message
                     dlg = Dialogs.ErrorDialog(self, errMsg % (os.path.join(sourceDir, fileNm), os.path.join(destDir, fileNm)))
                     dlg.Show()  # NOT Modal, and no Destroy prevents interruption
+            # If there are files to copy ...
+            if len(copyFiles) > 0:
+                # ... copy them and update the dest control
+                self.LocalTransferFiles(copyFiles)
+                self.RefreshFileList(destLbl, destDir, destFile, destFilter)
 
         # Copy or Move from Local Drive to SRB Collection
         elif (sourceLbl == self.LOCAL_LABEL) and \
              (destLbl == self.REMOTE_LABEL):
+            # sFTP files are gathered up and transferred together
+            transferFiles = []
             # For each file in the fileList ...
             for fileNm in fileList:
                 # See if the file is already in the destination list.  If NOT ...
                 if destFile.FindItem(-1, fileNm) == -1:
+                    # If we're connected to the sFTP Server ...
+                    if self.connectionType == 'sFTP':
+                        # ... add the file to the transfer
+                        transferFiles.append((sFTPFileTransfer.sFTP_UPLOAD, sourceDir, destDir, fileNm))
+                        continue
                     # ... call the Local to Remote File Copy routine, capturing the result
                     success = self.FileCopyMoveLocalToRemote(moveFlag, sourceDir, destDir, fileNm)
                     # Let's update the dest control after every file so that the new files show up in the list ASAP.
@@ -1895,14 +1987,26 @@ class FileManagement(wx.Dialog):
                     # Display the error message
                     dlg = Dialogs.ErrorDialog(self, errMsg % (p1.decode('utf8'), p2.decode('utf8')))
                     dlg.Show()  # NOT Modal, and no Destroy prevents interruption
+            # If there are sFTP files to transfer ...
+            if len(transferFiles) > 0:
+                # ... transfer them and update the dest control
+                self.sFTPTransferFiles(moveFlag, transferFiles)
+                self.RefreshFileList(destLbl, destDir, destFile, destFilter)
 
         # Copy or Move from SRB Collection to Local Drive
         elif (sourceLbl == self.REMOTE_LABEL) and \
              (destLbl == self.LOCAL_LABEL):
+            # sFTP files are gathered up and transferred together
+            transferFiles = []
             # For each file in the fileList ...
             for fileNm in fileList:
                 # See if the file is already in the destination list.  If NOT ...
                 if destFile.FindItem(-1, fileNm) == -1:
+                    # If we're connected to the sFTP Server ...
+                    if self.connectionType == 'sFTP':
+                        # ... add the file to the transfer
+                        transferFiles.append((sFTPFileTransfer.sFTP_DOWNLOAD, destDir, sourceDir, fileNm))
+                        continue
                     # ... call the Remote to Local File Copy routine, capturing the result
                     success = self.FileCopyMoveRemoteToLocal(moveFlag, sourceDir, destDir, fileNm, sourceFile.FindItem(-1, fileNm))
                     # Let's update the dest control after every file so that the new files show up in the list ASAP.
@@ -1922,6 +2026,11 @@ class FileManagement(wx.Dialog):
                     # Display the error message
                     dlg = Dialogs.ErrorDialog(self, errMsg % (string.join([sourceDir[len(self.sFTPHomePath):], fileNm], '/'), os.path.join(destDir, fileNm)))
                     dlg.Show()  # NOT Modal, and no Destroy prevents interruption
+            # If there are sFTP files to transfer ...
+            if len(transferFiles) > 0:
+                # ... transfer them and update the dest control
+                self.sFTPTransferFiles(moveFlag, transferFiles)
+                self.RefreshFileList(destLbl, destDir, destFile, destFilter)
 
         # Copy or Move from SRB Collection to SRB Collection
         elif (sourceLbl == self.REMOTE_LABEL) and \
@@ -2042,9 +2151,13 @@ class FileManagement(wx.Dialog):
             destFile = self.fileLeft
             destFilter = self.filterLeft
 
+        # If we're synchronizing local folders, or using an sFTP Server, compare manifests of the two trees
+        if (self.connectionType == 'sFTP') or ((sourceLbl == self.LOCAL_LABEL) and (destLbl == self.LOCAL_LABEL)):
+            self.SynchWithManifests(sourceLbl, sourcePath, destLbl, destPath)
+
         # Now COPY the FILES.
         # If our SOURCE is LOCAL ...
-        if sourceLbl == self.LOCAL_LABEL:
+        elif sourceLbl == self.LOCAL_LABEL:
 
             # We can't just call os.walk() while copying files.  This causes directories worth of files to be
             # copies recursively if you copy something into one of it's own sub-directories.  Instead, let's
@@ -2297,6 +2410,211 @@ class FileManagement(wx.Dialog):
         # Reset the cursor to the Arrow
         self.SetCursor(wx.StockCursor(wx.CURSOR_ARROW))
        
+    def SynchWithManifests(self, sourceLbl, sourcePath, destLbl, destPath):
+        """ Copy the files that are missing or changed in the DEST tree from the SOURCE tree, finding them by
+            comparing manifests of the two trees.  The manifests are cached, so unchanged files aren't checked again. """
+        # Copying from one directory to another on the sFTP Server isn't supported
+        if (sourceLbl == self.REMOTE_LABEL) and (destLbl == self.REMOTE_LABEL):
+            # Inform the user
+            prompt = _("Copying files from one directory to another on an sFTP server is not supported.")
+            dlg = Dialogs.InfoDialog(self, prompt)
+            dlg.ShowModal()
+            dlg.Destroy()
+            return
+
+        # Get the synchronization options from the user
+        prompt = _('Copy all new and changed files.  Options:')
+        choices = [_('Delete files in the destination that are not in the source'),
+                   _('Compare file contents (slow the first time)'),
+                   _('Only list the changes.  Do not copy or delete anything.')]
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(prompt, 'utf8')
+            choices = [unicode(choice, 'utf8') for choice in choices]
+        dlg = wx.MultiChoiceDialog(self, prompt, _("File Management"), choices)
+        result = dlg.ShowModal()
+        selections = dlg.GetSelections()
+        dlg.Destroy()
+        # If the user cancels, we're done
+        if result != wx.ID_OK:
+            return
+        mirrorDeletes = 0 in selections
+        useHash = 1 in selections
+        listOnly = 2 in selections
+
+        # Manifests use unicode paths
+        if isinstance(sourcePath, str):
+            sourcePath = sourcePath.decode(TransanaGlobal.encoding)
+        if isinstance(destPath, str):
+            destPath = destPath.decode(TransanaGlobal.encoding)
+        # Manifests are cached in the Waveforms directory, along with the other cached data
+        cacheDir = TransanaGlobal.configData.visualizationPath
+
+        def FullPath(lbl, root, relPath):
+            """ Get the full path of a file or directory in the manifest of a tree """
+            if lbl == self.LOCAL_LABEL:
+                return os.path.join(root, *relPath.split('/'))
+            else:
+                return string.join([root.rstrip('/'), relPath], '/')
+
+        self.SetStatusText(_('Comparing folders ...'))
+        # Build the manifests of the SOURCE and DEST trees.  Calculating checksums can take a long time, so the
+        # manifests are built on a worker thread behind a progress dialog the user can cancel.
+        keys = []
+        builders = []
+        for (lbl, path) in [(sourceLbl, sourcePath), (destLbl, destPath)]:
+            if lbl == self.LOCAL_LABEL:
+                key = SyncManifest.LocalKey(path)
+                builders.append(lambda progress, isCancelled, path=path, cached=SyncManifest.LoadCachedManifest(cacheDir, key):
+                                    SyncManifest.LocalManifest(path, useHash, cached, progress, isCancelled))
+            else:
+                key = SyncManifest.RemoteKey(self.sFTPTransport, path)
+                builders.append(lambda progress, isCancelled, path=path, cached=SyncManifest.LoadCachedManifest(cacheDir, key):
+                                    SyncManifest.RemoteManifest(self.sFTPTransport, path, cached, progress=progress, isCancelled=isCancelled))
+            keys.append(key)
+        dlg = ManifestProgress(self, _("Comparing folders"), builders)
+        manifests = dlg.Run()
+        error = dlg.error
+        dlg.Destroy()
+        # If something went wrong, report the problem
+        if error != None:
+            dlg = Dialogs.ErrorDialog(self, error)
+            dlg.ShowModal()
+            dlg.Destroy()
+            self.SetStatusText('')
+            return
+        # If the user cancelled, nothing is copied
+        if manifests == None:
+            self.SetStatusText(_('Copy cancelled.'))
+            return
+        ((sourceKey, sourceManifest), (destKey, destManifest)) = zip(keys, manifests)
+        # Compare the manifests
+        (dirsToCreate, filesToCopy, filesToDelete) = SyncManifest.Diff(sourceManifest, destManifest, useHash, mirrorDeletes)
+
+        # If the user only wants to see the list of changes ...
+        if listOnly:
+            # ... list the changes
+            changes = []
+            for relPath in dirsToCreate:
+                prompt = _('Create folder:  %s')
+                if 'unicode' in wx.PlatformInfo:
+                    prompt = unicode(prompt, 'utf8')
+                changes.append(prompt % relPath)
+            for relPath in filesToCopy:
+                if relPath in destManifest['files']:
+                    prompt = _('Replace:  %s')
+                else:
+                    prompt = _('Copy:  %s')
+                if 'unicode' in wx.PlatformInfo:
+                    prompt = unicode(prompt, 'utf8')
+                changes.append(prompt % relPath)
+            for relPath in filesToDelete:
+                prompt = _('Delete:  %s')
+                if 'unicode' in wx.PlatformInfo:
+                    prompt = unicode(prompt, 'utf8')
+                changes.append(prompt % relPath)
+            if len(changes) == 0:
+                prompt = _('The folders are already synchronized.')
+                if 'unicode' in wx.PlatformInfo:
+                    prompt = unicode(prompt, 'utf8')
+                changes.append(prompt)
+            # ... and display them.  (The manifests are still cached, so the actual copy won't need to calculate checksums again.)
+            SyncManifest.SaveCachedManifest(cacheDir, sourceKey, sourceManifest)
+            SyncManifest.SaveCachedManifest(cacheDir, destKey, destManifest)
+            dlg = wx.lib.dialogs.ScrolledMessageDialog(self, string.join(changes, '\n'), _("File Management"))
+            dlg.ShowModal()
+            dlg.Destroy()
+            self.SetStatusText('')
+            return
+
+        # If files are to be deleted, confirm that with the user first
+        if len(filesToDelete) > 0:
+            prompt = _('%d files in the destination are not in the source and will be deleted.') + '\n' + _('Do you want to continue?')
+            if 'unicode' in wx.PlatformInfo:
+                prompt = unicode(prompt, 'utf8')
+            dlg = Dialogs.QuestionDialog(self, prompt % len(filesToDelete), noDefault = True)
+            result = dlg.LocalShowModal()
+            dlg.Destroy()
+            if result == wx.ID_NO:
+                filesToDelete = []
+
+        # Create the missing DEST directories.  (These are sorted, so parents are created before their children.)
+        for relPath in dirsToCreate:
+            try:
+                if destLbl == self.LOCAL_LABEL:
+                    if not os.path.exists(FullPath(destLbl, destPath, relPath)):
+                        os.makedirs(FullPath(destLbl, destPath, relPath))
+                else:
+                    self.sFTPClient.mkdir(FullPath(destLbl, destPath, relPath))
+            except (IOError, OSError):
+                # Report the problem.  The files can't be copied without their directories.
+                dlg = Dialogs.ErrorDialog(self, "%s" % sys.exc_info()[1])
+                dlg.ShowModal()
+                dlg.Destroy()
+                self.SetStatusText(_('Copy cancelled.'))
+                return
+
+        # Copy the files
+        copiedFiles = []
+        success = True
+        # Local files are copied together.  (The copies keep the source's modification time, so they can be
+        # recognized as unchanged later.)
+        if (sourceLbl == self.LOCAL_LABEL) and (destLbl == self.LOCAL_LABEL):
+            copyFiles = []
+            # Remember which file is which, so the manifest can be updated
+            relPaths = {}
+            for relPath in filesToCopy:
+                copyFile = (FullPath(sourceLbl, sourcePath, relPath), os.path.dirname(FullPath(destLbl, destPath, relPath)))
+                copyFiles.append(copyFile)
+                relPaths[copyFile] = relPath
+            # If file contents are being compared, check the copies too
+            (success, completedFiles) = self.LocalTransferFiles(copyFiles, verify=useHash)
+            copiedFiles = [relPaths[copyFile] for copyFile in completedFiles]
+        # sFTP files are transferred together
+        else:
+            transferFiles = []
+            # Remember which file is which, so the manifest can be updated
+            relPaths = {}
+            for relPath in filesToCopy:
+                (parentPath, fileName) = (u'/' + relPath).rsplit(u'/', 1)
+                if sourceLbl == self.LOCAL_LABEL:
+                    transferFile = (sFTPFileTransfer.sFTP_UPLOAD, os.path.dirname(FullPath(sourceLbl, sourcePath, relPath)),
+                                    destPath.rstrip('/') + parentPath, fileName)
+                else:
+                    transferFile = (sFTPFileTransfer.sFTP_DOWNLOAD, os.path.dirname(FullPath(destLbl, destPath, relPath)),
+                                    sourcePath.rstrip('/') + parentPath, fileName)
+                transferFiles.append(transferFile)
+                relPaths[transferFile[1:]] = relPath
+            (success, completedFiles) = self.sFTPTransferFiles(False, transferFiles)
+            copiedFiles = [relPaths[transferFile[1:]] for transferFile in completedFiles]
+
+        # Delete the DEST files that aren't in the SOURCE, unless the copy was cancelled
+        deletedFiles = []
+        if success:
+            for relPath in filesToDelete:
+                try:
+                    if destLbl == self.LOCAL_LABEL:
+                        os.remove(FullPath(destLbl, destPath, relPath))
+                    else:
+                        self.sFTPClient.remove(FullPath(destLbl, destPath, relPath))
+                    deletedFiles.append(relPath)
+                except (IOError, OSError):
+                    # Report the problem
+                    dlg = Dialogs.ErrorDialog(self, "%s" % sys.exc_info()[1])
+                    dlg.ShowModal()
+                    dlg.Destroy()
+                    break
+
+        # Update and cache the manifests, so the next synchronization can skip unchanged files
+        SyncManifest.RecordChanges(sourceManifest, destManifest, copiedFiles, deletedFiles)
+        SyncManifest.SaveCachedManifest(cacheDir, sourceKey, sourceManifest)
+        SyncManifest.SaveCachedManifest(cacheDir, destKey, destManifest)
+        # Report the outcome in the status bar
+        if success:
+            self.SetStatusText(_('Copy complete.'))
+        else:
+            self.SetStatusText(_('Copy cancelled.'))
+
     def DeleteFile(self, lbl, path, filename):
         """ Delete the specified file """
         # Set cursor to hourglass
@@ -3657,6 +3975,182 @@ class FileManagement(wx.Dialog):
         dlg.ShowModal()
         dlg.Destroy()
 
+# Thread for building synchronization manifests
+class ThreadedManifestBuild(threading.Thread):
+    """ Threaded Manifest Build Class.  Builds each manifest in turn, unless the user cancels. """
+    def __init__(self, notify_window):
+        """Initialize the Manifest Build Thread Class."""
+        threading.Thread.__init__(self)
+        self._notify_window = notify_window
+        # prevent the application from hanging on Close
+        self.setDaemon(1)
+        # Start the thread
+        self.start()
+
+    def run(self):
+        """Run the Manifest Build Thread."""
+        try:
+            for builder in self._notify_window.builders:
+                try:
+                    manifest = builder(self._notify_window.AddProgress, self._notify_window.IsCancelled)
+                # Any error (including a file name that can't be decoded) stops the synchronization
+                except Exception:
+                    self._notify_window.error = "%s" % sys.exc_info()[1]
+                    break
+                # None means the user cancelled
+                if manifest == None:
+                    break
+                self._notify_window.manifests.append(manifest)
+        finally:
+            # Signal that the manifests are DONE
+            wx.PostEvent(self._notify_window, LocalFileTransfer.ThreadComplete())
+
+
+class ManifestProgress(wx.Dialog):
+    """ This object builds the manifests used to synchronize folders on a worker thread, and displays the progress.
+        builders is a list of functions taking (progress, isCancelled) that each build one manifest. """
+    def __init__(self, parent, title, builders):
+        """ Set up the Dialog Box and all GUI Widgets. """
+        # Set up local variables
+        self.builders = builders
+        # Initialize the timer that updates the progress dialog
+        self.timer = None
+
+        size = (350,150)
+        # Create the Dialog Box itself, with no minimize/maximize/close buttons
+        wx.Dialog.__init__(self, parent, -1, title, size = size, style=wx.CAPTION)
+
+        # Create a main VERTICAL sizer for the form
+        mainSizer = wx.BoxSizer(wx.VERTICAL)
+
+        # File label
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_("File: %s"), 'utf8')
+        else:
+            prompt = _("File: %s")
+        self.lblFile = wx.StaticText(self, -1, prompt % '', style=wx.ST_NO_AUTORESIZE)
+        # Add the label to the Main Sizer
+        mainSizer.Add(self.lblFile, 0, wx.EXPAND | wx.ALL, 10)
+
+        # Progress Bar.  The number of files isn't known until the trees have been walked, so it just shows activity.
+        self.progressBar = wx.Gauge(self, -1, 100, style=wx.GA_HORIZONTAL | wx.GA_SMOOTH)
+        # Add the element to the Main Sizer
+        mainSizer.Add(self.progressBar, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+
+        # Files Checked label
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_("%d files checked, %d bytes read"), 'utf8')
+        else:
+            prompt = _("%d files checked, %d bytes read")
+        self.lblFiles = wx.StaticText(self, -1, prompt % (0, 0), style=wx.ST_NO_AUTORESIZE)
+        # Add the label to the Main Sizer
+        mainSizer.Add(self.lblFiles, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+
+        # Cancel Button
+        self.btnCancel = wx.Button(self, wx.ID_CANCEL, _("Cancel"))
+        # Add the element to the Main Sizer
+        mainSizer.Add(self.btnCancel, 0, wx.ALIGN_CENTER | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+
+        wx.EVT_BUTTON(self, wx.ID_CANCEL, self.OnCancel)
+
+        # Attach the main sizer to the form
+        self.SetSizer(mainSizer)
+        # Turn Auto Layout on
+        self.SetAutoLayout(True)
+        # Lay out the form
+        self.Layout()
+        # Center on the Screen
+        TransanaGlobal.CenterOnPrimary(self)
+
+        # The manifests that have been built
+        self.manifests = []
+        # The error message if a manifest couldn't be built
+        self.error = None
+        # "cancelled" is intialized to false.  If the user cancels the manifests,
+        # this variable gets set to true to signal the need to interrupt them.
+        self.cancelled = False
+        # The number of files checked, the number of bytes read for checksums, and the latest file
+        self.filesChecked = 0
+        self.bytesRead = 0
+        self.currentFile = ''
+        # Lock to protect the progress values, which the manifest thread updates
+        self.lock = threading.Lock()
+
+    def Run(self):
+        """ Build the manifests, displaying the progress until they are done.  Returns the list of manifests, or
+            None if the user cancelled or a manifest couldn't be built. """
+        self.Bind(wx.EVT_TIMER, self.UpdateDisplay)
+        LocalFileTransfer.EVT_THREAD_COMPLETE(self, self.OnManifestBuildComplete)
+
+        # Create a timer used to update the Progress Dialog
+        self.timer = wx.Timer(self)
+        # Start the timer, firing it every half second
+        self.timer.Start(500)
+
+        ThreadedManifestBuild(self)
+
+        # Show the form
+        self.ShowModal()
+
+        if self.cancelled or (self.error != None) or (len(self.manifests) != len(self.builders)):
+            return None
+        return self.manifests
+
+    def AddProgress(self, relPath, bytesRead):
+        """ Note the file the manifest thread is checking, and the bytes it has read """
+        self.lock.acquire()
+        if relPath != self.currentFile:
+            self.filesChecked += 1
+            self.currentFile = relPath
+        self.bytesRead += bytesRead
+        self.lock.release()
+
+    def IsCancelled(self):
+        """ Has the user cancelled the manifests? """
+        return self.cancelled
+
+    def UpdateDisplay(self, event=None):
+        """ Update the Progress Dialog Box labels and progress bar """
+        # Get a consistent set of progress values
+        self.lock.acquire()
+        filesChecked = self.filesChecked
+        bytesRead = self.bytesRead
+        currentFile = self.currentFile
+        self.lock.release()
+
+        # Display the latest file checked
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_("File: %s"), 'utf8')
+        else:
+            prompt = _("File: %s")
+        self.lblFile.SetLabel(prompt % currentFile)
+        # Display the number of files checked and bytes read
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_("%d files checked, %d bytes read"), 'utf8')
+        else:
+            prompt = _("%d files checked, %d bytes read")
+        self.lblFiles.SetLabel(prompt % (filesChecked, bytesRead))
+        # Show that the manifests are still being built
+        self.progressBar.Pulse()
+
+    def OnCancel(self, event):
+        """ Respond to the user pressing the "Cancel" button to interrupt the manifests """
+        # Cancel is accomplished by setting this local variable.  The manifest logic detects this and responds appropriately
+        self.cancelled = True
+        self.btnCancel.SetLabel(_('Cancel requested.'))
+        self.btnCancel.Enable(False)
+
+    def OnManifestBuildComplete(self, event):
+        """ Process this when the Threaded Manifest Build Complete event is triggered """
+        self.timer.Stop()
+        # self.Show(False) doesn't work, as the Mac fails to move forward.  EndModal seems to work.
+        self.EndModal(True)
+
+
 class GenericDirCtrl_MacFix(wx.GenericDirCtrl):
     """ The wx.GenericDirCtrl cannot set paths on OS X that start with /Volumes, i.e. are not on the main Mac hard drive.
         This class makes a minor adjustment to the SetPath method to detect and correct that problem. """
@@ -22,6 +22,8 @@ DEBUG = False
 if DEBUG:
     print "KeywordMapClass DEBUG is ON!!"
 
+# import Python's bisect module
+import bisect
 # import Python's os and sys modules
 import os, sys
 # import Python's platform module
@@ -171,6 +173,10 @@ class KeywordMap(wx.Frame):
         self.startChar = -1
         self.endChar = -1
         self.keywordClipList = {}
+        # The Keyword Map layout:  the vertical position of each keyword's row, and each row's Clips, Snapshots, and Quotes
+        # sorted by start, so that overlaps and mouse-overs can be found by binary search
+        self.keywordY = {}
+        self.keywordClipIndex = {}
         self.configName = ''
         # Initialize variables required to avoid crashes when the visualization has been cleared
         self.graphicindent = 0
@@ -886,6 +892,8 @@ class KeywordMap(wx.Frame):
 
     def OnSize(self, event):
         (w, h) = self.GetClientSizeTuple()
+        # Remember the previous drawing area
+        oldBounds = self.Bounds
         if not self.embedded:
             if self.Bounds[1] == 5:
                 self.Bounds = (5, 5, w - 10, h - 25)
@@ -893,6 +901,9 @@ class KeywordMap(wx.Frame):
                 self.Bounds = (5, 40, w - 10, h - 30)
         else:
             self.Bounds = (0, 0, w, h - 25)
+        # If the drawing area hasn't changed size, the layout is still good and the graph doesn't need redrawing
+        if tuple(oldBounds) == tuple(self.Bounds):
+            return
         # If we have data defined in the graph ...
         if (self.episodeName != '') or (self.textObj != None) or (self.collection != None):
             # ... redraw the graph
@@ -1918,6 +1929,15 @@ class KeywordMap(wx.Frame):
     def DrawGraph(self):
         """ Actually Draw the Keyword Map """
         self.keywordClipList = {}
+        self.keywordClipIndex = {}
+        # Determine the vertical position of each keyword's row once, rather than for each Clip
+        self.keywordY = {}
+        for (row, (KWG, KW)) in enumerate(self.filteredKeywordList):
+            self.keywordY[(KWG, KW)] = self.CalcY(row)
+        # The Filter lists are checked for every Clip, Snapshot, and Quote, so use sets for them
+        clipFilter = set(self.clipFilterList)
+        snapshotFilter = set(self.snapshotFilterList)
+        quoteFilter = set(self.quoteFilterList)
         # We need to remember Snapshot Color for when self.keywordAsColor is False
         # Otherwise, whole snapshot coding may get a different color than detail snapshot coding.
         snapshotColor = {}
@@ -2238,14 +2258,14 @@ class KeywordMap(wx.Frame):
             # If we're in the Keyword Visualization and showEmbeddedLabels is enabled ...
             # NOTE:  This is ONLY to be used for testing the mouse-overs, not in production!
             if self.embedded and self.showEmbeddedLabels:
-                self.graphic.AddText("%s : %s" % (KWG, KW), 2, self.CalcY(self.filteredKeywordList.index((KWG, KW))) - 7)
+                self.graphic.AddText("%s : %s" % (KWG, KW), 2, self.keywordY[(KWG, KW)] - 7)
 
         # Set a counter for missing colors
         nextColour = 0
         # For each record in the Clip List ...
         for (KWG, KW, Start, Stop, ClipNum, ClipName, CollectNum) in self.clipList:
             # If the record should be displayed based on the Clip and Keyword sections of the Filter Dialog ...
-            if ((ClipName, CollectNum, True) in self.clipFilterList) and ((KWG, KW) in self.filteredKeywordList):
+            if ((ClipName, CollectNum, True) in clipFilter) and self.keywordY.has_key((KWG, KW)):
                 # See if the Clip's start is before the portion of the map being displayed
                 if Start < self.startTime:
                     Start = self.startTime
@@ -2263,8 +2283,7 @@ class KeywordMap(wx.Frame):
                     # Initialize a list for Temporary Lines
                     tempLine = []
                     # Add the Coding Line
-                    tempLine.append((self.CalcX(Start), self.CalcY(self.filteredKeywordList.index((KWG, KW))),
-                                     self.CalcX(Stop), self.CalcY(self.filteredKeywordList.index((KWG, KW)))))
+                    tempLine.append((self.CalcX(Start), self.keywordY[(KWG, KW)], self.CalcX(Stop), self.keywordY[(KWG, KW)]))
                     # If we're in the Keyword Map and are NOT using Colors as Keywords (i.e., colors are Clips) ....
                     if (not self.embedded) and (not self.colorAsKeywords):
                         # Update the color index here, at the clip transition
@@ -2298,76 +2317,13 @@ class KeywordMap(wx.Frame):
                 # Note what Clip is being processed at the moment
                 lastclip = ClipNum
 
-                # Now add the Clip to the keywordClipList.  This holds all Keyword/Clip data in memory so it can be searched quickly
-                # This dictionary object uses the keyword pair as the key and holds a list of Clip data for all clips with that keyword.
-                # If the list for a given keyword already exists ...
-                if self.keywordClipList.has_key((KWG, KW)):
-                    # Get the list of Clips that contain the current Keyword from the keyword / Clip List dictionary
-                    overlapClips = self.keywordClipList[(KWG, KW)]
-                    # Iterate through the Clip List ...
-                    for (objType, overlapStartTime, overlapEndTime, overlapClipNum, overlapClipName) in overlapClips:
-                        # Let's look for overlap
-                        overlapStart = Stop
-                        overlapEnd = Start
-
-                        if DEBUG and KWG == 'Transana Users' and KW == 'DavidW':
-                            print "Start = %7d, overStart = %7s, Stop = %7s, overEnd = %7s" % (Start, overlapStartTime, Stop, overlapEndTime)
-
-                        # Look for Start between overlapStartTime and overlapEndTime
-                        if (Start >= overlapStartTime) and (Start < overlapEndTime):
-                            overlapStart = Start
-
-                        # Look for overlapStartTime between Start and Stop
-                        if (overlapStartTime >= Start) and (overlapStartTime < Stop):
-                            overlapStart = overlapStartTime
-
-                        # Look for Stop between overlapStartTime and overlapEndTime
-                        if (Stop > overlapStartTime) and (Stop <= overlapEndTime):
-                            overlapEnd = Stop
-
-                        # Look for overlapEndTime between Start and Stop
-                        if (overlapEndTime > Start) and (overlapEndTime <= Stop):
-                            overlapEnd = overlapEndTime
-                            
-                        # If we've found an overlap, it will be indicated by Start being less than End!
-                        if overlapStart < overlapEnd:
-                            # Draw a multi-colored line to indicate overlap
-                            overlapThickness = int(self.barHeight/ 3) + 1
-                            self.graphic.SetThickness(overlapThickness)
-                            if self.colorOutput:
-                                self.graphic.SetColour("GREEN")
-                            else:
-                                self.graphic.SetColour("WHITE")
-                            tempLine = [(self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW))), self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW))))]
-                            self.graphic.AddLines(tempLine)
-                            if self.colorOutput:
-                                self.graphic.SetColour("RED")
-                            else:
-                                self.graphic.SetColour("BLACK")
-                            tempLine = [(self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-overlapThickness+1, self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-overlapThickness+1)]
-                            self.graphic.AddLines(tempLine)
-                            if self.colorOutput:
-                                self.graphic.SetColour("BLUE")
-                            else:
-                                self.graphic.SetColour("GRAY")
-                            tempLine = [(self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+overlapThickness, self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+overlapThickness)]
-                            self.graphic.AddLines(tempLine)
-                            # Let's remember the clip start and stop boundaries, to be drawn at the end so they won't get over-written
-                            overlapLines.append(((self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-(self.barHeight / 2), self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+(self.barHeight / 2)),))
-                            overlapLines.append(((self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-(self.barHeight / 2), self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+(self.barHeight / 2)),))
-
-                    # ... add the new Clip to the Clip List
-                    self.keywordClipList[(KWG, KW)].append(('Clip', Start, Stop, ClipNum, ClipName))
-
-                # If there is no entry for the given keyword ...
-                else:
-                    # ... create a List object with the first clip's data for this Keyword Pair key
-                    self.keywordClipList[(KWG, KW)] = [('Clip', Start, Stop, ClipNum, ClipName)]
+                # Now add the Clip to the Keyword Map layout, marking where it overlaps items already on the keyword's row
+                self.AddToLayout((KWG, KW), ('Clip', Start, Stop, ClipNum, ClipName), overlapLines)
 
         # For each record in the Snapshot List ...
         for (KWG, KW, Start, Stop, SnapshotNum, SnapshotName, CollectNum) in self.snapshotList:
             # If the record should be displayed based on the Snapshot and Keyword sections of the Filter Dialog ...
-            if ((SnapshotName, CollectNum, True) in self.snapshotFilterList) and ((KWG, KW) in self.filteredKeywordList):
+            if ((SnapshotName, CollectNum, True) in snapshotFilter) and self.keywordY.has_key((KWG, KW)):
                 # See if the Snapshot's start is before the portion of the map being displayed
                 if Start < self.startTime:
                     Start = self.startTime
@@ -2385,8 +2341,7 @@ class KeywordMap(wx.Frame):
                     # Initialize a list for Temporary Lines
                     tempLine = []
                     # Add the Coding Line
-                    tempLine.append((self.CalcX(Start), self.CalcY(self.filteredKeywordList.index((KWG, KW))),
-                                     self.CalcX(Stop), self.CalcY(self.filteredKeywordList.index((KWG, KW)))))
+                    tempLine.append((self.CalcX(Start), self.keywordY[(KWG, KW)], self.CalcX(Stop), self.keywordY[(KWG, KW)]))
                     # If we're in the Keyword Map and are NOT using Colors as Keywords (i.e., colors are Clips) ....
                     if (not self.embedded) and (not self.colorAsKeywords):
                         # Update the color index here, at the clip transition
@@ -2419,76 +2374,13 @@ class KeywordMap(wx.Frame):
                 # Note what Snapshot is being processed at the moment
                 lastsnapshot = SnapshotNum
 
-                # Now add the Snapshot to the keywordClipList.  This holds all Keyword/Clip data in memory so it can be searched quickly
-                # This dictionary object uses the keyword pair as the key and holds a list of Clip data for all clips with that keyword.
-                # If the list for a given keyword already exists ...
-                if self.keywordClipList.has_key((KWG, KW)):
-                    # Get the list of Clips that contain the current Keyword from the keyword / Clip List dictionary
-                    overlapClips = self.keywordClipList[(KWG, KW)]
-                    # Iterate through the Clip List ...
-                    for (objType, overlapStartTime, overlapEndTime, overlapClipNum, overlapClipName) in overlapClips:
-                        # Let's look for overlap
-                        overlapStart = Stop
-                        overlapEnd = Start
-
-                        if DEBUG and KWG == 'Transana Users' and KW == 'DavidW':
-                            print "Start = %7d, overStart = %7s, Stop = %7s, overEnd = %7s" % (Start, overlapStartTime, Stop, overlapEndTime)
-
-                        # Look for Start between overlapStartTime and overlapEndTime
-                        if (Start >= overlapStartTime) and (Start < overlapEndTime):
-                            overlapStart = Start
-
-                        # Look for overlapStartTime between Start and Stop
-                        if (overlapStartTime >= Start) and (overlapStartTime < Stop):
-                            overlapStart = overlapStartTime
-
-                        # Look for Stop between overlapStartTime and overlapEndTime
-                        if (Stop > overlapStartTime) and (Stop <= overlapEndTime):
-                            overlapEnd = Stop
-
-                        # Look for overlapEndTime between Start and Stop
-                        if (overlapEndTime > Start) and (overlapEndTime <= Stop):
-                            overlapEnd = overlapEndTime
-
-                        # If we've found an overlap, it will be indicated by Start being less than End!
-                        if overlapStart < overlapEnd:
-                            # Draw a multi-colored line to indicate overlap
-                            overlapThickness = int(self.barHeight/ 3) + 1
-                            self.graphic.SetThickness(overlapThickness)
-                            if self.colorOutput:
-                                self.graphic.SetColour("GREEN")
-                            else:
-                                self.graphic.SetColour("WHITE")
-                            tempLine = [(self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW))), self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW))))]
-                            self.graphic.AddLines(tempLine)
-                            if self.colorOutput:
-                                self.graphic.SetColour("RED")
-                            else:
-                                self.graphic.SetColour("BLACK")
-                            tempLine = [(self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-overlapThickness+1, self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-overlapThickness+1)]
-                            self.graphic.AddLines(tempLine)
-                            if self.colorOutput:
-                                self.graphic.SetColour("BLUE")
-                            else:
-                                self.graphic.SetColour("GRAY")
-                            tempLine = [(self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+overlapThickness, self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+overlapThickness)]
-                            self.graphic.AddLines(tempLine)
-                            # Let's remember the clip start and stop boundaries, to be drawn at the end so they won't get over-written
-                            overlapLines.append(((self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-(self.barHeight / 2), self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+(self.barHeight / 2)),))
-                            overlapLines.append(((self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-(self.barHeight / 2), self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+(self.barHeight / 2)),))
-
-                    # ... add the new Clip to the Clip List
-                    self.keywordClipList[(KWG, KW)].append(('Snapshot', Start, Stop, SnapshotNum, SnapshotName))
-
-                # If there is no entry for the given keyword ...
-                else:
-                    # ... create a List object with the first clip's data for this Keyword Pair key
-                    self.keywordClipList[(KWG, KW)] = [('Snapshot', Start, Stop, SnapshotNum, SnapshotName)]
+                # Now add the Snapshot to the Keyword Map layout, marking where it overlaps items already on the keyword's row
+                self.AddToLayout((KWG, KW), ('Snapshot', Start, Stop, SnapshotNum, SnapshotName), overlapLines)
 
         # For each record in the Quote List ...
         for (KWG, KW, Start, Stop, QuoteNum, QuoteName, CollectNum) in self.quoteList:
             # If the record should be displayed based on the Quote and Keyword sections of the Filter Dialog ...
-            if ((QuoteName, CollectNum, True) in self.quoteFilterList) and ((KWG, KW) in self.filteredKeywordList):
+            if ((QuoteName, CollectNum, True) in quoteFilter) and self.keywordY.has_key((KWG, KW)):
                 # See if the Quote's start is before the portion of the map being displayed
                 if Start < self.startChar:
                     Start = self.startChar
@@ -2507,8 +2399,7 @@ class KeywordMap(wx.Frame):
                     tempLine = []
 
                     # Add the Coding Line
-                    tempLine.append((self.CalcX(Start), self.CalcY(self.filteredKeywordList.index((KWG, KW))),
-                                     self.CalcX(Stop), self.CalcY(self.filteredKeywordList.index((KWG, KW)))))
+                    tempLine.append((self.CalcX(Start), self.keywordY[(KWG, KW)], self.CalcX(Stop), self.keywordY[(KWG, KW)]))
                     # If we're in the Keyword Map and are NOT using Colors as Keywords (i.e., colors are Quotes) ....
                     if (not self.embedded) and (not self.colorAsKeywords):
                         # Update the color index here, at the quote transition
@@ -2529,71 +2420,8 @@ class KeywordMap(wx.Frame):
                 # Note what Quote is being processed at the moment
                 lastQuote = QuoteNum
 
-                # Now add the Quote to the keywordClipList.  This holds all Keyword/Clip data in memory so it can be searched quickly
-                # This dictionary object uses the keyword pair as the key and holds a list of Clip data for all clips with that keyword.
-                # If the list for a given keyword already exists ...
-                if self.keywordClipList.has_key((KWG, KW)):
-                    # Get the list of Quotes that contain the current Keyword from the keyword / Clip List dictionary
-                    overlapClips = self.keywordClipList[(KWG, KW)]
-                    # Iterate through the Overlap Clip List ...
-                    for (objType, overlapStartTime, overlapEndTime, overlapClipNum, overlapClipName) in overlapClips:
-                        # Let's look for overlap
-                        overlapStart = Stop
-                        overlapEnd = Start
-
-                        if DEBUG and KWG == 'Transana Users' and KW == 'DavidW':
-                            print "Start = %7d, overStart = %7s, Stop = %7s, overEnd = %7s" % (Start, overlapStartTime, Stop, overlapEndTime)
-
-                        # Look for Start between overlapStartTime and overlapEndTime
-                        if (Start >= overlapStartTime) and (Start < overlapEndTime):
-                            overlapStart = Start
-
-                        # Look for overlapStartTime between Start and Stop
-                        if (overlapStartTime >= Start) and (overlapStartTime < Stop):
-                            overlapStart = overlapStartTime
-
-                        # Look for Stop between overlapStartTime and overlapEndTime
-                        if (Stop > overlapStartTime) and (Stop <= overlapEndTime):
-                            overlapEnd = Stop
-
-                        # Look for overlapEndTime between Start and Stop
-                        if (overlapEndTime > Start) and (overlapEndTime <= Stop):
-                            overlapEnd = overlapEndTime
-
-                        # If we've found an overlap, it will be indicated by Start being less than End!
-                        if overlapStart < overlapEnd:
-                            # Draw a multi-colored line to indicate overlap
-                            overlapThickness = int(self.barHeight/ 3) + 1
-                            self.graphic.SetThickness(overlapThickness)
-                            if self.colorOutput:
-                                self.graphic.SetColour("GREEN")
-                            else:
-                                self.graphic.SetColour("WHITE")
-                            tempLine = [(self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW))), self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW))))]
-                            self.graphic.AddLines(tempLine)
-                            if self.colorOutput:
-                                self.graphic.SetColour("RED")
-                            else:
-                                self.graphic.SetColour("BLACK")
-                            tempLine = [(self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-overlapThickness+1, self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-overlapThickness+1)]
-                            self.graphic.AddLines(tempLine)
-                            if self.colorOutput:
-                                self.graphic.SetColour("BLUE")
-                            else:
-                                self.graphic.SetColour("GRAY")
-                            tempLine = [(self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+overlapThickness, self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+overlapThickness)]
-                            self.graphic.AddLines(tempLine)
-                            # Let's remember the clip start and stop boundaries, to be drawn at the end so they won't get over-written
-                            overlapLines.append(((self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-(self.barHeight / 2), self.CalcX(overlapStart), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+(self.barHeight / 2)),))
-                            overlapLines.append(((self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))-(self.barHeight / 2), self.CalcX(overlapEnd), self.CalcY(self.filteredKeywordList.index((KWG, KW)))+(self.barHeight / 2)),))
-
-                    # ... add the new Quote to the Clip List
-                    self.keywordClipList[(KWG, KW)].append(('Quote', Start, Stop, QuoteNum, QuoteName))
-
-                # If there is no entry for the given keyword ...
-                else:
-                    # ... create a List object with the first quote's data for this Keyword Pair key
-                    self.keywordClipList[(KWG, KW)] = [('Quote', Start, Stop, QuoteNum, QuoteName)]
+                # Now add the Quote to the Keyword Map layout, marking where it overlaps items already on the keyword's row
+                self.AddToLayout((KWG, KW), ('Quote', Start, Stop, QuoteNum, QuoteName), overlapLines)
 
         # If we are doing a Keyword Visualization, but there are no Clips in the picture, it can be confusing.
         # Let's place a message on the visualization saying it's intentionally left blank.
@@ -2631,6 +2459,72 @@ class KeywordMap(wx.Frame):
             # The DrawGraph routine destroys and recreates self.graphic.  We need to re-point the waveform to it.
             self.parent.waveform = self.graphic
 
+    def AddToLayout(self, kw, clipData, overlapLines):
+        """ Add a Clip, Snapshot, or Quote to a keyword's row of the Keyword Map layout, drawing the overlap indicators
+            where it overlaps items already on the row.  Overlap boundary lines are added to overlapLines to be drawn last. """
+        (objType, Start, Stop, objNum, objName) = clipData
+        # Get the vertical position of the keyword's row
+        y = self.keywordY[kw]
+        # Iterate through the items on this row that overlap the new one ...
+        for (overlapType, overlapStartTime, overlapEndTime, overlapNum, overlapName) in self.FindClips(kw, Start, Stop):
+            # The overlap runs from the later start to the earlier end
+            overlapStart = max(Start, overlapStartTime)
+            overlapEnd = min(Stop, overlapEndTime)
+            # If we've found an overlap, it will be indicated by Start being less than End!
+            if overlapStart < overlapEnd:
+                # Draw a multi-colored line to indicate overlap
+                overlapThickness = int(self.barHeight/ 3) + 1
+                self.graphic.SetThickness(overlapThickness)
+                if self.colorOutput:
+                    self.graphic.SetColour("GREEN")
+                else:
+                    self.graphic.SetColour("WHITE")
+                self.graphic.AddLines([(self.CalcX(overlapStart), y, self.CalcX(overlapEnd), y)])
+                if self.colorOutput:
+                    self.graphic.SetColour("RED")
+                else:
+                    self.graphic.SetColour("BLACK")
+                self.graphic.AddLines([(self.CalcX(overlapStart), y - overlapThickness + 1, self.CalcX(overlapEnd), y - overlapThickness + 1)])
+                if self.colorOutput:
+                    self.graphic.SetColour("BLUE")
+                else:
+                    self.graphic.SetColour("GRAY")
+                self.graphic.AddLines([(self.CalcX(overlapStart), y + overlapThickness, self.CalcX(overlapEnd), y + overlapThickness)])
+                # Let's remember the clip start and stop boundaries, to be drawn at the end so they won't get over-written
+                overlapLines.append(((self.CalcX(overlapStart), y - (self.barHeight / 2), self.CalcX(overlapStart), y + (self.barHeight / 2)),))
+                overlapLines.append(((self.CalcX(overlapEnd), y - (self.barHeight / 2), self.CalcX(overlapEnd), y + (self.barHeight / 2)),))
+
+        # The keywordClipList holds all Keyword/Clip data in the order it was added.  This dictionary object uses the
+        # keyword pair as the key and holds a list of Clip data for all clips with that keyword.
+        if self.keywordClipList.has_key(kw):
+            self.keywordClipList[kw].append(clipData)
+        else:
+            self.keywordClipList[kw] = [clipData]
+        # The keywordClipIndex holds, for each keyword, a list of start values, a matching list of (order added, Clip data),
+        # both sorted by start, and the length of the longest item on the row.
+        if not self.keywordClipIndex.has_key(kw):
+            self.keywordClipIndex[kw] = [[], [], 0]
+        row = self.keywordClipIndex[kw]
+        pos = bisect.bisect_right(row[0], Start)
+        row[0].insert(pos, Start)
+        row[1].insert(pos, (len(self.keywordClipList[kw]) - 1, clipData))
+        row[2] = max(row[2], Stop - Start)
+
+    def FindClips(self, kw, lowerVal, upperVal):
+        """ Return the Clips, Snapshots, and Quotes on a keyword's row that start before upperVal and end after lowerVal,
+            in the order they were added to the Keyword Map """
+        # If nothing is coded to the keyword, nothing can be found
+        if not self.keywordClipIndex.has_key(kw):
+            return []
+        (starts, items, maxLength) = self.keywordClipIndex[kw]
+        # Only items starting before upperVal, and no more than the longest item's length before lowerVal, can qualify
+        first = bisect.bisect_right(starts, lowerVal - maxLength)
+        last = bisect.bisect_left(starts, upperVal)
+        found = [(order, clipData) for (order, clipData) in items[first:last] if clipData[2] > lowerVal]
+        # Put the items back in the order they were added
+        found.sort()
+        return [clipData for (order, clipData) in found]
+
     def GetKeywordCount(self):
         """ Returns the number of keywords in the filtered Keyword List and the size of the image that results """
         return (len(self.filteredKeywordList), len(self.filteredKeywordList) * (self.barHeight + self.whitespaceHeight) + self.topOffset + 4)
@@ -2671,22 +2565,20 @@ class KeywordMap(wx.Frame):
                     if self.MediaLength > 0:
                         # initialize the string that will hold the names of clips being pointed to
                         clipNames = ''
-                        # Get the list of Clips that contain the current Keyword from the keyword / Clip List dictionary
-                        clips = self.keywordClipList[kw]
+                        # Get the Clips with the current Keyword whose StartTime and EndTime surround the current Time value
+                        clips = self.FindClips(kw, time, time)
                         # Iterate through the Clip List ...
                         for (objType, startTime, endTime, clipNum, clipName) in clips:
-                            # If the current Time value falls between the Clip's StartTime and EndTime ...
-                            if (startTime < time) and (endTime > time):
-                                # ... calculate the length of the Clip ...
-                                clipLen = endTime - startTime
-                                # ... and add the Clip Name and Length to the list of Clips with this Keyword at this Time
-                                # First, see if the list is empty.
-                                if clipNames == '':
-                                    # If so, just add the keyword name and time
-                                    clipNames = "%s (%s)" % (clipName, Misc.time_in_ms_to_str(clipLen))
-                                else:
-                                    # ... add the keyword to the end of the list
-                                    clipNames += ', ' + "%s (%s)" % (clipName, Misc.time_in_ms_to_str(clipLen))
+                            # ... calculate the length of the Clip ...
+                            clipLen = endTime - startTime
+                            # ... and add the Clip Name and Length to the list of Clips with this Keyword at this Time
+                            # First, see if the list is empty.
+                            if clipNames == '':
+                                # If so, just add the keyword name and time
+                                clipNames = "%s (%s)" % (clipName, Misc.time_in_ms_to_str(clipLen))
+                            else:
+                                # ... add the keyword to the end of the list
+                                clipNames += ', ' + "%s (%s)" % (clipName, Misc.time_in_ms_to_str(clipLen))
                         # If any clips are found for the current mouse position ...
                         if (clipNames != ''):
                             # ... add the Clip Names to the ToolTip so they will show up on screen as a hint
@@ -2695,21 +2587,19 @@ class KeywordMap(wx.Frame):
                     elif self.CharacterLength > 0:
                         # initialize the string that will hold the names of quotes being pointed to.
                         quoteNames = ''
-                        # Get the list of Quotes that contain the current Keyword from the keyword / Clip List dictionary
-                        quotes = self.keywordClipList[kw]
+                        # Get the Quotes with the current Keyword whose StartChar and EndChar surround the current Character value
+                        quotes = self.FindClips(kw, time, time)
                         # Iterate through the Quote List ...
                         for (objType, startChar, endChar, quoteNum, quoteName) in quotes:
-                            # If the current Character value falls between the Quote's StartChar and EndChar ...
-                            if (startChar < time) and (endChar > time):
-                                # ... calculate the length of the Quote ...
-                                quoteLen = endChar - startChar
-                                # First, see if the list is empty.
-                                if quoteNames == '':
-                                    # If so, just add the keyword name and time
-                                    quoteNames = "%s (%s)" % (quoteName, quoteLen)
-                                else:
-                                    # ... and add the Quote Name and Quote LENGTH to the list of Quotes with this Keyword at this Position
-                                    quoteNames += ', ' + "%s (%s)" % (quoteName, quoteLen)
+                            # ... calculate the length of the Quote ...
+                            quoteLen = endChar - startChar
+                            # First, see if the list is empty.
+                            if quoteNames == '':
+                                # If so, just add the keyword name and time
+                                quoteNames = "%s (%s)" % (quoteName, quoteLen)
+                            else:
+                                # ... and add the Quote Name and Quote LENGTH to the list of Quotes with this Keyword at this Position
+                                quoteNames += ', ' + "%s (%s)" % (quoteName, quoteLen)
                         # If any quotes are found for the current mouse position ...
                         if (quoteNames != ''):
                             # ... add the KEYWORD names to the ToolTip so they will show up on screen as a hint
@@ -2732,16 +2622,14 @@ class KeywordMap(wx.Frame):
                         # initialize the string that will hold the names of clips being pointed to.
                         # We don't actually need to know the names, but this signals that we're at least OVER a Clip.
                         clipNames = ''
-                        # Get the list of Clips that contain the current Keyword from the keyword / Clip List dictionary
-                        clips = self.keywordClipList[kw]
+                        # Get the Clips with the current Keyword whose StartTime and EndTime surround the current Time value
+                        clips = self.FindClips(kw, time, time)
                         # Iterate through the Clip List ...
                         for (objType, startTime, endTime, clipNum, clipName) in clips:
-                            # If the current Time value falls between the Clip's StartTime and EndTime ...
-                            if (startTime < time) and (endTime > time):
-                                # ... calculate the length of the Clip ...
-                                clipLen = endTime - startTime
-                                # ... and add the Clip LENGTH to the list of Clips with this Keyword at this Time
-                                clipNames += " (%s)" % Misc.time_in_ms_to_str(clipLen)
+                            # ... calculate the length of the Clip ...
+                            clipLen = endTime - startTime
+                            # ... and add the Clip LENGTH to the list of Clips with this Keyword at this Time
+                            clipNames += " (%s)" % Misc.time_in_ms_to_str(clipLen)
                         # If any clips are found for the current mouse position ...
                         if (clipNames != ''):
                             # ... add the KEYWORD names to the ToolTip so they will show up on screen as a hint
@@ -2751,18 +2639,18 @@ class KeywordMap(wx.Frame):
                         # initialize the string that will hold the names of quotes being pointed to.
                         # We don't actually need to know the names, but this signals that we're at least OVER a Quote.
                         quoteNames = ''
-                        # Get the list of Quotes that contain the current Keyword from the keyword / Clip List dictionary
-                        quotes = self.keywordClipList[kw]
+                        # Get the Quotes with the current Keyword whose StartChar and EndChar include the current Character value
+                        # (Character positions are whole numbers, so starting before time + 1 means starting at or before time.)
+                        quotes = self.FindClips(kw, time, time + 1)
                         # Iterate through the Quote List ...
                         for (objType, startChar, endChar, quoteNum, quoteName) in quotes:
-                            # If the current Character value falls between the Quote's StartChar and EndChar ...
-                            if (startChar <= time) and (endChar > time):
-                                # ... calculate the length of the Quote ...
-                                quoteLen = endChar - startChar
-                                # ... and add the Quote LENGTH to the list of Quotes with this Keyword at this Position
-                                quoteNames += " (%s)" % quoteLen
-                            # Handle Orphan Quotes
-                            elif (startChar == 0) and (endChar == 1):
+                            # ... calculate the length of the Quote ...
+                            quoteLen = endChar - startChar
+                            # ... and add the Quote LENGTH to the list of Quotes with this Keyword at this Position
+                            quoteNames += " (%s)" % quoteLen
+                        # Handle Orphan Quotes, which are shown at the start of the document
+                        for (objType, startChar, endChar, quoteNum, quoteName) in self.FindClips(kw, 0, 1):
+                            if (startChar == 0) and (endChar == 1) and not ((objType, startChar, endChar, quoteNum, quoteName) in quotes):
                                 quoteNames += " (%s)" % 0
                         # If any quotes are found for the current mouse position ...
                         if (quoteNames != ''):
@@ -2801,8 +2689,9 @@ class KeywordMap(wx.Frame):
                 prompt = _("Keyword:  %s : %s,  Time: %s")
             # Set the Status Text to indicate the current Keyword and Time values
             self.SetStatusText(prompt % (kw[0], kw[1], Misc.time_in_ms_to_str(time)))
-            # Get the list of Clips that contain the current Keyword from the keyword / Clip List dictionary
-            clips = self.keywordClipList[kw]
+            # Get the Clips with the current Keyword whose StartTime and EndTime include the current Time value.
+            # (Times are whole numbers, so starting before time + 1 and ending after time - 1 includes the end points.)
+            clips = self.FindClips(kw, time - 1, time + 1)
             # Iterate through the Clip List ...
             for (objType, startTime, endTime, clipNum, clipName) in clips:
                 # If the current Time value falls between the Clip's StartTime and EndTime ...
@@ -766,6 +766,8 @@ that would corrupt the record that is currently locked by %s.  Please try again
                 prompt = _("Cannot save a %s with a blank Keyword.") % tname
             raise SaveError, prompt
         else:
+            # Cached keyword lists, keyword colors, and keyword assignments will be out of date
+            DBInterface.InvalidateQueryCache(['Keywords2', 'ClipKeywords2'])
             # Verify record lock is still good
             db = DBInterface.get_db()
 
@@ -794,6 +796,9 @@ that would corrupt the record that is currently locked by %s.  Please try again
             raise DeleteError, _("Invalid record number (0)")
         self.lock_record()
 
+        # Cached keyword lists, keyword colors, and keyword assignments will be out of date
+        DBInterface.InvalidateQueryCache(['Keywords2', 'ClipKeywords2'])
+
         db = DBInterface.get_db()
         c = db.cursor()
  
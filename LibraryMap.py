@@ -22,6 +22,8 @@ DEBUG = False
 if DEBUG:
     print "LibraryMap DEBUG is ON!!"
 
+# import Python's collections module
+import collections
 # import Python's os and sys modules
 import os, sys
 # import Python's platform module
@@ -76,6 +78,75 @@ ID_SERIESLIST        = wx.NewId()
 # Episode List Combo Box
 ID_EPISODELIST       = wx.NewId()
 
+# Library data loaded from the database, keyed by Library (Series) number, holding the query cache generation
+# (see DBInterface.QueryCacheGeneration()) it was loaded in.  Data saved since then, here or by another user through
+# the Message Server, changes the generation.  The Chat Window also clears this when messages arrive.
+_seriesCache = {}
+
+def ClearSeriesCache():
+    """ Discard all cached Library data, so the next Library Map reloads it from the database """
+    _seriesCache.clear()
+
+def LoadSeriesData(seriesNum):
+    """ Load the Episodes, Clip Keywords, and Snapshot Keywords for a Library with a handful of queries, rather than
+        several queries per Episode.  Returns a tuple of (episode rows, clip rows by Episode, snapshot rows by Episode). """
+    # Use the cached data if we have it and nothing has been saved since it was loaded
+    generation = DBInterface.QueryCacheGeneration()
+    if _seriesCache.has_key(seriesNum) and (_seriesCache[seriesNum][0] == generation):
+        return _seriesCache[seriesNum][1]
+    # Get a cursor that decodes the text columns
+    DBCursor = DBInterface.get_decoding_cursor(['EpisodeID', 'MediaFile', 'SeriesID', 'KeywordGroup', 'Keyword', 'ClipID', 'SnapshotID'])
+
+    # Get Series Number, Episode Number, Media File Name, and Length
+    SQLText = """SELECT e.EpisodeNum, e.EpisodeID, e.SeriesNum, e.MediaFile, e.EpLength, s.SeriesID
+                   FROM Episodes2 e, Series2 s
+                   WHERE s.SeriesNum = e.SeriesNum AND
+                         s.SeriesNum = %s
+                   ORDER BY EpisodeID """
+    # Adjust the query for sqlite if needed
+    SQLText = DBInterface.FixQuery(SQLText)
+    # Execute the query
+    DBCursor.execute(SQLText, (seriesNum, ))
+    episodeRows = DBCursor.fetchall()
+
+    # Get the Keyword Placement lines for all the Library's Clips.  We need them to be in ClipStart, ClipNum order within
+    # each Episode so colors will be distributed properly across bands.
+    clipRows = {}
+    SQLText = """SELECT cl.EpisodeNum, ck.KeywordGroup, ck.Keyword, cl.ClipStart, cl.ClipStop, cl.ClipNum, cl.ClipID, cl.CollectNum
+                   FROM Episodes2 e, Clips2 cl, ClipKeywords2 ck
+                   WHERE e.SeriesNum = %s AND
+                         cl.EpisodeNum = e.EpisodeNum AND
+                         cl.ClipNum = ck.ClipNum
+                   ORDER BY cl.EpisodeNum, ClipStart, cl.ClipNum, KeywordGroup, Keyword"""
+    # Adjust the query for sqlite if needed
+    SQLText = DBInterface.FixQuery(SQLText)
+    DBCursor.execute(SQLText, (seriesNum, ))
+    # Divide the results up by Episode
+    for row in DBCursor.fetchall():
+        clipRows.setdefault(row[0], []).append(row[1:])
+
+    # Get the Keyword Placement lines for all the Library's Snapshots, first the WHOLE SNAPSHOT Keywords, then the
+    # SNAPSHOT CODING Keywords, in SnapshotTimeCode, SnapshotNum order within each Episode.
+    snapshotRows = {}
+    for keywordTable in ['ClipKeywords2', 'SnapshotKeywords2']:
+        SQLText = """SELECT sn.EpisodeNum, ck.KeywordGroup, ck.Keyword, sn.SnapshotTimeCode, sn.SnapshotDuration, sn.SnapshotNum, sn.SnapshotID, sn.CollectNum
+                       FROM Episodes2 e, Snapshots2 sn, %s ck
+                       WHERE e.SeriesNum = %%s AND
+                             sn.EpisodeNum = e.EpisodeNum AND
+                             sn.SnapshotNum = ck.SnapshotNum
+                       ORDER BY sn.EpisodeNum, SnapshotTimeCode, sn.SnapshotNum, KeywordGroup, Keyword""" % keywordTable
+        # Adjust the query for sqlite if needed
+        SQLText = DBInterface.FixQuery(SQLText)
+        DBCursor.execute(SQLText, (seriesNum, ))
+        # Divide the results up by Episode
+        for row in DBCursor.fetchall():
+            snapshotRows.setdefault(row[0], []).append(row[1:])
+    DBCursor.close()
+
+    # Remember the results
+    _seriesCache[seriesNum] = (generation, (episodeRows, clipRows, snapshotRows))
+    return _seriesCache[seriesNum][1]
+
 class LibraryMap(wx.Frame):
     """ This is the main class for the Series Map application. """
     def __init__(self, parent, title, seriesNum, seriesName, reportType, controlObject=None):
@@ -810,21 +881,15 @@ class LibraryMap(wx.Frame):
         if self.reportType == 2:
             epLengths = {}
 
-        # Get Series Number, Episode Number, Media File Name, and Length
-        SQLText = """SELECT e.EpisodeNum, e.EpisodeID, e.SeriesNum, e.MediaFile, e.EpLength, s.SeriesID
-                       FROM Episodes2 e, Series2 s
-                       WHERE s.SeriesNum = e.SeriesNum AND
-                             s.SeriesNum = %s
-                       ORDER BY EpisodeID """
-        # Adjust the query for sqlite if needed
-        SQLText = DBInterface.FixQuery(SQLText)
-        # Execute the query
-        self.DBCursor.execute(SQLText, (self.seriesNum, ))
+        # Keywords, Clips and Snapshots appear many times in the data.  Use ordered sets to remove duplicates.
+        keywords = collections.OrderedDict()
+        clipFilter = collections.OrderedDict()
+        snapshotFilter = collections.OrderedDict()
+
+        # Get all the data for the Library
+        (episodeRows, clipRows, snapshotRows) = LoadSeriesData(self.seriesNum)
 
-        for (EpisodeNum, EpisodeID, SeriesNum, MediaFile, EpisodeLength, SeriesID) in self.DBCursor.fetchall():
-            EpisodeID = DBInterface.ProcessDBDataForUTF8Encoding(EpisodeID)
-            SeriesID = DBInterface.ProcessDBDataForUTF8Encoding(SeriesID)
-            MediaFile = DBInterface.ProcessDBDataForUTF8Encoding(MediaFile)
+        for (EpisodeNum, EpisodeID, SeriesNum, MediaFile, EpisodeLength, SeriesID) in episodeRows:
 
             self.episodeList.append((EpisodeID, SeriesID, True))
 
@@ -835,129 +900,35 @@ class LibraryMap(wx.Frame):
             # Remember the Episode's length
             self.episodeLengths[(EpisodeID, SeriesID)] = EpisodeLength
 
-            # Get the list of Keywords to be displayed
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword
-                           FROM Clips2 cl, ClipKeywords2 ck
-                           WHERE cl.EpisodeNum = %s AND
-                                 cl.ClipNum = ck.ClipNum
-                           GROUP BY ck.keywordgroup, ck.keyword
-                           ORDER BY KeywordGroup, Keyword, ClipStart"""
-            # Adjust the query for sqlite if needed
-            SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-
-            for (kwg, kw) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                if not (kwg, kw) in self.filteredKeywordList:
-                    self.filteredKeywordList.append((kwg, kw))
-                if not (kwg, kw, True) in self.unfilteredKeywordList:
-                    self.unfilteredKeywordList.append((kwg, kw, True))
-
-            # Get the list of WHOLE SNAPSHOT Keywords to be displayed
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword
-                           FROM Snapshots2 sn, ClipKeywords2 ck
-                           WHERE sn.EpisodeNum = %s AND
-                                 sn.SnapshotNum = ck.SnapshotNum
-                           GROUP BY ck.keywordgroup, ck.keyword
-                           ORDER BY KeywordGroup, Keyword, SnapshotTimeCode"""
-            # Adjust the query for sqlite if needed
-            SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-            for (kwg, kw) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                if not (kwg, kw) in self.filteredKeywordList:
-                    self.filteredKeywordList.append((kwg, kw))
-                if not (kwg, kw, True) in self.unfilteredKeywordList:
-                    self.unfilteredKeywordList.append((kwg, kw, True))
-
-            # Get the list of SNAPSHOT CODING Keywords to be displayed
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword
-                           FROM Snapshots2 sn, SnapshotKeywords2 ck
-                           WHERE sn.EpisodeNum = %s AND
-                                 sn.SnapshotNum = ck.SnapshotNum
-                           GROUP BY ck.keywordgroup, ck.keyword
-                           ORDER BY KeywordGroup, Keyword, SnapshotTimeCode"""
-            # Adjust the query for sqlite if needed
-            SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-            for (kwg, kw) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                if not (kwg, kw) in self.filteredKeywordList:
-                    self.filteredKeywordList.append((kwg, kw))
-                if not (kwg, kw, True) in self.unfilteredKeywordList:
-                    self.unfilteredKeywordList.append((kwg, kw, True))
-
-            # Sort the Keyword List
-            self.unfilteredKeywordList.sort()
-
-            # Create the Keyword Placement lines to be displayed.  We need them to be in ClipStart, ClipNum order so colors will be
-            # distributed properly across bands.
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword, cl.ClipStart, cl.ClipStop, cl.ClipNum, cl.ClipID, cl.CollectNum
-                           FROM Clips2 cl, ClipKeywords2 ck
-                           WHERE cl.EpisodeNum = %s AND
-                                 cl.ClipNum = ck.ClipNum
-                           ORDER BY ClipStart, cl.ClipNum, KeywordGroup, Keyword"""
-            # Adjust the query for sqlite if needed
-            SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-            for (kwg, kw, clipStart, clipStop, clipNum, clipID, collectNum) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                clipID = DBInterface.ProcessDBDataForUTF8Encoding(clipID)
+            # Create the Keyword Placement lines to be displayed.
+            for (kwg, kw, clipStart, clipStop, clipNum, clipID, collectNum) in clipRows.get(EpisodeNum, []):
+                # Every Clip Keyword is displayed
+                keywords[(kwg, kw)] = True
                 # If we're dealing with an Episode, self.clipNum will be None and we want all clips.
                 # If we're dealing with a Clip, we only want to deal with THIS clip!
                 if (self.clipNum == None) or (clipNum == self.clipNum):
                     self.clipList.append((kwg, kw, clipStart, clipStop, clipNum, clipID, collectNum, EpisodeID, SeriesID))
+                    clipFilter[(clipID, collectNum, True)] = True
 
-                    if not ((clipID, collectNum, True) in self.clipFilterList):
-                        self.clipFilterList.append((clipID, collectNum, True))
-
-            # Create the WHOLE SNAPSHOT Keyword Placement lines to be displayed.  We need them to be in SnapshotTimeCode, SnapshotNum order so colors will be
-            # distributed properly across bands.
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword, sn.SnapshotTimeCode, sn.SnapshotDuration, sn.SnapshotNum, sn.SnapshotID, sn.CollectNum
-                           FROM Snapshots2 sn, ClipKeywords2 ck
-                           WHERE sn.EpisodeNum = %s AND
-                                 sn.SnapshotNum = ck.SnapshotNum
-                           ORDER BY SnapshotTimeCode, sn.SnapshotNum, KeywordGroup, Keyword"""
-            # Adjust the query for sqlite if needed
-            SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-            for (kwg, kw, SnapshotTimeCode, SnapshotDuration, SnapshotNum, SnapshotID, collectNum) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                SnapshotID = DBInterface.ProcessDBDataForUTF8Encoding(SnapshotID)
-                # If we're dealing with an Episode, self.clipNum will be None and we want all clips.
-                # If we're dealing with a Clip, we only want to deal with THIS clip!
-                if (self.clipNum == None):
-                    self.snapshotList.append((kwg, kw, SnapshotTimeCode, SnapshotTimeCode + SnapshotDuration, SnapshotNum, SnapshotID, collectNum, EpisodeID, SeriesID))
-                    if not ((SnapshotID, collectNum, True) in self.snapshotFilterList):
-                        self.snapshotFilterList.append((SnapshotID, collectNum, True))
-
-            # Create the SNAPSHOT CODING Keyword Placement lines to be displayed.  We need them to be in SnapshotTimeCode, SnapshotNum order so colors will be
-            # distributed properly across bands.
-            SQLText = """SELECT ck.KeywordGroup, ck.Keyword, sn.SnapshotTimeCode, sn.SnapshotDuration, sn.SnapshotNum, sn.SnapshotID, sn.CollectNum
-                           FROM Snapshots2 sn, SnapshotKeywords2 ck
-                           WHERE sn.EpisodeNum = %s AND
-                                 sn.SnapshotNum = ck.SnapshotNum
-                           ORDER BY SnapshotTimeCode, sn.SnapshotNum, KeywordGroup, Keyword"""
-            # Adjust the query for sqlite if needed
-            SQLText = DBInterface.FixQuery(SQLText)
-            self.DBCursor.execute(SQLText, (EpisodeNum, ))
-            for (kwg, kw, SnapshotTimeCode, SnapshotDuration, SnapshotNum, SnapshotID, collectNum) in self.DBCursor.fetchall():
-                kwg = DBInterface.ProcessDBDataForUTF8Encoding(kwg)
-                kw = DBInterface.ProcessDBDataForUTF8Encoding(kw)
-                SnapshotID = DBInterface.ProcessDBDataForUTF8Encoding(SnapshotID)
+            # Create the Snapshot Keyword Placement lines to be displayed.
+            for (kwg, kw, SnapshotTimeCode, SnapshotDuration, SnapshotNum, SnapshotID, collectNum) in snapshotRows.get(EpisodeNum, []):
+                # Every Snapshot Keyword is displayed
+                keywords[(kwg, kw)] = True
                 # If we're dealing with an Episode, self.clipNum will be None and we want all clips.
                 # If we're dealing with a Clip, we only want to deal with THIS clip!
                 if (self.clipNum == None):
                     self.snapshotList.append((kwg, kw, SnapshotTimeCode, SnapshotTimeCode + SnapshotDuration, SnapshotNum, SnapshotID, collectNum, EpisodeID, SeriesID))
-                    if not ((SnapshotID, collectNum, True) in self.snapshotFilterList):
-                        self.snapshotFilterList.append((SnapshotID, collectNum, True))
+                    snapshotFilter[(SnapshotID, collectNum, True)] = True
+
+        # Build the Keyword Lists from the Keyword set
+        self.filteredKeywordList = keywords.keys()
+        self.unfilteredKeywordList = [(kwg, kw, True) for (kwg, kw) in self.filteredKeywordList]
+        # Build the Clip and Snapshot Filter Lists
+        self.clipFilterList = clipFilter.keys()
+        self.snapshotFilterList = snapshotFilter.keys()
 
-        # Sort the Keyword List
+        # Sort the Keyword Lists
+        self.unfilteredKeywordList.sort()
         self.filteredKeywordList.sort()
 
     def UpdateKeywordVisualization(self):
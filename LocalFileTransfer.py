@@ -14,26 +14,166 @@
 # Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
 #
 
-"""This module implements the LOCAL File Transfer progress dialog for the File Management window for Transana.  """
+"""This module implements the LOCAL File Transfer progress dialog for the File Management window for Transana.
+   Files are copied as a queue, a few at a time, with progress measured from the bytes actually written.  """
 
 __author__ = 'David Woods <dwoods@transana.com>'
 # NOTE:  This module is based on code I wrote for the TapeWorm project  (http://tapeworm.spurgeonwoods.com).
 
 import wx  # import wxPython
+import ctypes
+import hashlib
+import io
 import os
+import Queue
 import shutil
 import string
 import sys
 import threading
-import ctypes
-# import Python exceptions
-import exceptions
 import time
 import Dialogs
-import FileManagement
 import TransanaGlobal
 
 
+# The number of files copied at the same time
+LOCAL_COPY_THREADS = 2
+# The size of the copy buffer.  This is a multiple of the disk sector and memory page sizes.
+LOCAL_COPY_BUFFER_SIZE = 8388608
+# Files are copied under their own name plus this suffix, and renamed when they are complete, so an existing
+# copy is only replaced by a complete one
+LOCAL_PARTIAL_SUFFIX = '.part'
+
+# CopyFileEx() progress routine return values
+PROGRESS_CONTINUE = 0
+PROGRESS_CANCEL = 1
+
+
+def HashFile(fileName):
+    """ Calculate the checksum of the contents of a file """
+    checksum = hashlib.sha1()
+    f = io.open(fileName, 'rb', buffering=0)
+    try:
+        buf = bytearray(LOCAL_COPY_BUFFER_SIZE)
+        view = memoryview(buf)
+        while True:
+            bytesRead = f.readinto(buf)
+            if not bytesRead:
+                break
+            checksum.update(view[:bytesRead])
+    finally:
+        f.close()
+    return checksum.hexdigest()
+
+def CopyFileEx(copyFrom, copyTo, progress, isCancelled):
+    """ Copy a file using Windows' CopyFileEx(), which copies within the operating system rather than passing the
+        data through Python.  Returns False if the copy is cancelled. """
+    from ctypes import wintypes
+    # Define the progress routine CopyFileEx() calls as the copy goes
+    LPPROGRESS_ROUTINE = ctypes.WINFUNCTYPE(wintypes.DWORD, ctypes.c_longlong, ctypes.c_longlong, ctypes.c_longlong,
+                                            ctypes.c_longlong, wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE,
+                                            wintypes.HANDLE, wintypes.LPVOID)
+    # The number of bytes written as of the last progress report
+    written = [0]
+
+    def ProgressRoutine(totalFileSize, totalBytesTransferred, streamSize, streamBytesTransferred, streamNumber,
+                        callbackReason, sourceFile, destinationFile, data):
+        """ Report the bytes written since the last call, and stop the copy if it has been cancelled """
+        progress(totalBytesTransferred - written[0])
+        written[0] = totalBytesTransferred
+        if isCancelled():
+            return PROGRESS_CANCEL
+        return PROGRESS_CONTINUE
+
+    # Keep a reference to the callback until the copy is done
+    progressRoutine = LPPROGRESS_ROUTINE(ProgressRoutine)
+    # CopyFileEx() needs unicode file names
+    if isinstance(copyFrom, str):
+        copyFrom = copyFrom.decode(sys.getfilesystemencoding())
+    if isinstance(copyTo, str):
+        copyTo = copyTo.decode(sys.getfilesystemencoding())
+    if not ctypes.windll.kernel32.CopyFileExW(copyFrom, copyTo, progressRoutine, None, None, 0):
+        # A cancelled copy is reported as a failure.  (Windows removes the partial file.)
+        if isCancelled():
+            return False
+        raise ctypes.WinError()
+    return True
+
+def CopyFileBuffered(copyFrom, copyTo, progress, isCancelled, checksum=None):
+    """ Copy a file through a single large buffer, without Python's file buffering.  If checksum is a hashlib
+        object, the source data is added to it as it is copied.  Returns False if the copy is cancelled. """
+    buf = bytearray(LOCAL_COPY_BUFFER_SIZE)
+    view = memoryview(buf)
+    cancelled = False
+    source = io.open(copyFrom, 'rb', buffering=0)
+    try:
+        dest = io.open(copyTo, 'wb', buffering=0)
+        try:
+            while True:
+                if isCancelled():
+                    cancelled = True
+                    break
+                bytesRead = source.readinto(buf)
+                if not bytesRead:
+                    break
+                if checksum != None:
+                    checksum.update(view[:bytesRead])
+                # Unbuffered writes can write less than they're given
+                bytesWritten = 0
+                while bytesWritten < bytesRead:
+                    bytesWritten += dest.write(view[bytesWritten:bytesRead])
+                progress(bytesRead)
+        finally:
+            dest.close()
+    finally:
+        source.close()
+    # Don't leave a partial file behind
+    if cancelled:
+        os.remove(copyTo)
+        return False
+    # Keep the file's permissions and modification time, as CopyFileEx() does
+    shutil.copystat(copyFrom, copyTo)
+    return True
+
+def CopyFile(copyFrom, copyTo, progress, isCancelled, verify=False):
+    """ Copy a file.  progress(bytes) is called with the number of bytes written since the last call, and
+        isCancelled() is checked as the copy goes.  If verify is True, the copy's checksum is compared to the
+        original's.  Returns False if the copy is cancelled.  Raises IOError or OSError if the copy fails.
+        If the copy is cancelled or fails, any existing copyTo file is left as it was. """
+    partialFile = copyTo + LOCAL_PARTIAL_SUFFIX
+    try:
+        # On Windows, let the operating system do the copy
+        if '__WXMSW__' in wx.PlatformInfo:
+            copied = CopyFileEx(copyFrom, partialFile, progress, isCancelled)
+            sourceChecksum = None
+        else:
+            checksum = None
+            if verify:
+                checksum = hashlib.sha1()
+            copied = CopyFileBuffered(copyFrom, partialFile, progress, isCancelled, checksum)
+            if verify:
+                sourceChecksum = checksum.hexdigest()
+        if copied and verify:
+            if sourceChecksum == None:
+                sourceChecksum = HashFile(copyFrom)
+            if HashFile(partialFile) != sourceChecksum:
+                raise IOError(unicode(_('The copy of "%s" does not match the original.'), 'utf8') % copyFrom)
+    except:
+        # Don't leave a partial or damaged copy behind
+        if os.path.exists(partialFile):
+            try:
+                os.remove(partialFile)
+            except OSError:
+                pass
+        raise
+    if not copied:
+        return False
+    # The copy is complete, so give it its real name.  (A file being replaced has to be removed first on Windows.)
+    if os.path.exists(copyTo):
+        os.remove(copyTo)
+    os.rename(partialFile, copyTo)
+    return True
+
+
 # Define a Notification Event for Thread notification
 EVT_THREAD_COMPLETE_ID = wx.NewId()
 
@@ -54,161 +194,248 @@ class ThreadComplete(wx.PyEvent):
 
 # Thread for copying files
 class ThreadedFileCopy(threading.Thread):
-    """ Threaded File Copy Class."""
-    def __init__(self, notify_window, inFile, outDir):
+    """ Threaded File Copy Class.  Copies files from the transfer queue until it's empty."""
+    def __init__(self, notify_window, fileQueue):
         """Initialize the File Copy Thread Class."""
         threading.Thread.__init__(self)
         self._notify_window = notify_window
-        self._inFile = inFile
-        self._outDir = outDir
+        self._fileQueue = fileQueue
+        # prevent the application from hanging on Close
+        self.setDaemon(1)
         # Start the thread
         self.start()
 
     def run(self):
         """Run the File Copy Thread."""
-        # Copy the file as quickly as possible
-        shutil.copy(self._inFile, self._outDir)
-        # Signal that the copy is DONE
-        wx.PostEvent(self._notify_window, ThreadComplete())
-
-
-class LocalFileTransfer(wx.Dialog):
-    """ This object displays a progress dialog for file transfers on the local file system. """
-    def __init__(self, parent, title, copyFrom, copyTo):
+        try:
+            # Keep going until the queue is empty or the user cancels
+            while not self._notify_window.cancelled:
+                try:
+                    (copyFrom, copyTo) = self._fileQueue.get_nowait()
+                except Queue.Empty:
+                    break
+                self._notify_window.StartFile(copyFrom)
+                try:
+                    success = CopyFile(copyFrom, os.path.join(copyTo, os.path.split(copyFrom)[1]),
+                                       self._notify_window.AddProgress, self._notify_window.IsCancelled,
+                                       self._notify_window.verify)
+                except (IOError, OSError):
+                    success = False
+                    self._notify_window.AddError(u'%s:  %s' % (copyFrom, sys.exc_info()[1]))
+                if success:
+                    self._notify_window.FileComplete(copyFrom, copyTo)
+        finally:
+            # Signal that the copy is DONE
+            wx.PostEvent(self._notify_window, ThreadComplete())
+
+
+class LocalTransferQueue(wx.Dialog):
+    """ This object copies a queue of files on the local file system, a few at a time, and displays the progress
+        of the whole queue.  Add files with AddFile(), then call Run(). """
+    def __init__(self, parent, title, threads=LOCAL_COPY_THREADS, verify=False):
         """ Set up the Dialog Box and all GUI Widgets. """
-        if (os.path.exists(copyFrom)):
-            # Set up local variables
-            self.parent = parent
-            # Initialize Threaded File Copy object and the timer that updates the progress dialog
-            self.threadedFileCopy = None
-            self.timer = None
-
-            size = (350,200)
-            # Create the Dialog Box itself, with no minimize/maximize/close buttons
-            wx.Dialog.__init__(self, parent, -1, title, size = size, style=wx.CAPTION)
-
-            # Create a main VERTICAL sizer for the form
-            mainSizer = wx.BoxSizer(wx.VERTICAL)
-
-            # File label
-            if 'unicode' in wx.PlatformInfo:
-                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-                prompt = unicode(_("File: %s"), 'utf8')
-            else:
-                prompt = _("File: %s")
-            # extract the file name...
-            (dir, fileName) = os.path.split(copyFrom)
-            self.destFileStr = os.path.join(copyTo, fileName)
-            self.lblFile = wx.StaticText(self, -1, prompt % fileName, style=wx.ST_NO_AUTORESIZE)
-            # Add the label to the Main Sizer
-            mainSizer.Add(self.lblFile, 0, wx.ALL, 10)
-
-            # Progress Bar
-            self.progressBar = wx.Gauge(self, -1, 100, style=wx.GA_HORIZONTAL | wx.GA_SMOOTH)
-            # Add the element to the Main Sizer
-            mainSizer.Add(self.progressBar, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
-
-            # Create a Row Sizer
-            r1Sizer = wx.BoxSizer(wx.HORIZONTAL)
-            
-            # Bytes Transferred label
-            if 'unicode' in wx.PlatformInfo:
-                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-                prompt = unicode(_("%d bytes of %d transferred"), 'utf8')
-            else:
-                prompt = _("%d bytes of %d transferred")
-            self.lblBytes = wx.StaticText(self, -1, prompt % (100000000, 100000000), style=wx.ST_NO_AUTORESIZE)
-            # Add the label to the Row Sizer
-            r1Sizer.Add(self.lblBytes, 5, wx.EXPAND)
+        # Set up local variables
+        self.parent = parent
+        self.threads = threads
+        # Should copies be checked against the originals?
+        self.verify = verify
+        # Initialize the timer that updates the progress dialog
+        self.timer = None
+
+        size = (350,200)
+        # Create the Dialog Box itself, with no minimize/maximize/close buttons
+        wx.Dialog.__init__(self, parent, -1, title, size = size, style=wx.CAPTION)
+
+        # Create a main VERTICAL sizer for the form
+        mainSizer = wx.BoxSizer(wx.VERTICAL)
+
+        # File label
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_("File: %s"), 'utf8')
+        else:
+            prompt = _("File: %s")
+        self.lblFile = wx.StaticText(self, -1, prompt % '', style=wx.ST_NO_AUTORESIZE)
+        # Add the label to the Main Sizer
+        mainSizer.Add(self.lblFile, 0, wx.ALL, 10)
+
+        # Progress Bar
+        self.progressBar = wx.Gauge(self, -1, 100, style=wx.GA_HORIZONTAL | wx.GA_SMOOTH)
+        # Add the element to the Main Sizer
+        mainSizer.Add(self.progressBar, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+
+        # Create a Row Sizer
+        r1Sizer = wx.BoxSizer(wx.HORIZONTAL)
+        
+        # Bytes Transferred label
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_("%d bytes of %d transferred"), 'utf8')
+        else:
+            prompt = _("%d bytes of %d transferred")
+        self.lblBytes = wx.StaticText(self, -1, prompt % (100000000, 100000000), style=wx.ST_NO_AUTORESIZE)
+        # Add the label to the Row Sizer
+        r1Sizer.Add(self.lblBytes, 5, wx.EXPAND)
 
-            # Percent Transferred label
-            self.lblPercent = wx.StaticText(self, -1, "%5.1d %%" % 1000.1, style=wx.ST_NO_AUTORESIZE | wx.ALIGN_RIGHT)
-            # Add the Element to the Row Sizer
-            r1Sizer.Add(self.lblPercent, 1, wx.ALIGN_RIGHT)
+        # Percent Transferred label
+        self.lblPercent = wx.StaticText(self, -1, "%5.1d %%" % 1000.1, style=wx.ST_NO_AUTORESIZE | wx.ALIGN_RIGHT)
+        # Add the Element to the Row Sizer
+        r1Sizer.Add(self.lblPercent, 1, wx.ALIGN_RIGHT)
 
-            # Add the Row Sizer to the Main Sizer
-            mainSizer.Add(r1Sizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        # Add the Row Sizer to the Main Sizer
+        mainSizer.Add(r1Sizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
 
-            # Create a Row Sizer
-            r2Sizer = wx.BoxSizer(wx.HORIZONTAL)
+        # Create a Row Sizer
+        r2Sizer = wx.BoxSizer(wx.HORIZONTAL)
 
-            # Elapsed Time label
-            if 'unicode' in wx.PlatformInfo:
-                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-                prompt = unicode(_("Elapsed Time: %d:%02d:%02d"), 'utf8')
-            else:
-                prompt = _("Elapsed Time: %d:%02d:%02d")
-            self.lblElapsedTime = wx.StaticText(self, -1, prompt % (0, 0, 0), style=wx.ST_NO_AUTORESIZE)
-            # Add the element to the Row Sizer
-            r2Sizer.Add(self.lblElapsedTime, 0)
+        # Elapsed Time label
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_("Elapsed Time: %d:%02d:%02d"), 'utf8')
+        else:
+            prompt = _("Elapsed Time: %d:%02d:%02d")
+        self.lblElapsedTime = wx.StaticText(self, -1, prompt % (0, 0, 0), style=wx.ST_NO_AUTORESIZE)
+        # Add the element to the Row Sizer
+        r2Sizer.Add(self.lblElapsedTime, 0)
 
-            # Add a spacer
-            r2Sizer.Add((1, 0), 1, wx.EXPAND)
+        # Add a spacer
+        r2Sizer.Add((1, 0), 1, wx.EXPAND)
 
-            # Remaining Time label
-            if 'unicode' in wx.PlatformInfo:
-                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-                prompt = unicode(_("Time Remaining: %d:%02d:%02d"), 'utf8')
-            else:
-                prompt = _("Time Remaining: %d:%02d:%02d")
-            self.lblTimeRemaining = wx.StaticText(self, -1, prompt % (0, 0, 0), style=wx.ST_NO_AUTORESIZE | wx.ALIGN_RIGHT)
-            # Add the element to the Row Sizer
-            r2Sizer.Add(self.lblTimeRemaining, 0)
+        # Remaining Time label
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_("Time Remaining: %d:%02d:%02d"), 'utf8')
+        else:
+            prompt = _("Time Remaining: %d:%02d:%02d")
+        self.lblTimeRemaining = wx.StaticText(self, -1, prompt % (0, 0, 0), style=wx.ST_NO_AUTORESIZE | wx.ALIGN_RIGHT)
+        # Add the element to the Row Sizer
+        r2Sizer.Add(self.lblTimeRemaining, 0)
 
-            # Add the Row Sizer to the Main Sizer
-            mainSizer.Add(r2Sizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        # Add the Row Sizer to the Main Sizer
+        mainSizer.Add(r2Sizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
 
-            # Transfer Speed label
-            if 'unicode' in wx.PlatformInfo:
-                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
-                prompt = unicode(_("Transfer Speed: %d k/sec"), 'utf8')
-            else:
-                prompt = _("Transfer Speed: %d k/sec")
-            self.lblTransferSpeed = wx.StaticText(self, -1, prompt % 0, style=wx.ST_NO_AUTORESIZE)
-            # Add the element to the Main Sizer
-            mainSizer.Add(self.lblTransferSpeed, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
-
-            # Cancel Button
-            self.btnCancel = wx.Button(self, wx.ID_CANCEL, _("Cancel Remaining Files"))
-            # Add the element to the Main Sizer
-            mainSizer.Add(self.btnCancel, 0, wx.ALIGN_CENTER | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
-
-            wx.EVT_BUTTON(self, wx.ID_CANCEL, self.OnCancel)
-
-            # Attach the main sizer to the form
-            self.SetSizer(mainSizer)
-            # Turn Auto Layout on
-            self.SetAutoLayout(True)
-            # Lay out the form
-            self.Layout()
-            # Center on the Screen
-            TransanaGlobal.CenterOnPrimary(self)
-            # Initialize variables used in file transfer
-            BytesRead = 0
-            # "cancelled" is intialized to false.  If the user cancels the file transfer,
-            # this variable gets set to true to signal the need to interrupt the transfer.
-            self.cancelled = False
-            # Note the starting time of the transfer for progress reporting purposes
-            self.StartTime = time.time()
-
-            self.Bind(wx.EVT_TIMER, self.UpdateDisplay)
-            EVT_THREAD_COMPLETE(self, self.OnFileCopyComplete)
-            
-            # Create a timer used to update the Progress Dialog
-            self.timer = wx.Timer(self)
-            # Start the timer, firing it every half second
-            self.timer.Start(500)
-
-            self.size1 = os.stat(copyFrom)[6]
-            self.threadedFileCopy = ThreadedFileCopy(self, copyFrom, copyTo)
-
-            # Show the form
-            self.ShowModal()
+        # Transfer Speed label
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_("Transfer Speed: %d k/sec"), 'utf8')
+        else:
+            prompt = _("Transfer Speed: %d k/sec")
+        self.lblTransferSpeed = wx.StaticText(self, -1, prompt % 0, style=wx.ST_NO_AUTORESIZE)
+        # Add the element to the Main Sizer
+        mainSizer.Add(self.lblTransferSpeed, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+
+        # Cancel Button
+        self.btnCancel = wx.Button(self, wx.ID_CANCEL, _("Cancel Remaining Files"))
+        # Add the element to the Main Sizer
+        mainSizer.Add(self.btnCancel, 0, wx.ALIGN_CENTER | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+
+        wx.EVT_BUTTON(self, wx.ID_CANCEL, self.OnCancel)
+
+        # Attach the main sizer to the form
+        self.SetSizer(mainSizer)
+        # Turn Auto Layout on
+        self.SetAutoLayout(True)
+        # Lay out the form
+        self.Layout()
+        # Center on the Screen
+        TransanaGlobal.CenterOnPrimary(self)
+
+        # The queued files, as (file to copy, destination directory)
+        self.files = []
+        # The files that have been copied completely
+        self.completedFiles = []
+        # Error messages from failed copies
+        self.errors = []
+        # "cancelled" is intialized to false.  If the user cancels the file transfer,
+        # this variable gets set to true to signal the need to interrupt the transfer.
+        self.cancelled = False
+        # The total size of the queued files, and the number of bytes written so far
+        self.totalBytes = 0
+        self.bytesTransferred = 0
+        # The number of files started, and the name of the latest one
+        self.filesStarted = 0
+        self.currentFile = ''
+        # The number of copy threads still running
+        self.threadsRunning = 0
+        # Lock to protect the progress values, which the copy threads update
+        self.lock = threading.Lock()
+
+    def AddFile(self, copyFrom, copyTo):
+        """ Add a file to the transfer queue, to be copied into the directory copyTo """
+        self.files.append((copyFrom, copyTo))
+        self.totalBytes += os.path.getsize(copyFrom)
+
+    def Run(self):
+        """ Copy all the queued files, displaying the progress until the copies are done """
+        # Start a copy thread for each stream, but not more than there are files
+        self.threadsRunning = min(self.threads, len(self.files))
+        if self.threadsRunning == 0:
+            return
+        # Note the starting time of the transfer for progress reporting purposes
+        self.StartTime = time.time()
+        # Put the files in a queue the copy threads can share
+        fileQueue = Queue.Queue()
+        for f in self.files:
+            fileQueue.put(f)
+
+        self.Bind(wx.EVT_TIMER, self.UpdateDisplay)
+        EVT_THREAD_COMPLETE(self, self.OnFileCopyComplete)
+        
+        # Create a timer used to update the Progress Dialog
+        self.timer = wx.Timer(self)
+        # Start the timer, firing it every half second
+        self.timer.Start(500)
+
+        for thread in range(self.threadsRunning):
+            ThreadedFileCopy(self, fileQueue)
+
+        # Show the form
+        self.ShowModal()
+
+        # If any copies failed, tell the user
+        if len(self.errors) > 0:
+            prompt = unicode(_("Input / Output Error"), 'utf8') + "\n%s"
+            dlg = Dialogs.ErrorDialog(self.parent, prompt % string.join(self.errors, '\n'))
+            dlg.ShowModal()
+            dlg.Destroy()
+
+    def StartFile(self, copyFrom):
+        """ Note that a copy thread has started copying a file """
+        self.lock.acquire()
+        self.filesStarted += 1
+        self.currentFile = os.path.split(copyFrom)[1]
+        self.lock.release()
+
+    def AddProgress(self, bytesTransferred):
+        """ Add the bytes a copy thread has written to the progress """
+        self.lock.acquire()
+        self.bytesTransferred += bytesTransferred
+        self.lock.release()
+
+    def IsCancelled(self):
+        """ Has the user cancelled the transfer? """
+        return self.cancelled
+
+    def AddError(self, msg):
+        """ Record an error from a copy thread """
+        self.lock.acquire()
+        self.errors.append(msg)
+        self.lock.release()
+
+    def FileComplete(self, copyFrom, copyTo):
+        """ Record that a file has been copied completely """
+        self.lock.acquire()
+        self.completedFiles.append((copyFrom, copyTo))
+        self.lock.release()
 
     def TransferSuccessful(self):
         # This class needs to return whether the transfer succeeded so that the delete portion of
         # a cancelled Move can be skipped.
-        return not self.cancelled
+        return (not self.cancelled) and (len(self.completedFiles) == len(self.files))
+
+    def GetCompletedFiles(self):
+        """ Return the (file copied, destination directory) of each file copied completely """
+        return self.completedFiles
 
     def HoursMinutesSeconds(self, time):
         if time > 3600:
@@ -223,26 +450,43 @@ class LocalFileTransfer(wx.Dialog):
         secs = time % 60
         return (hours, mins, secs)
 
-    def UpdateDisplay(self, event):
+    def UpdateDisplay(self, event=None):
         """ Update the Transfer Dialog Box labels and progress bar """
-        if os.path.exists(self.destFileStr):
-            bytesTransferred = os.stat(self.destFileStr)[6]
+        # Get a consistent set of progress values
+        self.lock.acquire()
+        bytesTransferred = self.bytesTransferred
+        filesStarted = self.filesStarted
+        currentFile = self.currentFile
+        self.lock.release()
+
+        # Display the latest file started
+        if len(self.files) > 1:
+            if 'unicode' in wx.PlatformInfo:
+                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                prompt = unicode(_("File %d of %d: %s"), 'utf8')
+            else:
+                prompt = _("File %d of %d: %s")
+            self.lblFile.SetLabel(prompt % (filesStarted, len(self.files), currentFile))
         else:
-            return
-
+            if 'unicode' in wx.PlatformInfo:
+                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                prompt = unicode(_("File: %s"), 'utf8')
+            else:
+                prompt = _("File: %s")
+            self.lblFile.SetLabel(prompt % currentFile)
         # Display Number of Bytes tranferred
         if 'unicode' in wx.PlatformInfo:
             # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
             prompt = unicode(_("%d bytes of %d transferred"), 'utf8')
         else:
             prompt = _("%d bytes of %d transferred")
-        self.lblBytes.SetLabel(prompt % (bytesTransferred, self.size1))
+        self.lblBytes.SetLabel(prompt % (bytesTransferred, self.totalBytes))
         # Avoiding division by zero problems ...
         if bytesTransferred > 0:
             # ... display % of total bytes transferred
-            self.lblPercent.SetLabel("%5.1f %%" % (float(bytesTransferred) / float(self.size1) * 100))
+            self.lblPercent.SetLabel("%5.1f %%" % (float(bytesTransferred) / float(self.totalBytes) * 100))
             # Update the Progress Bar
-            self.progressBar.SetValue(int(float(bytesTransferred) / float(self.size1) * 100))
+            self.progressBar.SetValue(int(float(bytesTransferred) / float(self.totalBytes) * 100))
         # Calculate Elapsed Time and display it
         elapsedTime = time.time() - self.StartTime
 
@@ -260,7 +504,7 @@ class LocalFileTransfer(wx.Dialog):
             if speed > 0:
                 # Estimate the amount of time it will take to transfer the remaining data.
                 # (kilobytes of data remaining divided by the transfer speed = time remaining for transfer in seconds)
-                timeRemaining = (((float(self.size1) - float(bytesTransferred)) / 1024.0) / (speed))
+                timeRemaining = (((float(self.totalBytes) - float(bytesTransferred)) / 1024.0) / (speed))
             else:
                 timeRemaining = 0.0
             # Display the results of these calculations
@@ -278,13 +522,6 @@ class LocalFileTransfer(wx.Dialog):
             else:
                 prompt = _("Transfer Speed: %6.1f k/sec")
             self.lblTransferSpeed.SetLabel(prompt % speed)
-        try:
-            # Allow the screen to update and accept User Input (Cancel Button press, for example).
-            # (wxYield allows Windows to process Windows Messages)
-            wx.YieldIfNeeded()
-        except:
-            print sys.exc_info()[0]
-            print sys.exc_info()[1]
 
     def OnCancel(self, event):
         """ Respond to the user pressing the "Cancel" button to interrupt the file transfer """
@@ -295,7 +532,21 @@ class LocalFileTransfer(wx.Dialog):
 
     def OnFileCopyComplete(self, event):
         """ Process this when the Threaded File Copy Complete event is triggered """
-        self.timer.Stop()
-        self.threadedFileCopy = None
-        # self.Show(False) doesn't work, as the Mac fails to move forward.  EndModal seems to work.
-        self.EndModal(True)
+        self.threadsRunning -= 1
+        # When the last copy thread is done ...
+        if self.threadsRunning == 0:
+            self.timer.Stop()
+            # ... show the final results
+            self.UpdateDisplay()
+            # self.Show(False) doesn't work, as the Mac fails to move forward.  EndModal seems to work.
+            self.EndModal(True)
+
+
+class LocalFileTransfer(LocalTransferQueue):
+    """ This object displays a progress dialog for copying a single file on the local file system. """
+    def __init__(self, parent, title, copyFrom, copyTo):
+        """ Set up the Dialog Box and copy the file into the directory copyTo. """
+        if (os.path.exists(copyFrom)):
+            LocalTransferQueue.__init__(self, parent, title)
+            self.AddFile(copyFrom, copyTo)
+            self.Run()
@@ -0,0 +1,495 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+
+#This program is free software; you can redistribute it and/or
+#modify it under the terms of the GNU General Public License
+#as published by the Free Software Foundation; either version 2
+#of the License, or (at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program; if not, write to the Free Software
+#Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+""" This module implements the Media Queue, which runs audio extraction and media conversion jobs with a
+    pool of worker threads.  Jobs are kept in a queue file on disk, so work that hasn't finished when Transana
+    closes is picked up the next time the queue runs.  This module does not use wxPython, so the queue can also
+    be run without the GUI:
+
+        python MediaQueue.py --queue QUEUEFILE [--workers N] [--io N] [--waveform MEDIAFILE WAVEFILE] ... """
+
+__author__ = "David K. Woods <dwoods@transana.com>"
+
+# import Python's json module
+import json
+# import Python's multiprocessing module
+import multiprocessing
+# import Python's optparse module
+import optparse
+# import Python's os module
+import os
+# import Python's shlex module
+import shlex
+# import Python's subprocess module
+import subprocess
+# import Python's sys module
+import sys
+# import Python's threading module
+import threading
+# import Python's time module
+import time
+
+# The name of the queue file
+QUEUE_FILENAME = 'MediaQueue.json'
+# The number of jobs that may read from or write to the same disk at once
+DEFAULT_IO_WORKERS = 2
+# The number of times a failed job is tried again
+MAX_RETRIES = 2
+# The number of seconds to wait before trying a failed job again.  This is multiplied by the number of tries so far.
+RETRY_DELAY = 30
+
+# Job types
+AUDIO_EXTRACTION = 'AudioExtraction'
+CUSTOM_CONVERT = 'CustomConvert'
+
+# Job statuses
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+def AudioExtractionCommand(programDir):
+    """ The FFmpeg command line for audio extraction, with placeholders for the input and output file names """
+    # -i              input file
+    # -vn             disable video
+    # -ar 2756        Audio Sampling rate 2756 Hz
+    # -ab 8k          Audio Bitrate 8kb/s
+    # -ac 1           Audio Channels 1 (mono)
+    # -acodec pcm_u8  8-bit PCM audio codec
+    # -y              overwrite existing destination file
+    programStr = os.path.join(programDir, 'ffmpeg_Transana')
+    if sys.platform == 'win32':
+        programStr += '.exe'
+    return '"' +  programStr + '" "-embedded" "1" "-i" "%s" "-vn" "-ar" "2756" "-ab" "8k" "-ac" "1" "-acodec" "pcm_u8" "-y" "%s"'
+
+def ShortPathName(path, create=False):
+    """ On Windows, subprocess passes the command line in the ANSI code page, which can't hold every character of
+        a unicode file name.  Use Windows' short (8.3) name for such files instead.  If create is True, an output
+        file that doesn't exist yet is created so it has a short name.  If there is no short name, the path is
+        returned unchanged. """
+    # Only non-ASCII file names on Windows need this
+    if (sys.platform != 'win32') or not isinstance(path, unicode) or (max([ord(c) for c in path] + [0]) < 128):
+        return path
+    # import Python's ctypes module
+    import ctypes
+    if create and not os.path.exists(path):
+        try:
+            open(path, 'wb').close()
+        except IOError:
+            return path
+    # Ask for the length of the short name, then get it
+    size = ctypes.windll.kernel32.GetShortPathNameW(path, None, 0)
+    if size == 0:
+        return path
+    buf = ctypes.create_unicode_buffer(size)
+    if ctypes.windll.kernel32.GetShortPathNameW(path, buf, size) == 0:
+        return path
+    return buf.value
+
+def DiskID(filename):
+    """ Identify the disk a file is on, so we can limit the number of jobs using each disk """
+    # If the file doesn't exist yet, look at its folder
+    path = os.path.abspath(filename)
+    while not os.path.exists(path) and (os.path.dirname(path) != path):
+        path = os.path.dirname(path)
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return os.path.splitdrive(path)[0]
+
+class MediaJob(object):
+    """ A single audio extraction or media conversion job """
+    def __init__(self, jobNum, jobType, inputFile, outputFile, command=None, priority=0):
+        """ Initialize a Media Job.  command is the FFmpeg command line for CUSTOM_CONVERT jobs.
+            Higher priority jobs run first. """
+        self.jobNum = jobNum
+        self.jobType = jobType
+        self.inputFile = inputFile
+        self.outputFile = outputFile
+        self.command = command
+        self.priority = priority
+        self.status = QUEUED
+        # The number of times the job has been run
+        self.attempts = 0
+        # The time before which the job should not be (re-)tried
+        self.notBefore = 0
+        # Progress of the current run, as a percentage
+        self.percent = 0.0
+        # Output from the last run that wasn't a progress report
+        self.errorMessages = []
+        # The process running the job, while it's running
+        self.process = None
+
+    def __repr__(self):
+        return 'MediaJob %d (%s, %s): %s --> %s' % (self.jobNum, self.jobType, self.status, self.inputFile, self.outputFile)
+
+    def GetCommandLine(self, programDir):
+        """ Build the command line for the job """
+        if self.jobType == AUDIO_EXTRACTION:
+            command = AudioExtractionCommand(ShortPathName(programDir))
+        else:
+            command = self.command
+        # Encode the filenames so that unicode files are handled properly.  (On Windows, file names the ANSI code
+        # page can't hold are replaced by their short names.)
+        command = command % (ShortPathName(self.inputFile), ShortPathName(self.outputFile, create=True))
+        if isinstance(command, unicode):
+            command = command.encode(sys.getfilesystemencoding() or 'utf8')
+        # Windows parses the quoted command line itself.  Elsewhere, we have to split it up.
+        if sys.platform == 'win32':
+            return command
+        return shlex.split(command)
+
+    def GetDisks(self):
+        """ The disks this job reads from and writes to """
+        return set([DiskID(self.inputFile), DiskID(self.outputFile)])
+
+    def GetData(self):
+        """ The job's data, for saving in the queue file """
+        return {'jobNum' : self.jobNum, 'jobType' : self.jobType, 'inputFile' : self.inputFile,
+                'outputFile' : self.outputFile, 'command' : self.command, 'priority' : self.priority,
+                'status' : self.status, 'attempts' : self.attempts, 'notBefore' : self.notBefore,
+                'errorMessages' : self.errorMessages}
+
+    def SetData(self, data):
+        """ Restore the job's data from the queue file """
+        for key in ['status', 'attempts', 'notBefore', 'errorMessages']:
+            setattr(self, key, data[key])
+        # A job that was running when the queue stopped has to be run again
+        if self.status == RUNNING:
+            self.status = QUEUED
+
+class MediaQueue(object):
+    """ A queue of Media Jobs, saved to disk, run by a pool of worker threads """
+    def __init__(self, queueFilename, programDir, cpuWorkers=None, ioWorkers=DEFAULT_IO_WORKERS,
+                 maxRetries=MAX_RETRIES, onJobComplete=None):
+        """ Initialize the Media Queue.  cpuWorkers is the number of jobs that can run at once, by default
+            one per processor core.  ioWorkers is the number of jobs that can use the same disk at once.
+            onJobComplete(job) is called from a worker thread when a job finishes successfully. """
+        self.queueFilename = queueFilename
+        self.programDir = programDir
+        if cpuWorkers == None:
+            cpuWorkers = multiprocessing.cpu_count()
+        self.cpuWorkers = max(1, cpuWorkers)
+        self.ioWorkers = max(1, ioWorkers)
+        self.maxRetries = maxRetries
+        self.onJobComplete = onJobComplete
+        # The jobs, by job number
+        self.jobs = {}
+        self.nextJobNum = 1
+        # Condition to protect the queue and signal the workers
+        self.condition = threading.Condition(threading.RLock())
+        # The worker threads
+        self.workers = []
+        # Signals the workers to stop once the queue is empty
+        self.stopWhenEmpty = False
+        # Signals the workers to stop now
+        self.stopping = False
+        self.Load()
+
+    def Load(self):
+        """ Load the jobs from the queue file """
+        with self.condition:
+            if not os.path.exists(self.queueFilename):
+                return
+            try:
+                f = open(self.queueFilename, 'rb')
+                try:
+                    data = json.load(f)
+                finally:
+                    f.close()
+            # If the queue file can't be read, start with an empty queue
+            except (IOError, ValueError):
+                return
+            for jobData in data['jobs']:
+                job = MediaJob(jobData['jobNum'], jobData['jobType'], jobData['inputFile'], jobData['outputFile'],
+                               jobData['command'], jobData['priority'])
+                job.SetData(jobData)
+                self.jobs[job.jobNum] = job
+            self.nextJobNum = max([data['nextJobNum']] + [jobNum + 1 for jobNum in self.jobs])
+
+    def Save(self):
+        """ Save the jobs to the queue file """
+        with self.condition:
+            data = {'nextJobNum' : self.nextJobNum,
+                    'jobs' : [self.jobs[jobNum].GetData() for jobNum in sorted(self.jobs)]}
+            # Write to a temporary file first so the queue file is never left half-written
+            tempFilename = self.queueFilename + '.tmp'
+            f = open(tempFilename, 'wb')
+            try:
+                json.dump(data, f)
+            finally:
+                f.close()
+            # Windows won't rename over an existing file
+            if os.path.exists(self.queueFilename):
+                os.remove(self.queueFilename)
+            os.rename(tempFilename, self.queueFilename)
+
+    def Add(self, jobType, inputFile, outputFile, command=None, priority=0):
+        """ Add a job to the queue.  If the same job is already waiting, it is kept rather than added twice,
+            at the higher of the two priorities.  Returns the job. """
+        with self.condition:
+            for job in self.jobs.itervalues():
+                if (job.status in [QUEUED, RUNNING]) and (job.jobType == jobType) and \
+                   (job.inputFile == inputFile) and (job.outputFile == outputFile) and (job.command == command):
+                    job.priority = max(job.priority, priority)
+                    break
+            else:
+                job = MediaJob(self.nextJobNum, jobType, inputFile, outputFile, command, priority)
+                self.jobs[job.jobNum] = job
+                self.nextJobNum += 1
+            self.Save()
+            self.condition.notifyAll()
+            return job
+
+    def Cancel(self, jobNums):
+        """ Cancel jobs, stopping them if they are running """
+        with self.condition:
+            for jobNum in jobNums:
+                job = self.jobs.get(jobNum)
+                if (job != None) and (job.status in [QUEUED, RUNNING]):
+                    job.status = CANCELLED
+                    # The worker running the job will clean up after it
+                    if job.process != None:
+                        try:
+                            job.process.kill()
+                        except OSError:
+                            pass
+            self.Save()
+
+    def Purge(self, jobNums=None):
+        """ Remove finished jobs from the queue.  By default, all completed and cancelled jobs are removed. """
+        with self.condition:
+            if jobNums == None:
+                jobNums = [jobNum for (jobNum, job) in self.jobs.iteritems() if job.status in [DONE, CANCELLED]]
+            for jobNum in jobNums:
+                if (jobNum in self.jobs) and (self.jobs[jobNum].status not in [QUEUED, RUNNING]):
+                    del(self.jobs[jobNum])
+            self.Save()
+
+    def GetJob(self, jobNum):
+        """ Get a job by its job number """
+        return self.jobs.get(jobNum)
+
+    def GetProgress(self, jobNums=None):
+        """ Get the combined progress of a group of jobs, by default all jobs in the queue.  Returns
+            (number finished, number failed, total number, overall percent complete, running jobs) """
+        with self.condition:
+            if jobNums == None:
+                jobNums = self.jobs.keys()
+            jobs = [self.jobs[jobNum] for jobNum in jobNums if jobNum in self.jobs]
+            finished = len([job for job in jobs if job.status in [DONE, FAILED, CANCELLED]])
+            failed = len([job for job in jobs if job.status == FAILED])
+            running = [job for job in jobs if job.status == RUNNING]
+            if len(jobs) == 0:
+                percent = 100.0
+            else:
+                percent = (finished * 100.0 + sum([job.percent for job in running])) / len(jobs)
+            return (finished, failed, len(jobs), percent, running)
+
+    def Start(self, stopWhenEmpty=False):
+        """ Start the worker threads.  If stopWhenEmpty is True, the workers stop when there is nothing left to do. """
+        with self.condition:
+            self.stopping = False
+            self.stopWhenEmpty = stopWhenEmpty
+            # Drop workers that have stopped
+            self.workers = [worker for worker in self.workers if worker.isAlive()]
+            while len(self.workers) < self.cpuWorkers:
+                worker = threading.Thread(target=self.Worker, name='MediaQueue worker %d' % (len(self.workers) + 1))
+                # Don't keep the program open just for the workers
+                worker.setDaemon(True)
+                worker.start()
+                self.workers.append(worker)
+            self.condition.notifyAll()
+
+    def Stop(self, cancelRunning=False):
+        """ Stop the worker threads.  Running jobs are finished unless cancelRunning is True, in which case
+            they are stopped and left in the queue to run again. """
+        with self.condition:
+            self.stopping = True
+            if cancelRunning:
+                for job in self.jobs.itervalues():
+                    if job.process != None:
+                        try:
+                            job.process.kill()
+                        except OSError:
+                            pass
+            self.condition.notifyAll()
+
+    def Wait(self):
+        """ Wait for the worker threads to stop """
+        for worker in self.workers:
+            # Joining with a timeout lets Ctrl-C through
+            while worker.isAlive():
+                worker.join(1.0)
+
+    def NextJob(self):
+        """ Get the highest priority job that is ready to run without overloading a disk, or None.
+            (Call with self.condition held.) """
+        # Count the running jobs using each disk
+        diskUse = {}
+        for job in self.jobs.itervalues():
+            if job.status == RUNNING:
+                for disk in job.GetDisks():
+                    diskUse[disk] = diskUse.get(disk, 0) + 1
+        now = time.time()
+        # Highest priority first, then in the order the jobs were added
+        for job in sorted(self.jobs.itervalues(), key=lambda job: (-job.priority, job.jobNum)):
+            if (job.status == QUEUED) and (job.notBefore <= now):
+                if max([diskUse.get(disk, 0) for disk in job.GetDisks()]) < self.ioWorkers:
+                    return job
+        return None
+
+    def Worker(self):
+        """ Worker thread.  Runs jobs until told to stop. """
+        while True:
+            with self.condition:
+                job = None
+                while (job == None) and not self.stopping:
+                    job = self.NextJob()
+                    if job == None:
+                        # If nothing is waiting or running and we're supposed to stop when the queue is empty, stop
+                        if self.stopWhenEmpty and \
+                           (len([j for j in self.jobs.itervalues() if j.status in [QUEUED, RUNNING]]) == 0):
+                            self.condition.notifyAll()
+                            return
+                        # Check again in a second, or when something changes, as retries become ready with time
+                        self.condition.wait(1.0)
+                if self.stopping:
+                    return
+                job.status = RUNNING
+                job.attempts += 1
+                job.percent = 0.0
+                job.errorMessages = []
+                self.Save()
+            self.RunJob(job)
+            with self.condition:
+                self.Save()
+                self.condition.notifyAll()
+
+    def RunJob(self, job):
+        """ Run a single job, updating its status when it finishes """
+        # If the output folder doesn't exist, create it
+        outputPath = os.path.dirname(job.outputFile)
+        if (outputPath != '') and not os.path.exists(outputPath):
+            try:
+                os.makedirs(outputPath)
+            except OSError:
+                pass
+        kwargs = {}
+        # On Windows, don't pop up a console window for FFmpeg
+        if sys.platform == 'win32':
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+            kwargs['startupinfo'] = startupinfo
+        try:
+            process = subprocess.Popen(job.GetCommandLine(self.programDir), stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT, **kwargs)
+        except (OSError, ValueError), e:
+            job.errorMessages.append(str(e))
+            returnCode = -1
+        else:
+            with self.condition:
+                job.process = process
+                # If the job was cancelled while it was starting, stop it now
+                if job.status == CANCELLED:
+                    process.kill()
+            # FFmpeg reports progress as lines of the form "xp percent seconds total"
+            for line in iter(process.stdout.readline, ''):
+                line = line.strip()
+                progress = line.split(' ')
+                if (progress[0] == 'xp') and (len(progress) >= 2):
+                    try:
+                        job.percent = min(100.0, float(progress[1]))
+                    except ValueError:
+                        pass
+                elif line != '':
+                    job.errorMessages.append(line)
+            returnCode = process.wait()
+            job.process = None
+        with self.condition:
+            # If the job was cancelled or didn't finish, remove any partial output
+            if (job.status == CANCELLED) or (returnCode != 0) or not os.path.exists(job.outputFile):
+                if os.path.exists(job.outputFile):
+                    try:
+                        os.remove(job.outputFile)
+                    except OSError:
+                        pass
+            if job.status == CANCELLED:
+                return
+            if self.stopping and (returnCode != 0):
+                # The job didn't finish, so it will run again next time
+                job.status = QUEUED
+                job.attempts -= 1
+            elif (returnCode == 0) and os.path.exists(job.outputFile):
+                job.status = DONE
+                job.percent = 100.0
+            elif job.attempts <= self.maxRetries:
+                # Try again later, waiting longer after each failure
+                job.status = QUEUED
+                job.notBefore = time.time() + RETRY_DELAY * job.attempts
+            else:
+                job.status = FAILED
+        if (job.status == DONE) and (self.onJobComplete != None):
+            self.onJobComplete(job)
+
+
+# If running without the GUI ...
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage='%prog --queue QUEUEFILE [options]')
+    parser.add_option('--queue', dest='queueFilename', help='the queue file')
+    parser.add_option('--workers', dest='cpuWorkers', type='int', default=None,
+                      help='the number of jobs to run at once (default: one per processor core)')
+    parser.add_option('--io', dest='ioWorkers', type='int', default=DEFAULT_IO_WORKERS,
+                      help='the number of jobs that can use the same disk at once (default: %d)' % DEFAULT_IO_WORKERS)
+    parser.add_option('--retries', dest='maxRetries', type='int', default=MAX_RETRIES,
+                      help='the number of times to retry a failed job (default: %d)' % MAX_RETRIES)
+    parser.add_option('--waveform', dest='waveforms', nargs=2, action='append', default=[], metavar='MEDIAFILE WAVEFILE',
+                      help='add an audio extraction job to the queue')
+    parser.add_option('--priority', dest='priority', type='int', default=0, help='the priority for jobs added')
+    (options, args) = parser.parse_args()
+    if options.queueFilename == None:
+        parser.error('a queue file is required')
+
+    # FFmpeg is in the Transana program directory, along with this module
+    programDir = os.path.dirname(os.path.abspath(sys.argv[0]))
+    queue = MediaQueue(options.queueFilename, programDir, options.cpuWorkers, options.ioWorkers, options.maxRetries)
+    fsEncoding = sys.getfilesystemencoding() or 'utf8'
+    for (mediaFile, waveFile) in options.waveforms:
+        queue.Add(AUDIO_EXTRACTION, os.path.abspath(mediaFile).decode(fsEncoding),
+                  os.path.abspath(waveFile).decode(fsEncoding), priority=options.priority)
+    queue.Start(stopWhenEmpty=True)
+    try:
+        # Report progress until the queue is empty
+        while len([worker for worker in queue.workers if worker.isAlive()]) > 0:
+            (finished, failed, total, percent, running) = queue.GetProgress()
+            sys.stdout.write('\r%d of %d jobs finished (%d failed), %d running, %5.1f%% complete ' % \
+                             (finished, total, failed, len(running), percent))
+            sys.stdout.flush()
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        # Leave unfinished jobs in the queue for next time
+        queue.Stop(cancelRunning=True)
+        queue.Wait()
+    (finished, failed, total, percent, running) = queue.GetProgress()
+    print
+    for job in queue.jobs.itervalues():
+        if job.status == FAILED:
+            print job
+            for line in job.errorMessages[-5:]:
+                print '   ', line
+    # Completed jobs don't need to be kept
+    queue.Purge()
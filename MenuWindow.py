@@ -1532,8 +1532,8 @@ class MenuWindow(wx.Frame):  # wx.MDIParentFrame
             fn, ext = os.path.splitext(filename)
             # Cast the extension as lower case
             ext = ext.lower()
-            # For Transana-XML Export ...
-            if ext == '.tra':
+            # For Transana-XML Export (optionally gzip-compressed) ...
+            if (ext == '.tra') or (filename[-7:].lower() == '.tra.gz'):
                 # ... export the data in Transana-XML format (XML extension no longer used.)
                 temp.Export()
             # For QDA-XML Export ...
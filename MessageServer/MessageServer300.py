@@ -43,14 +43,22 @@ if DEBUG:
 VERSION = 300
 # NOTE:  Remember to update the version number for the _svc_display_name_ too!
 
+# import Python's collections module
+import collections
+# import Python's errno module
+import errno
 # import the Python os module
 import os
 # import Python's re (regular expression) module
 import re
+# import Python's select module
+import select
 # import Python's SSL module
 import ssl
 # import python's socket module
 import socket
+# import Python's struct module
+import struct
 # import python's sys module
 import sys
 # import python's thread module
@@ -90,7 +98,7 @@ if RUNASDAEMON:
     # import the daemon class
     import daemon
 
-# Interval for checking client validation (in seconds)
+# Interval for reporting server status (in seconds)
 checkInterval = 20.0
 # The MessageServer is ALWAYS run as localhost, as it can only run on the machine running it!!
 myHost = ''   # '' indicates localhost
@@ -175,570 +183,615 @@ def now():
     return time.ctime(time.time())
 
 
-# Establish the capacity to lock the threads
-threadLock = threading.Lock()
 
-# Create a subclass of Thread for socket connections
-class connectionThread(threading.Thread):
-    """ Subclass of threading.thread designed to handle socket connections in threads """
-    def __init__(self, parent, id, connection, address):
-        # Initialize the Thread object
-        threading.Thread.__init__(self)
-
-        # We need a way to signal to the thread that it's time to quit!
-        self.keepRunning = True
-        # remember the parent object, dispatcher, which is common for all connection threads.
-        self.parent = parent
-        # id is the thread identifier, probably not used for anything
-        self.id = id
+# The Message Server runs as a single thread that multiplexes all client sockets with select(), rather than
+# running one thread per client.  Clients are grouped into "rooms" by Database Host and Database Name, so a
+# message only goes to the clients in the sender's room, and a username index finds the recipients of
+# private messages directly.
+#
+# Framing:  Transana-MU clients up through 3.00 terminate each message with the " ||| " separator.  These
+# clients are still supported.  A client may instead open its connection by sending FRAMING_HELLO, which the
+# server echoes back.  From then on, every message in both directions is sent as a 4-byte network-order
+# length followed by that many bytes of message.
+
+# The greeting that selects length-prefixed framing.  Legacy clients always start with "C ", so never send this.
+FRAMING_HELLO = '\x00TMS'
+# The legacy message separator
+MESSAGE_SEPARATOR = ' ||| '
+# The length prefix for length-prefixed framing
+FRAME_HEADER = struct.Struct('!I')
+# The largest message we accept.  Anything bigger indicates a broken or hostile client.
+MAX_MESSAGE_SIZE = 1048576
+# If this much data is waiting to go out to a client, stop reading from that client until it catches up
+OUTBOUND_HIGH_WATER = 262144
+# If this much data is waiting to go out to a client, the client has stopped reading and is dropped
+OUTBOUND_LIMIT = 4194304
+# The most data to hand to a socket in one send() call
+SEND_CHUNK_SIZE = 65536
+# The number of seconds a client gets to complete the SSL handshake before it is dropped
+HANDSHAKE_TIMEOUT = 10.0
+
+
+class clientConnection(object):
+    """ The state of one client connection:  its socket, its buffers, and who the user is """
+    def __init__(self, connection, address, useSSL):
         # connection is the connection established by the socket
         self.connection = connection
         # address is the address of the socket connection
         self.address = address
+        # Remember whether this is an SSL connection
+        self.useSSL = useSSL
+        # SSL connections must complete the SSL handshake, a step at a time as select() allows, before use
+        self.handshaking = useSSL
+        # The handshake is waiting for the socket to be readable, or writable if this is True
+        self.handshakeWantsWrite = False
+        # The time by which the handshake must be complete
+        self.handshakeDeadline = time.time() + HANDSHAKE_TIMEOUT
+        # Framing is None until we know, then True for length-prefixed framing or False for " ||| " separators
+        self.framed = None
+        # Data received but not yet formed into complete messages
+        self.inBuffer = ''
+        # Messages waiting to be sent, the data currently being sent, and the total size of both
+        self.outQueue = collections.deque()
+        self.outBuffer = ''
+        self.outBytes = 0
+        # User information, filled in by the Connection message
+        self.name = ''
+        self.dbHost = ''
+        self.dbName = ''
+        self.ssl = 'FALSE'
+        self.version = '100'
+        # The room (dbHost, dbName) the client is in, or None before the Connection message
+        self.room = None
+
+    def fileno(self):
+        """ Allow select() to use the connection object directly """
+        return self.connection.fileno()
+
+    def Handshake(self):
+        """ Take the SSL handshake as far as the socket allows without blocking.
+            Raises socket.error if the handshake fails. """
+        try:
+            self.connection.do_handshake()
+            # The handshake is complete
+            self.handshaking = False
+        # If the handshake needs more data, or room to send, try again when select() says the socket is ready
+        except ssl.SSLError, e:
+            if e.args[0] == ssl.SSL_ERROR_WANT_READ:
+                self.handshakeWantsWrite = False
+            elif e.args[0] == ssl.SSL_ERROR_WANT_WRITE:
+                self.handshakeWantsWrite = True
+            else:
+                raise socket.error(str(e))
+
+    def Receive(self):
+        """ Read whatever data is available from the socket.  Returns the list of complete messages received.
+            Raises socket.error if the connection has been lost. """
+        # Get data from the socket connection
+        try:
+            data = self.connection.recv(SEND_CHUNK_SIZE)
+            # An SSL socket can hold decrypted data that select() doesn't know about, so read that now too.
+            if self.useSSL:
+                while self.connection.pending() > 0:
+                    data += self.connection.recv(self.connection.pending())
+        # If no data is ready yet (as can happen with SSL), there's nothing to process
+        except ssl.SSLError, e:
+            if e.args[0] in [ssl.SSL_ERROR_WANT_READ, ssl.SSL_ERROR_WANT_WRITE]:
+                return []
+            raise socket.error(str(e))
+        # An empty read means the client closed the connection
+        if not data:
+            raise socket.error('Connection closed')
+        # Add the data to what's left over from last time
+        self.inBuffer += data
+
+        # If we don't yet know what framing the client uses ...
+        if self.framed == None:
+            # ... wait until we have enough data to tell
+            if (len(self.inBuffer) < len(FRAMING_HELLO)) and FRAMING_HELLO.startswith(self.inBuffer):
+                return []
+            # If the client sent the greeting, it wants length-prefixed framing
+            if self.inBuffer.startswith(FRAMING_HELLO):
+                self.framed = True
+                # Remove the greeting from the buffer
+                self.inBuffer = self.inBuffer[len(FRAMING_HELLO):]
+                # Echo it, so the client knows this server understands it.  (It goes out without framing.)
+                self.outQueue.append(FRAMING_HELLO)
+                self.outBytes += len(FRAMING_HELLO)
+            # Otherwise, we have an older client
+            else:
+                self.framed = False
+
+        # Break the buffer into complete messages
+        messages = []
+        if self.framed:
+            # Process as many complete frames as we have
+            while len(self.inBuffer) >= FRAME_HEADER.size:
+                (length,) = FRAME_HEADER.unpack(self.inBuffer[:FRAME_HEADER.size])
+                if length > MAX_MESSAGE_SIZE:
+                    raise socket.error('Message too large')
+                # If the whole message hasn't arrived yet, wait for the rest
+                if len(self.inBuffer) < FRAME_HEADER.size + length:
+                    break
+                messages.append(self.inBuffer[FRAME_HEADER.size:FRAME_HEADER.size + length])
+                self.inBuffer = self.inBuffer[FRAME_HEADER.size + length:]
+        else:
+            # Split on the message separator.  The last segment is an incomplete message (usually blank),
+            # which we keep until the rest of it arrives.
+            segments = self.inBuffer.split(MESSAGE_SEPARATOR)
+            self.inBuffer = segments[-1]
+            if len(self.inBuffer) > MAX_MESSAGE_SIZE:
+                raise socket.error('Message too large')
+            messages = segments[:-1]
+        return messages
+
+    def Send(self, message):
+        """ Queue a message (without separator) for sending, framed the way this client expects.
+            Raises socket.error if the client has stopped reading. """
+        # Frame the message
+        if self.framed:
+            data = FRAME_HEADER.pack(len(message)) + message
+        else:
+            data = message + MESSAGE_SEPARATOR
 
         if DEBUG:
-            print "New thread spawned for %s, %s" % (self.connection, self.address)
-            
-        # Let's keep track of the number of errors that arise
-        self.errorCount = 0
+            print "sending %s to %s" % (message, self.address)
+
+        # Add it to the outbound queue
+        self.outQueue.append(data)
+        self.outBytes += len(data)
+        # If the client isn't keeping up at all, give up on it
+        if self.outBytes > OUTBOUND_LIMIT:
+            raise socket.error('Client is not reading its messages')
+
+    def Flush(self):
+        """ Send as much queued data as the socket will accept without blocking.
+            Raises socket.error if the connection has been lost. """
+        while self.outBytes > 0:
+            # If we're not in the middle of sending something, gather the next chunk from the queue
+            # (SSL requires that an interrupted send be retried with the same data.)
+            if self.outBuffer == '':
+                chunks = []
+                size = 0
+                while (len(self.outQueue) > 0) and (size < SEND_CHUNK_SIZE):
+                    chunks.append(self.outQueue.popleft())
+                    size += len(chunks[-1])
+                self.outBuffer = ''.join(chunks)
+            try:
+                sent = self.connection.send(self.outBuffer)
+            # If the socket can't accept more data right now, try again when select() says it can
+            except ssl.SSLError, e:
+                if e.args[0] in [ssl.SSL_ERROR_WANT_READ, ssl.SSL_ERROR_WANT_WRITE]:
+                    return
+                raise socket.error(str(e))
+            except socket.error, e:
+                if e.args[0] in [errno.EAGAIN, errno.EWOULDBLOCK]:
+                    return
+                raise
+            # Remove what was sent
+            self.outBuffer = self.outBuffer[sent:]
+            self.outBytes -= sent
+            # If the socket didn't take it all, it's full
+            if self.outBuffer != '':
+                return
+
+    def Close(self):
+        """ Close the socket connection """
+        try:
+            self.connection.close()
+        except:
+            pass
+
+
+class dispatcher(object):
+    """ This starts the Transana Message Server.  It listens for both un-encrypted and SSL-encrypted socket
+        connections, and handles all client traffic in a single server thread. """
+    def __init__(self):
+        # Maintain a dictionary of connections, by socket address
+        self.connections = {}
+        # Maintain an index of connections by room, (dbHost, dbName)
+        self.rooms = {}
+        # Maintain an index of connections by user name
+        self.users = {}
+        # We need a way to signal to the server thread that it's time to quit!
+        self.keepRunning = True
 
-    def run(self):
-        # running this thread involves listening to the socket and processing messages that come in.
+        # Create the un-encrypted and encrypted listening sockets
+        self.listeners = {}
+        for (port, useSSL) in [(myPort, False), (mySSLPort, True)]:
+            # Create a TCP Socket object
+            sockobj = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Bind the socket to the port
+            sockobj.bind((myHost, port))
+            # Allow a max of 100 connections waiting to be accepted
+            sockobj.listen(100)
+            # Remember whether the listener is for SSL connections
+            self.listeners[sockobj] = useSSL
 
-        # Initialize the User Name
-        userName = ''
-        # Put this in a loop so that multiple messages will be processed.
+        # Create and start the server thread
+        self.serverThread = threading.Thread(target=self.Run)
+        self.serverThread.start()
+
+        if DEBUG:
+            print "Starting MessageServer on ports %d (unencrypted) and %d (SSL-encrypted)" % (myPort, mySSLPort)
+
+    def Run(self):
+        """ The server loop, which waits for socket activity and processes it """
+        # Note when the next Report is due
+        nextReport = time.time() + checkInterval
         while self.keepRunning:
-            # Broken socket connections cause exceptions, so process everything in a "try .. except" block
+            # Drop clients that haven't completed the SSL handshake in time
+            for conn in self.connections.values():
+                if conn.handshaking and (time.time() > conn.handshakeDeadline):
+                    self.ConnectionLost(conn)
+            # Listen to all listeners.  Listen to clients unless too much data is waiting to go out to them, or
+            # the SSL handshake is waiting to send.
+            readList = self.listeners.keys() + \
+                       [conn for conn in self.connections.values()
+                        if (conn.outBytes < OUTBOUND_HIGH_WATER) and not (conn.handshaking and conn.handshakeWantsWrite)]
+            # Watch for room to send to clients that have data waiting, or whose SSL handshake is waiting to send
+            writeList = [conn for conn in self.connections.values()
+                         if (conn.outBytes > 0) or (conn.handshaking and conn.handshakeWantsWrite)]
             try:
-                if DEBUG:
-                    print "Waiting for data from ", self.address
-                    
-                # Get data from the socket connection
-                data = self.connection.recv(1024)
-                if not data:
-                    break
-                # Get a Thread Lock.  
-                threadLock.acquire()
+                (readable, writable, errored) = select.select(readList, writeList, [], 1.0)
+            except select.error, e:
+                # A signal interrupting select() isn't a problem
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+
+            # Continue SSL handshakes that the socket is ready for
+            for conn in set(readable + writable):
+                if (not conn in self.listeners) and conn.handshaking and (conn.address in self.connections):
+                    try:
+                        conn.Handshake()
+                    except socket.error:
+                        self.ConnectionLost(conn)
+                    # Until the handshake is done, there's nothing to read or send
+                    if conn in readable:
+                        readable.remove(conn)
+                    if conn in writable:
+                        writable.remove(conn)
+
+            # Process incoming connections and messages
+            for sock in readable:
+                if sock in self.listeners:
+                    self.Accept(sock, self.listeners[sock])
+                # The connection may have been dropped while processing another client's message
+                elif sock.address in self.connections:
+                    try:
+                        for message in sock.Receive():
+                            self.ProcessMessage(sock, message)
+                            # A Disconnection message closes the connection
+                            if not sock.address in self.connections:
+                                break
+                    except socket.error:
+                        self.ConnectionLost(sock)
+                    except:
+                        # Don't let one bad message stop the server
+                        if DEBUG:
+                            print "except"
+                            print sys.exc_info()[0], sys.exc_info()[1]
+                            import traceback
+                            traceback.print_exc(file=sys.stdout)
+
+            # Send outgoing data.  (Check the connection list, as the client may have dropped.)
+            for conn in writable:
+                if conn.address in self.connections:
+                    try:
+                        conn.Flush()
+                    except socket.error:
+                        self.ConnectionLost(conn)
+
+            # Report status at the appropriate interval
+            if time.time() >= nextReport:
+                self.Report()
+                nextReport = time.time() + checkInterval
+
+        # We're done.  Close all the sockets.
+        for conn in self.connections.values():
+            conn.Close()
+        for sockobj in self.listeners.keys():
+            sockobj.close()
+
+    def Accept(self, sockobj, useSSL):
+        """ Accept a new socket connection """
+        try:
+            # Detect a new socket connection
+            connection, address = sockobj.accept()
+            # The socket must never block the server
+            connection.setblocking(0)
+            # If this is an SSL connection ...
+            if useSSL:
 
                 if DEBUG:
-                    print 'Server received  "%s" from %s' % (data, self.address)
-
-                # Remove the data separator, if there is one at the end of the message
-                if data[-5:] == ' ||| ':
-                    data = data[:-5]
-
-                # If the message is a Connection message ...
-                # (Format: "C Username DatabaseHost DatabaseName [SSL] Version")
-                if (len(data) > 1) and (data[:data.find(' ')] == 'C'):
-                    # Strip the connection flag from the message
-                    st = data[2:].strip()
-                    # extract the User Name
-                    userName = st[:st.find(' ')]
-                    # remove the User Name from the data string
-                    st = st[st.find(' ') + 1:]
-                    # extract the Database Host 
-                    dbHost = st[:st.find(' ')].upper()
-                    # remove the Database Host from the data string
-                    st = st[st.find(' ') + 1:]
-                    # See if there is another parameter after dbName
-                    if st.find(' ') > -1:
-                        # extract the Database Name 
-                        dbName = st[:st.find(' ')].upper()
-                        # remove the Database Name from the data string
-                        st = st[st.find(' ') + 1:]
-                        # See if there are both "SSL" and "Version" parameter
-                        if st.find(' ') > -1:
-                            # Extract the SSL value ...
-                            SSL = st[:st.find(' ')].upper()
-                            # ... and conver the Version value
-                            version = st[st.find(' ') + 1:]
-                        else:
-                            # If there's no SSL value, then SSL is FALSE!!
-                            SSL = 'FALSE'
-                            # Extract the VERSION value
-                            version = st.upper()
-                    # If dbName is the last parameter
-                    else:
-                        # ... extract the Database Name
-                        dbName = st.upper()
-                        # ... set SSL to False
-                        SSL = 'FALSE'
-                        # ... and default Version to 1.00
-                        version = '100'
-
-                    if DEBUG:
-                        print 'New Connection: Username = "%s", dbHost = "%s", dbName = "%s", SSL = "%s", version = "%s"' % (userName, dbHost, dbName, SSL, version)
-                        print "%d users are currently logged on. (1)" % (len(self.parent.connections) + 1)
-
-                    # Check the Transana version against the Message Server version.
-                    # Detect Transana 2.60 on a Transana 2.61 server
-                    if (int(version) == 260) and (VERSION == 261):
-                        self.connection.send('M MessageServer: The Transana Message Server you have connected to is newer than ||| ')
-                        self.connection.send('M MessageServer: your copy of Transana-MU.  Please upgrade your copy of Transana-MU ||| ')
-                        self.connection.send('M MessageServer: as soon as you are able. ||| ')
-                        self.connection.send('M MessageServer: - ||| ')
-                        # But we can go ahead and validate the Message Server, as it WILL work!
-                        self.connection.send('V MessageServer: ServerValidated ||| ')
-                    # Detect old Transana versions...
-                    elif int(version) < VERSION:
-                        self.connection.send('M MessageServer: The Transana Message Server you have connected to is newer than ||| ')
-                        self.connection.send('M MessageServer: your copy of Transana-MU.  Please upgrade your copy of Transana-MU ||| ')
-                        self.connection.send('M MessageServer: immediately. ||| ')
-                        self.connection.send('M MessageServer: - ||| ')
-                        self.connection.send('M MessageServer: Please do not proceed.  Data corruption could result. ||| ')
-                        self.connection.send('M MessageServer: - ||| ')
-                    # Detect new Transana versions...
-                    elif int(version) > VERSION:
-                        self.connection.send('M MessageServer: The Transana Message Server you have connected to is older than ||| ')
-                        self.connection.send('M MessageServer: your copy of Transana-MU.  Please ask your system administrator ||| ')
-                        self.connection.send('M MessageServer: to upgrade your copy of the Transana-MU Message Server immediately. ||| ')
-                        self.connection.send('M MessageServer: - ||| ')
-                        self.connection.send('M MessageServer: Please do not proceed.  Data corruption could result. ||| ')
-                        self.connection.send('M MessageServer: - ||| ')
-                    else:
-                        self.connection.send('V MessageServer: ServerValidated ||| ')
-
-                    # Add the new User information to the Connection List
-                    self.parent.connections[self.address] = {'name' : userName, 'dbHost' : dbHost, 'dbName' : dbName, 'ssl' : SSL, 'version' : version}
-
-                    # Keep doing this until told to stop.
-                    while True:
-                        # Assume we will NOT find the userName in the list.
-                        nameFound = False
-
-                        # Check for duplicate user names in the list of existing threads and avoid them.
-                        for thr in threading.enumerate():
-                            # ... check to be sure we've got a connectionThread, not the Main program thread ...
-                            if isinstance(thr, connectionThread):
-
-                                if DEBUG:
-                                    print thr.address, self.parent.connections.has_key(thr.address)
-                                
-                                # ... if a connection is not THIS connection AND ...
-                                # ... the connection has not been dropped AND ...
-                                # ... the connection has the same Username ...
-                                if (thr.address != self.address) and \
-                                   self.parent.connections.has_key(thr.address) and \
-                                   self.parent.connections[thr.address]['name'] == userName:
-
-                                    # Define a regular expression to find the " (#)" portion of a name
-                                    regex = re.compile("\(\d+\)")
-                                    # Find that regular expression in the userName
-                                    regexResult = regex.findall(userName)
-
-                                    # If the regex is not found ...
-                                    if regexResult == []:
-                                        # ... then we add "(2)" to the username
-                                        userName = userName + '(2)'
-                                    # However, if the regex is found ...
-                                    else:
-                                        # ... extract the number from the string.
-                                        # (the regexResult is in the form ['(#)'], so we extract the list element,
-                                        #  then strip the parentheses from the string, then convert to an integer.)
-                                        n = int(regexResult[0][1:-1])
-                                        # Update the user name with the new number, in parentheses
-                                        userName = userName[:userName.rfind('(')] + "(%d)" % (n + 1)
-
-                                    # Update the connection list with the new name
-                                    self.parent.connections[self.address]['name'] = userName
-                                    # Prepare the data string to be broadcase with the new username
-                                    data = 'C %s %s' % (userName, SSL)
-                                    # Signal that we found the userName, so we can now search for the new iteration too
-                                    nameFound = True
-
-                                    # Inform the Chat Client that the username was updated
-                                    self.connection.send('R %s %s ||| ' % (userName, SSL))
-
-                        # If we DIDN'T change the name, we can stop searching to see if the name's in use
-                        if not nameFound:
-                            break
-
-                    # Broadcast the existing connection information to the new user.  Loop through all existing connection threads ...
-                    for thr in threading.enumerate():
-                        # ... check to be sure we've got a connectionThread, not the Main program thread ...
-                        if isinstance(thr, connectionThread):
-                            # ... if a connection is not THIS connection but has the same Database Host and
-                            # Database Name ...
-                            if (thr.address != self.address) and \
-                               self.parent.connections[thr.address]['dbHost'] == self.parent.connections[self.address]['dbHost'] and \
-                               self.parent.connections[thr.address]['dbName'] == self.parent.connections[self.address]['dbName']:
-                                # ... then broadcast "C Username" to signal the names of other users in the same
-                                # database as the connecting user.  This tells the newly connected user who else
-                                # was already connected when s/he joined the group.
-                                self.connection.send('C %s %s ||| ' % (self.parent.connections[thr.address]['name'], self.parent.connections[thr.address]['ssl']))
-
-                elif (len(data) > 1) and (data[:data.find('0')] == 'D'):
-                    # Substitute the correct user name, the one the Message Server knows.
-                    data = 'D %s' % self.parent.connections[self.address]['name']
-
-                if (data == 'M SHOW USERS') and (self.parent.connections[self.address]['name'] in ['DavidW', 'DavidW(2)', 'DavidW(3)']):
-
-                    message = "M MessageServer: Users: ||| "
-                    self.connection.send(message)
-                    for c in self.parent.connections:
-                        message = "M MessageServer: %s %s %s %s ||| " % (self.parent.connections[c]['name'], self.parent.connections[c]['dbHost'], self.parent.connections[c]['dbName'], self.parent.connections[c]['ssl'])
-                        self.connection.send(message)
-
-                elif (data == 'M SHOW CERTIFICATES'):
-                    
-                    message = "M MessageServer: %s %s ||| " % (CERT_FILE, os.path.exists(CERT_FILE))
-                    self.connection.send(message)
-                    message = "M MessageServer: %s %s ||| " % (CERT_KEY, os.path.exists(CERT_KEY))
-                    self.connection.send(message)
-
-                elif (data == 'M RESET USERS') and (self.parent.connections[self.address]['name'] in ['DavidW', 'DavidW(2)', 'DavidW(3)']):
-                    message = "M MessageServer: RESET -  Exit immediately.  %s %s %s ||| " % (self.parent.connections[self.address]['name'], self.parent.connections[self.address]['dbHost'], self.parent.connections[self.address]['dbName'])
-                    self.connection.send(message)
-                    self.parent.KillAllThreads()
-                    self.parent.connections = {}
-
-                else:
-                    # Broadcast the incoming message to others.  Loop through all existing connection threads.
-                    for thr in threading.enumerate():
-                        # This "if" ensures that only communication threads are processed, not the main program thread
-                        if isinstance(thr, connectionThread):
-                            try:
-                                # pass the message to other threads.
-                                thr.BroadcastMessage('%s' % data, self.parent.connections[self.address]['name'], self.parent.connections[self.address]['dbHost'], self.parent.connections[self.address]['dbName'])
-                            except:
-                                if DEBUG:
-                                    print "Key Error??"
-
-                                    print sys.exc_info()[0], sys.exc_info()[1]
-                                    import traceback
-                                    traceback.print_exc(file=sys.stdout)
-                                    
-                                continue
-                    # release the Thread Lock, as we're done.
-                    if (len(data) > 1) and (data[:data.find(' ')] == 'D'):
+                    print "Creating SSL Connection"
+
+                # Wrap the connection using SSL.  The handshake is done a step at a time in the server loop, so a
+                # slow client can't hold up the server.
+                connection = ssl.wrap_socket(connection,
+                                             server_side=True,
+                                             certfile=CERT_FILE,
+                                             keyfile=CERT_KEY,
+                                             do_handshake_on_connect=False)
+            elif DEBUG:
+                print "Creating Connection without SSL"
+            # Add the connection to our connections list
+            self.connections[address] = clientConnection(connection, address, useSSL)
 
-                        if DEBUG:
-                            print "D", self.address
+            if DEBUG:
+                print 'Server connection established from %s at %s\n' % (address, now())
+                print 'There are currently %d connections to this Message Server.' % len(self.connections)
 
-                        # Remove this address from our connections list
-                        del(self.parent.connections[self.address])
-                        # Close the socket connection
-                        self.connection.close()
+        except:
+            if DEBUG:
+                print sys.exc_info()[0]
+                print sys.exc_info()[1]
+                import traceback
+                traceback.print_exc(file=sys.stdout)
+                print
 
-                        if DEBUG:
-                            print "Disconnection message from ", userName
-                            print "%d users are currently logged on. (2)" % len(self.parent.connections)
+    def ProcessMessage(self, conn, data):
+        """ Process a single message received from a client """
 
-                # Release the thread lock
-                threadLock.release()
+        if DEBUG:
+            print 'Server received  "%s" from %s' % (data, conn.address)
+
+        # If the message is a Connection message ...
+        # (Format: "C Username DatabaseHost DatabaseName [SSL] Version")
+        if (len(data) > 1) and (data[:data.find(' ')] == 'C'):
+            # Strip the connection flag from the message
+            st = data[2:].strip()
+            # extract the User Name
+            userName = st[:st.find(' ')]
+            # remove the User Name from the data string
+            st = st[st.find(' ') + 1:]
+            # extract the Database Host
+            dbHost = st[:st.find(' ')].upper()
+            # remove the Database Host from the data string
+            st = st[st.find(' ') + 1:]
+            # See if there is another parameter after dbName
+            if st.find(' ') > -1:
+                # extract the Database Name
+                dbName = st[:st.find(' ')].upper()
+                # remove the Database Name from the data string
+                st = st[st.find(' ') + 1:]
+                # See if there are both "SSL" and "Version" parameter
+                if st.find(' ') > -1:
+                    # Extract the SSL value ...
+                    SSL = st[:st.find(' ')].upper()
+                    # ... and conver the Version value
+                    version = st[st.find(' ') + 1:]
+                else:
+                    # If there's no SSL value, then SSL is FALSE!!
+                    SSL = 'FALSE'
+                    # Extract the VERSION value
+                    version = st.upper()
+            # If dbName is the last parameter
+            else:
+                # ... extract the Database Name
+                dbName = st.upper()
+                # ... set SSL to False
+                SSL = 'FALSE'
+                # ... and default Version to 1.00
+                version = '100'
 
-            # A socket.error indicates that one of the clients has crashed.
+            if DEBUG:
+                print 'New Connection: Username = "%s", dbHost = "%s", dbName = "%s", SSL = "%s", version = "%s"' % (userName, dbHost, dbName, SSL, version)
+                print "%d users are currently logged on. (1)" % len(self.connections)
+
+            # Check the Transana version against the Message Server version.
+            # Detect Transana 2.60 on a Transana 2.61 server
+            if (int(version) == 260) and (VERSION == 261):
+                conn.Send('M MessageServer: The Transana Message Server you have connected to is newer than')
+                conn.Send('M MessageServer: your copy of Transana-MU.  Please upgrade your copy of Transana-MU')
+                conn.Send('M MessageServer: as soon as you are able.')
+                conn.Send('M MessageServer: -')
+                # But we can go ahead and validate the Message Server, as it WILL work!
+                conn.Send('V MessageServer: ServerValidated')
+            # Detect old Transana versions...
+            elif int(version) < VERSION:
+                conn.Send('M MessageServer: The Transana Message Server you have connected to is newer than')
+                conn.Send('M MessageServer: your copy of Transana-MU.  Please upgrade your copy of Transana-MU')
+                conn.Send('M MessageServer: immediately.')
+                conn.Send('M MessageServer: -')
+                conn.Send('M MessageServer: Please do not proceed.  Data corruption could result.')
+                conn.Send('M MessageServer: -')
+            # Detect new Transana versions...
+            elif int(version) > VERSION:
+                conn.Send('M MessageServer: The Transana Message Server you have connected to is older than')
+                conn.Send('M MessageServer: your copy of Transana-MU.  Please ask your system administrator')
+                conn.Send('M MessageServer: to upgrade your copy of the Transana-MU Message Server immediately.')
+                conn.Send('M MessageServer: -')
+                conn.Send('M MessageServer: Please do not proceed.  Data corruption could result.')
+                conn.Send('M MessageServer: -')
+            else:
+                conn.Send('V MessageServer: ServerValidated')
+
+            # If the client was already registered, take it out of its old room first
+            self.RemoveFromIndexes(conn)
+
+            # Check for duplicate user names among the other connections and avoid them.
+            while self.users.has_key(userName):
+                # Define a regular expression to find the " (#)" portion of a name
+                regex = re.compile("\(\d+\)")
+                # Find that regular expression in the userName
+                regexResult = regex.findall(userName)
+
+                # If the regex is not found ...
+                if regexResult == []:
+                    # ... then we add "(2)" to the username
+                    userName = userName + '(2)'
+                # However, if the regex is found ...
+                else:
+                    # ... extract the number from the string.
+                    # (the regexResult is in the form ['(#)'], so we extract the list element,
+                    #  then strip the parentheses from the string, then convert to an integer.)
+                    n = int(regexResult[0][1:-1])
+                    # Update the user name with the new number, in parentheses
+                    userName = userName[:userName.rfind('(')] + "(%d)" % (n + 1)
+
+                # Prepare the data string to be broadcase with the new username
+                data = 'C %s %s' % (userName, SSL)
+
+                # Inform the Chat Client that the username was updated
+                conn.Send('R %s %s' % (userName, SSL))
+
+            # Add the new User information to the connection and the indexes
+            conn.name = userName
+            conn.dbHost = dbHost
+            conn.dbName = dbName
+            conn.ssl = SSL
+            conn.version = version
+            conn.room = (dbHost, dbName)
+            self.users[userName] = conn
+
+            # Send "C Username" for each user already in the room to signal the names of other users in the same
+            # database as the connecting user.  This tells the newly connected user who else was already connected
+            # when s/he joined the group.
+            for other in self.rooms.get(conn.room, []):
+                conn.Send('C %s %s' % (other.name, other.ssl))
+            # Now add the new user to the room
+            self.rooms.setdefault(conn.room, set()).add(conn)
+
+        # Messages from a client that hasn't sent a Connection message can't be routed
+        if conn.room == None:
+            return
+
+        # If the message is a Disconnection message ...
+        if (len(data) > 1) and (data[:data.find(' ')] == 'D'):
+            # Substitute the correct user name, the one the Message Server knows.
+            data = 'D %s' % conn.name
+
+        if (data == 'M SHOW USERS') and (conn.name in ['DavidW', 'DavidW(2)', 'DavidW(3)']):
+
+            conn.Send("M MessageServer: Users:")
+            for c in self.connections.values():
+                conn.Send("M MessageServer: %s %s %s %s" % (c.name, c.dbHost, c.dbName, c.ssl))
+
+        elif (data == 'M SHOW CERTIFICATES'):
+
+            conn.Send("M MessageServer: %s %s" % (CERT_FILE, os.path.exists(CERT_FILE)))
+            conn.Send("M MessageServer: %s %s" % (CERT_KEY, os.path.exists(CERT_KEY)))
+
+        elif (data == 'M RESET USERS') and (conn.name in ['DavidW', 'DavidW(2)', 'DavidW(3)']):
+            conn.Send("M MessageServer: RESET -  Exit immediately.  %s %s %s" % (conn.name, conn.dbHost, conn.dbName))
+            # Try to get the message out before disconnecting everyone
+            try:
+                conn.Flush()
             except socket.error:
+                pass
+            # Drop all connections
+            for c in self.connections.values():
+                c.Close()
+            self.connections = {}
+            self.rooms = {}
+            self.users = {}
 
-                if DEBUG:
-                    print "Socket Error"
-                    import traceback
-                    traceback.print_exc(file=sys.stdout)
-
-		try:
-                    # Broadcast the loss of the user to other users
-                    data = 'D %s' % self.parent.connections[self.address]['name']
-                    # Broadcast the incoming message to others.  Loop through all existing connection threads.
-                    for thr in threading.enumerate():
-                        # This "if" ensures that only communication threads are processed, not the main program thread
-                        if isinstance(thr, connectionThread):
-                            try:
-                                # pass the message to other threads.
-                                thr.BroadcastMessage('%s' % data, self.parent.connections[self.address]['name'], self.parent.connections[self.address]['dbHost'], self.parent.connections[self.address]['dbName'])
-                            except:
-                                if DEBUG:
-                                    print "Exception within a socket error"
-                                continue
-                    # Remove this address from our connections list
-                    del(self.parent.connections[self.address])
-                except:
-                    pass  # forget about sending the message if it won't be sent.
-                
-                # Close the socket connection
-                self.connection.close()
+        else:
+            # Broadcast the incoming message to others in the room
+            self.BroadcastMessage(data, conn)
+            # If this was a Disconnection message ...
+            if (len(data) > 1) and (data[:data.find(' ')] == 'D'):
 
                 if DEBUG:
-                    # print "except socket.error"
-                    print "Connection %s lost." % (self.address,)
-                    print "%d users are currently logged on. (3)" % len(self.parent.connections)
-                    if len(self.parent.connections) == 0:
-                        print
-                        print
-                        print
-                        
-                # end the "while" loop that receives socket data
-                break
-            except:
-                if DEBUG:
-                    print "except"
-                    print sys.exc_info()[0], sys.exc_info()[1]
-                    import traceback
-                    print traceback.print_exc(file=sys.stdout)
-
-                self.errorCount += 1
-                # Release the thread lock
-                threadLock.release()
-
-                if self.errorCount > 50:
-                    if DEBUG:
-                        print "break.  Too many errors."
-                    break
+                    print "Disconnection message from ", conn.name
 
-        if DEBUG:
-            print "A thread is actually dying here.  %s has left the building" % userName
+                # Remove the connection.  (Anything still queued for it is lost, as before.)
+                self.RemoveConnection(conn)
 
-    def BroadcastMessage(self, message, sendingUsername, sendingDBHost, sendingDBName):
-        """ Selectively broadcast a message if the sender and recipient are on the same
-            Database Host and are using the same Database Name """
+                if DEBUG:
+                    print "%d users are currently logged on. (2)" % len(self.connections)
+
+    def BroadcastMessage(self, message, sender):
+        """ Send a message to the users on the sender's Database Host who are using the same Database Name,
+            or to the named users in that room for a Private Message """
         # Detect Private Messages
         if (message[0:2] == 'M ') and (message.find(' >|< ') > -1):
-            # Create a recipient list, starting with the originating user
-            recipientList = [sendingUsername]
             # Split the data into the message and the recipient list
             messageParts = message.split(' >|< ')
-            # Add the recipients to the recipient list
-            for user in messageParts[1].split(' '):
-                recipientList.append(user)
             # Save the recipient list as a string
             recipientString = messageParts[1]
-            # Remove the recipient list from the message
-            message = messageParts[0]
-            # If this message is NOT terminated ...
-            if message.find(' ||| ') == -1:
-                # ... add the Private Message indicator and the terminator
-                message += "  (" + "private message to " + recipientString + ") ||| "
-            # If this message is terminated ...
-            else:
-                # ... insert the Private Message indicator before the terminator
-                message = message[: message.find(' ||| ')] + "  (" + "private message for " + recipientString + ")  " + \
-                            message[message.find(' ||| ') + 1:]
+            # Remove the recipient list from the message, and add the Private Message indicator
+            message = messageParts[0] + "  (" + "private message to " + recipientString + ")"
+            # Create a recipient list, starting with the originating user.  Look the users up by name.
+            recipients = set([sender])
+            for user in recipientString.split(' '):
+                if self.users.has_key(user):
+                    recipients.add(self.users[user])
+            # Only forward the message to people on the same dbHost in the same DB
+            recipients = recipients & self.rooms.get(sender.room, set())
         # If this is NOT a Private Message ...
         else:
-            # ... initialize the Recipient list to None to indicate a public message
-            recipientList = None
-                
-        # Only forward the message to people on the same dbHost in the same DB
-        if (self.parent.connections[self.address]['dbHost'] == sendingDBHost) and \
-           (self.parent.connections[self.address]['dbName'] == sendingDBName) and \
-           ((recipientList == None) or (self.parent.connections[self.address]['name'] in recipientList)):
-            # If it's a message other than Connect, Disconnect, and Rename, insert the
-            # username into the message.
-            if (len(message) > 0) and not (message[:message.find(' ')] in ['C', 'D', 'R']):
-                message = '%s %s: %s' % (message[:message.find(' ')], sendingUsername, message[message.find(' ') + 1:])
-            if message.find(' ||| ') == -1:
-                # Add the Message Terminator
-                message += ' ||| '
-            # Send the message
+            # ... everyone in the room gets it
+            recipients = self.rooms.get(sender.room, set())
 
-            if DEBUG:
-                print "sending %s to %s" % (message, self.address)
-
-            self.connection.send(message)
-            
-    def CommitSuicide(self):
-        """ For this to work as a Service, the threads need the capacity to kill themselves!  Otherwise, the
-            Service is unable to Stop. """
-        # How do we kill the thread?  I'm trying this!  It should signal the thread to quit.
-        self.keepRunning = False
-
-
-# Create a subclass of Thread for socket listeners that accept socket connections
-class listenerThread(threading.Thread):
-    def __init__(self, parent, useSSL):
-        # Initialize the Thread object
-        threading.Thread.__init__(self)
-
-        # We need a way to signal to the thread that it's time to quit!
-        self.keepRunning = True
-
-        self.parent = parent
-        self.useSSL = useSSL
-        
-        # Create a TCP Socket object
-        self.sockobj = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-        if useSSL:
-            # Bind the socket to the port
-            self.sockobj.bind((myHost, mySSLPort))
-            self.port = mySSLPort
-        else:
-            # Bind the socket to the port
-            self.sockobj.bind((myHost, myPort))
-            self.port = myPort
-            
-        # Allow a max of 100 connections
-        self.sockobj.listen(100)
-
-    def run(self):
-        # running this thread involves listening to the socket and processing messages that come in.
-        # Put this in a loop so that multiple messages will be processed.
-
-        while self.keepRunning:
+        # If it's a message other than Connect, Disconnect, and Rename, insert the
+        # username into the message.
+        if (len(message) > 0) and not (message[:message.find(' ')] in ['C', 'D', 'R']):
+            message = '%s %s: %s' % (message[:message.find(' ')], sender.name, message[message.find(' ') + 1:])
 
+        # Send the message.  (Copy the recipient set, as dropping a client changes the room.)
+        for conn in list(recipients):
             try:
-
-                if self.useSSL:
-
-                    if DEBUG:
-                        print "Creating SSL Connection"
-
-                    # Detect a new socket connection
-                    connection_plain, address = self.sockobj.accept()
-
-
-                    # Wrap the connection using SSL
-                    connection = ssl.wrap_socket(connection_plain,
-                                                 server_side=True,
-                                                 certfile=CERT_FILE,
-                                                 keyfile=CERT_KEY)
-
-                else:
-
-                    if DEBUG:
-                        print "Creating Connection without SSL"
-
-
-                    # Detect a new socket connection
-                    connection, address = self.sockobj.accept()
-
-                if DEBUG:
-                    print 'Server connection established from %s at %s\n' % (address, now())
-                    print 'There are currently %d connections to this Message Server.' % (len(self.parent.connections) + 1)
-
-                # increment the Thread Counter
-                self.parent.threadCount += 1
-                # Spawn a Connection Thread Object to handle the connection
-                thread = connectionThread(self.parent, self.parent.threadCount, connection, address)
-                # Start the new Thread
-                thread.start()
-            except:
-                if DEBUG:
-                    print sys.exc_info()[0]
-                    print sys.exc_info()[1]
-                    import traceback
-                    traceback.print_exc(file=sys.stdout)
-                    print
-
-                pass
-
-        
-    def CommitSuicide(self):
-        """ For this to work as a Service, the threads need the capacity to kill themselves!  Otherwise, the
-            Service is unable to Stop. """
-        # How do we kill the thread?  I'm trying this!  It should signal the thread to quit.
-        self.keepRunning = False
-
-
-
-class dispatcher(object):
-    """ This starts the Transana Message Server.  It creates two Listener threads, one for
-        un-encrypted Socket connections and one for SSL-encrypted SSL connections """
-    def __init__(self):
-        # Initialize a Thread Counter
-        self.threadCount = 0
-        # Maintain a dictionary of connections
-        self.connections = {}
-
-        # Call the Report.  (This initiates a Timer that keeps it going!)
-        self.Report()
-
-        # Create and start an un-encrypted Listener thread
-        plainListener = listenerThread(self, False)
-        plainListener.start()
-
-        # Create and start an encrypted Listener thread
-        sslListener = listenerThread(self, True)
-        sslListener.start()
+                conn.Send(message)
+            except socket.error:
+                self.ConnectionLost(conn)
+
+    def ConnectionLost(self, conn):
+        """ Handle a connection that has been lost, or dropped for not keeping up """
+        # If we've already dealt with this connection, there's nothing to do
+        if not conn.address in self.connections:
+            return
+        # Remove the connection
+        self.RemoveConnection(conn)
+        # If the user was in a room, let the others know the user is gone
+        if conn.room != None:
+            self.BroadcastMessage('D %s' % conn.name, conn)
 
         if DEBUG:
-            print "Starting MessageServer on ports %d (unencrypted) and %d (SSL-encrypted)" % (myPort, mySSLPort)
+            print "Connection %s lost." % (conn.address,)
+            print "%d users are currently logged on. (3)" % len(self.connections)
+
+    def RemoveConnection(self, conn):
+        """ Remove a connection from the connection list and the indexes and close it """
+        if self.connections.has_key(conn.address):
+            del(self.connections[conn.address])
+        self.RemoveFromIndexes(conn)
+        conn.Close()
+
+    def RemoveFromIndexes(self, conn):
+        """ Remove a connection from the room and user name indexes """
+        # If the connection is in a room ...
+        if conn.room != None:
+            # ... remove it from the room
+            room = self.rooms.get(conn.room, set())
+            room.discard(conn)
+            # If the room is now empty, get rid of it
+            if len(room) == 0 and self.rooms.has_key(conn.room):
+                del(self.rooms[conn.room])
+        # If the user name belongs to this connection, remove it
+        if self.users.get(conn.name) is conn:
+            del(self.users[conn.name])
 
     def Report(self):
-        """ Report status in DEBUG Mode, but do some connection maintenance whether the Report
-            output is displayed or not """
-        
+        """ Report status in DEBUG Mode """
+
         if DEBUG and DEBUG2:
             print
             print "Report for %s:" % now()
-            print "Treads:"
-            for thr in threading.enumerate():
-                if isinstance(thr, listenerThread):
-                    print "Listener Thread", thr.port, thr.useSSL
-                if isinstance(thr, connectionThread):
-                    print "Connection Thread:", thr, self.connections[thr.address]['name']
             print "Connections:"
-            for c in self.connections:
-                print c, self.connections[c]['name'], self.connections[c]['dbHost'], self.connections[c]['dbName']
-            print
-
-        # Create an empty list to track existing threads
-        threadList = []
-        # for each existing thread ...
-        for thr in threading.enumerate():
-            # If this is a connection thread (not the Timer or the program's main thread) ...
-            if isinstance(thr, connectionThread):
-                # add this thread's address to the thread list
-                threadList.append(thr.address)
-
-        # Since we can't change the self.connections dictionary while iterating through it,
-        # initialize a list of the threads NOT found in the connections dictionary
-        threadsNotFound = []
-        # Iterate through the known connections
-        for c in self.connections:
-            # If we come across a connection not listed in the threads, we know a Mac crashed
-            # and didn't clean up after itself correctly.
-            if not c in threadList:
-
-                if DEBUG  and DEBUG2:
-                    print '------------------------------------'
-                    print c, 'not in', threadList
-                    print self.connections[c]
-                    print '------------------------------------'
-
-                # ... so add this connection to the list of connections not found
-                threadsNotFound.append(c)
-
-        # For each connection where we didn't find a thread ...
-        for c in threadsNotFound:
-            try:
-                # Broadcast the loss of the user to other users
-                data = 'D %s' % self.connections[c]['name']
-                # Broadcast the incoming message to others.  Loop through all existing connection threads.
-                for thr in threading.enumerate():
-                    # This "if" ensures that only communication threads are processed, not the main program thread
-                    if isinstance(thr, connectionThread):
-                        try:
-                            # pass the message to other threads.
-                            thr.BroadcastMessage('%s' % data, self.connections[thr.address]['name'], self.connections[thr.address]['dbHost'], self.connections[thr.address]['dbName'])
-                        except:
-                            if DEBUG and DEBUG2:
-                                print "Exception within a socket error"
-                            continue
-            except:
-                pass  # forget about sending the message if it won't be sent.
-
-            # ... delete the connetion record
-            del(self.connections[c])
-
-        if DEBUG and DEBUG2:
+            for c in self.connections.values():
+                print c.address, c.name, c.dbHost, c.dbName, c.outBytes
+            print "Rooms:"
+            for room in self.rooms:
+                print room, len(self.rooms[room])
             print
 
-        # Create a one-off Timer to call this method again at the appropriate interval
-        t = threading.Timer(checkInterval, self.Report)
-        # Start the timer
-        t.start()
-
     def KillAllThreads(self):
-        """ Kill all Connection and all Listener threads """
-        for thr in threading.enumerate():
-            if isinstance(thr, connectionThread):
-                # Tell the threads they should kill themselves when they get their next message
-                thr.CommitSuicide()
-            if isinstance(thr, listenerThread):
-                # Tell the threads they should kill themselves when they get their next message
-                thr.CommitSuicide()
-        
+        """ Stop the server thread, which closes all connections """
+        self.keepRunning = False
+
 if RUNASWINSERVICE:
 
     # See Chapter 18 of Hammond and Robinson's "Python Programming on Win32"
@@ -789,8 +842,9 @@ elif RUNASDAEMON:
 
     class MyDaemon(daemon.Daemon):
         def run(self):
-            while True:
-                self.dispatcher = dispatcher()
+            # Start the Message Server and wait for its server thread to finish
+            self.dispatcher = dispatcher()
+            self.dispatcher.serverThread.join()
 
     daemon = MyDaemon('/tmp/transanamessageserver.pid')
     if len(sys.argv) == 2:
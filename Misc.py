@@ -23,6 +23,8 @@ __author__ = 'David Woods <dwoods@transana.com>, Nathaniel Case'
 #import mx.DateTime
 import os, string, sys
 import TransanaGlobal
+# import Transana's Waveform Cache
+import WaveformCache
 
 #def datestr_to_dt(datestr):
 #    """Construct a DateTime object from a given date string.  This function
@@ -216,14 +218,9 @@ def convertMacFilename(filename):
 
 def GetWavefileName(mediaFile):
     """ Given a media file name, form the correct wave file name and see if that file already exists. """
-    # Separate the path from the file name
-    (path1, fn1) = os.path.split(mediaFile)
-    # Separate the file name from the extension
-    (fnroot1, ext1) = os.path.splitext(fn1)
-    # Determine the correct WAV file name
-    waveFilename = os.path.join(TransanaGlobal.configData.visualizationPath, fnroot1 + '.wav')
-    # Return the file name and whether it exists
-    return waveFilename, os.path.exists(waveFilename)
+    # The Waveform Cache names the WAV file for the media file's path, size, and modification time, and
+    # only reports it as existing if it is complete
+    return WaveformCache.GetWaveFilename(mediaFile)
 
 
 # There a problem in Python using string.strip() with strings encoded with UTF-8.
@@ -372,8 +372,8 @@ class NotesBrowser(wx.Dialog):  # (wx.MDIChildFrame)
             snapshotNode = tree.AppendItem(root, _("Snapshot"))
             tree.SetPyData(snapshotNode, DatabaseTreeTab._NodeData('SnapshotNode'))
 
-        # Get a list of all Notes from the Database
-        notes = DBInterface.list_of_all_notes(searchText=searchText)
+        # Get all Notes from the Database.  They are read as they are added to the tree, not all at once.
+        notes = DBInterface.iterate_all_notes(searchText=searchText)
         # Iterate through the list of notes
         for note in notes:
             if note['SeriesNum'] > 0:
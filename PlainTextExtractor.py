@@ -0,0 +1,277 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+
+#This program is free software; you can redistribute it and/or
+#modify it under the terms of the GNU General Public License
+#as published by the Free Software Foundation; either version 2
+#of the License, or (at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program; if not, write to the Free Software
+#Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+""" This module extracts the Plain Text of Documents, Transcripts, and Quotes directly from their stored text,
+    giving the same text the Rich Text control's GetValue() would, without loading the text into a control.
+    XML is read with a SAX handler that does not use wxPython, so it can be extracted in worker processes.
+    Legacy Rich Text Format data is read by PyRTFParser, which needs wxPython, in the current process. """
+
+__author__ = "David K. Woods <dwoods@transana.com>"
+
+# import Python's multiprocessing module
+import multiprocessing
+# import Python's Regular Expression module
+import re
+# import Python's sys module
+import sys
+# import Python's XML Sax handler
+import xml.sax
+import xml.sax.handler
+
+# The number of worker processes to use for extracting XML text.  0 extracts in the current process.
+PLAIN_TEXT_PROCESSES = 0
+
+# Time Codes are the Time Code character (TransanaConstants.TIMECODE_CHAR) followed by the hidden time code data.
+# They are not part of the Plain Text.
+TIMECODE_PATTERN = re.compile(u'\xa4<[\d]*>')
+
+
+class XMLToPlainTextHandler(xml.sax.handler.ContentHandler):
+    """ This handler collects the text of wxRichTextCtrl XML data the way the wxRichTextXMLHandler loads it:
+        paragraphs separated by newlines, symbols as their characters, and images taking up a position but
+        adding no text. """
+
+    def __init__(self):
+        """ Initialize the XML to Plain Text handler """
+        xml.sax.handler.ContentHandler.__init__(self)
+        # The text of each completed paragraph
+        self.paragraphs = []
+        # The pieces of the current paragraph, or None outside a paragraph
+        self.paragraph = None
+        # The text or symbol element being read, and its character data
+        self.element = None
+        self.data = []
+        # The number of images
+        self.images = 0
+
+    def startElement(self, name, attributes):
+        """ XML SAX - Handle the start of an XML element """
+        if name == u'paragraph':
+            self.paragraph = []
+        elif name in [u'text', u'symbol']:
+            self.element = name
+            self.data = []
+        elif name == u'image':
+            self.images += 1
+
+    def characters(self, data):
+        """ XML SAX - Handle the text between XML element tags.  This can arrive in several pieces. """
+        if self.element != None:
+            self.data.append(data)
+
+    def endElement(self, name):
+        """ XML SAX - Handle the end (close) of an XML element """
+        # Text and symbols outside of a paragraph aren't part of the document
+        if (name in [u'text', u'symbol']) and (self.paragraph != None):
+            data = u''.join(self.data)
+            if name == u'text':
+                # Like the wxRichTextXMLHandler, drop the newline the XML adds at the end of the text and the
+                # quotation marks put around text with leading or trailing spaces
+                if data[-1:] == u'\n':
+                    data = data[:-1]
+                if data[:1] == u'"':
+                    data = data[1:]
+                if data[-1:] == u'"':
+                    data = data[:-1]
+                self.paragraph.append(data)
+            # A symbol holds the character code of a single character
+            elif data.strip() != u'':
+                self.paragraph.append(unichr(int(data)))
+        elif (name == u'paragraph') and (self.paragraph != None):
+            self.paragraphs.append(u''.join(self.paragraph))
+            self.paragraph = None
+        if name in [u'text', u'symbol']:
+            self.element = None
+
+    def GetValue(self):
+        """ The text, time codes included, as the Rich Text control reports it """
+        return u'\n'.join(self.paragraphs)
+
+    def GetImageCount(self):
+        """ The number of images, which each take up one position in the Rich Text control """
+        return self.images
+
+
+class RTFToPlainTextCtrl(object):
+    """ A stand-in for the wxRichTextCtrl that PyRTFParser's RTFTowxRichTextCtrlParser writes into.  It keeps the
+        text and ignores the formatting. """
+
+    def __init__(self):
+        """ Initialize the RTF to Plain Text control """
+        # The pieces of text written so far
+        self.chunks = []
+        # The number of positions used, counting paragraph breaks and images
+        self.length = 0
+        # The number of images
+        self.images = 0
+
+    def WriteText(self, text):
+        """ Add text at the end of the document """
+        # PyRTFParser writes encoded strings as well as unicode
+        if not isinstance(text, unicode):
+            text = unicode(text, 'utf8', 'replace')
+        self.chunks.append(text)
+        self.length += len(text)
+
+    def Newline(self):
+        """ End the current paragraph """
+        self.chunks.append(u'\n')
+        self.length += 1
+
+    def WriteImage(self, image):
+        """ Images take up a position but add no text """
+        self.images += 1
+        self.length += 1
+
+    def GetLastPosition(self):
+        return self.length
+
+    def GetInsertionPoint(self):
+        # Text is only ever added at the end
+        return self.length
+
+    def SetInsertionPoint(self, pos):
+        pass
+
+    def IsEditable(self):
+        return True
+
+    def SetEditable(self, editable):
+        pass
+
+    def SetReadOnly(self, readOnly):
+        pass
+
+    def SetBasicStyle(self, style):
+        pass
+
+    def SetDefaultStyle(self, style):
+        pass
+
+    def BeginStyle(self, style):
+        pass
+
+    def EndStyle(self):
+        pass
+
+    def BeginURL(self, url):
+        pass
+
+    def EndURL(self):
+        pass
+
+    def GetValue(self):
+        """ The text, time codes included, as the Rich Text control reports it """
+        return u''.join(self.chunks)
+
+    def GetImageCount(self):
+        """ The number of images, which each take up one position in the Rich Text control """
+        return self.images
+
+
+def DataType(text):
+    """ Determine what kind of stored text we have, as the Transcript Editor does when loading it:
+        'transcript-less clip', 'xml', 'text', 'rtf', or None if it's not known """
+    if (len(text) == 0) or (text[:24] == '<(transcript-less clip)>'):
+        return 'transcript-less clip'
+    elif text[:5] == '<?xml':
+        return 'xml'
+    elif text[:4] == 'txt\n':
+        return 'text'
+    elif text[2:5] == 'rtf':
+        return 'rtf'
+    return None
+
+def _Result(ctrl):
+    """ Build the extraction results from an XMLToPlainTextHandler or RTFToPlainTextCtrl """
+    text = ctrl.GetValue()
+    # The length includes the time codes, which are in the control even though they aren't in the Plain Text
+    return (TIMECODE_PATTERN.sub(u'', text), len(text) + ctrl.GetImageCount())
+
+def ExtractXMLText(text):
+    """ Extract the Plain Text from wxRichTextCtrl XML.  Returns (Plain Text, length in characters). """
+    # The SAX parser wants the encoded XML
+    if isinstance(text, unicode):
+        text = text.encode('utf8')
+    handler = XMLToPlainTextHandler()
+    try:
+        xml.sax.parseString(text, handler)
+    # If the XML is damaged, keep what was read before the damage, as the Rich Text control does
+    except xml.sax.SAXException:
+        print "PlainTextExtractor.ExtractXMLText():  XML parsing failed"
+        print sys.exc_info()[1]
+        # Include the paragraph the damage was found in
+        if handler.paragraph != None:
+            handler.endElement(u'paragraph')
+    return _Result(handler)
+
+def ExtractRTFText(text):
+    """ Extract the Plain Text from Rich Text Format data.  This uses wxPython.  Returns (Plain Text, length in characters). """
+    # import Transana's RTF Parser, which imports wxPython
+    import PyRTFParser
+    # Transcripts decode RTF data before it is loaded
+    if isinstance(text, str):
+        try:
+            text = unicode(text, 'utf8')
+        except UnicodeDecodeError:
+            pass
+    ctrl = RTFToPlainTextCtrl()
+    PyRTFParser.RTFTowxRichTextCtrlParser(ctrl, buf=text, displayProgress=False)
+    return _Result(ctrl)
+
+def ExtractText(text):
+    """ Extract the Plain Text from the stored text of a Document, Transcript, or Quote.
+        Returns (Plain Text, length in characters). """
+    dataType = DataType(text)
+    if dataType == 'xml':
+        return ExtractXMLText(text)
+    elif dataType == 'rtf':
+        return ExtractRTFText(text)
+    elif dataType == 'text':
+        # Text files are loaded as they are, without the TXT indicator
+        text = text[4:]
+        if not isinstance(text, unicode):
+            text = unicode(text, 'utf8', 'replace')
+        return (TIMECODE_PATTERN.sub(u'', text), len(text))
+    # Transcript-less Clips, and text that can't be loaded, have no Plain Text
+    return (u'', 0)
+
+def ExtractTexts(texts, processes=PLAIN_TEXT_PROCESSES, callback=None):
+    """ Extract the Plain Text from each of a list of stored texts, using worker processes for XML if requested.
+        If callback is given, it is called after each text is extracted, so a GUI caller can stay responsive.
+        Returns a list of (Plain Text, length in characters) in the same order. """
+    results = [None] * len(texts)
+    # RTF needs wxPython, so it's always extracted here.  Everything else can be shared out.
+    sharedIndexes = [index for index in range(len(texts)) if DataType(texts[index]) != 'rtf']
+    # If we're using worker processes, and there's enough to share out ...
+    if (processes >= 2) and (len(sharedIndexes) >= processes):
+        pool = multiprocessing.Pool(processes)
+        try:
+            sharedResults = pool.imap(ExtractText, [texts[index] for index in sharedIndexes], max(1, len(sharedIndexes) / (processes * 4)))
+            for (index, result) in zip(sharedIndexes, sharedResults):
+                results[index] = result
+                if callback != None:
+                    callback()
+        finally:
+            pool.close()
+            pool.join()
+    # Extract whatever is left here
+    for index in range(len(texts)):
+        if results[index] == None:
+            results[index] = ExtractText(texts[index])
+            if callback != None:
+                callback()
+    return results
@@ -559,6 +559,9 @@ class ProcessSearch(object):
         includesOrOperator = False
         # We also need to keep track of what the Search Text terms are
         textSearchItems = []
+        # For each Text Search line, we track the search text, whether it is whole-word only, and the NOT flag,
+        # indexed by its position in countStrings, so we can look the terms up in the Text Index
+        textIndexTerms = {}
         # Initialize a list for strings to store SQL "COUNT" lines
         countStrings = []
         # Initialize a list to hold the Search Parameters.
@@ -631,6 +634,12 @@ class ProcessSearch(object):
                     includesText = True
                     # Remember the Text Search Term
                     textSearchItems.append(tempStr[20:tempStr.rfind('"')])
+                    # Remember what to look up in the Text Index for this line.  Only MySQL's Word Frequency search
+                    # matches whole words.  SQLite's matches any text, like the Search Dialog's.
+                    textIndexTerms[len(countStrings)] = (tempStr[20:tempStr.rfind('"')],
+                                                         (tempStr[:20] == 'Word Text contains "') and \
+                                                         (TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server', 'PyMySQL']),
+                                                         notFlag)
                     # Converting the Text Search Request into platform-appropriate SQL.
                     tempStr2 = "COUNT(CASE WHEN ("
                     # If we are working from Text Search from the Search Dialog ...
@@ -716,6 +725,41 @@ class ProcessSearch(object):
             tmpDlg.ShowModal()
             tmpDlg.Destroy()
 
+        # Rather than having the database scan the PlainText of every Document, Transcript, and Quote for each
+        # text term, we look the terms up in the Text Index to get the (usually small) set of items that could
+        # contain them.  Each COUNT line is then limited to those candidates, with the PlainText comparison
+        # still deciding the exact match.  When there is no OR operator, every term that isn't NOTted must be
+        # present, so the candidate sets can also limit the rows the query considers at all.
+        # Initialize the Text Index SQL for the COUNT lines and the WHERE clauses for Documents, Transcripts and Quotes
+        textIndexCountSQL = {'D' : {}, 'T' : {}, 'Q' : {}}
+        textIndexWhereSQL = {'D' : '', 'T' : '', 'Q' : ''}
+        # Items saved without Text Index entries (from XML Import, for example) are indexed in the background.  Until
+        # that's done, the Text Index could miss them, so the PlainText comparison does all the work.
+        if includesText and DBInterface.TextIndexReady():
+            # Define the record number fields for each object type
+            keyFields = {'D' : 'Doc.DocumentNum', 'T' : 'Tr.TranscriptNum', 'Q' : 'Q.QuoteNum'}
+            # For each text search line ...
+            for lineNum in textIndexTerms.keys():
+                (searchText, wholeWords, textNotFlag) = textIndexTerms[lineNum]
+                # ... for each object type ...
+                for objectType in keyFields.keys():
+                    # ... get the candidate items from the Text Index
+                    candidates = DBInterface.TextIndexCandidates(objectType, searchText, wholeWords)
+                    # If the Text Index can't narrow the search, we skip it and let PlainText decide.
+                    if candidates == None:
+                        continue
+                    # If nothing could match, we just need a condition that's always false
+                    if len(candidates) == 0:
+                        indexSQL = '(0 = 1)'
+                    else:
+                        candidates = list(candidates)
+                        candidates.sort()
+                        indexSQL = '(%s IN (%s))' % (keyFields[objectType], ', '.join(['%d' % num for num in candidates]))
+                    textIndexCountSQL[objectType][lineNum] = indexSQL
+                    # Without an OR operator, a term that isn't NOTted must be present for an item to be found
+                    if not (includesOrOperator or textNotFlag):
+                        textIndexWhereSQL[objectType] += 'AND %s ' % indexSQL
+
         # Before we continue, let's build the part of the query that implements the Document, Transcript, and
         # Collections selections
 
@@ -781,13 +825,13 @@ class ProcessSearch(object):
                 tempStr = ' '
 
             # Add the SQL "COUNT" Line and seperator to the Library/Document Query
-            documentSQL += countStrings[lineNum] + tempStr
+            documentSQL += self.AddTextIndexSQL(countStrings[lineNum], textIndexCountSQL['D'].get(lineNum)) + tempStr
             # Add the SQL "COUNT" Line and seperator to the Library/Episode Query
-            episodeSQL += countStrings[lineNum] + tempStr
+            episodeSQL += self.AddTextIndexSQL(countStrings[lineNum], textIndexCountSQL['T'].get(lineNum)) + tempStr
             # Add the SQL "COUNT" Line and seperator to the Collection/Quote Query
-            quoteSQL += countStrings[lineNum] + tempStr
+            quoteSQL += self.AddTextIndexSQL(countStrings[lineNum], textIndexCountSQL['Q'].get(lineNum)) + tempStr
             # Add the SQL "COUNT" Line and seperator to the Collection/Clip Query
-            clipSQL += countStrings[lineNum] + tempStr
+            clipSQL += self.AddTextIndexSQL(countStrings[lineNum], textIndexCountSQL['T'].get(lineNum)) + tempStr
             if not includesText:
                 # Add the SQL "COUNT" Line and seperator to the Whole Snapshot Query
                 wholeSnapshotSQL += countStrings[lineNum] + tempStr
@@ -809,6 +853,8 @@ class ProcessSearch(object):
         if len(self.documentList) > 0:
             # ... add the appropriate scoping SQL
             documentSQL += docSQL
+        # Limit the Documents to Text Index candidates, if appropriate
+        documentSQL += textIndexWhereSQL['D']
         documentSQL += 'GROUP BY Doc.LibraryNum, SeriesID, Doc.DocumentNum, DocumentID '
         # Add in the SQL "HAVING" Clause that was constructed above
         documentSQL += 'HAVING %s ' % havingStr
@@ -833,6 +879,8 @@ class ProcessSearch(object):
         if len(self.transcriptList) > 0:
             # ... add the appropriate scoping SQL
             episodeSQL += transSQL
+        # Limit the Transcripts to Text Index candidates, if appropriate
+        episodeSQL += textIndexWhereSQL['T']
         episodeSQL += 'GROUP BY Ep.SeriesNum, SeriesID, Ep.EpisodeNum, EpisodeID'
         if includesText:
             episodeSQL += ', Tr.TranscriptNum, TranscriptID'
@@ -852,6 +900,8 @@ class ProcessSearch(object):
             quoteSQL += 'AND (CK1.QuoteNum > 0) '
         if len(self.collectionList) > 0:
             quoteSQL += collectionSQL % paramsQ
+        # Limit the Quotes to Text Index candidates, if appropriate
+        quoteSQL += textIndexWhereSQL['Q']
         quoteSQL += 'GROUP BY Q.CollectNum, CollectID, Q.QuoteNum, QuoteID '
         # Add in the SQL "HAVING" Clause that was constructed above
         quoteSQL += 'HAVING %s ' % havingStr
@@ -875,6 +925,8 @@ class ProcessSearch(object):
             clipSQL += 'AND (Tr.ClipNum = Cl.ClipNum) '
         if len(self.collectionList) > 0:
             clipSQL += collectionSQL % paramsCl
+        # Limit the Clip Transcripts to Text Index candidates, if appropriate
+        clipSQL += textIndexWhereSQL['T']
         clipSQL += 'GROUP BY Cl.CollectNum, CollectID, Cl.ClipNum, ClipID '
         # Add in the SQL "HAVING" Clause that was constructed above
         clipSQL += 'HAVING %s ' % havingStr
@@ -944,6 +996,15 @@ class ProcessSearch(object):
         # and the list of parameters to use with these queries to the calling routine.
         return (documentSQL, episodeSQL, quoteSQL, clipSQL, wholeSnapshotSQL, snapshotCodingSQL, params, textSearchItems)
 
+    def AddTextIndexSQL(self, countString, indexSQL):
+        """ Add a Text Index candidate condition to a Text Search "COUNT" line so the PlainText is only
+            examined for items the Text Index says could match """
+        # If there is no Text Index condition for this line, leave it alone
+        if indexSQL == None:
+            return countString
+        # Otherwise, insert the condition ahead of the PlainText comparison
+        return countString.replace('COUNT(CASE WHEN (', 'COUNT(CASE WHEN (%s AND ' % indexSQL, 1)
+
     def GetNodeList(self, dataTree, dataNode, nodeType):
         """ Recursively builds a list of all nodes for the Word Frequency Text Search searchScope Node
             and appropriate child nodes which match nodeType """
@@ -261,6 +261,42 @@ class Quote(DataObject.DataObject):
         # Close the database cursor
         c.close()
 
+    def load_many(cls, nums, skipText=False, objectCache=None):
+        """ Load a list of Quotes, with their keywords, in a few queries rather than two queries per Quote.
+            objectCache is an optional identity map (see DataObject.load_cached()) shared with other loads.
+            Returns a dictionary of the Quotes found, keyed by Quote Number. """
+        # If we're skipping the XML Text ...
+        if skipText:
+            # Define the query to load Quotes without text
+            query = """SELECT a.QuoteNum, QuoteID, a.CollectNum, CollectID, SourceDocumentNum, SortOrder, a.Comment,
+                              StartChar, EndChar,
+                              a.RecordLock, a.LockTime, LastSaveTime
+                         FROM Quotes2 a, QuotePositions2 b, Collections2 c
+                         WHERE a.QuoteNum IN (%s) AND
+                               a.QuoteNum = b.QuoteNum AND
+                               a.CollectNum = c.CollectNum
+                    """
+        # If we're NOT skipping the XML Text ...
+        else:
+            # Define the query to load Quotes with everything
+            query = """SELECT a.QuoteNum, QuoteID, a.CollectNum, CollectID, SourceDocumentNum, SortOrder, a.Comment,
+                              StartChar, EndChar,
+                              XMLText, PlainText, a.RecordLock, a.LockTime, LastSaveTime
+                         FROM Quotes2 a, QuotePositions2 b, Collections2 c
+                         WHERE a.QuoteNum IN (%s) AND
+                               a.QuoteNum = b.QuoteNum AND
+                               a.CollectNum = c.CollectNum
+                    """
+        (quotes, loaded) = cls._load_many_rows(nums, query, objectCache, needText=not skipText, skipText=skipText)
+        keywords = DBInterface.dict_of_keywords('Quote', [quote.number for quote in loaded])
+        for quote in loaded:
+            quote._load_keywords(keywords[quote.number])
+            # ... set up data structures needed for editing large paragraphs, as loading a single Quote does
+            quote.UpdateParagraphs()
+        return quotes
+    # Make load_many() a class method
+    load_many = classmethod(load_many)
+
     def UpdateParagraphs(self):
         """ This method divides XML text up into paragraphs, needed for editing LONG documents """
         # Initialize (or re-initialize) the paragraph pointers dictionary
@@ -544,6 +580,8 @@ class Quote(DataObject.DataObject):
             raise SaveError, prompt
         # If there's no error prompt ...
         else:
+            # Update the Quote's Text Index entries
+            DBInterface.UpdateTextIndex('Q', self.number, self.plaintext, c)
             # ... Commit the database transaction
             if use_transactions:
                 c.execute('COMMIT')
@@ -581,6 +619,10 @@ class Quote(DataObject.DataObject):
             if result:
                 DBInterface.delete_all_keywords_for_a_group(0, 0, 0, self.number, 0)
 
+            # Remove the Quote from the Text Index
+            if result:
+                DBInterface.DeleteTextIndex('Q', self.number, c)
+
             # Delete the actual record.
             self._db_do_delete(use_transactions, c, result)
 
@@ -620,8 +662,11 @@ class Quote(DataObject.DataObject):
         
     def refresh_keywords(self):
         """Clear the keyword list and refresh it from the database."""
+        self._load_keywords(DBInterface.list_of_keywords(Quote=self.number))
+
+    def _load_keywords(self, kwpairs):
+        """Replace the keyword list with the keyword data from the database."""
         self._kwlist = []
-        kwpairs = DBInterface.list_of_keywords(Quote=self.number)
         for data in kwpairs:
             tempClipKeyword = ClipKeywordObject.ClipKeyword(data[0], data[1], quoteNum=self.number, example=data[2])
             self._kwlist.append(tempClipKeyword)
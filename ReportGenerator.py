@@ -984,6 +984,17 @@ class ReportGenerator(wx.Object):
                 #     behind Transana!)
                 progress = wx.ProgressDialog(self.title, _('Assembling report contents'), parent=self.report)
 
+            # Load all the report's objects up front, a few queries per object type rather than several per object.
+            # objectCache is an identity map, so Collections, Episodes, Documents, and Transcripts that several
+            # items share are only loaded once.
+            objectCache = {}
+            Quote.Quote.load_many([item[1] for item in majorList if item[0] == 'Quote'], objectCache=objectCache)
+            Clip.Clip.load_many([item[1] for item in majorList if item[0] == 'Clip'], objectCache=objectCache, loadEpisodes=True)
+            Snapshot.Snapshot.load_many([item[1] for item in majorList if item[0] == 'Snapshot'], objectCache=objectCache)
+            Episode.Episode.load_many([item[1] for item in majorList if item[0] == 'Episode'], objectCache=objectCache)
+            # Document Reports don't use the Document text
+            Document.Document.load_many([item[1] for item in majorList if item[0] == 'Document'], skipText=True, objectCache=objectCache)
+
             # Iterate through the major list
             for (objType, groupNo, group, parentCollNo) in majorList:
 
@@ -1032,14 +1043,14 @@ class ReportGenerator(wx.Object):
                     # If we have Collection-based data ...
                     if (self.collection != None) or ((self.searchColl != None) and (self.treeCtrl != None)):
                         # ... load the collection the current clip is in
-                        tempColl = Collection.Collection(parentCollNo)
+                        tempColl = Collection.Collection.load_cached(parentCollNo, objectCache)
 
                         # Check to see if we're showing Collection headers, if we're showing nested collections (since
                         # there's no point showing collection headers if there aren't different collections!), and
                         # see if the new collection is different from the collection of the last clip displayed.
                         if (workingCollection != '') and \
                            (self.showNested or self.showComments or self.showCollectionNotes) and \
-                           (workingCollection[0] != tempColl.GetNodeString()):
+                           (workingCollection[0] != tempColl.GetNodeString(objectCache)):
                             # Format text for the next section of the report
                             reportText.SetTxtStyle(fontSize=12, fontBold=useBold, fontUnderline=False,
                                                    parAlign = wx.TEXT_ALIGNMENT_LEFT,
@@ -1048,7 +1059,7 @@ class ReportGenerator(wx.Object):
                             # Add the Collections header and data to the report
                             reportText.WriteText(_('Collection: '))
 #                            reportText.SetTxtStyle(fontBold=False)
-                            reportText.WriteText('%s\n' % tempColl.GetNodeString())
+                            reportText.WriteText('%s\n' % tempColl.GetNodeString(objectCache))
                             
                             # If we are supposed to show Comments ...
                             if self.showComments:
@@ -1092,7 +1103,7 @@ class ReportGenerator(wx.Object):
 #                                        reportText.Newline()
                             # Update the workingCollection variable with the data for the current collection so we'll
                             # be able to tell when the collection changes
-                            workingCollection = (tempColl.GetNodeString(), tempColl.number)
+                            workingCollection = (tempColl.GetNodeString(objectCache), tempColl.number)
                             
                             # We need to indent EVERYTHING else to adjust for these headers
                             baseIndent = 63
@@ -1152,26 +1163,26 @@ class ReportGenerator(wx.Object):
                         reportText.WriteText(_('Collection:'))
                         reportText.SetTxtStyle(fontBold = False)
                         # Add the data to the report, the full Collection path in this case
-                        reportText.WriteText('  %s\n' % (tempColl.GetNodeString(),))
+                        reportText.WriteText('  %s\n' % (tempColl.GetNodeString(objectCache),))
                         # If we're looking at a Quote ...
                         if objType == 'Quote':
                             # Get the full Quote data
-                            quoteObj = Quote.Quote(groupNo)
+                            quoteObj = Quote.Quote.load_cached(groupNo, objectCache)
                             tmpObj = quoteObj
                             try:
                                 # If we have a Quote, load the Source Document!
-                                tmpDoc = Document.Document(num=tmpObj.source_document_num)
+                                tmpDoc = Document.Document.load_cached(tmpObj.source_document_num, objectCache, skipText=True)
                             except TransanaExceptions.RecordNotFoundError:
                                 tmpDoc = None
                         # If we're looking at a Clip ...
                         elif objType == 'Clip':
                             # Get the full Clip data
-                            clipObj = Clip.Clip(groupNo)
+                            clipObj = Clip.Clip.load_cached(groupNo, objectCache)
                             tmpObj = clipObj
                         # If we're looking at a Snapshot ...
                         elif objType == 'Snapshot':
                             # Get the full Snapshot data
-                            snapshotObj = Snapshot.Snapshot(groupNo, suppressEpisodeError = True)
+                            snapshotObj = Snapshot.Snapshot.load_cached(groupNo, objectCache, suppressEpisodeError = True)
                             tmpObj = snapshotObj
                         # If we're supposed to show the Media File Name ...
                         if self.showFile:
@@ -1370,7 +1381,7 @@ class ReportGenerator(wx.Object):
                                             if tr.source_transcript > 0:
                                                 # ... try to load that source transcript
                                                 # To save time here, we can skip loading the actual transcript text, which can take time once we start dealing with images!
-                                                episodeTranscriptObj = Transcript.Transcript(tr.source_transcript, skipText=True)
+                                                episodeTranscriptObj = Transcript.Transcript.load_cached(tr.source_transcript, objectCache, skipText=True)
                                         # if the record is not found (orphaned Clip)
                                         except TransanaExceptions.RecordNotFoundError:
                                             # We don't need to do anything.
@@ -1670,7 +1681,7 @@ class ReportGenerator(wx.Object):
                     else:
                         if objType == 'Episode':
                             # Get the full Episode data
-                            tmpObj = Episode.Episode(groupNo)
+                            tmpObj = Episode.Episode.load_cached(groupNo, objectCache)
                             fileName = tmpObj.media_filename
                             addFiles = tmpObj.additional_media_files
                             # Get the Episode's Transcript records
@@ -1710,7 +1721,7 @@ class ReportGenerator(wx.Object):
                                 reportText.SetTxtStyle(fontBold = False)
 
                         elif objType == 'Document':
-                            tmpObj = Document.Document(groupNo)
+                            tmpObj = Document.Document.load_cached(groupNo, objectCache, skipText=True)
                             fileName = tmpObj.imported_file
                             addFiles = []
                         # If we're supposed to show the Media File Name ...
@@ -1998,6 +2009,14 @@ class ReportGenerator(wx.Object):
                 except:
                     tmpDoc = None
 
+            # Load all the report's objects up front, a few queries per object type rather than several per object.
+            # objectCache is an identity map, so Collections, Episodes, and Transcripts that several items share
+            # are only loaded once.
+            objectCache = {}
+            Quote.Quote.load_many([item['QuoteNum'] for item in majorList if item['Type'] == 'Quote'], objectCache=objectCache)
+            Clip.Clip.load_many([item['ClipNum'] for item in majorList if item['Type'] == 'Clip'], objectCache=objectCache, loadEpisodes=True)
+            Snapshot.Snapshot.load_many([item['SnapshotNum'] for item in majorList if item['Type'] == 'Snapshot'], objectCache=objectCache)
+
             # Iterate through the major list
             for itemRecord in majorList:
                 if itemRecord['Type'] == 'Quote':
@@ -2006,25 +2025,25 @@ class ReportGenerator(wx.Object):
                     filterList = self.quoteFilterList
                     prompt = _('Quote')
                     # Load the Quote Object
-                    tmpObj = Quote.Quote(num=itemRecord['QuoteNum'])
+                    tmpObj = Quote.Quote.load_cached(itemRecord['QuoteNum'], objectCache)
                 elif itemRecord['Type'] == 'Clip':
                     # our Filter comparison is based on Clip data
                     filterVal = (itemRecord['ClipID'], itemRecord['CollectNum'], True)
                     filterList = self.filterList
                     prompt = _('Clip')
                     # Load the Clip Object
-                    tmpObj = Clip.Clip(itemRecord['ClipNum'])
+                    tmpObj = Clip.Clip.load_cached(itemRecord['ClipNum'], objectCache)
                 elif itemRecord['Type'] == 'Snapshot':
                     # our Filter comparison is based on Clip data
                     filterVal = (itemRecord['SnapshotID'], itemRecord['CollectNum'], True)                    
                     filterList = self.snapshotFilterList
                     prompt = _('Snapshot')
                     # Load the Snapshot Object
-                    tmpObj = Snapshot.Snapshot(itemRecord['SnapshotNum'], suppressEpisodeError = True)
+                    tmpObj = Snapshot.Snapshot.load_cached(itemRecord['SnapshotNum'], objectCache, suppressEpisodeError = True)
                 # now that we have the filter comparison data, we see if it's actually in the Filter List.
                 if filterVal in filterList:
                     # First, load the collection the current clip is in
-                    collectionObj = Collection.Collection(itemRecord['CollectNum'])
+                    collectionObj = Collection.Collection.load_cached(itemRecord['CollectNum'], objectCache)
                     # Set the font for the heading.
                     reportText.SetTxtStyle(fontSize = 12, fontBold = True)
                     reportText.SetTxtStyle(parAlign = wx.TEXT_ALIGNMENT_LEFT,
@@ -2066,7 +2085,7 @@ class ReportGenerator(wx.Object):
                     # Turn bold off.
                     reportText.SetTxtStyle(fontBold = False)
                     # Add the data to the report, the full Collection path in this case
-                    reportText.WriteText('  %s\n' % (collectionObj.GetNodeString(),))
+                    reportText.WriteText('  %s\n' % (collectionObj.GetNodeString(objectCache),))
 #                    reportText.Newline()
 
                     # If we're supposed to show Media File name information ...
@@ -2256,7 +2275,7 @@ class ReportGenerator(wx.Object):
                                         if tr.source_transcript > 0:
                                             # ... try to load that source transcript
                                             # To save time here, we can skip loading the actual transcript text, which can take time once we start dealing with images!
-                                            episodeTranscriptObj = Transcript.Transcript(tr.source_transcript, skipText=True)
+                                            episodeTranscriptObj = Transcript.Transcript.load_cached(tr.source_transcript, objectCache, skipText=True)
                                     # if the record is not found (orphaned Clip)
                                     except TransanaExceptions.RecordNotFoundError:
                                         # We don't need to do anything.
@@ -18,6 +18,8 @@
 
 __author__ = 'David K. Woods <dwoods@transana.com>'
 
+# import Python's itertools module
+import itertools
 # import the Python String module
 import string
 # import wxPython
@@ -159,21 +161,18 @@ class ReportGenerator(wx.Object):
         # If a Root Node flag is passed in ...
         if self.reportType == 'RootNode':
             # ... we want to group notes by category.  (They will be alphabetical within each category.)
-            majorList = DBInterface.list_of_all_notes(reportType='LibraryNode', searchText=self.searchText)
             if TransanaConstants.proVersion:
-                majorList += DBInterface.list_of_all_notes(reportType='DocumentNode', searchText=self.searchText)
-            majorList += DBInterface.list_of_all_notes(reportType='EpisodeNode', searchText=self.searchText)
-            majorList += DBInterface.list_of_all_notes(reportType='TranscriptNode', searchText=self.searchText)
-            majorList += DBInterface.list_of_all_notes(reportType='CollectionNode', searchText=self.searchText)
-            if TransanaConstants.proVersion:
-                majorList += DBInterface.list_of_all_notes(reportType='QuoteNode', searchText=self.searchText)
-            majorList += DBInterface.list_of_all_notes(reportType='ClipNode', searchText=self.searchText)
-            if TransanaConstants.proVersion:
-                majorList += DBInterface.list_of_all_notes(reportType='SnapshotNode', searchText=self.searchText)
+                reportTypes = ['LibraryNode', 'DocumentNode', 'EpisodeNode', 'TranscriptNode', 'CollectionNode',
+                               'QuoteNode', 'ClipNode', 'SnapshotNode']
+            else:
+                reportTypes = ['LibraryNode', 'EpisodeNode', 'TranscriptNode', 'CollectionNode', 'ClipNode']
+            # The Notes are read from the database category by category as the report is built, not all at once
+            majorList = itertools.chain(*[DBInterface.iterate_all_notes(reportType=reportType, searchText=self.searchText)
+                                          for reportType in reportTypes])
         # if a specific Node flag is passed in ...
         else:
             # ... and use the Notes from the requested Report Type for the majorList. 
-            majorList = DBInterface.list_of_all_notes(reportType=self.reportType, searchText=self.searchText)
+            majorList = DBInterface.iterate_all_notes(reportType=self.reportType, searchText=self.searchText)
 
         # Initialize the initial data structure that will be turned into the report
         self.data = []
@@ -396,13 +396,9 @@ class RichTextEditCtrl(richtext.RichTextCtrl):
         else:
             plaintext = self.GetValue()
 
-        # Strip Time Codes
+        # Strip Time Codes.  One pass with the regular expression, rather than rebuilding the string for each time code.
         regex = "%s<[\d]*>" % TransanaConstants.TIMECODE_CHAR
-        reg = re.compile(regex)
-        pos = 0
-        for x in reg.findall(plaintext):
-            pos = plaintext.find(x, pos, len(plaintext))
-            plaintext = plaintext[ : pos] + plaintext[pos + len(x) : ]
+        plaintext = re.sub(regex, '', plaintext)
 
         return plaintext
 
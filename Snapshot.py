@@ -209,20 +209,8 @@ class Snapshot(DataObject.DataObject):
         query = DBInterface.FixQuery(query)
         # Execute the query
         c.execute(query, (num, ))
-        # Get the query results
-        results = c.fetchall()
-        # Initialize the counter
-        counter = 0
-        # Put the results into the Snapshot Object
-        for (SnapshotNum, KeywordGroup, Keyword, x1, y1, x2, y2, visible) in results:
-            self.codingObjects[counter] = {'x1'             :  x1,
-                                         'y1'             :  y1,
-                                         'x2'             :  x2,
-                                         'y2'             :  y2,
-                                         'keywordGroup'   :  DBInterface.ProcessDBDataForUTF8Encoding(KeywordGroup),
-                                         'keyword'        :  DBInterface.ProcessDBDataForUTF8Encoding(Keyword),
-                                         'visible'        :  visible == '1'}
-            counter += 1
+        # Put the query results into the Snapshot Object
+        self._load_coding_objects(c.fetchall())
         # Create a Query to get the keywordStyles
         query = """ SELECT SnapshotNum, KeywordGroup, Keyword, DrawMode, LineColorName, LineColorDef, LineWidth, LineStyle
                       FROM SnapshotKeywordStyles2
@@ -231,16 +219,8 @@ class Snapshot(DataObject.DataObject):
         query = DBInterface.FixQuery(query)
         # Execute the query
         c.execute(query, (num, ))
-        # Get the query results
-        results = c.fetchall()
-        # Put the results into the Snapshot Object
-        for (SnapshotNum, KeywordGroup, Keyword, DrawMode, LineColorName, LineColorDef, LineWidth, LineStyle) in results:
-            self.keywordStyles[(DBInterface.ProcessDBDataForUTF8Encoding(KeywordGroup), DBInterface.ProcessDBDataForUTF8Encoding(Keyword))] = \
-                { 'drawMode'       :  DrawMode,
-                  'lineColorName'  :  DBInterface.ProcessDBDataForUTF8Encoding(LineColorName),
-                  'lineColorDef'   :  LineColorDef,
-                  'lineWidth'      :  "%d" % LineWidth,
-                  'lineStyle'      :  LineStyle  }
+        # Put the query results into the Snapshot Object
+        self._load_keyword_styles(c.fetchall())
 
         # Close the database cursor
         c.close()
@@ -309,20 +289,8 @@ class Snapshot(DataObject.DataObject):
         query = DBInterface.FixQuery(query)
         # Execute the query
         c.execute(query, (self.number, ))
-        # Get the query results
-        results = c.fetchall()
-        # Initialize the counter
-        counter = 0
-        # Put the results into the Snapshot Object
-        for (SnapshotNum, KeywordGroup, Keyword, x1, y1, x2, y2, visible) in results:
-            self.codingObjects[counter] = {'x1'             :  x1,
-                                         'y1'             :  y1,
-                                         'x2'             :  x2,
-                                         'y2'             :  y2,
-                                         'keywordGroup'   :  DBInterface.ProcessDBDataForUTF8Encoding(KeywordGroup),
-                                         'keyword'        :  DBInterface.ProcessDBDataForUTF8Encoding(Keyword),
-                                         'visible'        :  visible == '1'}
-            counter += 1
+        # Put the query results into the Snapshot Object
+        self._load_coding_objects(c.fetchall())
         # Create a Query to get the keywordStyles
         query = """ SELECT SnapshotNum, KeywordGroup, Keyword, DrawMode, LineColorName, LineColorDef, LineWidth, LineStyle
                       FROM SnapshotKeywordStyles2
@@ -331,21 +299,64 @@ class Snapshot(DataObject.DataObject):
         query = DBInterface.FixQuery(query)
         # Execute the query
         c.execute(query, (self.number, ))
-        # Get the query results
-        results = c.fetchall()
-        # Put the results into the Snapshot Object
-        for (SnapshotNum, KeywordGroup, Keyword, DrawMode, LineColorName, LineColorDef, LineWidth, LineStyle) in results:
-            self.keywordStyles[(DBInterface.ProcessDBDataForUTF8Encoding(KeywordGroup), DBInterface.ProcessDBDataForUTF8Encoding(Keyword))] = \
-                { 'drawMode'       :  DrawMode,
-                  'lineColorName'  :  DBInterface.ProcessDBDataForUTF8Encoding(LineColorName),
-                  'lineColorDef'   :  LineColorDef,
-                  'lineWidth'      :  "%d" % LineWidth,
-                  'lineStyle'      :  LineStyle  }
+        # Put the query results into the Snapshot Object
+        self._load_keyword_styles(c.fetchall())
 
         # Close the database cursor
         c.close()
         self._sync_snapshot()
 
+    def load_many(cls, nums, objectCache=None):
+        """ Load a list of Snapshots, with their keywords, coding, and keyword styles, in a few queries rather than
+            several queries per Snapshot.  The Collections, Episodes, and Transcripts the Snapshots refer to are
+            loaded once each.  objectCache is an optional identity map (see DataObject.load_cached()) shared with
+            other loads.  As with suppressEpisodeError, missing Context Episodes are not reported.  Returns a
+            dictionary of the Snapshots found, keyed by Snapshot Number. """
+        query = """
+        SELECT *
+          FROM Snapshots2 a
+          WHERE a.SnapshotNum IN (%s)
+        """
+        (snapshots, loaded) = cls._load_many_rows(nums, query, objectCache, suppressEpisodeError=True)
+        loadedNums = [snapshot.number for snapshot in loaded]
+        keywords = DBInterface.dict_of_keywords('Snapshot', loadedNums)
+        for snapshot in loaded:
+            snapshot._load_keywords(keywords[snapshot.number])
+        # Get the coding and keyword styles for all the Snapshots
+        codingRows = {}
+        styleRows = {}
+        for num in loadedNums:
+            codingRows[num] = []
+            styleRows[num] = []
+        c = DBInterface.get_db().cursor()
+        for numList in DBInterface.NumberLists(loadedNums):
+            query = """ SELECT SnapshotNum, KeywordGroup, Keyword, x1, y1, x2, y2, visible
+                          FROM SnapshotKeywords2
+                          WHERE SnapshotNum IN (%s) """ % numList
+            c.execute(query)
+            for row in c.fetchall():
+                codingRows[row[0]].append(row)
+            query = """ SELECT SnapshotNum, KeywordGroup, Keyword, DrawMode, LineColorName, LineColorDef, LineWidth, LineStyle
+                          FROM SnapshotKeywordStyles2
+                          WHERE SnapshotNum IN (%s) """ % numList
+            c.execute(query)
+            for row in c.fetchall():
+                styleRows[row[0]].append(row)
+        c.close()
+        # Load the Episodes and Transcripts the Snapshots refer to, so each is loaded only once
+        if objectCache == None:
+            objectCache = {}
+        Episode.Episode.load_many([snapshot.episode_num for snapshot in loaded if snapshot.episode_num > 0], objectCache=objectCache)
+        Transcript.Transcript.load_many([snapshot.transcript_num for snapshot in loaded if snapshot.transcript_num > 0],
+                                        skipText=True, objectCache=objectCache)
+        for snapshot in loaded:
+            snapshot._load_coding_objects(codingRows[snapshot.number])
+            snapshot._load_keyword_styles(styleRows[snapshot.number])
+            snapshot._sync_snapshot(objectCache)
+        return snapshots
+    # Make load_many() a class method
+    load_many = classmethod(load_many)
+
     def db_save(self, use_transactions=True):
         """Save the record to the database using Insert or Update as appropriate."""
 
@@ -785,8 +796,11 @@ class Snapshot(DataObject.DataObject):
         
     def refresh_keywords(self):
         """Clear the keyword list and refresh it from the database."""
+        self._load_keywords(DBInterface.list_of_keywords(Snapshot=self.number))
+
+    def _load_keywords(self, kwpairs):
+        """Replace the keyword list with the keyword data from the database."""
         self._kwlist = []
-        kwpairs = DBInterface.list_of_keywords(Snapshot=self.number)
         for data in kwpairs:
             tempClipKeyword = ClipKeywordObject.ClipKeyword(data[0], data[1], snapshotNum=self.number)
             self._kwlist.append(tempClipKeyword)
@@ -915,12 +929,39 @@ class Snapshot(DataObject.DataObject):
         if self.useVideoRoot:
             self.image_filename = TransanaGlobal.configData.videoPath.replace('\\', '/') + self.image_filename
 
-    def _sync_snapshot(self):
-        """Synchronize the Snapshot's Collection, Episode, and Transcript properties, if needed."""
+    def _load_coding_objects(self, rows):
+        """Add coding objects from SnapshotKeywords2 database rows."""
+        # Initialize the counter
+        counter = 0
+        # Put the results into the Snapshot Object
+        for (SnapshotNum, KeywordGroup, Keyword, x1, y1, x2, y2, visible) in rows:
+            self.codingObjects[counter] = {'x1'             :  x1,
+                                         'y1'             :  y1,
+                                         'x2'             :  x2,
+                                         'y2'             :  y2,
+                                         'keywordGroup'   :  DBInterface.ProcessDBDataForUTF8Encoding(KeywordGroup),
+                                         'keyword'        :  DBInterface.ProcessDBDataForUTF8Encoding(Keyword),
+                                         'visible'        :  visible == '1'}
+            counter += 1
+
+    def _load_keyword_styles(self, rows):
+        """Add keyword styles from SnapshotKeywordStyles2 database rows."""
+        # Put the results into the Snapshot Object
+        for (SnapshotNum, KeywordGroup, Keyword, DrawMode, LineColorName, LineColorDef, LineWidth, LineStyle) in rows:
+            self.keywordStyles[(DBInterface.ProcessDBDataForUTF8Encoding(KeywordGroup), DBInterface.ProcessDBDataForUTF8Encoding(Keyword))] = \
+                { 'drawMode'       :  DrawMode,
+                  'lineColorName'  :  DBInterface.ProcessDBDataForUTF8Encoding(LineColorName),
+                  'lineColorDef'   :  LineColorDef,
+                  'lineWidth'      :  "%d" % LineWidth,
+                  'lineStyle'      :  LineStyle  }
+
+    def _sync_snapshot(self, objectCache=None):
+        """Synchronize the Snapshot's Collection, Episode, and Transcript properties, if needed.  objectCache is
+        an optional identity map (see DataObject.load_cached()) for the Collection, Episode, and Transcript."""
         # If there is a Collection Number ...
         if self.collection_num > 0:
             # ... load the Collection
-            tempCollection = Collection.Collection(self.collection_num)
+            tempCollection = Collection.Collection.load_cached(self.collection_num, objectCache)
             # ... and grab the Collection ID
             self.collection_id = tempCollection.id
         # If there is an Episode Number ...
@@ -928,7 +969,7 @@ class Snapshot(DataObject.DataObject):
             # Start Exception Handling
             try:
                 # Load the Episode
-                tempEpisode = Episode.Episode(self.episode_num)
+                tempEpisode = Episode.Episode.load_cached(self.episode_num, objectCache)
                 # Get the Episode ID and the Library Information
                 self.episode_id = tempEpisode.id
                 self.series_num = tempEpisode.series_num
@@ -978,7 +1019,7 @@ class Snapshot(DataObject.DataObject):
             # Start Exception Handling
             try:
                 # Try to load the Transcript.  (Don't need text)
-                tempTranscript = Transcript.Transcript(self.transcript_num, skipText=True)
+                tempTranscript = Transcript.Transcript.load_cached(self.transcript_num, objectCache, skipText=True)
                 # If loaded, get the ID
                 self.transcript_id = tempTranscript.id
             # If the Transcript cannot be loaded ...
@@ -0,0 +1,284 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+
+#This program is free software; you can redistribute it and/or
+#modify it under the terms of the GNU General Public License
+#as published by the Free Software Foundation; either version 2
+#of the License, or (at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program; if not, write to the Free Software
+#Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+""" This module builds the manifests the File Management window uses to synchronize directory trees.  A manifest
+    lists every directory and file in a tree, with each file's size, modification time, and (optionally) a checksum
+    of its contents.  The manifests of the source and destination are compared in memory to find the files that
+    need to be copied or deleted.  Manifests are cached between runs so checksums are only calculated again for
+    files that have changed.  This module does not use wxPython. """
+
+__author__ = "David K. Woods <dwoods@transana.com>"
+
+# import Python's hashlib module
+import hashlib
+# import Python's json module
+import json
+# import Python's os module
+import os
+# import Python's Queue module
+import Queue
+# import Python's stat module
+import stat
+# import Python's threading module
+import threading
+
+# import paramiko for sFTP functionality
+import paramiko
+
+# The name of the manifest cache file
+CACHE_NAME = 'SyncManifests.cache'
+# The number of simultaneous sFTP streams used to list a remote directory tree
+SCAN_STREAMS = 8
+# The size of the blocks read when calculating checksums
+HASH_BLOCK_SIZE = 1048576
+# Modification times within this many seconds are considered the same.  (FAT file systems only record even seconds.)
+MTIME_TOLERANCE = 2
+# Partially transferred files (see sFTPFileTransfer) are not part of the tree
+PARTIAL_SUFFIX = '.part'
+
+def IsExcluded(name):
+    """ Hidden system files and directories (starting with a dot), and partially transferred files, are left out
+        of manifests on both local and remote trees, as the File Management window leaves them out of its lists """
+    return (name[0] in [u'.', u'/']) or name.endswith(PARTIAL_SUFFIX)
+
+def LocalKey(root):
+    """ The manifest cache key for a local directory tree """
+    return u'local:' + os.path.normcase(os.path.abspath(root))
+
+def RemoteKey(transport, root):
+    """ The manifest cache key for a directory tree on an sFTP Server """
+    (host, port) = transport.getpeername()[:2]
+    return u'sftp://%s@%s:%s%s' % (transport.get_username(), host, port, root)
+
+def LoadCachedManifest(cacheDir, key):
+    """ Get the cached manifest for a directory tree, or None if there isn't one """
+    try:
+        f = open(os.path.join(cacheDir, CACHE_NAME), 'rb')
+        try:
+            return json.load(f).get(key)
+        finally:
+            f.close()
+    # If the cache can't be read, we just don't have a cached manifest
+    except (IOError, ValueError):
+        return None
+
+def SaveCachedManifest(cacheDir, key, manifest):
+    """ Save the manifest for a directory tree in the cache """
+    cacheFilename = os.path.join(cacheDir, CACHE_NAME)
+    tempFilename = cacheFilename + '.tmp'
+    try:
+        try:
+            f = open(cacheFilename, 'rb')
+            try:
+                cache = json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            cache = {}
+        cache[key] = manifest
+        # Write to a temporary file first so the cache is never left half-written
+        f = open(tempFilename, 'wb')
+        try:
+            json.dump(cache, f)
+        finally:
+            f.close()
+        # Windows won't rename over an existing file
+        if os.path.exists(cacheFilename):
+            os.remove(cacheFilename)
+        os.rename(tempFilename, cacheFilename)
+    # If the cache can't be written, the manifest just isn't remembered
+    except (IOError, OSError):
+        pass
+
+def HashLocalFile(path, progress=None, isCancelled=None):
+    """ Calculate the checksum of the contents of a local file.  If given, progress(bytes) is called after each
+        block is read, and isCancelled() is checked before each block.  Returns None if the checksum is cancelled. """
+    checksum = hashlib.sha1()
+    f = open(path, 'rb')
+    try:
+        while True:
+            if (isCancelled != None) and isCancelled():
+                return None
+            data = f.read(HASH_BLOCK_SIZE)
+            if len(data) == 0:
+                break
+            checksum.update(data)
+            if progress != None:
+                progress(len(data))
+    finally:
+        f.close()
+    return checksum.hexdigest()
+
+def _CachedHash(cached, relPath, size, mtime):
+    """ Get a file's checksum from a cached manifest, if the file hasn't changed since it was cached """
+    if cached != None:
+        entry = cached['files'].get(relPath)
+        if (entry != None) and (entry[0] == size) and (entry[1] == mtime):
+            return entry[2]
+    return None
+
+def LocalManifest(root, useHash=False, cached=None, progress=None, isCancelled=None):
+    """ Build the manifest of a local directory tree.  Paths in the manifest are relative to root and use '/' as
+        the separator.  Checksums are taken from the cached manifest for unchanged files, and calculated for the
+        others if useHash is True.  If given, progress(relPath, bytes) is called as each file is checked and as
+        its checksum is calculated, and isCancelled() is checked as the tree is walked.  Returns None if the
+        manifest is cancelled.  Raises OSError if a directory can't be listed or a file can't be checked. """
+
+    def WalkError(error):
+        """ A directory that can't be listed would be missing from the manifest, and its files would look like they
+            had been deleted, so stop instead of leaving it out """
+        raise error
+
+    manifest = {'dirs' : [], 'files' : {}}
+    for (path, dirs, files) in os.walk(root, onerror=WalkError):
+        if (isCancelled != None) and isCancelled():
+            return None
+        relDir = path[len(root):].replace(os.sep, '/').strip('/')
+        # Don't walk into hidden directories
+        dirs[:] = [d for d in dirs if not IsExcluded(d)]
+        for d in dirs:
+            manifest['dirs'].append(('%s/%s' % (relDir, d)).strip('/'))
+        for f in files:
+            if IsExcluded(f):
+                continue
+            relPath = ('%s/%s' % (relDir, f)).strip('/')
+            # A file that can't be checked raises OSError rather than being left out of the manifest
+            fileStat = os.stat(os.path.join(path, f))
+            (size, mtime) = (fileStat.st_size, int(fileStat.st_mtime))
+            if progress != None:
+                progress(relPath, 0)
+            checksum = _CachedHash(cached, relPath, size, mtime)
+            if (checksum == None) and useHash:
+                if progress != None:
+                    hashProgress = lambda bytes, relPath=relPath: progress(relPath, bytes)
+                else:
+                    hashProgress = None
+                checksum = HashLocalFile(os.path.join(path, f), hashProgress, isCancelled)
+                if checksum == None:
+                    return None
+            manifest['files'][relPath] = [size, mtime, checksum]
+    return manifest
+
+def RemoteManifest(transport, root, cached=None, streams=SCAN_STREAMS, progress=None, isCancelled=None):
+    """ Build the manifest of a directory tree on an sFTP Server.  Directories are listed several at a time, each
+        listing returning the names, sizes, and modification times together.  Checksums can't be calculated on
+        the server, so they are only taken from the cached manifest for unchanged files.  If given,
+        progress(relPath, 0) is called as each directory is listed, and isCancelled() is checked before each
+        listing.  Returns None if the manifest is cancelled.  Raises IOError if a directory can't be listed. """
+    manifest = {'dirs' : [], 'files' : {}}
+    errors = []
+    lock = threading.Lock()
+    # The directories waiting to be listed
+    dirQueue = Queue.Queue()
+    dirQueue.put(u'')
+
+    def ListDirectories(sFTPClient):
+        """ List directories from the queue until told to stop """
+        while True:
+            relDir = dirQueue.get()
+            # None means there are no more directories to list
+            if relDir == None:
+                break
+            try:
+                # Once something has gone wrong, or the manifest is cancelled, just empty the queue
+                if (len(errors) == 0) and not ((isCancelled != None) and isCancelled()):
+                    if progress != None:
+                        progress(relDir, 0)
+                    if relDir == u'':
+                        path = root
+                    else:
+                        path = '%s/%s' % (root.rstrip('/'), relDir)
+                    for entry in sFTPClient.listdir_attr(path):
+                        name = entry.filename
+                        if isinstance(name, str):
+                            name = name.decode('utf8')
+                        # Skip hidden system files, as the File Management window does
+                        if IsExcluded(name):
+                            continue
+                        relPath = ('%s/%s' % (relDir, name)).strip('/')
+                        lock.acquire()
+                        if stat.S_ISDIR(entry.st_mode):
+                            manifest['dirs'].append(relPath)
+                            dirQueue.put(relPath)
+                        elif stat.S_ISREG(entry.st_mode):
+                            manifest['files'][relPath] = [entry.st_size, entry.st_mtime, _CachedHash(cached, relPath, entry.st_size, entry.st_mtime)]
+                        lock.release()
+            except (IOError, paramiko.SSHException), e:
+                lock.acquire()
+                errors.append(u'%s:  %s' % (relDir, e))
+                lock.release()
+            finally:
+                dirQueue.task_done()
+
+    # Each listing stream gets its own sFTP channel on the connection
+    clients = [paramiko.SFTPClient.from_transport(transport) for stream in range(streams)]
+    threads = []
+    try:
+        for sFTPClient in clients:
+            thread = threading.Thread(target=ListDirectories, args=(sFTPClient, ))
+            # prevent the application from hanging on Close
+            thread.setDaemon(1)
+            thread.start()
+            threads.append(thread)
+        # Wait for all the directories to be listed, then stop the listing threads
+        dirQueue.join()
+        for thread in threads:
+            dirQueue.put(None)
+        for thread in threads:
+            thread.join()
+    finally:
+        for sFTPClient in clients:
+            sFTPClient.close()
+    if len(errors) > 0:
+        raise IOError(errors[0])
+    if (isCancelled != None) and isCancelled():
+        return None
+    manifest['dirs'].sort()
+    return manifest
+
+def Diff(source, dest, useHash=False, mirrorDeletes=False):
+    """ Compare source and destination manifests.  Returns (directories to create, files to copy, files to delete),
+        with files to copy including files that will replace an older or different destination file.
+        A file is copied if it's missing from the destination, if its size is different, if the source is newer,
+        or, if useHash is True and both checksums are known, if its contents are different. """
+    destDirs = set(dest['dirs'])
+    dirsToCreate = [d for d in source['dirs'] if not d in destDirs]
+    filesToCopy = []
+    for (relPath, (size, mtime, checksum)) in source['files'].iteritems():
+        destEntry = dest['files'].get(relPath)
+        if (destEntry == None) or (destEntry[0] != size):
+            filesToCopy.append(relPath)
+        elif useHash and (checksum != None) and (destEntry[2] != None):
+            if checksum != destEntry[2]:
+                filesToCopy.append(relPath)
+        elif mtime > destEntry[1] + MTIME_TOLERANCE:
+            filesToCopy.append(relPath)
+    filesToCopy.sort()
+    filesToDelete = []
+    if mirrorDeletes:
+        filesToDelete = [relPath for relPath in dest['files'].iterkeys() if not relPath in source['files']]
+        filesToDelete.sort()
+    return (dirsToCreate, filesToCopy, filesToDelete)
+
+def RecordChanges(source, dest, copiedFiles, deletedFiles):
+    """ Update the destination manifest after files have been copied and deleted.  Copied files have the source
+        file's size and modification time, so they take on the source's manifest entry. """
+    for relPath in copiedFiles:
+        dest['files'][relPath] = list(source['files'][relPath])
+    for relPath in deletedFiles:
+        if relPath in dest['files']:
+            del(dest['files'][relPath])
+    dest['dirs'] = sorted(set(dest['dirs']) | set(source['dirs']))
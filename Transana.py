@@ -719,17 +719,9 @@ class Transana(wx.App):
 
 
     def OnTimer(self, event):
-        """ To prevent a "Lost Database" message, we periocially run a very simple query to maintain our
-            connection to the database. """
-        # Get the database connection
-        db = DBInterface.get_db()
-        if db != None:
-            # Get a DB Cursor
-            dbCursor = db.cursor()
-            # This is the simplest query I can think of
-            query = "SHOW TABLES like 'Series%'"
-            # Execute the query
-            dbCursor.execute(query)
+        """ To prevent a "Lost Database" message, we periocially check our connection to the database,
+            reconnecting if the server has dropped it. """
+        DBInterface.keep_alive()
 
 
 def transana_excepthook(extype, value, trace):
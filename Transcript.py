@@ -26,6 +26,7 @@ if DEBUG:
 import wx
 # import Python's os module
 import os
+import re
 # import Python's types module
 import types
 # import Transana's Dialogs, required for an error message
@@ -47,6 +48,10 @@ import TransanaGlobal
 
 TIMECODE_CHAR = "\\'a4"   # Note that this differs from the TIMECODE_CHAR in TranscriptEditor.py
                           # because this is for RTF text and that is for parsed text.
+# Regular Expression for a time code, from the TIMECODE_CHAR through the closing ">"
+TIMECODE_REGEXP = re.compile(re.escape(TIMECODE_CHAR) + '[^>]*>')
+# Regular Expression for the RTF tab marker, including its delimiting space if there is one
+TAB_REGEXP = re.compile(r'\\tab ?')
 
 class Transcript(DataObject.DataObject):
     """This class defines the structure for a transcript object.  A transcript
@@ -135,31 +140,25 @@ class Transcript(DataObject.DataObject):
 ##                    print
 ##            print
             
-            return self.__dict__ == other.__dict__
+            # The cached text without time codes doesn't count.  It's derived from the text.
+            selfDict = self.__dict__.copy()
+            selfDict.pop('_cleanText', None)
+            otherDict = other.__dict__.copy()
+            otherDict.pop('_cleanText', None)
+            return selfDict == otherDict
 
     def GetTranscriptWithoutTimeCodes(self):
         """ Returns a copy of the Transcript Text with the Time Code information removed. """
-        newText = self.text
-            
-        while True:
-            timeCodeStart = newText.find(TIMECODE_CHAR)
-            if timeCodeStart == -1:
-                break
-            timeCodeEnd = newText.find('>', timeCodeStart)
-            newText = newText[:timeCodeStart] + newText[timeCodeEnd + 1:]
-
-        # We should also replace TAB characters with spaces
-        while True:
-            tabStart = newText.find('\\tab', 0)
-            if tabStart == -1:
-                break
-            newText = newText[:tabStart] + '    ' + newText[tabStart + 4:]
-            # if the RTF delimiter for the \tab marker was a space, the space should be removed too!
-            if newText[tabStart] == ' ':
-                newText = newText[:tabStart] + newText[tabStart + 1:]
-                
+        # Reports and printouts can ask for this many times for a large transcript.  The result is cached
+        # until the text changes.
+        if self._cleanText == None:
+            # Remove the Time Codes in a single pass
+            newText = TIMECODE_REGEXP.sub('', self.text)
+            # We should also replace TAB characters with spaces.  If the RTF delimiter for the \tab marker was
+            # a space, the space is removed too!
+            self._cleanText = TAB_REGEXP.sub('    ', newText)
 
-        return newText
+        return self._cleanText
 
     def db_load_by_name(self, name, episode):
         """Load a record by ID / Name."""
@@ -276,6 +275,30 @@ class Transcript(DataObject.DataObject):
         # Close the database cursor
         c.close()
 
+    def load_many(cls, nums, skipText=False, objectCache=None):
+        """ Load a list of Transcripts in a few queries rather than one query per Transcript.  objectCache is an
+            optional identity map (see DataObject.load_cached()) shared with other loads.  Returns a dictionary of
+            the Transcripts found, keyed by Transcript Number. """
+        # If we're skipping the RTF Text ...
+        if skipText:
+            # Define the query to load Transcripts without text
+            query = """SELECT TranscriptNum, TranscriptID, EpisodeNum, SourceTranscriptNum,
+                              ClipNum, SortOrder, Transcriber, ClipStart, ClipStop, Comment,
+                              MinTranscriptWidth, RecordLock, LockTime, LastSaveTime
+                         FROM Transcripts2 WHERE   TranscriptNum IN (%s)
+                    """
+        # If we're NOT skipping the RTF Text ...
+        else:
+            # Define the query to load Transcripts with everything
+            query = """SELECT * FROM Transcripts2 WHERE   TranscriptNum IN (%s)"""
+        (transcripts, loaded) = cls._load_many_rows(nums, query, objectCache, needText=not skipText, skipText=skipText)
+        for transcript in loaded:
+            # ... set up data structures needed for editing large paragraphs, as loading a single Transcript does
+            transcript.UpdateParagraphs()
+        return transcripts
+    # Make load_many() a class method
+    load_many = classmethod(load_many)
+
     def db_load_by_clipnum(self, clip):
         """ Load a Transcript Record based on Clip Number """
         # Get the database connection
@@ -606,6 +629,8 @@ class Transcript(DataObject.DataObject):
 
         # Execure the Save query
         c.execute(query, values)
+        # Update the Text Index for the Transcript's Plain Text
+        DBInterface.UpdateTextIndex('T', self.number, self.plaintext, c)
             
         c.close()
 
@@ -665,6 +690,10 @@ class Transcript(DataObject.DataObject):
             if result and (self.clip_num == 0):
                 DBInterface.ClearSourceTranscriptRecords(self.number)
 
+            # Remove the Transcript from the Text Index
+            if result:
+                DBInterface.DeleteTextIndex('T', self.number, c)
+
             # Delete the actual record.
             self._db_do_delete(use_transactions, c, result)
 
@@ -813,8 +842,12 @@ class Transcript(DataObject.DataObject):
         return self._text
     def _set_text(self, txt):
         self._text = txt
+        # Clear the cached text without time codes
+        self._cleanText = None
     def _del_text(self):
         self._text = ''
+        # Clear the cached text without time codes
+        self._cleanText = None
 
     # Implementation for PlainText Property
     def _get_plaintext(self):
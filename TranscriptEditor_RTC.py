@@ -38,6 +38,8 @@ import FormatDialog
 import Transcript
 # Import the Transana Drag and Drop infrastructure
 import DragAndDropObjects
+# Import Transana's Database Interface
+import DBInterface
 # Import Transana's Dialogs
 import Dialogs
 # import Transana's Document object
@@ -58,6 +60,10 @@ import TranscriptionUI_RTC
 import TextReport
 # Import Transana's Miscellaneous functions
 import Misc
+# Import Python's bisect module for searching the sorted Time Codes list
+import bisect
+# Import Python's copy module
+import copy
 # Import Python's Regular Expression handler
 import re
 # Import Python's cPickle module
@@ -72,6 +78,10 @@ import os
 import string
 # Import Python's sys module
 import sys
+# Import Python's threading module
+import threading
+# Import Python's time module
+import time
 # Import Python's types module
 import types
 
@@ -85,6 +95,128 @@ TIMECODE_CHAR = TransanaConstants.TIMECODE_CHAR
 # My REGEXP "\xA4<[\d]*>" appears to do that.
 TIMECODE_REGEXP = "%s<[\d]*>" % TIMECODE_CHAR            # "\xA4<[^<]*>"
 
+# How often Auto-Save runs, in milliseconds.  600,000 is every TEN MINUTES
+AUTOSAVE_INTERVAL = 600000
+# How often the crash-recovery journal is written, at most, in milliseconds.  60,000 is every MINUTE
+JOURNAL_INTERVAL = 60000
+# Taking a journal snapshot holds up the GUI.  For long transcripts, the time between journal snapshots is stretched
+# to this many times the length of the last snapshot, so the journal never takes more than half a percent of the
+# GUI's time.  It is never stretched past the Auto-Save interval.
+JOURNAL_COST_FACTOR = 200
+
+# Auto-Save runs in a background thread so that transcription is not interrupted.  The thread reports back
+# to the Transcript Editor with a custom event.
+
+# Get an ID for a custom Event for signalling that a background Auto-Save is complete
+EVT_AUTOSAVE_COMPLETE_ID = wx.NewId()
+
+# Define a custom "Auto-Save Complete" event
+def EVT_AUTOSAVE_COMPLETE(win, func):
+    """ Defines the EVT_AUTOSAVE_COMPLETE event type """
+    win.Connect(-1, -1, EVT_AUTOSAVE_COMPLETE_ID, func)
+
+# Create the actual Custom Auto-Save Complete Event object
+class AutoSaveCompleteEvent(wx.PyEvent):
+    """ This event is used to tell the GUI that a background Auto-Save is complete.  It carries the thread. """
+    def __init__(self, thread):
+        # Initialize a wxPyEvent
+        wx.PyEvent.__init__(self)
+        # Link the event to the Event ID
+        self.SetEventType(EVT_AUTOSAVE_COMPLETE_ID)
+        # Store the thread that did the work, which holds the results
+        self.thread = thread
+
+def AutoSaveJournalFileName(transcriptNum):
+    """ Return the name of the local crash-recovery journal file for a Transcript """
+    # Journal files live in the autosave folder of the user's Transana profile
+    path = os.path.join(TransanaGlobal.configData.GetDefaultProfilePath(), 'autosave')
+    # The journal is specific to the database and the transcript
+    return os.path.join(path, u'%s_%d.journal' % (TransanaGlobal.configData.database, transcriptNum))
+
+class AutoSaveThread(threading.Thread):
+    """ Custom Thread object for writing a snapshot of a transcript to the crash-recovery journal and,
+        optionally, to the database, without holding up the GUI """
+    def __init__(self, notificationWindow, transcript, xmlText, rawText, editCount, saveToDB=True):
+        # parameters are:
+        #   notificationWindow  --  the Transcript Editor to be notified when the work is done
+        #   transcript          --  a copy of the Transcript Object, which the thread can change safely
+        #   xmlText             --  the XML snapshot of the editor contents
+        #   rawText             --  the editor contents as text, which still includes time codes
+        #   editCount           --  the editor's edit counter at the time of the snapshot
+        #   saveToDB            --  if False, only the journal is written
+
+        # Initialize the Thread object
+        threading.Thread.__init__(self)
+        # Remember the parameters
+        self.window = notificationWindow
+        self.transcript = transcript
+        self.xmlText = xmlText
+        self.rawText = rawText
+        self.editCount = editCount
+        self.saveToDB = saveToDB
+        # Results, for the GUI to process when we're done
+        self.error = None
+        self.elapsed = 0
+        # prevent the application from hanging on Close
+        self.setDaemon(1)
+
+    def run(self):
+        # Note the start time
+        startTime = time.time()
+        # Start exception handling.  (No GUI from inside the thread.  Errors get reported to the GUI.)
+        try:
+            # Strip the time codes out of the text to get the Plain Text.  One pass with the regular expression.
+            plaintext = re.sub(TIMECODE_REGEXP, '', self.rawText)
+            # Write the crash-recovery journal
+            self.WriteJournal(plaintext)
+            # If we should save the transcript to the database too ...
+            if self.saveToDB:
+                # Place the snapshot in our copy of the Transcript Object
+                self.transcript.text = self.xmlText
+                self.transcript.plaintext = plaintext
+                # Open this thread's own database connection
+                if DBInterface.open_thread_db() == None:
+                    raise TransanaExceptions.SaveError, _("Auto-save could not connect to the database.")
+                try:
+                    # Save the transcript.  This checks that our record lock is still valid.
+                    self.transcript.db_save()
+                finally:
+                    # Close the thread's database connection
+                    DBInterface.close_thread_db()
+        except:
+            # Remember the error so the GUI can report it
+            self.error = sys.exc_info()[1]
+            # Note the failure in the Error Log
+            print "TranscriptEditor_RTC.AutoSaveThread.run():"
+            print sys.exc_info()[0]
+            print sys.exc_info()[1]
+        # Note how long that took
+        self.elapsed = int((time.time() - startTime) * 1000)
+        # Tell the Transcript Editor we're done
+        wx.PostEvent(self.window, AutoSaveCompleteEvent(self))
+
+    def WriteJournal(self, plaintext):
+        """ Write the snapshot to the local crash-recovery journal file """
+        # Get the journal file name
+        fname = AutoSaveJournalFileName(self.transcript.number)
+        # If the autosave folder doesn't exist ...
+        if not os.path.exists(os.path.dirname(fname)):
+            # ... create it
+            os.makedirs(os.path.dirname(fname))
+        # Write to a temporary file first so a crash part-way through doesn't destroy the previous journal
+        f = open(fname + '.tmp', 'wb')
+        cPickle.dump({'number' : self.transcript.number,
+                      'id' : self.transcript.id,
+                      'lastsavetime' : self.transcript.lastsavetime,
+                      'text' : self.xmlText,
+                      'plaintext' : plaintext}, f, cPickle.HIGHEST_PROTOCOL)
+        f.close()
+        # Windows can't rename over an existing file
+        if os.path.exists(fname):
+            os.remove(fname)
+        # Put the new journal in place
+        os.rename(fname + '.tmp', fname)
+
 class TranscriptEditor(RichTextEditCtrl):
     """This class is a word processor for transcribing and editing.  It
     provides only the actual text editing control, without any external GUI
@@ -121,6 +253,9 @@ class TranscriptEditor(RichTextEditCtrl):
         self.LinesLoaded = 0
         # Initialize the Time Codes array to empty
         self.timecodes = []
+        # Initialize the Time Code Positions dictionary, which maps time code values to the character position
+        # of the time code in the text, to empty
+        self.timecodePositions = {}
         # Initialize the current time code to DOES NOT EXIST
         self.current_timecode = -1
 
@@ -128,6 +263,21 @@ class TranscriptEditor(RichTextEditCtrl):
         self.autoSaveTimer = wx.Timer()
         # Define the Time Event
         self.autoSaveTimer.Bind(wx.EVT_TIMER, self.OnAutoSave)
+        # Create the Timer for the crash-recovery journal, which is written to local disk between Auto-Saves
+        self.journalTimer = wx.Timer()
+        # Define the Time Event
+        self.journalTimer.Bind(wx.EVT_TIMER, self.OnJournalTimer)
+        # Count edits, so we can tell if the transcript has changed since an Auto-Save or journal snapshot was taken
+        self.editCount = 0
+        # Note the edit count at the last journal snapshot
+        self.journalEditCount = 0
+        # The background Auto-Save thread and journal thread, when they are running
+        self.autoSaveThread = None
+        self.journalThread = None
+        # How long the last Auto-Save took, in milliseconds
+        self.lastAutoSaveTime = None
+        # Handle the Auto-Save Complete event from the background Auto-Save thread
+        EVT_AUTOSAVE_COMPLETE(self, self.OnAutoSaveComplete)
 
         # We should start out in Read Only mode so that we get Word Tracking
         self.set_read_only(True)
@@ -593,34 +743,59 @@ class TranscriptEditor(RichTextEditCtrl):
 
     def load_timecodes(self):
         """Scan the document for timecodes and add to internal list."""
-        # Clear the existing time codes list
+        # Clear the existing time codes list and time code positions
         self.timecodes = []
-        # Get the text to scan
-        txt = self.GetText()
-        # Define the string to search for
-        findstr = TIMECODE_CHAR + "<"
-        # Locate the time code using string.find()
-        i = txt.find(findstr, 0)
-        # As long as there are more time codes to find ...
-        while i >= 0:
-            # ... find the END of the time code data, i.e. the next ">" character
-            endi = txt.find(">", i)
-            # Extract the Time Code Data
-            timestr = txt[i+2:endi]
-            # Trap exceptions
-            try:
-                # Conver the time code data to an integer and add it to the TimeCodes list
-                self.timecodes.append(int(timestr))
-            # If an exception arises (because of inability to convert the time code) ...
-            except:
-                # ... then just ignore that time code.  It's probably defective.
-                pass
-            # Look for the next time code.  Result will be -1 if NOT FOUND
-            i = txt.find(findstr, i+1)
+        self.timecodePositions = {}
+        # Get the text to scan, and scan it in a single pass for time codes
+        for tcMatch in re.finditer(TIMECODE_CHAR + "<([\d]+)>", self.GetText()):
+            # Convert the time code data to an integer
+            tcVal = int(tcMatch.group(1))
+            # Add it to the TimeCodes list
+            self.timecodes.append(tcVal)
+            # Remember where it is.  If there are images before the time code, this may be off by a few
+            # characters, which GetTimeCodePosition() corrects the first time the position is used.
+            self.timecodePositions[tcVal] = tcMatch.start()
+        # Everything that uses the time codes list counts on it being in order.  Well-formed transcripts
+        # already are, so this is quick.
+        self.timecodes.sort()
+
+    def GetTimeCodePosition(self, tc, startPos=0):
+        """ Return the character position of the time code with value tc, or -1 if it can't be found.
+            If the position has to be looked up, the search starts at startPos. """
+        # Build the time code string we're looking for
+        tcStr = "%s<%d>" % (TIMECODE_CHAR, tc)
+        # If we know where the time code was last ...
+        if self.timecodePositions.has_key(tc):
+            pos = self.timecodePositions[tc]
+            # ... and it's still there, we're done.  Checking this is much faster than finding it again.
+            if self.GetRange(pos, pos + len(tcStr)) == tcStr:
+                return pos
+        # Otherwise, we need to find the time code in the text
+        pos = self.FindText(startPos, self.GetTextLength(), tcStr)
+        # If it was found ...
+        if pos > -1:
+            # ... remember where it is for next time
+            self.timecodePositions[tc] = pos
+        # Return the position
+        return pos
+
+    def AdjustTimeCodePositions(self, position, sizeChange):
+        """ Shift the known positions of all time codes at or after position by sizeChange characters
+            following an edit of the text """
+        # If the text size didn't change, the positions don't either
+        if sizeChange != 0:
+            # For each time code we know the position of ...
+            for tc in self.timecodePositions.keys():
+                # ... if it comes at or after the edit ...
+                if self.timecodePositions[tc] >= position:
+                    # ... move it by the amount of text inserted or deleted.
+                    self.timecodePositions[tc] += sizeChange
 
     def save_transcript(self, continueEditing=True, use_transactions=True, showPopup=True):
         """ Save the transcript to the database.
             continueEditing is used for Partial Transcript Editing only. """
+        # If a background Auto-Save is running, let it finish first
+        self.WaitForAutoSave()
         # Too many popups can crash the program (at least on Windows), so they're now optional.
         if showPopup:
             # Create a popup telling the user about the save (needed for large files)
@@ -660,6 +835,8 @@ class TranscriptEditor(RichTextEditCtrl):
                 self.TranscriptObj.document_length = self.GetLength()
                 # Write it to the database
                 self.TranscriptObj.db_save(use_transactions=use_transactions)
+                # The crash-recovery journal is no longer needed
+                self.RemoveAutoSaveJournal()
         except TransanaExceptions.SaveError, e:
             raise
         except:
@@ -1187,6 +1364,8 @@ class TranscriptEditor(RichTextEditCtrl):
         if (len(self.timecodes) == 0) or (prevTimeCode < timepos) and ((timepos < nextTimeCode) or (nextTimeCode == -1)) \
            or ((timepos == 0) and (prevTimeCode == 0.0) and (self.timecodes[0] > 0)):
             
+            # Note where the Time Code is going
+            tcPos = self.GetInsertionPoint()
             # Insert the Time Code
             self.InsertTimeCode(timepos)
             # If time code data is visible ...
@@ -1213,16 +1392,10 @@ class TranscriptEditor(RichTextEditCtrl):
                     self.InsertStyledText(tcText, len(tcText))
             # Update the RTC
             self.Refresh()
-            # Update the 'timecodes' list, putting it in the right spot
-            i = 0
-            if len(self.timecodes) > 0:
-                # the index variable (i) must be less than the number of elements in
-                # self.timecodes to avoid an index error when inserting a selection timecode
-                # at the end of the Transcript.
-                while (i < len(self.timecodes) and (self.timecodes[i] < timepos)):
-                    i = i + 1
-            # Add the time code value to the TimeCodes array
-            self.timecodes.insert(i, timepos)
+            # Add the time code value to the TimeCodes array, putting it in the right spot
+            bisect.insort_left(self.timecodes, timepos)
+            # Remember the time code's position
+            self.timecodePositions[timepos] = tcPos
         # If the proposed time code is out of sequence ...
         else:
             # ... build an error message.
@@ -1339,25 +1512,19 @@ class TranscriptEditor(RichTextEditCtrl):
         # Temporarily halt screen updates
         self.Freeze()
         
-        # Find the timecodes that are on either side of what we want
-        # Initialize "Before" to the start of the file
-        tcBefore = -1
-        # Initializae "After" to the end of the file (-1)
-        tcAfter = -1
-
-        # Iterate through the time code list
-        for timecode in self.timecodes:
-
-            # If the entry in the time code list is less than the current media position ...
-            if timecode < ms:
-                # ... update the Before value
-                tcBefore = timecode
-            # If the entry in the time code list is greater than the current media position ...
-            else:
-                # ... then we can stop looking for our Before position and we should capture THIS as our After position
-                tcAfter = timecode
-                # We can stop iterating once we reach this point.
-                break
+        # Find the timecodes that are on either side of what we want.  The time codes list is sorted,
+        # so the first time code that is not less than the current media position is our After position.
+        i = bisect.bisect_left(self.timecodes, ms)
+        # If there is a time code before that, it's our Before value.  Otherwise, use the start of the file
+        if i > 0:
+            tcBefore = self.timecodes[i - 1]
+        else:
+            tcBefore = -1
+        # If there is a time code at or after the current position, it's our After value.  Otherwise, use the end of the file (-1)
+        if i < len(self.timecodes):
+            tcAfter = self.timecodes[i]
+        else:
+            tcAfter = -1
 
         # If the current position is before the first time code ...
         if tcBefore == -1:
@@ -1366,7 +1533,7 @@ class TranscriptEditor(RichTextEditCtrl):
         # Otherwise ...
         else:
             # ... let's get the character position of the Before time code
-            start = self.FindText(0, self.GetTextLength(), "%s<%d>" % (TIMECODE_CHAR, tcBefore))
+            start = self.GetTimeCodePosition(tcBefore)
 
         # If the current position is after the last time code ...
         if tcAfter == -1:
@@ -1375,7 +1542,7 @@ class TranscriptEditor(RichTextEditCtrl):
         # Otherwise ...
         else:
             # ... let's get the character position of the After time code
-            end = self.FindText(0, self.GetTextLength(), "%s<%d>" % (TIMECODE_CHAR, tcAfter))
+            end = self.GetTimeCodePosition(tcAfter)
 
         # Let's get the current selection position
         pos = self.GetSelection()
@@ -1443,9 +1610,7 @@ class TranscriptEditor(RichTextEditCtrl):
         # If the text IS a time code, this code will locate the appropriate time code AFTER the number sent.  This is needed
         # when a selection is made in the Visualization Window which may not align with a know ending time code.
         try:
-            timecodePos = 0
-            while (timecodePos < len(self.timecodes)) and (int(self.timecodes[timecodePos]) < int(float(text))):
-                timecodePos += 1
+            timecodePos = bisect.bisect_left(self.timecodes, int(float(text)))
             if text != str(self.timecodes[timecodePos]):
                 text = str(self.timecodes[timecodePos])
         except:
@@ -1571,12 +1736,15 @@ class TranscriptEditor(RichTextEditCtrl):
         if TransanaGlobal.configData.autoSave and isinstance(self.parent, TranscriptionUI_RTC._TranscriptPanel):
             # If we are switching to READ ONLY ...
             if state:
-                # ... we can turn OFF the AutoSave Timer
+                # ... we can turn OFF the AutoSave and Journal Timers
                 self.autoSaveTimer.Stop()
+                self.journalTimer.Stop()
             # If we are switching to EDIT MODE ...
             else:
-                # ... we should turn ON the AutoSave Timer.  600,000 is every TEN MINUTES
-                self.autoSaveTimer.Start(600000)
+                # ... we should turn ON the AutoSave Timer
+                self.autoSaveTimer.Start(AUTOSAVE_INTERVAL)
+                # ... and the Journal Timer
+                self.journalTimer.Start(JOURNAL_INTERVAL)
 
     def get_read_only(self):
         """ Report the current Read Only / Edit Mode status """
@@ -1639,7 +1807,7 @@ class TranscriptEditor(RichTextEditCtrl):
             # ... just assume the time code value is 0.
             start_timecode = 0
         # If we are positioned AFTER the LAST time-code ...
-        if (start_timecode in self.timecodes) and (self.timecodes.index(start_timecode) == len(self.timecodes) - 1):
+        if start_timecode == self.timecodes[-1]:
             # ... return the start time code and the end of the file
             return (start_timecode, -1)
 
@@ -1688,7 +1856,7 @@ class TranscriptEditor(RichTextEditCtrl):
             # ... if we're not at the FIRST time code in the document ...
             if (start_timecode > self.timecodes[0]):
                 # ... then select the next earliest time code as the correct start_timecode
-                start_timecode = self.timecodes[self.timecodes.index(start_timecode) - 1]
+                start_timecode = self.timecodes[bisect.bisect_left(self.timecodes, start_timecode) - 1]
             # If you ARE at the first time code ...
             elif start_timecode == 0:
 
@@ -1703,6 +1871,10 @@ class TranscriptEditor(RichTextEditCtrl):
 
     def ClearDoc(self, skipUnlock = False):
         """ Clear the Transcript Window """
+        # If a background Auto-Save is running, let it finish first
+        self.WaitForAutoSave()
+        # Saving has already been taken care of, so the crash-recovery journal is no longer needed
+        self.RemoveAutoSaveJournal()
         # If the current Transcript is locked ...
         if (self.TranscriptObj != None) and (self.TranscriptObj.isLocked) and not skipUnlock:
             # ... unlock it.  (Saving has already been taken care of.)
@@ -1715,8 +1887,9 @@ class TranscriptEditor(RichTextEditCtrl):
         self.TimePosition = 0
         # Clear the Transcript Object
         self.TranscriptObj = None
-        # Clear the time code list
+        # Clear the time code list and time code positions
         self.timecodes = []
+        self.timecodePositions = {}
         # Clear the current time code pointer
         self.current_timecode = -1
         # Make the control read-only
@@ -1742,27 +1915,18 @@ class TranscriptEditor(RichTextEditCtrl):
             # ... then return 0 to signal to start at the beginning of the file
             return 0
 
-        # Start Exception Handling
-        try:
-            # Try to get the Index in the time codes list of the item BEFORE the current time code value (hence -1)
-            i = self.timecodes.index(tc) - 1
-            # If our index is 0 or higher ...
-            while i >= 0:
-                # If the Time Code List value is less than our original time code ...
-                if self.timecodes[i] < tc:
-                    # ... then return the value
-                    return self.timecodes[i]
-                # Otherwise, move a value earlier in the list and try again
-                i = i - 1
-            # If we exit the while loop without RETURN, then return 0 to signal to start at the beginning of the file
-            return 0
-        # If an exception is raised ...  (probably an index out of range call.)
-        except:
-            if DEBUG:
-                print sys.exc_info()[0]
-                print sys.exc_info()[1]
+        # Find the current time code in the sorted time codes list
+        i = bisect.bisect_left(self.timecodes, tc)
+        # If the current time code isn't in the list ...
+        if (i == len(self.timecodes)) or (self.timecodes[i] != tc):
             # ... return 0 to signal to start at the beginning of the file
             return 0
+        # If there is an earlier time code ...
+        if i > 0:
+            # ... then return the value.  (bisect_left() finds the FIRST entry with this value, so it's earlier.)
+            return self.timecodes[i - 1]
+        # If there's no earlier time code, return 0 to signal to start at the beginning of the file
+        return 0
 
     def NextTimeCode(self, tc=None):
         """Return the timecode immediately after the current one."""
@@ -1777,32 +1941,18 @@ class TranscriptEditor(RichTextEditCtrl):
                 # ... then return the FIRST value in the list.
                 return self.timecodes[0]
 
-        # Start Exception Handling
-        try:
-            # Try to get the Index in the time codes list of the item AFTER the current time code value (hence +1)
-            i = self.timecodes.index(tc) + 1
-            # If our index is less than the highest value ...
-            while i < len(self.timecodes):
-                # If the Time Code List value is greater than our original time code ...
-                if self.timecodes[i] > tc:
-                    # ... then return the value
-                    return self.timecodes[i]
-                # Otherwise, move a value later in the list and try again
-                i = i + 1
-            # If we get here, we got to the end of the list.  Just return the list's highest value
+        # If there are no time codes in the time codes list ...
+        if len(self.timecodes) == 0:
+            # ... return -1 to signal failure
+            return -1
+        # Find the first time code in the sorted time codes list that is greater than our original time code
+        i = bisect.bisect_right(self.timecodes, tc)
+        # If the current time code isn't in the list, or there is no later time code ...
+        if (i == 0) or (self.timecodes[i - 1] != tc) or (i == len(self.timecodes)):
+            # ... return the highest value in the list
             return self.timecodes[-1]
-        # If an exception is rasied ...  (probably an index out of range call.)
-        except:
-            if DEBUG:
-                print sys.exc_info()[0]
-                print sys.exc_info()[1]
-            # If there are time codes in the time codes list ...
-            if len(self.timecodes) > 0:
-                # ... return the highest value in the list
-                return self.timecodes[-1]
-            else:
-                # ... return -1 to signal failure
-                return -1
+        # Otherwise, return the next value
+        return self.timecodes[i]
 
     def OnKeyDown(self, event):
         """ Called when a key is pressed down.  All characters are upper case.  """
@@ -2073,6 +2223,10 @@ class TranscriptEditor(RichTextEditCtrl):
 
     def OnContentChanged(self, event):
         """ Handle changes to the current Document """
+        # Count the edit, so Auto-Save can tell if the text changed while it was saving.  GetFormattedSelection()
+        # changes the contents temporarily and puts them back, so those changes don't count.
+        if not self.gettingFormattedSelection:
+            self.editCount += 1
 
         # Only call it if we're editing a Document and we're in Edit mode
         if not self.gettingFormattedSelection and isinstance(self.TranscriptObj, Document.Document) and not self.get_read_only():
@@ -2193,8 +2347,52 @@ class TranscriptEditor(RichTextEditCtrl):
             # signal that that can be skippped.
             self.parent.ControlObject.UpdateKeywordVisualization(textChangeOnly = True)
 
+        # If we're editing a Transcript ...
+        elif not self.gettingFormattedSelection and isinstance(self.TranscriptObj, Transcript.Transcript) and not self.get_read_only():
+            # ... determine how much the text size changed
+            length = self.GetLastPosition()
+            sizeChange = length - self.documentLength
+            # If there's a selection, the change starts at the selection start.
+            selection = self.GetSelection()
+            if selection != (-2, -2):
+                position = selection[0]
+            # Otherwise, the change is at the cursor, which is already past any inserted text
+            else:
+                position = self.GetCurrentPos()
+                if sizeChange > 0:
+                    position -= sizeChange
+            # Move the known positions of the time codes after the change
+            self.AdjustTimeCodePositions(position, sizeChange)
+            # Remember the new Transcript Length
+            self.documentLength = length
+
     def OnAutoSave(self, event):
         """ Process the AutoSave Timer Event """
+        # If nothing has changed since the last save, or the last Auto-Save is still running, there's nothing to do
+        if not self.modified() or self.AutoSaveRunning():
+            return
+        # Background Auto-Save works from a snapshot of the full transcript, with time codes in their normal
+        # state.  If that's not what's in the editor, or we can't get a second database connection for the
+        # background thread, save the transcript the old way.
+        if TransanaConstants.partialTranscriptEdit or self.timeCodeDataVisible or not self.codes_vis or \
+           not isinstance(self.TranscriptObj, Transcript.Transcript) or (self.TranscriptObj.number == 0) or \
+           not DBInterface.thread_db_available():
+            self.AutoSaveInForeground()
+            return
+
+        # Note the start time
+        startTime = time.time()
+        # Take the snapshot and start the background Auto-Save.  The rich text buffer can only be read from the
+        # GUI thread, so the XML is gathered here.  Stripping time codes, writing the crash-recovery journal and
+        # the database save all happen in the background, so media playback and typing can continue.
+        self.autoSaveThread = self.StartAutoSaveThread(saveToDB=True)
+        # Remember how long the snapshot held up the GUI.  The rest gets added when the thread finishes.
+        self.autoSaveThread.snapshotTime = int((time.time() - startTime) * 1000)
+
+    def AutoSaveInForeground(self):
+        """ Save the transcript on the GUI thread.  Used when a background Auto-Save is not possible. """
+        # Note the start time
+        startTime = time.time()
         # Determine what control HAS focus
         focusCtrl = self.FindFocus()
         # If the media is playing ...
@@ -2243,12 +2441,189 @@ class TranscriptEditor(RichTextEditCtrl):
             # If the original control that had focus is not available, set focus
             # to the transcript!
             self.SetFocus()
+
+        # Report how long the Auto-Save took
+        self.ShowAutoSaveTime(int((time.time() - startTime) * 1000))
             
 ##        # If Partial Transcript editing is enabled ...
 ##        if TransanaConstants.partialTranscriptEdit:
 ##            # If we have only part of the transcript in the editor, we need to restore the partial transcript state following save
 ##            self.UpdateCurrentContents('EnterEditMode')
 
+    def OnJournalTimer(self, event):
+        """ Process the Journal Timer Event, writing changes to the local crash-recovery journal between Auto-Saves """
+        # If nothing has changed since the last snapshot, or a snapshot is still being written, there's nothing to do
+        if (self.editCount == self.journalEditCount) or not self.modified() or self.AutoSaveRunning():
+            return
+        # We can only take a snapshot of the full transcript, with time codes in their normal state
+        if TransanaConstants.partialTranscriptEdit or self.timeCodeDataVisible or not self.codes_vis or \
+           not isinstance(self.TranscriptObj, Transcript.Transcript) or (self.TranscriptObj.number == 0):
+            return
+        # Note the start time
+        startTime = time.time()
+        # Take the snapshot and write the journal in the background
+        self.journalThread = self.StartAutoSaveThread(saveToDB=False)
+        # Note how long the snapshot held up the GUI
+        self.journalThread.snapshotTime = int((time.time() - startTime) * 1000)
+        # Wait longer before the next snapshot if this one was slow, but no longer than the Auto-Save interval
+        interval = min(max(JOURNAL_INTERVAL, self.journalThread.snapshotTime * JOURNAL_COST_FACTOR), AUTOSAVE_INTERVAL)
+        # If that's not the current interval ...
+        if interval != self.journalTimer.GetInterval():
+            # ... restart the Journal Timer with the new interval
+            self.journalTimer.Start(interval)
+
+    def StartAutoSaveThread(self, saveToDB):
+        """ Take a snapshot of the transcript and start a thread to journal and optionally save it """
+        # Note the edit count for this snapshot
+        self.journalEditCount = self.editCount
+        # Create the thread.  It works on a copy of the Transcript Object so it can't disturb the one in use.
+        thread = AutoSaveThread(self, copy.copy(self.TranscriptObj), self.GetFormattedSelection('XML'),
+                                self.GetValue(), self.editCount, saveToDB)
+        # Signal that the copy has changed
+        thread.transcript.has_changed = 1
+        # No snapshot time yet
+        thread.snapshotTime = 0
+        # Start the thread
+        thread.start()
+        # Return the thread
+        return thread
+
+    def AutoSaveRunning(self):
+        """ Report whether a background Auto-Save or journal thread is running """
+        return ((self.autoSaveThread != None) and self.autoSaveThread.isAlive()) or \
+               ((self.journalThread != None) and self.journalThread.isAlive())
+
+    def OnAutoSaveComplete(self, event):
+        """ Handle the end of a background Auto-Save or journal thread """
+        # If this is the Auto-Save thread we're waiting for ...
+        if event.thread is self.autoSaveThread:
+            # ... process its results
+            self.ProcessAutoSaveResult(event.thread)
+        # If this is the journal thread ...
+        elif event.thread is self.journalThread:
+            # ... we're done with it
+            self.journalThread = None
+
+    def WaitForAutoSave(self):
+        """ If a background Auto-Save or journal thread is running, wait for it to finish """
+        # If a journal is being written ...
+        if self.journalThread != None:
+            # ... wait for it
+            self.journalThread.join()
+            self.journalThread = None
+        # If an Auto-Save is running ...
+        if self.autoSaveThread != None:
+            # ... wait for it ...
+            self.autoSaveThread.join()
+            # ... and process its results now.  (Its Auto-Save Complete event will be ignored.)
+            self.ProcessAutoSaveResult(self.autoSaveThread)
+
+    def ProcessAutoSaveResult(self, thread):
+        """ Bring the results of a background Auto-Save back into the Transcript Editor """
+        # We're done with the thread
+        self.autoSaveThread = None
+        # If the save failed ...
+        if thread.error != None:
+            # ... tell the user.  The edits remain unsaved, and the journal remains on disk.
+            prompt = unicode(_('Auto-save failed.\n%s'), 'utf8')
+            # Transana's exceptions carry an explanation for the user
+            if hasattr(thread.error, 'explanation'):
+                msg = thread.error.explanation
+            else:
+                msg = '%s' % thread.error
+            errordlg = Dialogs.ErrorDialog(self, prompt % msg)
+            errordlg.ShowModal()
+            errordlg.Destroy()
+            return
+        # If the same transcript is still loaded ...
+        if (self.TranscriptObj != None) and (self.TranscriptObj.number == thread.transcript.number):
+            # ... update it with what was saved
+            self.TranscriptObj.text = thread.transcript.text
+            self.TranscriptObj.plaintext = thread.transcript.plaintext
+            self.TranscriptObj.lastsavetime = thread.transcript.lastsavetime
+            self.TranscriptObj.paragraphPointers = thread.transcript.paragraphPointers
+            # If there have been no edits since the snapshot was taken ...
+            if self.editCount == thread.editCount:
+                # ... the editor matches the database.  Mark the Edit Control as unmodified.
+                self.DiscardEdits()
+                # The crash-recovery journal is no longer needed
+                self.RemoveAutoSaveJournal()
+        # Report how long the Auto-Save took
+        self.ShowAutoSaveTime(thread.snapshotTime + thread.elapsed)
+
+    def ShowAutoSaveTime(self, elapsed):
+        """ Show how long the last Auto-Save took """
+        # Remember the time
+        self.lastAutoSaveTime = elapsed
+        # Display it where the selection times are normally shown
+        prompt = unicode(_('Last auto-save took %d ms'), 'utf8')
+        self.parent.UpdateSelectionText(prompt % elapsed)
+
+    def RemoveAutoSaveJournal(self):
+        """ Delete the crash-recovery journal for the current transcript, if there is one """
+        # Only Transcripts get Auto-Saved
+        if isinstance(self.TranscriptObj, Transcript.Transcript) and (self.TranscriptObj.number != 0):
+            # Get the journal file name
+            fname = AutoSaveJournalFileName(self.TranscriptObj.number)
+            # If the journal exists ...
+            if os.path.exists(fname):
+                # ... delete it
+                os.remove(fname)
+
+    def RecoverAutoSaveJournal(self, transcript):
+        """ If a crash left a recovery journal for the transcript being loaded, offer to restore it """
+        # Only Transcripts get Auto-Saved.  If this transcript is already loaded, its journal is current.
+        if not isinstance(transcript, Transcript.Transcript) or (transcript.number == 0) or \
+           ((self.TranscriptObj != None) and (self.TranscriptObj.number == transcript.number)):
+            return
+        # Get the journal file name
+        fname = AutoSaveJournalFileName(transcript.number)
+        # If there is no journal, there's nothing to do
+        if not os.path.exists(fname):
+            return
+        # Start exception handling
+        try:
+            # Read the journal
+            f = open(fname, 'rb')
+            journal = cPickle.load(f)
+            f.close()
+        # If the journal can't be read ...
+        except:
+            # ... there's nothing we can recover
+            journal = None
+        # If the transcript has been saved since the journal was written, the journal is out of date
+        if (journal == None) or (journal['number'] != transcript.number) or (journal['lastsavetime'] != transcript.lastsavetime):
+            os.remove(fname)
+            return
+        # Ask the user if the unsaved changes should be restored
+        prompt = unicode(_('Transana found unsaved changes to Transcript "%s" from a session that did not end normally.\nDo you want to restore them?'), 'utf8')
+        dlg = Dialogs.QuestionDialog(self, prompt % transcript.id)
+        result = dlg.LocalShowModal()
+        dlg.Destroy()
+        # If the user wants the changes ...
+        if result == wx.ID_YES:
+            # Start exception handling
+            try:
+                # Lock the transcript
+                transcript.lock_record()
+                # Put the journal contents into the Transcript Object
+                transcript.text = journal['text']
+                transcript.plaintext = journal['plaintext']
+                # Save the transcript
+                transcript.db_save()
+                # Unlock the transcript
+                transcript.unlock_record()
+            # If the transcript is locked by another user ...
+            except TransanaExceptions.RecordLockedError, e:
+                # ... tell the user, and keep the journal for later
+                prompt = unicode(_('Transcript "%s" is locked by %s.\nThe unsaved changes cannot be restored right now.'), 'utf8')
+                errordlg = Dialogs.ErrorDialog(self, prompt % (transcript.id, e.user))
+                errordlg.ShowModal()
+                errordlg.Destroy()
+                return
+        # The journal has been dealt with
+        os.remove(fname)
+
     def CheckTimeCodesAtSelectionBoundaries(self):
         """ Check the start and end of a selection and make sure neither is in the middle of a time code """
         # We need to make sure the cursor is not positioned between a time code symbol and the time code data, which unfortunately
@@ -2826,18 +3201,21 @@ class TranscriptEditor(RichTextEditCtrl):
         # Let's find each time code mark and update it.  This will be easier if we use the
         # POSITION rather than the VALUE of the "timecodes" list, as we need to change that
         # list as we go too!
+        # Start with an empty list of new time code positions
+        newPositions = {}
+        # Start looking at the beginning of the transcript
+        start = 0
         for loop in range(0, len(self.timecodes)):
-            # Find the time code
-            self.cursor_find("%s<%d>" % (TIMECODE_CHAR, self.timecodes[loop]))
-            # Remember the starting position, adjusted for the width of the Time Code Character
-            start = self.GetCurrentPos() - len(TIMECODE_CHAR)
-            # We need to determine the end position the hard way.  select_find() was giving the wrong
-            # answer because of the CheckTimeCodesAtSelectionBoundaries() call.
-            # So start at the beginning of the time code ...
-            end = start
-            # ... and keep moving until we find the first ">" character, which closes the time code.
-            while self.GetCharAt(end - 1) != ord('>'):
-                end += 1
+            # Find the time code's starting position.  Editing the earlier time codes has adjusted the known
+            # position of this one, so this is a quick check rather than a search of the whole transcript.
+            # If we do have to search, we search after the time codes we've already changed.
+            start = self.GetTimeCodePosition(self.timecodes[loop], start)
+            # If the time code can't be found, skip it
+            if start == -1:
+                start = 0
+                continue
+            # The end position is just past the first ">" character, which closes the time code.
+            end = start + len("%s<%d>" % (TIMECODE_CHAR, self.timecodes[loop]))
 
             # Now select the smaller selection, which should just be the Time Code Data
             self.SetSelection(start, end)
@@ -2845,10 +3223,16 @@ class TranscriptEditor(RichTextEditCtrl):
             # Finally, replace the old time code data with the new time code data.
             # First delete the old data
             self.DeleteSelection()
+            # Make sure we insert at the start of the old time code
+            self.SetInsertionPoint(start)
             # Then insert the new data as hidden text (which is why we can't just plug it in above.)
             self.InsertTimeCode(self.timecodes[loop] + int(adjustmentAmount* 1000))
             # Adjust the local list of Transcript time codes too!
             self.timecodes[loop] = self.timecodes[loop] + int(adjustmentAmount * 1000)
+            # Note where the adjusted time code is
+            newPositions[self.timecodes[loop]] = start
+        # Replace the time code positions, which were keyed by the old time code values
+        self.timecodePositions = newPositions
        
 
         # We better hide all the hidden text for the time codes again
@@ -520,6 +520,9 @@ class TranscriptionUI(wx.Frame):
         # Clear the toolbar
         self.ClearToolbar()
 
+        # If Auto-Save left a crash-recovery journal for this transcript, offer to restore it.  (This is only done
+        # here, where the user opens a transcript, and not for the invisible editors used for reports and exports.)
+        self.dlg.editor.RecoverAutoSaveJournal(transcriptObj)
         # Load the transcript
         self.dlg.editor.load_transcript(transcriptObj)
 
@@ -992,6 +995,9 @@ class TranscriptionUI(wx.Frame):
                 (not self.ControlObject.SaveTranscript(1, transcriptToSave=self.nb.GetCurrentPage().activePanel))):
                 # Reset the Toolbar
                 self.ClearToolbar()
+                # User chose to not save, so the Auto-Save crash-recovery journal should go too
+                self.dlg.editor.WaitForAutoSave()
+                self.dlg.editor.RemoveAutoSaveJournal()
                 # User chose to not save, revert back to database version
                 tobj = self.dlg.editor.TranscriptObj
                 # If our object is a DOCUMENT ...
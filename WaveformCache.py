@@ -0,0 +1,235 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+
+#This program is free software; you can redistribute it and/or
+#modify it under the terms of the GNU General Public License
+#as published by the Free Software Foundation; either version 2
+#of the License, or (at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program; if not, write to the Free Software
+#Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+""" This module manages the extracted audio (WAV) files in the Waveforms Directory.  Each WAV file is named
+    for the media file it came from plus a key built from the media file's full path, size, and modification
+    time, so editing or replacing a media file, or having two media files with the same name in different
+    folders, no longer picks up the wrong waveform.  A manifest records the cached files so they can be
+    checked for integrity and the least recently used ones removed when the cache exceeds its size limit.
+    The Peak File that WaveformGraphic saves next to each WAV file counts toward the limit, and is removed
+    with its WAV file. """
+
+__author__ = "David K. Woods <dwoods@transana.com>"
+
+# import Python's hashlib module
+import hashlib
+# import Python's json module
+import json
+# import Python's os module
+import os
+# import Python's struct module
+import struct
+# import Python's threading module
+import threading
+# import Python's time module
+import time
+
+# import Transana's Globals
+import TransanaGlobal
+
+# The name of the manifest file in the Waveforms Directory
+MANIFEST_NAME = 'WaveformCache.manifest'
+# The length of the media file key included in WAV file names
+KEY_LENGTH = 12
+# The Peak File extension.  Peak Files live next to the extracted WAV file.
+PEAK_FILE_EXTENSION = '.peaks'
+
+# The manifest, as loaded, and the (path, modification time) it was loaded from
+_manifest = None
+_manifestSource = None
+# Lock to protect the manifest
+_manifestLock = threading.RLock()
+
+def GetCacheKey(mediaFile):
+    """ Build the cache key for a media file from its full path, size, and modification time.
+        Returns None if the media file can't be found. """
+    try:
+        stats = os.stat(mediaFile)
+    except (OSError, UnicodeError):
+        return None
+    # Build the key from the normalized path, so the same file always has the same key
+    path = os.path.normcase(os.path.abspath(mediaFile))
+    if isinstance(path, unicode):
+        path = path.encode('utf8')
+    return hashlib.sha1('%s|%d|%d' % (path, stats.st_size, int(stats.st_mtime))).hexdigest()[:KEY_LENGTH]
+
+def PeakFilename(waveFilename):
+    """ The name of the Peak File for a WAV file """
+    return os.path.splitext(waveFilename)[0] + PEAK_FILE_EXTENSION
+
+def _RemoveCachedFiles(waveFilename):
+    """ Remove a WAV file and its Peak File """
+    for filename in [waveFilename, PeakFilename(waveFilename)]:
+        try:
+            if os.path.exists(filename):
+                os.remove(filename)
+        # If the file is in use, it will be found and re-added the next time it's used
+        except OSError:
+            pass
+
+def _CachedSize(cacheName, entry):
+    """ The disk space used by a cached WAV file and its Peak File, if it has one """
+    try:
+        peakSize = os.path.getsize(PeakFilename(os.path.join(TransanaGlobal.configData.visualizationPath, cacheName)))
+    except OSError:
+        peakSize = 0
+    return entry['waveSize'] + peakSize
+
+def IsValidWaveFile(waveFilename, expectedSize=None):
+    """ Check that a WAV file is complete.  The RIFF header has to be present and has to account for the whole
+        file, which is only true once the extraction has finished writing it. """
+    try:
+        fileSize = os.path.getsize(waveFilename)
+        # If we know what size the file should be and it isn't that size, it's been changed
+        if (expectedSize != None) and (fileSize != expectedSize):
+            return False
+        f = open(waveFilename, 'rb')
+        try:
+            header = f.read(12)
+        finally:
+            f.close()
+    except (IOError, OSError, UnicodeError):
+        return False
+    # The header must be 'RIFF', the chunk size, and 'WAVE'
+    if (len(header) < 12) or (header[:4] != 'RIFF') or (header[8:12] != 'WAVE'):
+        return False
+    # The RIFF chunk size covers everything after the first 8 bytes (allowing for a pad byte)
+    riffSize = struct.unpack('<I', header[4:8])[0]
+    return fileSize - 8 - riffSize in (0, 1)
+
+def _ManifestFilename():
+    """ The full path of the manifest file """
+    return os.path.join(TransanaGlobal.configData.visualizationPath, MANIFEST_NAME)
+
+def _LoadManifest():
+    """ Load the manifest, unless the copy we already have is up to date.  (Call with _manifestLock held.) """
+    global _manifest, _manifestSource
+    manifestFilename = _ManifestFilename()
+    try:
+        source = (manifestFilename, os.path.getmtime(manifestFilename))
+    except OSError:
+        source = (manifestFilename, None)
+    # If the manifest has changed or the Waveforms Directory has moved since we last read it ...
+    if (_manifest == None) or (source != _manifestSource):
+        _manifest = {}
+        if source[1] != None:
+            try:
+                f = open(manifestFilename, 'rb')
+                try:
+                    _manifest = json.load(f)
+                finally:
+                    f.close()
+            # If the manifest can't be read, start over.  The WAV files will be picked up again as they are used.
+            except (IOError, ValueError):
+                _manifest = {}
+        _manifestSource = source
+    return _manifest
+
+def _SaveManifest():
+    """ Save the manifest.  (Call with _manifestLock held.) """
+    global _manifestSource
+    manifestFilename = _ManifestFilename()
+    tempFilename = manifestFilename + '.tmp'
+    try:
+        # Write to a temporary file first so a manifest is never left half-written
+        f = open(tempFilename, 'wb')
+        try:
+            json.dump(_manifest, f)
+        finally:
+            f.close()
+        # Windows won't rename over an existing file
+        if os.path.exists(manifestFilename):
+            os.remove(manifestFilename)
+        os.rename(tempFilename, manifestFilename)
+        _manifestSource = (manifestFilename, os.path.getmtime(manifestFilename))
+    # If the Waveforms Directory can't be written, the cache just isn't remembered
+    except (IOError, OSError):
+        pass
+
+def GetWaveFilename(mediaFile):
+    """ Given a media file name, determine the WAV file name for it and whether a valid WAV file already exists """
+    # Separate the path from the file name, and the file name from the extension
+    (fnroot, ext) = os.path.splitext(os.path.split(mediaFile)[1])
+    # Determine the WAV file name as it was before there was a cache
+    legacyFilename = os.path.join(TransanaGlobal.configData.visualizationPath, fnroot + '.wav')
+    key = GetCacheKey(mediaFile)
+    # If the media file can't be found, we can only use the old-style name
+    if key == None:
+        return legacyFilename, os.path.exists(legacyFilename)
+    cacheName = '%s_%s.wav' % (fnroot, key)
+    waveFilename = os.path.join(TransanaGlobal.configData.visualizationPath, cacheName)
+    with _manifestLock:
+        manifest = _LoadManifest()
+        entry = manifest.get(cacheName)
+        # If the WAV file is in the cache ...
+        if entry != None:
+            # ... and hasn't been damaged or changed ...
+            if IsValidWaveFile(waveFilename, entry['waveSize']):
+                # ... note that it's been used and use it
+                entry['lastUsed'] = time.time()
+                _SaveManifest()
+                return waveFilename, True
+            # If it has been damaged, drop it so it will be extracted again
+            del(manifest[cacheName])
+            _SaveManifest()
+            _RemoveCachedFiles(waveFilename)
+            return waveFilename, False
+        # If the WAV file is there but not in the manifest (perhaps the manifest was lost), add it
+        if IsValidWaveFile(waveFilename):
+            Store(mediaFile, waveFilename)
+            return waveFilename, True
+    # If there's an old-style WAV file that's newer than the media file, keep using it
+    if os.path.exists(legacyFilename) and \
+       (os.path.getmtime(legacyFilename) >= os.path.getmtime(mediaFile)) and \
+       IsValidWaveFile(legacyFilename):
+        return legacyFilename, True
+    return waveFilename, False
+
+def Store(mediaFile, waveFilename):
+    """ Add a newly extracted WAV file to the cache, then trim the cache to its size limit """
+    cacheName = os.path.split(waveFilename)[1]
+    key = GetCacheKey(mediaFile)
+    # Only WAV files named for the cache, and complete, are managed
+    if (key == None) or (cacheName[-(KEY_LENGTH + 4):-4] != key) or not IsValidWaveFile(waveFilename):
+        return
+    with _manifestLock:
+        manifest = _LoadManifest()
+        manifest[cacheName] = {'mediaFile' : os.path.abspath(mediaFile),
+                               'waveSize' : os.path.getsize(waveFilename),
+                               'lastUsed' : time.time()}
+        # Trimming the cache saves the manifest
+        Evict(keep=cacheName)
+
+def Evict(keep=None, maxSize=None):
+    """ Remove the least recently used WAV files, and their Peak Files, until the cache is within its size limit.
+        The file named in keep is never removed. """
+    # The size limit is configured in megabytes
+    if maxSize == None:
+        maxSize = TransanaGlobal.configData.waveformCacheSize * 1024 * 1024
+    with _manifestLock:
+        manifest = _LoadManifest()
+        sizes = dict([(cacheName, _CachedSize(cacheName, entry)) for (cacheName, entry) in manifest.iteritems()])
+        totalSize = sum(sizes.values())
+        # Go through the cached files from the least recently used to the most recently used
+        for (lastUsed, cacheName) in sorted([(entry['lastUsed'], cacheName) for (cacheName, entry) in manifest.iteritems()]):
+            if totalSize <= maxSize:
+                break
+            if cacheName == keep:
+                continue
+            totalSize -= sizes[cacheName]
+            del(manifest[cacheName])
+            _RemoveCachedFiles(os.path.join(TransanaGlobal.configData.visualizationPath, cacheName))
+        _SaveManifest()
@@ -29,10 +29,268 @@ import Dialogs
 import sys
 # Import Python's wave module for processing Wave files
 import wave
+# Import Python's os module
+import os
+# Import Python's struct module for reading the RIFF header and the Peak File header
+import struct
+# import numpy for bulk envelope calculation
+import numpy
+# Import Transana's Waveform Cache, which names the Peak Files
+import WaveformCache
+
+
+# Peak File signature and format version
+PEAK_FILE_MAGIC = 'TPKS'
+PEAK_FILE_VERSION = 1
+# Number of frames summarized by each entry of the finest peak level.  Each subsequent level doubles this.
+PEAK_BASE_BLOCK = 32
+# Number of base blocks processed at once when building the peak file, so memory use stays flat for long media
+PEAK_BUILD_SLAB = 65536
+
+# In-memory cache of loaded WaveformPeaks objects, keyed by WAV file name, so repeated zooms and scrolls don't
+# even need to re-read the Peak File
+_peakCache = {}
+
+
+def _FindDataChunk(waveFilename):
+    """ Parse the RIFF header of a WAV file and return (nchannels, sampwidth, framerate, dataOffset, dataLength) """
+    # Open the file for reading in binary mode
+    f = open(waveFilename, 'rb')
+    try:
+        # Read the RIFF header
+        (riff, riffSize, waveID) = struct.unpack('<4sI4s', f.read(12))
+        # If this isn't a RIFF WAVE file, we can't memory-map it
+        if (riff != 'RIFF') or (waveID != 'WAVE'):
+            raise ValueError('%s is not a RIFF WAVE file' % waveFilename)
+        # Initialize the format values
+        fmt = None
+        # Walk the chunks until we find the data chunk
+        while True:
+            header = f.read(8)
+            # If we run out of file before we find the data chunk, the file is bad
+            if len(header) < 8:
+                raise ValueError('%s has no data chunk' % waveFilename)
+            (chunkID, chunkSize) = struct.unpack('<4sI', header)
+            # The fmt chunk tells us how to interpret the data
+            if chunkID == 'fmt ':
+                fmtData = f.read(chunkSize)
+                (formatTag, nchannels, framerate, byteRate, blockAlign, bitsPerSample) = struct.unpack('<HHIIHH', fmtData[:16])
+                fmt = (nchannels, (bitsPerSample + 7) / 8, framerate)
+            # The data chunk holds the samples
+            elif chunkID == 'data':
+                if fmt is None:
+                    raise ValueError('%s has no fmt chunk' % waveFilename)
+                # ffmpeg writes a placeholder size when piping, so don't trust a size beyond the end of the file
+                dataLength = min(chunkSize, os.path.getsize(waveFilename) - f.tell())
+                return fmt + (f.tell(), dataLength)
+            # Skip any other chunk (chunks are word-aligned)
+            else:
+                f.seek(chunkSize + (chunkSize & 1), 1)
+    finally:
+        f.close()
+
+
+class WaveformPeaks(object):
+    """ Multi-resolution min / max / RMS envelope for a WAV file.  Level 0 summarizes PEAK_BASE_BLOCK frames
+        per entry, and each subsequent level summarizes twice as many frames as the level before it.  All
+        values are normalized to signed 16-bit amplitudes regardless of the WAV file's sample width. """
+
+    def __init__(self, waveFilename):
+        """ Load (or build and save) the Peak File for waveFilename """
+        # Remember the WAV file name
+        self.waveFilename = waveFilename
+        # Note the Peak File name
+        self.peakFilename = WaveformCache.PeakFilename(waveFilename)
+        # Note the WAV file's size and modification time, which validate the Peak File
+        self.waveStat = GetFileSignature(waveFilename)
+        # Parse the WAV header
+        (self.nchannels, self.sampwidth, self.framerate, self.dataOffset, dataLength) = _FindDataChunk(waveFilename)
+        # Determine the number of frames in the file
+        self.nframes = dataLength / (self.nchannels * self.sampwidth)
+        # Try to load the existing Peak File.  If that fails, build a new one.
+        if not self.Load():
+            self.Build()
+            self.Save()
+
+    def GetSamples(self):
+        """ Memory-map the WAV data and return it as a 1-dimensional signed 16-bit-scale array (first channel
+            if several, max per frame otherwise) without reading the whole file """
+        # Determine the sample data type
+        if self.sampwidth == 1:
+            dtype = numpy.uint8
+        else:
+            dtype = numpy.dtype('<i2')
+        # Memory-map the data chunk
+        data = numpy.memmap(self.waveFilename, dtype=dtype, mode='r', offset=self.dataOffset,
+                            shape=(self.nframes * self.nchannels,))
+        # If we have more than one channel, split the channels out
+        if self.nchannels > 1:
+            data = data.reshape((self.nframes, self.nchannels))
+        return data
+
+    def _Normalize(self, samples):
+        """ Convert a block of raw samples to signed 16-bit values """
+        # Use 32-bit integers so the arithmetic below can't overflow
+        samples = samples.astype(numpy.int32)
+        # 8-bit WAV data is unsigned, with 128 as silence
+        if self.sampwidth == 1:
+            samples = (samples - 128) * 256
+        # If we have multiple channels, take the loudest channel for each frame
+        if samples.ndim > 1:
+            samples = numpy.where(numpy.abs(samples.max(axis=1)) > numpy.abs(samples.min(axis=1)),
+                                  samples.max(axis=1), samples.min(axis=1))
+        return samples
+
+    def Build(self):
+        """ Compute the envelope levels from the memory-mapped WAV data """
+        # Get the memory-mapped sample data
+        data = self.GetSamples()
+        # Initialize lists for the level 0 values
+        mins = []
+        maxs = []
+        rmss = []
+        # Determine the number of frames per slab
+        slabFrames = PEAK_BASE_BLOCK * PEAK_BUILD_SLAB
+        # Process the file one slab at a time
+        for slabStart in xrange(0, self.nframes, slabFrames):
+            # Get the normalized samples for this slab
+            samples = self._Normalize(data[slabStart:slabStart + slabFrames])
+            # Pad a partial final block with silence so it can be reshaped into blocks
+            remainder = len(samples) % PEAK_BASE_BLOCK
+            if remainder:
+                samples = numpy.concatenate((samples, numpy.zeros(PEAK_BASE_BLOCK - remainder, dtype=numpy.int32)))
+            # Reshape into one row per block
+            blocks = samples.reshape((-1, PEAK_BASE_BLOCK))
+            # Calculate the min, max, and RMS values for every block at once.  (A block of full-scale negative
+            # samples has an RMS of 32768, which doesn't fit in 16 bits, so the RMS is clipped.)
+            mins.append(blocks.min(axis=1).astype(numpy.int16))
+            maxs.append(blocks.max(axis=1).astype(numpy.int16))
+            rmss.append(numpy.sqrt((blocks.astype(numpy.float32) ** 2).mean(axis=1)).clip(0, 32767).astype(numpy.int16))
+        # Release the memory map
+        del data
+        # If the WAV file was empty, we have a single silent block
+        if len(mins) == 0:
+            mins = maxs = rmss = [numpy.zeros(1, dtype=numpy.int16)]
+        # Create level 0
+        self.levels = [(numpy.concatenate(mins), numpy.concatenate(maxs), numpy.concatenate(rmss))]
+        # Build each coarser level by combining adjacent pairs from the previous level
+        while len(self.levels[-1][0]) > 1:
+            (levelMin, levelMax, levelRms) = self.levels[-1]
+            # Pad odd-length levels by repeating the last value so pairs line up
+            if len(levelMin) % 2:
+                levelMin = numpy.append(levelMin, levelMin[-1])
+                levelMax = numpy.append(levelMax, levelMax[-1])
+                levelRms = numpy.append(levelRms, levelRms[-1])
+            rms = levelRms.astype(numpy.float32).reshape((-1, 2))
+            self.levels.append((levelMin.reshape((-1, 2)).min(axis=1),
+                                levelMax.reshape((-1, 2)).max(axis=1),
+                                numpy.sqrt((rms ** 2).mean(axis=1)).clip(0, 32767).astype(numpy.int16)))
+
+    def Load(self):
+        """ Load the Peak File, returning False if it is missing, damaged, or out of date """
+        # If there's no Peak File, we can't load it
+        if not os.path.exists(self.peakFilename):
+            return False
+        try:
+            f = open(self.peakFilename, 'rb')
+            try:
+                # Read and check the header
+                headerFormat = '<4sHqdIIIIH'
+                header = struct.unpack(headerFormat, f.read(struct.calcsize(headerFormat)))
+                (magic, version, waveSize, waveMTime, framerate, nframes, sampwidth, baseBlock, numLevels) = header
+                # If the Peak File doesn't describe THIS version of the WAV file, it's stale
+                if (magic != PEAK_FILE_MAGIC) or (version != PEAK_FILE_VERSION) or \
+                   ((waveSize, waveMTime) != self.waveStat) or (nframes != self.nframes) or \
+                   (baseBlock != PEAK_BASE_BLOCK):
+                    return False
+                # Read the levels
+                self.levels = []
+                for level in range(numLevels):
+                    (count,) = struct.unpack('<I', f.read(4))
+                    values = numpy.fromfile(f, dtype='<i2', count=count * 3)
+                    # A short read means a truncated file
+                    if len(values) != count * 3:
+                        return False
+                    self.levels.append((values[:count], values[count:count * 2], values[count * 2:]))
+                return True
+            finally:
+                f.close()
+        except (IOError, OSError, struct.error):
+            return False
+
+    def Save(self):
+        """ Save the Peak File next to the WAV file.  Failure to save is not fatal. """
+        try:
+            f = open(self.peakFilename, 'wb')
+            try:
+                f.write(struct.pack('<4sHqdIIIIH', PEAK_FILE_MAGIC, PEAK_FILE_VERSION, self.waveStat[0], self.waveStat[1],
+                                    self.framerate, self.nframes, self.sampwidth, PEAK_BASE_BLOCK, len(self.levels)))
+                for (levelMin, levelMax, levelRms) in self.levels:
+                    f.write(struct.pack('<I', len(levelMin)))
+                    f.write(numpy.concatenate((levelMin, levelMax, levelRms)).astype('<i2').tostring())
+            finally:
+                f.close()
+        except (IOError, OSError):
+            if DEBUG:
+                print "WaveformGraphic:  Unable to save peak file", self.peakFilename
+
+    def GetEnvelope(self, startFrame, framesPerPixel, numPixels):
+        """ Return (mins, maxs, rmss) arrays with one entry per pixel, covering numPixels pixels of
+            framesPerPixel frames each starting at startFrame.  The arrays may be shorter than numPixels
+            if the media ends first. """
+        # Don't read past the end of the media
+        numPixels = min(numPixels, max(0, (self.nframes - startFrame + framesPerPixel - 1) / framesPerPixel))
+        # If there's nothing to draw, return empty arrays
+        if numPixels <= 0:
+            empty = numpy.zeros(0, dtype=numpy.int16)
+            return (empty, empty, empty)
+        # If we're zoomed in past the finest peak level, read the samples themselves.  This is a small region.
+        if framesPerPixel < PEAK_BASE_BLOCK:
+            data = self._Normalize(self.GetSamples()[startFrame:startFrame + framesPerPixel * numPixels])
+            mins = maxs = data
+            rmss = numpy.abs(data)
+            blockSize = 1
+            # The sample array starts at startFrame
+            origin = startFrame
+        # Otherwise, select the coarsest level whose blocks still fit within a pixel
+        else:
+            level = 0
+            while (level + 1 < len(self.levels)) and (PEAK_BASE_BLOCK << (level + 1) <= framesPerPixel):
+                level += 1
+            (mins, maxs, rmss) = self.levels[level]
+            blockSize = PEAK_BASE_BLOCK << level
+            # The level arrays start at the beginning of the media
+            origin = 0
+        # Determine the index of the block that starts each pixel
+        indexes = (startFrame - origin + numpy.arange(numPixels) * framesPerPixel) / blockSize
+        indexes = numpy.clip(indexes, 0, len(mins) - 1)
+        # Each pixel must include at least one block
+        indexes = numpy.maximum.accumulate(indexes)
+        end = min(len(mins), indexes[-1] + max(1, framesPerPixel / blockSize))
+        # Reduce the blocks for each pixel in one pass
+        pixelMins = numpy.minimum.reduceat(mins[:end], indexes)
+        pixelMaxs = numpy.maximum.reduceat(maxs[:end], indexes)
+        pixelRms = numpy.maximum.reduceat(rmss[:end], indexes)
+        return (pixelMins, pixelMaxs, pixelRms)
+
+
+def GetFileSignature(filename):
+    """ Return the (size, modification time) pair used to detect changes to a file """
+    fileStat = os.stat(filename)
+    return (fileStat.st_size, float(fileStat.st_mtime))
+
+
+def GetWaveformPeaks(waveFilename):
+    """ Return the WaveformPeaks object for waveFilename, using the in-memory cache when it's still valid """
+    # If we have a cached copy that matches the file on disk, use it
+    if _peakCache.has_key(waveFilename) and (_peakCache[waveFilename].waveStat == GetFileSignature(waveFilename)):
+        return _peakCache[waveFilename]
+    # Otherwise, load or build the peaks and cache them
+    peaks = WaveformPeaks(waveFilename)
+    _peakCache[waveFilename] = peaks
+    return peaks
 
 
-# import numpy
-
 
 def WaveformGraphicCreate(waveFilename, waveformFilename, startPoint, mediaLength, graphicSize, colors = (wx.CYAN, wx.GREEN, wx.BLUE, wx.RED), style='waveform'):
     try:
@@ -81,6 +339,8 @@ def WaveformGraphicCreate(waveFilename, waveformFilename, startPoint, mediaLengt
 
                 # Read the appropriate number of frames to position properly in the wave file
                 # Number of seconds into the file * Frame Rate
+                # Unless we are indenting into the wave file below, we start reading at the first frame
+                startFrame = 0
 
                 # If we are at the beginning of the virtual media file ...
                 if startPoint == 0:
@@ -114,7 +374,7 @@ def WaveformGraphicCreate(waveFilename, waveformFilename, startPoint, mediaLengt
                             print "read to ",float(abs(indent)) / 1000.0 * waveFile.getframerate(),"frames"
 
                         # Indent the wave file the appropriate number of frames to get to the right part of the wave file
-                        frames = waveFile.readframes(int(float(abs(indent)) / 1000.0 * waveFile.getframerate()))
+                        startFrame = int(float(abs(indent)) / 1000.0 * waveFile.getframerate())
 
 #                        print "**", startPoint, indent, float(abs(indent)) / 1000.0 * waveFile.getframerate(), float(indent) / 1000.0 * waveFile.getframerate()
 
@@ -132,96 +392,99 @@ def WaveformGraphicCreate(waveFilename, waveformFilename, startPoint, mediaLengt
                     print "\n\nTODO:  Zoomed in so that Number of Lines is less than Graphic Width!!\n\n"
 
 
-                max1 = min1 = 0
-                
-                # Draw the actual WaveForm
-                # for each pixel position in the graphic's width ...
-                for loop in range(sp, ep):
-                    # Read the appropriate number of chunks from the wave file
-                    frames = waveFile.readframes(ChunkSize)
-
-                    # Don't break all of Transana if we couldn't extract the wave
-                    if len(frames) == 0:
-                        break
-
-                    # Determine the largest value in the data read (this produces the best-looking graph!)
-                    frame = max(frames)
-                    # Process the data differently based on the Bytes Per Sample value of the Wave File
-                    if waveFile.getsampwidth() == 1:
-                        if style == 'waveform':
-                            #This is for the 8-bit Bytes per Sample setting
-                            # The byte value represents sound, with 128 being silence and deviation from it being louder.
-                            # Therefore, determine the distance the Byte Value (frame) differs from silence.
-                            if ord(frame) > 128:
-                               amplitude = ord(frame) - 128
-                            else:
-                               amplitude = 128 - ord(frame)
-                            # Adjust the raw amplitude (0 .. 255 range) for the size of the graphic canvas
-                            amplitude = round(amplitude * graphicSize[1] / 256.0)
-                            # Determine the coordinates for drawing the amplitude line on the Device Context
-                            # The horizontal value equals the value of the loop
-                            x = loop
-                            # The vertical values represent the divergence of amplitude from the center of the graphic
-                            y1 = round((graphicSize[1]/2.0 - amplitude))
-                            y2 = round((graphicSize[1]/2.0 + amplitude))
-
-                            # draw the line on the Device Context
-                            dc.DrawLine(int(x), int(y1), int(x), int(y2))
-                        elif style == 'spectrogram':
+                # If we are drawing a waveform ...
+                if style == 'waveform':
+                    # ... get the min / max envelope for each pixel from the Peak File.  This is a fixed cost
+                    # regardless of the length of the media file.
+                    (mins, maxs, rmss) = GetWaveformPeaks(wavFile['filename']).GetEnvelope(startFrame, ChunkSize, ep - sp)
+                    # The amplitude is the largest divergence from silence in either direction
+                    amplitudes = numpy.maximum(numpy.abs(mins.astype(numpy.int32)), numpy.abs(maxs.astype(numpy.int32)))
+                    # Adjust the amplitude (signed 16-bit range) for the size of the graphic canvas
+                    amplitudes = numpy.round(amplitudes * graphicSize[1] / 65536.0)
+                    # The horizontal values start at the starting pixel
+                    x = numpy.arange(sp, sp + len(amplitudes))
+                    # The vertical values represent the divergence of amplitude from the center of the graphic
+                    y1 = numpy.round(graphicSize[1] / 2.0 - amplitudes)
+                    y2 = numpy.round(graphicSize[1] / 2.0 + amplitudes)
+                    # Draw all of the lines on the Device Context at once
+                    dc.DrawLineList(numpy.column_stack((x, y1, x, y2)).astype(numpy.int32).tolist())
+                # If we are drawing a spectrogram ...
+                else:
+                    # ... we need the raw frames, so move to the right part of the wave file
+                    if startFrame > 0:
+                        waveFile.readframes(startFrame)
+
+                    max1 = min1 = 0
+
+                    # Draw the spectrogram from the raw wave data
+                    # for each pixel position in the graphic's width ...
+                    for loop in range(sp, ep):
+                        # Read the appropriate number of chunks from the wave file
+                        frames = waveFile.readframes(ChunkSize)
+
+                        # Don't break all of Transana if we couldn't extract the wave
+                        if len(frames) == 0:
+                            break
+
+                        # Determine the largest value in the data read (this produces the best-looking graph!)
+                        frame = max(frames)
+                        # Process the data differently based on the Bytes Per Sample value of the Wave File
+                        if waveFile.getsampwidth() == 1:
+                            if style == 'spectrogram':
 
 #                            print "Waveform style = spectrogram", sp, ep, ep-sp
 
 #                            print frames, type(frames), len(frames)
 #                            print
 
-                            sigList = []
-                            for loop2 in range(len(frames)):
+                                sigList = []
+                                for loop2 in range(len(frames)):
 
-                                val = ord(frames[loop2])
-                                if val > 128:
-                                    sigList.append(val - 128)
-                                else:
-                                    sigList.append(128 - val)
+                                    val = ord(frames[loop2])
+                                    if val > 128:
+                                        sigList.append(val - 128)
+                                    else:
+                                        sigList.append(128 - val)
 
 #                            print sigList
 #                            print
 
-                            max1 = max(max1, max(sigList))
-                            min1 = min(min1, min(sigList))
+                                max1 = max(max1, max(sigList))
+                                min1 = min(min1, min(sigList))
 
-                            sig = numpy.array(sigList)
+                                sig = numpy.array(sigList)
                             
 #                            print sig
 #                            print
 
-                            spectrum = 10*numpy.log10(abs(numpy.fft.rfft(sig)))
+                                spectrum = 10*numpy.log10(abs(numpy.fft.rfft(sig)))
 
 #                            print spectrum, len(spectrum)
 
 #                            print "Max =", max1, "Min =", min1
 
-                            x = loop
-                            for loop2 in range(len(spectrum)):
+                                x = loop
+                                for loop2 in range(len(spectrum)):
 
 #                                print loop2, spectrum[loop2], type(spectrum[loop2]),
 
-                                if spectrum[loop2] in [numpy.inf, -numpy.inf]:
-                                    n = 0
-                                else:
-                                    n = max(0, int(5 * spectrum[loop2]))
+                                    if spectrum[loop2] in [numpy.inf, -numpy.inf]:
+                                        n = 0
+                                    else:
+                                        n = max(0, int(5 * spectrum[loop2]))
 
 #                                    print 5 * spectrum[loop2], n
 
-                                    n = max(0, int(5 * spectrum[loop2]))
+                                        n = max(0, int(5 * spectrum[loop2]))
                                 
-                                pen.SetColour(wx.Colour(255-n, 255-n, 255-n))
-                                dc.SetPen(pen)
-                                dc.DrawPoint(x, loop2)
+                                    pen.SetColour(wx.Colour(255-n, 255-n, 255-n))
+                                    dc.SetPen(pen)
+                                    dc.DrawPoint(x, loop2)
                                               
                         
-                    else:
-                        #This is for the 16-bit Bytes per Sample setting
-                        print "Waveform for 16-bit wave files not yet implemented."
+                        else:
+                            #This is for the 16-bit Bytes per Sample setting
+                            print "Spectrogram for 16-bit wave files not yet implemented."
 
                 # Close the Wave File   
                 waveFile.close()
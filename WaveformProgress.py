@@ -36,6 +36,10 @@ if __name__ == '__main__':
 import Misc
 # Import Transana's Global Variables
 import TransanaGlobal
+# import Transana's Media Queue
+import MediaQueue
+# import Transana's Waveform Cache
+import WaveformCache
 
 ID_BTNCANCEL    =  wx.NewId()
 
@@ -256,17 +260,8 @@ class WaveformProgress(wx.Dialog):
             
         # Build the command line for the appropriate media conversion call
         if mode == 'AudioExtraction':
-            # -i              input file
-            # -vn             disable video
-            # -ar 2756        Audio Sampling rate 2756 Hz
-            # -ab 8k          Audio Bitrate 8kb/s
-            # -ac 1           Audio Channels 1 (mono)
-            # -acodec pcm_u8  8-bit PCM audio codec
-            # -y              overwrite existing destination file
-            programStr = os.path.join(TransanaGlobal.programDir, 'ffmpeg_Transana')
-            if 'wxMSW' in wx.PlatformInfo:
-                programStr += '.exe'
-            process = '"' +  programStr + '" "-embedded" "1" "-i" "%s" "-vn" "-ar" "2756" "-ab" "8k" "-ac" "1" "-acodec" "pcm_u8" "-y" "%s"'
+            # The Media Queue uses the same audio extraction command
+            process = MediaQueue.AudioExtractionCommand(TransanaGlobal.programDir)
             tempMediaFilename = inputFile
             tempWaveFilename = outputFile
 
@@ -291,6 +286,7 @@ class WaveformProgress(wx.Dialog):
             import TransanaExceptions
             raise TransanaExceptions.NotImplementedError
 
+        self.sourceFile = inputFile
         self.destFile = outputFile
         
         # Create a wxProcess object
@@ -359,6 +355,9 @@ class WaveformProgress(wx.Dialog):
                 self.process.CloseOutput()
             # De-reference the process
             self.process = None
+            # If audio extraction finished, add the WAV file to the Waveform Cache
+            if (self.mode == 'AudioExtraction') and (self.errorMessages != ['Cancelled']):
+                WaveformCache.Store(self.sourceFile, self.destFile)
             wx.YieldIfNeeded()
             # If we're allowing multiple threads ...
             if not self.showModally:
@@ -419,6 +418,142 @@ class WaveformProgress(wx.Dialog):
                     # ... just do output so I'll notice during testing and handle it!
 #                    print ' WaveformProgress.OnTimer() --> ', progress
 
+
+class MediaQueueProgress(wx.Dialog):
+    """ This class implements a single Progress Dialog for a group of Media Queue jobs.  When all of the
+        jobs have finished, it calls parent.OnConvertComplete(self) and closes. """
+
+    def __init__(self, parent, mediaQueue, jobNums):
+        """ Initialize the Media Queue Progress Dialog """
+        # Remember the Parent
+        self.parent = parent
+        # Remember the Media Queue and the jobs we're reporting on
+        self.mediaQueue = mediaQueue
+        self.jobNums = jobNums
+        # Initialize a list to collect error messages
+        self.errorMessages = []
+
+        # Encode the prompt
+        prompt = unicode(_('Media File Conversion Progress'), 'utf8')
+        # Define the Dialog Box.  wx.STAY_ON_TOP required because this dialog can't be modal, but shouldn't be hidden or worked behind.
+        wx.Dialog.__init__(self, parent, -1, prompt, size=(400, 160), style=wx.CAPTION | wx.STAY_ON_TOP)
+
+        # To look right, the Mac needs the Small Window Variant.
+        if "__WXMAC__" in wx.PlatformInfo:
+            self.SetWindowVariant(wx.WINDOW_VARIANT_SMALL)
+
+        # Create the main Sizer, which is Vertical
+        sizer = wx.BoxSizer(wx.VERTICAL)
+
+        # Files Processed label
+        self.lbl = wx.StaticText(self, -1, '', style=wx.ST_NO_AUTORESIZE)
+        sizer.Add(self.lbl, 0, wx.ALIGN_LEFT | wx.EXPAND | wx.ALL, 10)
+
+        # Progress Bar
+        self.progressBar = wx.Gauge(self, -1, 100, style=wx.GA_HORIZONTAL | wx.GA_SMOOTH)
+        sizer.Add(self.progressBar, 0, wx.ALIGN_CENTER | wx.LEFT | wx.RIGHT | wx.EXPAND, 10)
+
+        # Current Files label, listing the files being processed now
+        self.lblFiles = wx.StaticText(self, -1, '', style=wx.ST_NO_AUTORESIZE)
+        sizer.Add(self.lblFiles, 1, wx.ALIGN_LEFT | wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
+
+        elapsedSizer = wx.BoxSizer(wx.HORIZONTAL)
+
+        # Time Elapsed label
+        # Encode the prompt
+        prompt = unicode(_("%s elapsed"), 'utf8')
+        self.lblElapsed = wx.StaticText(self, -1, prompt % '0:00:00', style=wx.ST_NO_AUTORESIZE | wx.ALIGN_LEFT)
+        elapsedSizer.Add(self.lblElapsed, 0, wx.ALIGN_LEFT | wx.LEFT, 10)
+        elapsedSizer.Add((0, 5), 1, wx.EXPAND)
+
+        # Time Remaining label
+        # Encode the prompt
+        prompt = unicode(_("%s remaining"), 'utf8')
+        self.lblRemaining = wx.StaticText(self, -1, prompt % '0:00:00', style=wx.ST_NO_AUTORESIZE | wx.ALIGN_RIGHT)
+        elapsedSizer.Add(self.lblRemaining, 0, wx.ALIGN_RIGHT | wx.RIGHT, 10)
+        sizer.Add(elapsedSizer, 0, wx.EXPAND | wx.TOP | wx.BOTTOM, 4)
+
+        # Cancel button
+        # Encode the prompt
+        prompt = unicode(_("Cancel"), 'utf8')
+        self.btnCancel = wx.Button(self, -1, prompt)
+        sizer.Add(self.btnCancel, 0, wx.ALIGN_CENTER | wx.BOTTOM, 10)
+        self.btnCancel.Bind(wx.EVT_BUTTON, self.OnInterrupt)
+
+        self.SetSizer(sizer)
+        # Set this as the minimum size for the form.
+        sizer.SetMinSize(wx.Size(450, 200))
+        # Call Layout to "place" the widgits
+        self.Layout()
+        self.SetAutoLayout(True)
+        self.Fit()
+
+        # Create a Timer that will check the jobs' progress
+        self.timer = wx.Timer()
+        self.timer.Bind(wx.EVT_TIMER, self.OnTimer)
+
+        TransanaGlobal.CenterOnPrimary(self)
+
+    def Start(self):
+        """ Show the Progress Dialog and start monitoring the jobs """
+        # Note the time when the progress bar started
+        self.progressStartTime = time.time()
+        # Start the timer to post progress
+        self.timer.Start(500)
+        self.Show()
+        # Post the initial progress.  (If there's nothing to do, this reports completion.)
+        self.OnTimer(None)
+
+    def GetErrorMessages(self):
+        """ Get the error messages from the jobs that failed """
+        return self.errorMessages
+
+    def OnInterrupt(self, event):
+        """ Cancel Button Event Handler """
+        # Disable the Cancel button to prevent multiple presses while processing occurs
+        self.btnCancel.Enable(False)
+        # Cancel the jobs that haven't finished
+        self.mediaQueue.Cancel(self.jobNums)
+        # ... signal the calling routine through the Error Message process
+        self.errorMessages = ['Cancelled']
+
+    def OnTimer(self, event):
+        """ Handle the EVT_TIMER event, which updates the progress dialog """
+        (finished, failed, total, percent, running) = self.mediaQueue.GetProgress(self.jobNums)
+        # Show how many files have been processed
+        prompt = unicode(_("%d of %d files processed"), 'utf8')
+        self.lbl.SetLabel(prompt % (finished, total))
+        self.progressBar.SetValue(int(percent))
+        # List the files being processed now
+        self.lblFiles.SetLabel('\n'.join([os.path.split(job.inputFile)[1] for job in running]))
+        # If we've made SOME progress ...
+        if percent > 0:
+            # ... calculate time elapsed ...
+            t1 = (time.time() - self.progressStartTime)
+            # ... calculate total estimated time for completion
+            t2 = t1 * 100.0 / percent
+            # Display elapsed time
+            self.lblElapsed.SetLabel(_("%s elapsed") % Misc.TimeMsToStr(t1 * 1000))
+            # Display time remaining
+            self.lblRemaining.SetLabel(_("%s remaining") % Misc.TimeMsToStr((t2 - t1) * 1000))
+        # If all the jobs are finished ...
+        if finished == total:
+            # Stop the Progress Timer
+            self.timer.Stop()
+            # Collect the errors from any jobs that failed
+            if self.errorMessages != ['Cancelled']:
+                for jobNum in self.jobNums:
+                    job = self.mediaQueue.GetJob(jobNum)
+                    if (job != None) and (job.status == MediaQueue.FAILED):
+                        self.errorMessages += job.errorMessages
+            # The jobs are finished, so we don't need to keep them in the queue
+            self.mediaQueue.Purge(self.jobNums)
+            # ... inform the PARENT that the jobs are complete for cleanup
+            self.parent.OnConvertComplete(self)
+            # Close the Progress Dialog
+            self.Close()
+
+
 # If running in stand-alone mode for testing ...
 if __name__ == '__main__':
     # Create a PySimpleApp
@@ -0,0 +1,115 @@
+# Copyright (C) 2002 - 2017 Spurgeon Woods LLC
+
+#This program is free software; you can redistribute it and/or
+#modify it under the terms of the GNU General Public License
+#as published by the Free Software Foundation; either version 2
+#of the License, or (at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program; if not, write to the Free Software
+#Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+""" This module implements the word counting engine behind the Word Frequency Report.  It splits
+    Plain Text into words and counts them, caching the counts for each object.  It does not use
+    wxPython, so the counting can be run in worker processes. """
+
+__author__ = "David K. Woods <dwoods@transana.com>"
+
+# import Python's collections module
+import collections
+# import Python's multiprocessing module
+import multiprocessing
+# import Python's Regular Expression module
+import re
+
+# The number of worker processes to use for counting words.  0 counts in the current process.
+WORD_COUNT_PROCESSES = 0
+
+# Text cleanup patterns.  These are applied in order, and produce exactly the words the original eight
+# separate substitutions did.
+#   1.  Runs of two or more periods, question marks, colons, asterisks, plus signs, exclamation points, and hyphens;
+#       parentheses, brackets, braces, quotation marks, slashes, ampersands, equal signs, asterisks, pound signs,
+#       less than and greater than; and apostrophes preceded by white space or by any of those.
+#       These all become spaces.
+PUNCTUATION_PATTERN = re.compile('[\.?:\*+!-][\.?:\*+!-]+|' +
+                                 '[()\[\]{}"/&=\*#<>]|' +
+                                 '(?<=[\s()\[\]{}"/&=\*#<>])\'|' +
+                                 '(?<=[\.?:\*+!-][\.?:\*+!-])\'')
+#   2.  Certain unicode characters that seem to cause problems (smart quotes, double-angle quotes, etc.)
+#       Also, the 4 Jeffersonian special symbols.  These are removed.
+UNICODE_DELETIONS = dict([(ord(c), None) for c in u'\u00ab\u00b0\u00bb\u2018\u2019\u2022\u201c\u201d\u2039\u203a\u2191\u2193'])
+#   3.  Commas, periods, questions marks, exclamation points, colons, semicolons, and apostrophes followed by
+#       whitespace (but NOT those NOT followed by white space, leaving "2.2", "1,000" and "won't" intact), and
+#       final punctuation at the end of the string.  These are removed.
+TRAILING_PUNCTUATION_PATTERN = re.compile('[,\.?!:;\'](?=\s)|[\.?!\']$')
+# Words are separated by white space
+WHITESPACE_PATTERN = re.compile('\s+')
+# There are certain "words" that should not be included.  These can slip past the cleanup.
+EXCLUDED_WORDS = ['', '-', ':']
+
+# Word counts for individual objects, keyed by (object type, object number), holding (last save time, word counts)
+_countCache = {}
+
+def PrepareText(text):
+    """ Clean up the messy PlainText that comes in, removing punctuation, etc. """
+    text = PUNCTUATION_PATTERN.sub(' ', text)
+    if isinstance(text, unicode):
+        text = text.translate(UNICODE_DELETIONS)
+    else:
+        text = text.translate(None, '\xab\xb0\xbb')
+    return TRAILING_PUNCTUATION_PATTERN.sub('', text)
+
+def CountText(text):
+    """ Count the words in a piece of Plain Text, without applying synonyms.  Returns a Counter. """
+    words = collections.Counter()
+    # If there is no text, there are no words
+    if not text:
+        return words
+    for word in WHITESPACE_PATTERN.split(PrepareText(text)):
+        # Compensate for different cases
+        word = word.strip().lower()
+        if not word in EXCLUDED_WORDS:
+            words[word] += 1
+    return words
+
+def CountTexts(texts, processes=WORD_COUNT_PROCESSES):
+    """ Count the words in each of a list of Plain Texts, using worker processes if requested.
+        Returns a list of Counters in the same order. """
+    # If we're not using worker processes, or there's too little to share out ...
+    if (processes < 2) or (len(texts) < processes):
+        # ... count here
+        return map(CountText, texts)
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(CountText, texts, max(1, len(texts) / (processes * 4)))
+    finally:
+        pool.close()
+        pool.join()
+
+def CachedCounts(objectType, objectNum, lastSaveTime):
+    """ Get the cached word counts for an object, or None if they aren't cached or the object has been saved since """
+    cached = _countCache.get((objectType, objectNum))
+    if (cached == None) or (cached[0] != lastSaveTime):
+        return None
+    return cached[1]
+
+def CacheCounts(objectType, objectNum, lastSaveTime, counts):
+    """ Remember the word counts for an object as of its last save time """
+    _countCache[(objectType, objectNum)] = (lastSaveTime, counts)
+
+def ApplySynonyms(counts, synonymLookups, words=None):
+    """ Add word counts into a word frequency dictionary, replacing words with their synonym groups.
+        Returns the word frequency dictionary. """
+    # Start a new dictionary if one isn't passed in
+    if words == None:
+        words = {}
+    for (word, count) in counts.iteritems():
+        # If the word has a synonym, substitute the synonym for the original word
+        word = synonymLookups.get(word, word)
+        words[word] = words.get(word, 0) + count
+    return words
@@ -22,6 +22,8 @@ SHOW_CORRELATION = False
 
 # import Python's codecs module for reading utf-8 files
 import codecs
+# import Python's collections module
+import collections
 # import Python's os and sys modules
 import os, sys
 # import Python's random module
@@ -67,6 +69,8 @@ import TransanaGlobal
 import TransanaImages
 # Import Transana's Transcript Object
 import Transcript
+# Import Transana's Word Counter
+import WordCounter
 
 
 class CheckListCtrl(wx.ListCtrl, ListCtrlMixins.CheckListCtrlMixin):
@@ -859,7 +863,7 @@ class WordFrequencyReport(wx.Frame, ListCtrlMixins.ColumnSorterMixin):
                 self.synonymResults.SetStringItem(index, 1, word + synonymExtension)
 
                 # If our word already HAS a synonym entry ...
-                if word in self.synonymLookups.keys():
+                if word in self.synonymLookups:
                     # ... add the extended version to the synonyms list for the synonym group
                     self.synonyms[self.synonymLookups[word]].append(word + synonymExtension)
                 # If our word does NOT have a synonym entry ...
@@ -923,7 +927,7 @@ class WordFrequencyReport(wx.Frame, ListCtrlMixins.ColumnSorterMixin):
             synonym = self.synonymResults.GetItemText(item, 1)
 
             # It's possible that the Synonym Group is actually a synonym itself!  Check for that.
-            if synonymGroup in self.synonymLookups.keys():
+            if synonymGroup in self.synonymLookups:
                 # If so, use the value from the lookup dictionary rather than from the control
                 synonymGroup = self.synonymLookups[synonymGroup]
             # Delete the synonym from the database
@@ -1049,10 +1053,8 @@ And then I had to write it again and 1,000 I had to do it fast, so it wasn't as
 http://www.spurgeonwoods.com/test
 It's kind of  (2.2)   a bummer.
 I'm Ellen Feiss, and I'm a student!"""
-                # Prepare the sample text
-                text = self.PrepareText(sampleText)
                 # Count the words in the sample text
-                data = self.CountWords(text, data)
+                data = WordCounter.ApplySynonyms(WordCounter.CountText(sampleText), self.synonymLookups, data)
 
             # If we're in Transana ...
             else:
@@ -1162,17 +1164,26 @@ I'm Ellen Feiss, and I'm a student!"""
             a data structure with all the individual words in the appropriate scope along with their counts. """
         # Ask the user to wait while the report is being assembled
         popupDlg = Dialogs.PopupDialog(self, _("Word Frequency Report"), _("Please wait ..."))
+        # Initialize the lists of objects to count, keyed by object type.  An object appearing in more than one
+        # tree node is counted once for each node.
+        objects = {'D' : collections.Counter(), 'T' : collections.Counter(), 'Q' : collections.Counter(), 'C' : collections.Counter()}
+        # Extract the objects from the tree using this recursive method
+        self.ExtractDataFromNode(tree, startNode, objects)
         # Initialize the data dictionary
         data = {}
-        # Extract the data from the tree using this recursive method
-        data = self.ExtractDataFromNode(tree, startNode, data)
+        # For each type of object ...
+        for objectType in objects.keys():
+            # ... if there are any to count ...
+            if len(objects[objectType]) > 0:
+                # ... add their word counts to the data dictionary
+                data = self.CountObjectWords(objectType, objects[objectType], data)
         # Destroy the popup
         popupDlg.Destroy()
         # Return the data dictionary to the calling routine
         return data
 
-    def ExtractDataFromNode(self, tree, startNode, data):
-        """ This extracts data from a node, calling subnodes recursively as needed """
+    def ExtractDataFromNode(self, tree, startNode, objects):
+        """ This extracts the objects to count from a node, calling subnodes recursively as needed """
         # Get the Item Name and Item Data from the tree node passed in.
         itemName = tree.GetItemText(startNode)
         itemData = tree.GetPyData(startNode)
@@ -1194,44 +1205,26 @@ I'm Ellen Feiss, and I'm a student!"""
                 # If the child node is soemthing we need to process ...
                 else:
                     # ... process the node by calling this method recursively
-                    data = self.ExtractDataFromNode(tree, childNode, data)
+                    self.ExtractDataFromNode(tree, childNode, objects)
                 # Try to get the next Child Node
                 (childNode, cookieItem) = tree.GetNextChild(startNode, cookieItem)
 
         # If the node passed in is a Document Node ...
         elif itemData.nodetype in ['DocumentNode', 'SearchDocumentNode']:
-            # ... load the Document ...
-            record = Document.Document(num=itemData.recNum)
-            # ... prepare the object's plain text ...
-            text = self.PrepareText(record.plaintext)
-            # ... and count the words in the prepared text
-            data = self.CountWords(text, data)
+            # ... note the Document
+            objects['D'][itemData.recNum] += 1
         # If the node passed in is a Transcript Node ...
         elif itemData.nodetype in ['TranscriptNode', 'SearchTranscriptNode']:
-            # ... load the Transcript ...
-            record = Transcript.Transcript(itemData.recNum)
-            # ... prepare the object's plain text ...
-            text = self.PrepareText(record.plaintext)
-            # ... and count the words in the prepared text
-            data = self.CountWords(text, data)
+            # ... note the Transcript
+            objects['T'][itemData.recNum] += 1
         # If the node passed in is a Quote Node ...
         elif itemData.nodetype in ['QuoteNode', 'SearchQuoteNode']:
-            # ... load the Quote ...
-            record = Quote.Quote(num=itemData.recNum)
-            # ... prepare the object's plain text ...
-            text = self.PrepareText(record.plaintext)
-            # ... and count the words in the prepared text
-            data = self.CountWords(text, data)
+            # ... note the Quote
+            objects['Q'][itemData.recNum] += 1
         # If the node passed in is a Clip Node ...
         elif itemData.nodetype in ['ClipNode', 'SearchClipNode']:
-            # ... load the Clip ...
-            clipRecord = Clip.Clip(itemData.recNum)
-            # ... for each Transcript associated with the Clip ...
-            for record in clipRecord.transcripts:
-                # ... prepare the object's plain text ...
-                text = self.PrepareText(record.plaintext)
-                # ... and count the words in the prepared text
-                data = self.CountWords(text, data)
+            # ... note the Clip, whose Transcripts will be counted
+            objects['C'][itemData.recNum] += 1
         # If we have a Note node ... (Does this ever happen??)
         elif itemData.nodetype in ['LibraryNoteNode', 'DocumentNoteNode', 'EpisodeNoteNode', 'TranscriptNoteNode']:
             pass
@@ -1240,70 +1233,45 @@ I'm Ellen Feiss, and I'm a student!"""
             # ... we should NEVER see this, obviously!
             print "ERROR:  ", tree.GetItemText(startNode).encode('utf8'), " NOT PROCESSED.  Wrong Node Type.", itemData.nodetype
 
-        # Return the extracted Word Count data
+    def CountObjectWords(self, objectType, objectNums, data):
+        """ Add the word counts for the objects of one type to the data dictionary.  objectNums maps object numbers to the
+            number of times each object appears.  Only the Plain Text of objects that have changed since they were last
+            counted is read from the database. """
+        # Get the Last Save Times.  For Clips, we get the save time and Clip Number of each Clip Transcript.
+        saveTimes = DBInterface.dictionary_of_plain_text_save_times(objectType, objectNums.keys())
+        # Clip Transcripts are read and cached as Transcripts
+        if objectType == 'C':
+            objectType = 'T'
+        # Find the objects whose counts aren't cached or are out of date
+        stale = [num for num in saveTimes.keys() if WordCounter.CachedCounts(objectType, num, saveTimes[num][0]) == None]
+        # If there are any ...
+        if len(stale) > 0:
+            # ... read their Plain Text a page at a time, so only one page of Plain Text is held in memory
+            records = []
+            for rec in DBInterface.iterate_plain_text(objectType, stale):
+                records.append(rec)
+                # When we have a full page, count its words
+                if len(records) == DBInterface.QUERY_PAGE_SIZE:
+                    self.CountRecordWords(objectType, records)
+                    records = []
+            # Count the words of the last, partial page
+            if len(records) > 0:
+                self.CountRecordWords(objectType, records)
+        # Add the counts for each object to the data dictionary, once per appearance in the tree
+        for (num, (lastSaveTime, parentNum)) in saveTimes.iteritems():
+            counts = WordCounter.CachedCounts(objectType, num, lastSaveTime)
+            # If the counts are missing (the object was saved again while we were reading), skip it
+            if counts == None:
+                continue
+            for appearance in range(objectNums[parentNum]):
+                data = WordCounter.ApplySynonyms(counts, self.synonymLookups, data)
         return data
 
-    def PrepareText(self, text):
-        """ This method cleans up the messy PlainText that comes in, removing time codes, punctuation, etc. """
-
-        # Strip Time Codes
-##        regex = "%s<[\d]*>" % TransanaConstants.TIMECODE_CHAR
-##        text = re.sub(regex, '', text
-## INSTEAD OF...
-##        reg = re.compile(regex)
-##        pos = 0
-##        for x in reg.findall(text):
-##            pos = text.find(x, pos, len(text))
-##            text = text[ : pos] + text[pos + len(x) : ]
-## IF THIS WORKS, ALSO UPDATE PlainTextUpdate.py!!
-
-        # strip multiple periods, questions marks, plus signs, exclamation points, hyphens
-        text = re.sub('[\.?:\*+!-][\.?:\*+!-]+', ' ', text)
-        # Strip parentheses, brackets, braces, quotation marks, slashes, ampersands, equal signs, asterisks, pound sign(hashtag),
-        # less than, greater than
-        text = re.sub('[()\[\]{}"/&=\*#<>]', ' ', text)
-        # Apostrophes PRECEDED by white space
-        text = re.sub("\s'", ' ', text)
-        # Remove certain unicode characters that seem to cause problems (smart quotes, double-angle quotes, etc.)
-        # Also, the 4 Jeffersonian special symbols
-        text = re.sub(u'\u00ab|\u00b0|\u00bb|\u2018|\u2019|\u2022|\u201c|\u201d|\u2039|\u203a|\u2191|\u2193', u'', text)
-        # Strip commas, periods, questions marks, exclamation points, colons, semicolons, and apostrophes
-        # followed by whitespace (but NOT those NOT followed by white space, leaving "2.2", "1,000" and
-        # "won't" intact.)
-        text = re.sub('[,\.?!:;\']\s', ' ', text)
-        # String final punctuation at tend of the string, not followed by whitespace
-        text = re.sub('[\.?!\']$', '', text)
-        # Strip multiple whitespace characters, replacing all whitespace with single spaces
-        text = re.sub('\s+', '\n', text)
-
-        # Return the prepared text
-        return text
-
-    def CountWords(self, text, words = {}):
-        """ This method takes prepared text (see above) and adds it to existing WordCount data. """
-        # DO NOT initialize a dictionary to hold word counts (key = word, value = count) here.
-        # Instead, this structure can be passed in to allow additional text to be added.
-        
-        # For each line of the prepared text ...
-        for line in text.split('\n'):
-            # ... remove whitespace and compensate for different cases
-            word = line.strip().lower()
-            # If the word exists in the synonymLookup dictionary ...
-            if word in self.synonymLookups.keys():
-                # ... substitute the synonym for the original word
-                word = self.synonymLookups[word]
-            # There are certain "words" that should not be included.  These can slip past PrepareText.
-            if not word in ['', '-', ':']:
-                # If the word is already in the dictionary ...
-                if words.has_key(word):
-                    # ... increment the count
-                    words[word] += 1
-                # If the word is not in the dictionary ...
-                else:
-                    # ... add it with a count of one.
-                    words[word] = 1
-        # Return the word dictionary
-        return words
+    def CountRecordWords(self, objectType, records):
+        """ Count the words in a page of (object number, Plain Text, Last Save Time) records, and cache the counts """
+        counts = WordCounter.CountTexts([plainText for (objectNum, plainText, lastSaveTime) in records])
+        for index in range(len(records)):
+            WordCounter.CacheCounts(objectType, records[index][0], records[index][2], counts[index])
 
     def OnCheck(self, event):
         """ Handle Check and Uncheck Buttons """
@@ -35,6 +35,8 @@ if TransanaConstants.USESRTC:
 import RichTextEditCtrl
 import cPickle
 import datetime
+# import Python's gzip module for compressed export files
+import gzip
 import pickle
 import os
 # import Python's Regular Expresions
@@ -50,6 +52,37 @@ ENCODE_PROPERLY = True
 
 # FLAG for including or excluding the QDA-XML export options
 QDA_XML_ENABLED = TransanaConstants.QDA_XML
+# Number of records read from the database at a time during export
+EXPORT_FETCH_SIZE = 200
+
+
+class SilentProgress(object):
+    """ A stand-in for wx.ProgressDialog used when exporting without a user interface """
+    def Update(self, *args, **kwargs):
+        """ Ignore progress updates """
+        return (True, False)
+
+    def Refresh(self):
+        """ Ignore refresh requests """
+        pass
+
+    def Destroy(self):
+        """ Nothing to clean up """
+        pass
+
+
+def BackupDatabase(fileName, parent=None):
+    """ Export the whole database to fileName without prompting the user, for unattended (nightly) backups.
+        A file name ending in ".gz" produces a gzip-compressed file.  The wx.App must exist, as legacy RTF
+        transcripts are converted through invisible editing controls. """
+    # Create the Export object, but don't show it
+    exportObj = XMLExport(parent, -1, _('Transana Data Export'))
+    try:
+        # Export the whole database without a Progress Dialog
+        exportObj.Export(fileName=fileName, content=0, showProgress=False)
+    finally:
+        exportObj.Destroy()
+
 
 class XMLExport(Dialogs.GenForm):
     """ This window displays a variety of GUI Widgets. """
@@ -223,41 +256,9 @@ class XMLExport(Dialogs.GenForm):
     def Escape(self, inpStr):
         """ Replaces "&", "<", and ">" with the XML friendly "&amp;", &gt;", and "&lt;"
             >, <, and & all need to be replaced, but &amp;, &gt;, and &lt; needs to survive! """
-        # We can't just casually replace ampersands, as there are ampersands in the replacement!
-        # Find the first Ampersand in the document
-        chrPos = inpStr.find('&')
-        # While there are more Ampersands ...
-        while (chrPos > -1):
-            # ... replace the Ampersand with the escape string ...
-            inpStr = inpStr[:chrPos] + '&amp;' + inpStr[chrPos + 1:]
-            # ... and look for the NEXT Ampersand after the replacement
-            chrPos = inpStr.find('&', chrPos + 1)
-        # Find the first Greater Than in the document
-        chrPos = inpStr.find('>')
-        # While there are more Greater Thans ...
-        while (chrPos > -1):
-            # ... replace the Greater Than with the escape string ...
-            inpStr = inpStr[:chrPos] + '&gt;' + inpStr[chrPos + 1:]
-            # ... and look for the NEXT Greater Than after the replacement
-            chrPos = inpStr.find('>', chrPos + 1)
-        # Find the first Less Than in the document
-        chrPos = inpStr.find('<')
-        # While there are more Less Thans ...
-        while (chrPos > -1):
-            # ... replace the Less Than with the escape string ...
-            inpStr = inpStr[:chrPos] + '&lt;' + inpStr[chrPos + 1:]
-            # ... and look for the NEXT Less Than after the replacement
-            chrPos = inpStr.find('<', chrPos + 1)
-        # Find the first Quotation Mark in the document
-        chrPos = inpStr.find('"')
-        # While there are more Quotation Marks ...
-        while (chrPos > -1):
-            # ... replace the Quotation Mark with the escape string ...
-            inpStr = inpStr[:chrPos] + '&quot;' + inpStr[chrPos + 1:]
-            # ... and look for the NEXT Quotation Mark after the replacement
-            chrPos = inpStr.find('"', chrPos + 1)
-        # Return the modified string
-        return inpStr
+        # Ampersands must be replaced first, as there are ampersands in the other replacements!
+        # Each replace() is a single linear pass, so this stays fast for large Document and Transcript records.
+        return inpStr.replace('&', '&amp;').replace('>', '&gt;').replace('<', '&lt;').replace('"', '&quot;')
 
     def CalcPercent(self, num):
         """ Calculate the Percent value to be displayed in the Progress Bar """
@@ -272,12 +273,28 @@ class XMLExport(Dialogs.GenForm):
         # Return the appropriate integer representation of the progress percentage
         return int(round(100.0 / numCategories * num))
 
-    def Export(self):
-        # use the LONGEST title here!  That determines the size of the Dialog Box.
-        progress = wx.ProgressDialog(_('Transana XML Export'), _('Exporting Transcript records (This may be slow because of the size of Transcript records.)'), style = wx.PD_APP_MODAL | wx.PD_AUTO_HIDE)
-        if progress.GetSize()[0] > 800:
-            progress.SetSize((800, progress.GetSize()[1]))
-            progress.Centre()
+    def Export(self, fileName=None, content=None, showProgress=True):
+        """ Export the database to a Transana-XML file.  If fileName and content are not passed, they are taken
+            from the form.  If the file name ends with ".gz", the file is gzip-compressed as it is written.
+            If showProgress is False, no Progress Dialog is shown, so the export can run unattended. """
+        # If no file name was passed in, get it from the form
+        if fileName == None:
+            fileName = self.XMLFile.GetValue()
+        # If no content selection was passed in, get it from the form (0 = whole database, 1 = keywords only)
+        if content == None:
+            content = self.contentCtrl.GetSelection()
+
+        # If we're showing progress ...
+        if showProgress:
+            # use the LONGEST title here!  That determines the size of the Dialog Box.
+            progress = wx.ProgressDialog(_('Transana XML Export'), _('Exporting Transcript records (This may be slow because of the size of Transcript records.)'), style = wx.PD_APP_MODAL | wx.PD_AUTO_HIDE)
+            if progress.GetSize()[0] > 800:
+                progress.SetSize((800, progress.GetSize()[1]))
+                progress.Centre()
+        # If we're running unattended ...
+        else:
+            # ... use a progress object that does nothing
+            progress = SilentProgress()
 
         db = DBInterface.get_db()
 
@@ -286,10 +303,23 @@ class XMLExport(Dialogs.GenForm):
             # ... switch the text_factory from string to unicode here so we don't have to mess with decoding.
             db.text_factory = unicode
 
+        # Initialize the file, in case we can't open it
+        f = None
         try:
-            fs = self.XMLFile.GetValue()
-            if (fs[-4:].lower() != '.xml') and (fs[-4:].lower() != '.tra'):
-                fs = fs + '.tra'
+            fs = fileName
+            # Note whether we're compressing the output
+            compress = (fs[-3:].lower() == '.gz')
+            # Check the extension of the uncompressed file name
+            if compress:
+                baseFs = fs[:-3]
+            else:
+                baseFs = fs
+            if (baseFs[-4:].lower() != '.xml') and (baseFs[-4:].lower() != '.tra'):
+                baseFs = baseFs + '.tra'
+            if compress:
+                fs = baseFs + '.gz'
+            else:
+                fs = baseFs
             # On the Mac, if no path is specified, the data is exported to a file INSIDE the application bundle, 
             # where no one will be able to find it.  Let's put it in the user's HOME directory instead.
             # I'm okay with not handling this on Windows, where it will be placed in the Program's folder
@@ -300,7 +330,12 @@ class XMLExport(Dialogs.GenForm):
                 if fs.find(os.sep) == -1:
                     # ... then prepend the HOME folder
                     fs = os.getenv("HOME") + os.sep + fs
-            f = file(fs, 'w')
+            # If we're compressing ...
+            if compress:
+                # ... compress the data as it is written
+                f = gzip.GzipFile(fs, 'wb')
+            else:
+                f = file(fs, 'w')
             progress.Update(0, _('Writing Headers'))
             self.WriteXMLDTD(f)
 
@@ -325,268 +360,86 @@ class XMLExport(Dialogs.GenForm):
                 f.write('    1.7\n')
             f.write('  </TransanaXMLVersion>\n')
 
-            if self.contentCtrl.GetSelection() == 0:
-
-                progress.Update(self.CalcPercent(1), _('Writing Library Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT SeriesNum, SeriesID, SeriesComment, SeriesOwner, DefaultKeywordGroup FROM Series2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <SeriesFile>\n')
-                        for seriesRec in data:
-                            self.WriteSeriesRec(f, seriesRec)
-                        f.write('  </SeriesFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(2), _('Writing Document Records  (This will seem slow because of the size of the Document Records.)'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT DocumentNum, DocumentID, LibraryNum, Author, Comment, ImportedFile, ImportDate, DocumentLength, XMLText FROM Documents2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <DocumentFile>\n')
-                        for documentRec in data:
-                            self.WriteDocumentRec(f, progress, documentRec)
-                        f.write('  </DocumentFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(3), _('Writing Episode Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT EpisodeNum, EpisodeID, SeriesNum, TapingDate, MediaFile, EpLength, EpComment FROM Episodes2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <EpisodeFile>\n')
-                        for episodeRec in data:
-                            self.WriteEpisodeRec(f, episodeRec)
-                        f.write('  </EpisodeFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(4), _('Writing Core Data Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = """SELECT CoreDataNum, Identifier, Title, Creator, Subject, Description, Publisher,
-                                        Contributor, DCDate, DCType, Format, Source, Language, Relation, Coverage, Rights
-                                        FROM CoreData2"""
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <CoreDataFile>\n')
-                        for coreDataRec in data:
-                            self.WriteCoreDataRec(f, coreDataRec)
-                        f.write('  </CoreDataFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(5), _('Writing Collection Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT CollectNum, CollectID, ParentCollectNum, CollectComment, CollectOwner, DefaultKeywordGroup FROM Collections2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <CollectionFile>\n')
-                        for collectionRec in data:
-                            self.WriteCollectionRec(f, collectionRec)
-                        f.write('  </CollectionFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(6), _('Writing Quote Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT QuoteNum, QuoteID, CollectNum, SourceDocumentNum, SortOrder, Comment, XMLText FROM Quotes2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <QuoteFile>\n')
-                        for quoteRec in data:
-                            self.WriteQuoteRec(f, quoteRec)
-                        f.write('  </QuoteFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(7), _('Writing Quote Position Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT QuoteNum, DocumentNum, StartChar, EndChar FROM QuotePositions2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <QuotePositionFile>\n')
-                        for quotePosRec in data:
-                            self.WriteQuotePosRec(f, quotePosRec)
-                        f.write('  </QuotePositionFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(8), _('Writing Clip Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT ClipNum, ClipID, CollectNum, EpisodeNum, MediaFile, ClipStart, ClipStop, ClipOffset, Audio, '
-                    SQLText += 'ClipComment, SortOrder FROM Clips2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <ClipFile>\n')
-                        for clipRec in data:
-                            self.WriteClipRec(f, clipRec)
-                        f.write('  </ClipFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(9), _('Writing Additional Media File Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT AddVidNum, EpisodeNum, ClipNum, MediaFile, VidLength, Offset, Audio FROM AdditionalVids2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <AdditionalVidsFile>\n')
-                        for additionalMediaFileRec in data:
-                            self.WriteAdditionalMediaFileRec(f, additionalMediaFileRec)
-                        f.write('  </AdditionalVidsFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(10), _('Writing Transcript Records  (This will seem slow because of the size of the Transcript Records.)'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    dbCursor2 = db.cursor()
-                    # Load Transcript Information WITHOUT RTFText content, which requires too much memory in some large database
-                    # NOTE:  This will probably be a bit slower, but won't crash on databases with many, many images.
-                    SQLText = 'SELECT TranscriptNum, TranscriptID, EpisodeNum, SourceTranscriptNum, ClipNum, SortOrder, Transcriber, '
-                    SQLText += 'ClipStart, ClipStop, Comment, MinTranscriptWidth FROM Transcripts2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <TranscriptFile>\n')
-                        for transcriptRec in data:
-                            # Now load the RTFText on a Transcript by Transcript basis (to use less memory)
-                            SQLText2 = 'SELECT RTFText FROM Transcripts2 WHERE TranscriptNum = %s'
-                            SQLText2 = DBInterface.FixQuery(SQLText2)
-                            dbCursor2.execute(SQLText2, (transcriptRec[0],))
-                            rtfText = dbCursor2.fetchone()
-                            # Add the RTFText to the Transcript Record
-                            transcriptRec = transcriptRec + rtfText
-                            # Write the Transcript Record to the Export File
-                            self.WriteTranscriptRec(f, progress, transcriptRec)
-                        f.write('  </TranscriptFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(11), _('Writing Snapshot Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT SnapshotNum, SnapshotID, CollectNum, ImageFile, ImageScale, ImageCoordsX, ImageCoordsY, '
-                    SQLText += 'ImageSizeW, ImageSizeH, EpisodeNum, TranscriptNum, SnapshotTimeCode, SnapshotDuration, '
-                    SQLText += 'SnapshotComment, SortOrder FROM Snapshots2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <SnapshotFile>\n')
-                        for snapshotRec in data:
-                            self.WriteSnapshotRec(f, snapshotRec)
-                        f.write('  </SnapshotFile>\n')
-                    dbCursor.close()
-
-            progress.Update(self.CalcPercent(12), _('Writing Keyword Records'))
             if db != None:
-                dbCursor = db.cursor()
-                SQLText = 'SELECT KeywordGroup, Keyword, Definition, LineColorName, LineColorDef, DrawMode, LineWidth, LineStyle FROM Keywords2'
-                dbCursor.execute(SQLText)
-                data = dbCursor.fetchall()
-                if len(data) > 0:
-                    f.write('  <KeywordFile>\n')
-                    for keywordRec in data:
-                        self.WriteKeywordRec(f, keywordRec)
-                    f.write('  </KeywordFile>\n')
-                dbCursor.close()
-
-            if self.contentCtrl.GetSelection() == 0:
-
-                progress.Update(self.CalcPercent(13), _('Writing Clip Keyword Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT EpisodeNum, DocumentNum, ClipNum, QuoteNum, SnapshotNum, KeywordGroup, Keyword, Example FROM ClipKeywords2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <ClipKeywordFile>\n')
-                        for clipKeywordRec in data:
-                            self.WriteClipKeywordRec(f, clipKeywordRec)
-                        f.write('  </ClipKeywordFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(14), _('Writing Snapshot Keywords Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT SnapshotNum, KeywordGroup, Keyword, x1, y1, x2, y2, visible FROM SnapshotKeywords2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <SnapshotKeywordFile>\n')
-                        for snapshotKeywordRec in data:
-                            self.WriteSnapshotKeywordRec(f, snapshotKeywordRec)
-                        f.write('  </SnapshotKeywordFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(15), _('Writing Snapshot Coding Style Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT SnapshotNum, KeywordGroup, Keyword, DrawMode, LineColorName, LineColorDef, LineWidth, LineStyle '
-                    SQLText += 'FROM SnapshotKeywordStyles2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <SnapshotKeywordStyleFile>\n')
-                        for snapshotKeywordStyleRec in data:
-                            self.WriteSnapshotKeywordStyleRec(f, snapshotKeywordStyleRec)
-                        f.write('  </SnapshotKeywordStyleFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(16), _('Writing Note Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT NoteNum, NoteID, SeriesNum, EpisodeNum, CollectNum, ClipNum, SnapshotNum, DocumentNum, '
-                    SQLText += 'QuoteNum, TranscriptNum, NoteTaker, NoteText FROM Notes2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <NoteFile>\n')
-                        for noteRec in data:
-                            self.WriteNoteRec(f, noteRec)
-                        f.write('  </NoteFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(17), _('Writing Synonym Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT SynonymGroup, Synonym FROM Synonyms2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <SynonymFile>\n')
-                        for filterRec in data:
-                            self.WriteSynonymRec(f, filterRec)
-                        f.write('  </SynonymFile>\n')
-                    dbCursor.close()
-
-                progress.Update(self.CalcPercent(18), _('Writing Filter Records'))
-                if db != None:
-                    dbCursor = db.cursor()
-                    SQLText = 'SELECT ReportType, ReportScope, ConfigName, FilterDataType, FilterData FROM Filters2'
-                    dbCursor.execute(SQLText)
-                    data = dbCursor.fetchall()
-                    if len(data) > 0:
-                        f.write('  <FilterFile>\n')
-                        for filterRec in data:
-                            self.WriteFilterRec(f, filterRec)
-                        f.write('  </FilterFile>\n')
-                    dbCursor.close()
+                # Define the sections of the export file, in the order required by the DTD.  Each section is
+                # (progress percent, progress prompt, codebook section?, section tag, query, record writer, streaming?)
+                sections = [(1, _('Writing Library Records'), False, 'SeriesFile',
+                             'SELECT SeriesNum, SeriesID, SeriesComment, SeriesOwner, DefaultKeywordGroup FROM Series2',
+                             lambda rec: self.WriteSeriesRec(f, rec), True),
+                            (2, _('Writing Document Records  (This will seem slow because of the size of the Document Records.)'), False, 'DocumentFile',
+                             'SELECT DocumentNum, DocumentID, LibraryNum, Author, Comment, ImportedFile, ImportDate, DocumentLength, XMLText FROM Documents2',
+                             lambda rec: self.WriteDocumentRec(f, progress, rec), True),
+                            (3, _('Writing Episode Records'), False, 'EpisodeFile',
+                             'SELECT EpisodeNum, EpisodeID, SeriesNum, TapingDate, MediaFile, EpLength, EpComment FROM Episodes2',
+                             lambda rec: self.WriteEpisodeRec(f, rec), True),
+                            (4, _('Writing Core Data Records'), False, 'CoreDataFile',
+                             """SELECT CoreDataNum, Identifier, Title, Creator, Subject, Description, Publisher,
+                                       Contributor, DCDate, DCType, Format, Source, Language, Relation, Coverage, Rights
+                                       FROM CoreData2""",
+                             lambda rec: self.WriteCoreDataRec(f, rec), True),
+                            (5, _('Writing Collection Records'), False, 'CollectionFile',
+                             'SELECT CollectNum, CollectID, ParentCollectNum, CollectComment, CollectOwner, DefaultKeywordGroup FROM Collections2',
+                             lambda rec: self.WriteCollectionRec(f, rec), True),
+                            (6, _('Writing Quote Records'), False, 'QuoteFile',
+                             'SELECT QuoteNum, QuoteID, CollectNum, SourceDocumentNum, SortOrder, Comment, XMLText FROM Quotes2',
+                             lambda rec: self.WriteQuoteRec(f, rec), True),
+                            (7, _('Writing Quote Position Records'), False, 'QuotePositionFile',
+                             'SELECT QuoteNum, DocumentNum, StartChar, EndChar FROM QuotePositions2',
+                             lambda rec: self.WriteQuotePosRec(f, rec), True),
+                            (8, _('Writing Clip Records'), False, 'ClipFile',
+                             'SELECT ClipNum, ClipID, CollectNum, EpisodeNum, MediaFile, ClipStart, ClipStop, ClipOffset, Audio, ' + \
+                             'ClipComment, SortOrder FROM Clips2',
+                             lambda rec: self.WriteClipRec(f, rec), True),
+                            (9, _('Writing Additional Media File Records'), False, 'AdditionalVidsFile',
+                             'SELECT AddVidNum, EpisodeNum, ClipNum, MediaFile, VidLength, Offset, Audio FROM AdditionalVids2',
+                             lambda rec: self.WriteAdditionalMediaFileRec(f, rec), True),
+                            # Load Transcript Information WITHOUT RTFText content, which requires too much memory in some large database.
+                            # The RTFText is loaded on a Transcript by Transcript basis, so this can't use a streaming cursor.
+                            (10, _('Writing Transcript Records  (This will seem slow because of the size of the Transcript Records.)'), False, 'TranscriptFile',
+                             'SELECT TranscriptNum, TranscriptID, EpisodeNum, SourceTranscriptNum, ClipNum, SortOrder, Transcriber, ' + \
+                             'ClipStart, ClipStop, Comment, MinTranscriptWidth FROM Transcripts2',
+                             lambda rec: self.WriteTranscriptRecWithText(db, f, progress, rec), False),
+                            (11, _('Writing Snapshot Records'), False, 'SnapshotFile',
+                             'SELECT SnapshotNum, SnapshotID, CollectNum, ImageFile, ImageScale, ImageCoordsX, ImageCoordsY, ' + \
+                             'ImageSizeW, ImageSizeH, EpisodeNum, TranscriptNum, SnapshotTimeCode, SnapshotDuration, ' + \
+                             'SnapshotComment, SortOrder FROM Snapshots2',
+                             lambda rec: self.WriteSnapshotRec(f, rec), True),
+                            (12, _('Writing Keyword Records'), True, 'KeywordFile',
+                             'SELECT KeywordGroup, Keyword, Definition, LineColorName, LineColorDef, DrawMode, LineWidth, LineStyle FROM Keywords2',
+                             lambda rec: self.WriteKeywordRec(f, rec), True),
+                            (13, _('Writing Clip Keyword Records'), False, 'ClipKeywordFile',
+                             'SELECT EpisodeNum, DocumentNum, ClipNum, QuoteNum, SnapshotNum, KeywordGroup, Keyword, Example FROM ClipKeywords2',
+                             lambda rec: self.WriteClipKeywordRec(f, rec), True),
+                            (14, _('Writing Snapshot Keywords Records'), False, 'SnapshotKeywordFile',
+                             'SELECT SnapshotNum, KeywordGroup, Keyword, x1, y1, x2, y2, visible FROM SnapshotKeywords2',
+                             lambda rec: self.WriteSnapshotKeywordRec(f, rec), True),
+                            (15, _('Writing Snapshot Coding Style Records'), False, 'SnapshotKeywordStyleFile',
+                             'SELECT SnapshotNum, KeywordGroup, Keyword, DrawMode, LineColorName, LineColorDef, LineWidth, LineStyle ' + \
+                             'FROM SnapshotKeywordStyles2',
+                             lambda rec: self.WriteSnapshotKeywordStyleRec(f, rec), True),
+                            (16, _('Writing Note Records'), False, 'NoteFile',
+                             'SELECT NoteNum, NoteID, SeriesNum, EpisodeNum, CollectNum, ClipNum, SnapshotNum, DocumentNum, ' + \
+                             'QuoteNum, TranscriptNum, NoteTaker, NoteText FROM Notes2',
+                             lambda rec: self.WriteNoteRec(f, rec), True),
+                            (17, _('Writing Synonym Records'), False, 'SynonymFile',
+                             'SELECT SynonymGroup, Synonym FROM Synonyms2',
+                             lambda rec: self.WriteSynonymRec(f, rec), True),
+                            (18, _('Writing Filter Records'), False, 'FilterFile',
+                             'SELECT ReportType, ReportScope, ConfigName, FilterDataType, FilterData FROM Filters2',
+                             lambda rec: self.WriteFilterRec(f, rec), True)]
+
+                # For each section of the export file ...
+                for (progPct, progPrompt, codebookSection, sectionTag, SQLText, writeRec, streaming) in sections:
+                    # ... if we're exporting the whole database, or this section is part of the codebook ...
+                    if (content == 0) or codebookSection:
+                        # ... update the progress dialog ...
+                        progress.Update(self.CalcPercent(progPct), progPrompt)
+                        # ... and write the section
+                        self.WriteSection(db, f, sectionTag, SQLText, writeRec, streaming)
 
             f.write('</Transana>\n');
 
             f.flush()
-
-            dbCursor.close()
             
         except:
 
@@ -602,24 +455,86 @@ class XMLExport(Dialogs.GenForm):
                 prompt = unicode(_('An error occurred during Database Export.\n%s\n%s'), 'utf8')
             else:
                 prompt = _('An error occurred during Database Export.\n%s\n%s')
-            errordlg = Dialogs.ErrorDialog(self, prompt % (sys.exc_info()[0], sys.exc_info()[1]))
-            errordlg.ShowModal()
-            errordlg.Destroy()
+            # If we're showing progress, we can show an error message too
+            if showProgress:
+                errordlg = Dialogs.ErrorDialog(self, prompt % (sys.exc_info()[0], sys.exc_info()[1]))
+                errordlg.ShowModal()
+                errordlg.Destroy()
 
             if DEBUG or DEBUG2:
                 import traceback
                 traceback.print_exc(file=sys.stdout)
-            dbCursor.close()
         finally:
             # If we're using sqlite ...
             if TransanaConstants.DBInstalled in ['sqlite3']:
                 # ... we need to go back to using strings rather than unicode objects from the database
                 db.text_factory = str
 
-        f.close()
+        if f != None:
+            f.close()
         progress.Update(100)
         progress.Destroy()
 
+    def WriteSection(self, db, f, sectionTag, SQLText, writeRec, streaming=True):
+        """ Write one section of the Transana-XML file.  Rows are read EXPORT_FETCH_SIZE at a time, so the whole
+            table is never held in memory.  The section tags are only written if the table has records. """
+        # The record writers let the GUI process events, and other code may query the main connection then.  On MySQL,
+        # that can't happen while a server-side cursor is reading from the connection, so stream from a separate one.
+        streamDb = None
+        if streaming and (TransanaConstants.DBInstalled in ['MySQLdb-embedded', 'MySQLdb-server', 'PyMySQL']):
+            streamDb = DBInterface.open_streaming_db()
+            # If we can't have a separate connection, read the table the regular way rather than tie up the main one
+            if streamDb == None:
+                streaming = False
+        # If we can stream this table, use a server-side cursor.  Otherwise use a regular cursor.
+        if streamDb != None:
+            dbCursor = DBInterface.get_streaming_cursor(streamDb)
+        elif streaming:
+            dbCursor = DBInterface.get_streaming_cursor(db)
+        else:
+            dbCursor = db.cursor()
+        try:
+            # Run the query for this section
+            dbCursor.execute(SQLText)
+            # Note that we haven't written the opening section tag yet
+            sectionOpen = False
+            # Get the first batch of records
+            data = dbCursor.fetchmany(EXPORT_FETCH_SIZE)
+            # As long as there are records ...
+            while len(data) > 0:
+                # If this is the first batch, write the opening section tag
+                if not sectionOpen:
+                    f.write('  <%s>\n' % sectionTag)
+                    sectionOpen = True
+                # Write the records
+                for rec in data:
+                    writeRec(rec)
+                # Get the next batch of records
+                data = dbCursor.fetchmany(EXPORT_FETCH_SIZE)
+            # If we wrote the opening section tag, write the closing one
+            if sectionOpen:
+                f.write('  </%s>\n' % sectionTag)
+        finally:
+            dbCursor.close()
+            # Close the separate streaming connection, if we opened one
+            if streamDb != None:
+                DBInterface.close_streaming_db(streamDb)
+
+    def WriteTranscriptRecWithText(self, db, f, progress, transcriptRec):
+        """ Load the RTFText for a single Transcript record and write the record.  Loading RTFText one transcript
+            at a time uses less memory in databases with many, many images. """
+        dbCursor2 = db.cursor()
+        # Now load the RTFText on a Transcript by Transcript basis (to use less memory)
+        SQLText2 = 'SELECT RTFText FROM Transcripts2 WHERE TranscriptNum = %s'
+        SQLText2 = DBInterface.FixQuery(SQLText2)
+        dbCursor2.execute(SQLText2, (transcriptRec[0],))
+        rtfText = dbCursor2.fetchone()
+        dbCursor2.close()
+        # Add the RTFText to the Transcript Record
+        transcriptRec = transcriptRec + rtfText
+        # Write the Transcript Record to the Export File
+        self.WriteTranscriptRec(f, progress, transcriptRec)
+
     def WriteXMLDTD(self, f):
         f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
         f.write('<!DOCTYPE TransanaData [\n')
@@ -46,11 +46,14 @@ import Note
 import QDAXMLHandler
 import Quote
 import Library
+import LibraryMap
 import Snapshot
 import TransanaConstants
 import TransanaGlobal
 import Transcript
 
+# import Python's gzip module for compressed Transana-XML files
+import gzip
 # import Python's os and sys modules
 import os
 import sys
@@ -66,6 +69,103 @@ MENU_FILE_EXIT = wx.NewId()
 # FLAG for including or excluding the QDA-XML export option
 QDA_XML_ENABLED = TransanaConstants.QDA_XML
 
+# Number of rows collected for each simple table (Quote Positions, Additional Media, Clip Keywords, Snapshot Keywords,
+# and Snapshot Coding Styles) before they are sent to the database in a single executemany() call
+IMPORT_BATCH_SIZE = 500
+# Number of records between updates of the records-per-second figure in the Progress Dialog
+IMPORT_PROGRESS_INTERVAL = 250
+
+# Escape sequences used in Transana-XML, and the characters they represent
+ESCAPE_SEQUENCES = { '&#10;'  : '\n',
+                     '&gt;'   : '>',
+                     '&lt;'   : '<',
+                     '&quot;' : '"',
+                     '&amp;'  : '&' }
+# A single regular expression that finds all of the escape sequences in one pass
+ESCAPE_PATTERN = re.compile('&#10;|&gt;|&lt;|&quot;|&amp;')
+
+# The closing tags that signal the end of a data record, which must then be saved
+RECORD_END_TAGS = frozenset(['</SERIES>', '</DOCUMENT>', '</EPISODE>', '</COREDATA>', '</TRANSCRIPT>', '</COLLECTION>',
+                             '</QUOTE>', '</QUOTEPOSITION>', '</CLIP>', '</SNAPSHOT>', '</SNAPSHOTKEYWORD>',
+                             '</SNAPSHOTKEYWORDSTYLE>', '</ADDVID>', '</KEYWORDREC>', '</CLIPKEYWORD>', '</NOTE>',
+                             '</SYNONYMREC>', '</FILTER>'])
+
+
+class ImportBatchError(Exception):
+    """ Raised when a batched row can't be saved.  Identifies the record the row came from, so the user can be told
+        where to correct it, and carries the original error. """
+
+    def __init__(self, objectType, lineNum, recordNum, excInfo):
+        """ Initialize the Import Batch Error """
+        Exception.__init__(self, '%s' % excInfo[1])
+        # The type of the record, the line in the XML file where it ends, its record number (if it's needed to identify
+        # the record), and the original exception information
+        self.objectType = objectType
+        self.lineNum = lineNum
+        self.recordNum = recordNum
+        self.excInfo = excInfo
+
+
+class ImportBatch(object):
+    """ Collects INSERT and UPDATE rows for tables that don't need the new record number returned, and sends
+        them to the database in batches using executemany().  If a batch fails, its rows are sent again one at a
+        time to find the one that failed, which is reported with an ImportBatchError. """
+
+    def __init__(self, dbCursor, batchSize=IMPORT_BATCH_SIZE):
+        """ Initialize the Import Batch """
+        # Remember the database cursor
+        self.dbCursor = dbCursor
+        # Remember the batch size
+        self.batchSize = batchSize
+        # Keep a dictionary of pending rows, keyed by the query they go with.  Keep the query order too, so
+        # rows are written in the order the tables were encountered.
+        self.pending = {}
+        self.queryOrder = []
+
+    def Add(self, query, values, objectType, lineNum, recordNum=None):
+        """ Add a row of values for query, sending the batch to the database if it is full.  objectType, lineNum, and
+            recordNum identify the record the row came from if it can't be saved. """
+        # If this is a new query ...
+        if not self.pending.has_key(query):
+            # ... start a new list of rows for it
+            self.pending[query] = []
+            self.queryOrder.append(query)
+        # Add the row
+        self.pending[query].append((values, (objectType, lineNum, recordNum)))
+        # If the batch is full, send it to the database
+        if len(self.pending[query]) >= self.batchSize:
+            rows = self.pending[query]
+            self.pending[query] = []
+            self.Send(query, rows)
+
+    def Flush(self):
+        """ Send all pending rows to the database """
+        # Take the pending rows
+        pending = self.pending
+        queryOrder = self.queryOrder
+        self.pending = {}
+        self.queryOrder = []
+        for query in queryOrder:
+            if len(pending[query]) > 0:
+                self.Send(query, pending[query])
+
+    def Send(self, query, rows):
+        """ Send a batch of rows for query to the database """
+        # Mark the start of the batch, so a batch that fails part way through can be undone
+        self.dbCursor.execute('SAVEPOINT ImportBatch')
+        try:
+            self.dbCursor.executemany(query, [values for (values, context) in rows])
+        except:
+            # Undo whatever part of the batch was saved, and send the rows again one at a time to find the bad one
+            self.dbCursor.execute('ROLLBACK TO SAVEPOINT ImportBatch')
+            for (values, (objectType, lineNum, recordNum)) in rows:
+                try:
+                    self.dbCursor.execute(query, values)
+                except:
+                    raise ImportBatchError(objectType, lineNum, recordNum, sys.exc_info())
+        self.dbCursor.execute('RELEASE SAVEPOINT ImportBatch')
+
+
 class XMLImport(Dialogs.GenForm):
     """ This window displays a variety of GUI Widgets. """
     def __init__(self, parent, id, title, importData=None):
@@ -223,48 +323,11 @@ class XMLImport(Dialogs.GenForm):
     def UnEscape(self, inpStr):
         """ Replaces "&amp;", "&gt;", and "&lt;" with "&", ">", and "<" 
             >, <, and & all need to be replaced, but &amp;, &gt;, and &lt; needs to survive!"""
-        # Find the first line break in the text
-        chrPos = inpStr.find('&#10;')
-        # While there are more line breaks ...
-        while (chrPos > -1):
-            # ... replace the line break with the escape string ...
-            inpStr = inpStr[:chrPos] + '\n' + inpStr[chrPos + 5:]
-            # ... and look for the NEXT line break after the replacement
-            chrPos = inpStr.find('&#10;', chrPos + 1)
-        # Find the first Greater Than in the text
-        chrPos = inpStr.find('&gt;')
-        # While there are more Greater Thans ...
-        while (chrPos > -1):
-            # ... replace the Greater Than with the escape string ...
-            inpStr = inpStr[:chrPos] + '>' + inpStr[chrPos + 4:]
-            # ... and look for the NEXT Greater Than after the replacement
-            chrPos = inpStr.find('&gt;', chrPos + 1)
-        # Find the first Less Than in the text
-        chrPos = inpStr.find('&lt;')
-        # While there are more Less Thans ...
-        while (chrPos > -1):
-            # ... replace the Less Than with the escape string ...
-            inpStr = inpStr[:chrPos] + '<' + inpStr[chrPos + 4:]
-            # ... and look for the NEXT Less Than after the replacement
-            chrPos = inpStr.find('&lt;', chrPos + 1)
-        # Find the first Quotation Mark in the text
-        chrPos = inpStr.find('&quot;')
-        # While there are more Quotation Marks ...
-        while (chrPos > -1):
-            # ... replace the Quotation Mark with the escape string ...
-            inpStr = inpStr[:chrPos] + '"' + inpStr[chrPos + 6:]
-            # ... and look for the NEXT Quotation Mark after the replacement
-            chrPos = inpStr.find('&quot;', chrPos + 1)
-        # Find the first Ampersand in the text
-        chrPos = inpStr.find('&amp;')
-        # While there are more Ampersands ...
-        while (chrPos > -1):
-            # ... replace the Ampersand with the escape string ...
-            inpStr = inpStr[:chrPos] + '&' + inpStr[chrPos + 5:]
-            # ... and look for the NEXT Ampersand after the replacement
-            chrPos = inpStr.find('&amp;', chrPos + 1)
-        # Return the modified string
-        return inpStr
+        # If there's no ampersand, there's nothing to replace
+        if not '&' in inpStr:
+            return inpStr
+        # Replace all escape sequences in a single pass, so that replacement text is never re-scanned
+        return ESCAPE_PATTERN.sub(lambda match: ESCAPE_SEQUENCES[match.group(0)], inpStr)
 
     def Import(self):
        """ Handle the Import request """
@@ -304,9 +367,18 @@ class XMLImport(Dialogs.GenForm):
 
 #           print "XMLImport - Begin Transaction"
 
+       # Create the batch for rows that can be inserted without knowing the new record number
+       importBatch = ImportBatch(dbCursor)
+
        # We need to track the number of lines read and processed from the input file.
        lineCount = 0
        objCountNumber = 1
+       # We track the import rate for each section of the file.  Keep a list of (section, records, seconds) values.
+       self.importStatistics = []
+       # Initialize the current section, its start time, and its record count
+       sectionName = None
+       sectionStart = time.time()
+       sectionRecords = 0
        
        # We need to track how many Transcript records were in the database PRIOR to import!
        # (Needed for merging non-overlapping databases!  Otherwise, we lose SourceTranscriptNum information.)
@@ -481,12 +553,19 @@ class XMLImport(Dialogs.GenForm):
        try:
            # Assume we're good to continue unless informed otherwise
            contin = True
-           # Open the XML file
-           f = file(self.XMLFile.GetValue(), 'r')
+           # Open the XML file.  Files exported with gzip compression are decompressed as they are read.
+           if self.XMLFile.GetValue()[-3:].lower() == '.gz':
+               f = gzip.GzipFile(self.XMLFile.GetValue(), 'rb')
+           else:
+               f = file(self.XMLFile.GetValue(), 'r')
 
            # Initialize objectType and dataType, which are used to parse the file
            objectType = None 
            dataType = None
+           # Multi-line XML and RTF text is collected in a list and joined once, at the closing tag.
+           # (Repeatedly adding lines to a long string is quadratic.)
+           textBuffer = None
+           textHasContent = False
            # Initialize constants for whether the "Skip additional messages" checkbox should be displayed as part of error messages
            skipCheck = False
            skipValue = False
@@ -525,14 +604,28 @@ class XMLImport(Dialogs.GenForm):
                   ((dataType == 'NoteText') and (lineUpper.lstrip() == '</NOTETEXT>')):
 
                    # Code for updating the Progress Bar
-                   if lineUpper in MainHeads.keys():
+                   if lineUpper in MainHeads:
+                       # Send any rows from the previous section to the database, as later sections may depend on them
+                       try:
+                           importBatch.Flush()
+                       # If a row couldn't be saved ...
+                       except ImportBatchError, e:
+                           # ... tell the user which record it came from, and stop the import
+                           self.ReportBatchError(e)
+                           contin = False
+                       # Record the import rate for the previous section
+                       self.FinishSection(sectionName, sectionRecords, sectionStart)
+                       # Start the new section
+                       sectionName = lineUpper[1:-1]
+                       sectionStart = time.time()
+                       sectionRecords = 0
                        if (self.importData == None) or not ('wxMac' in wx.PlatformInfo):
                            progress.Update(MainHeads[lineUpper]['progPct'], MainHeads[lineUpper]['progPrompt'])
                        # These records should NEVER skip error messages
                        skipCheck = MainHeads[lineUpper]['skipCheck']
                        skipValue = MainHeads[lineUpper]['skipValue']
 
-                   elif lineUpper.lstrip() in DataTypes.keys():
+                   elif lineUpper.lstrip() in DataTypes:
                        dataType = DataTypes[lineUpper.lstrip()]
 
                    # When we finish the Collections import section ...
@@ -722,25 +815,17 @@ class XMLImport(Dialogs.GenForm):
                         dataType = None
 
                    # If we're closing a data record in the XML, we need to SAVE the data object.
-                   elif lineUpper == '</SERIES>' or \
-                        lineUpper == '</DOCUMENT>' or \
-                        lineUpper == '</EPISODE>' or \
-                        lineUpper == '</COREDATA>' or \
-                        lineUpper == '</TRANSCRIPT>' or \
-                        lineUpper == '</COLLECTION>' or \
-                        lineUpper == '</QUOTE>' or \
-                        lineUpper == '</QUOTEPOSITION>' or \
-                        lineUpper == '</CLIP>' or \
-                        lineUpper == '</SNAPSHOT>' or \
-                        lineUpper == '</SNAPSHOTKEYWORD>' or \
-                        lineUpper == '</SNAPSHOTKEYWORDSTYLE>' or \
-                        lineUpper == '</ADDVID>' or \
-                        lineUpper == '</KEYWORDREC>' or \
-                        lineUpper == '</CLIPKEYWORD>' or \
-                        lineUpper == '</NOTE>' or \
-                        lineUpper == '</SYNONYMREC>' or \
-                        lineUpper == '</FILTER>':
-                       dataType = None
+                   elif lineUpper in RECORD_END_TAGS:
+                       dataType = None
+                       # Count the record for this section's import rate
+                       sectionRecords += 1
+                       # Periodically update the Progress Dialog with the import rate
+                       if (sectionRecords % IMPORT_PROGRESS_INTERVAL == 0) and (sectionName != None) and \
+                          ((self.importData == None) or not ('wxMac' in wx.PlatformInfo)):
+                           prompt = unicode(_('%d records (%d records/second)'), 'utf8')
+                           progress.Update(MainHeads['<%s>' % sectionName]['progPct'],
+                                           unicode(MainHeads['<%s>' % sectionName]['progPrompt'], 'utf8') + u'\n  ' + \
+                                           prompt % (sectionRecords, sectionRecords / max(time.time() - sectionStart, 0.001)))
 
                        # Saves are one area where problems will arise if the data's not clean.
                        # We can trap some of these problems here.
@@ -840,8 +925,8 @@ class XMLImport(Dialogs.GenForm):
                                query = DBInterface.FixQuery(query)
                                # Get the data for each insert query
                                data = (quotePosition['DocumentNum'], quotePosition['StartChar'], quotePosition['EndChar'], quotePosition['QuoteNum'])
-                               # Execute the query
-                               dbCursor.execute(query, data)
+                               # Add the data to the import batch
+                               importBatch.Add(query, data, objectType, lineCount, quotePosition['QuoteNum'])
 
                            elif objectType == 'AddVid':
                                # Additional Video records don't have a proper object type, so we have to do the saves the hard way.
@@ -866,8 +951,8 @@ class XMLImport(Dialogs.GenForm):
                                tmpFilename = tmpFilename.encode(TransanaGlobal.encoding)
                                # Get the data for each insert query
                                data = (currentObj['EpisodeNum'], currentObj['ClipNum'], tmpFilename, currentObj['VidLength'], currentObj['Offset'], currentObj['Audio'])
-                               # Execute the query
-                               dbCursor.execute(query, data)
+                               # Add the data to the import batch
+                               importBatch.Add(query, data, objectType, lineCount)
 
                            elif  objectType == 'CoreData':
                                currentObj.number = 0
@@ -897,7 +982,9 @@ class XMLImport(Dialogs.GenForm):
                                        print "XMLImport 5:  Saving ", type(currentObj), objCountNumber
                                        objCountNumber += 1;
 
-                                   currentObj.db_save()
+                                   # Add the Clip Keyword to the import batch
+                                   (query, values) = currentObj.GetSaveQueryAndValues()
+                                   importBatch.Add(query, values, objectType, lineCount)
 
                            elif objectType == 'SnapshotKeyword':
                                if self.snapshotKeyword['SnapshotNum'] > 0:
@@ -916,9 +1003,9 @@ class XMLImport(Dialogs.GenForm):
                                              self.snapshotKeyword['X2'],
                                              self.snapshotKeyword['Y2'],
                                              self.snapshotKeyword['Visible'])
-                                   # Save the Snapshot Keyword data
+                                   # Add the Snapshot Keyword data to the import batch
                                    if db != None:
-                                       dbCursor.execute(query, values)
+                                       importBatch.Add(query, values, objectType, lineCount)
                                    
                            elif objectType == 'SnapshotKeywordStyle':
                                if self.snapshotKeywordStyle['SnapshotNum'] > 0:
@@ -937,9 +1024,9 @@ class XMLImport(Dialogs.GenForm):
                                              self.snapshotKeywordStyle['ColorDef'],
                                              self.snapshotKeywordStyle['LineWidth'],
                                              self.snapshotKeywordStyle['LineStyle'])
-                                   # Save the Snapshot Keyword Style data
+                                   # Add the Snapshot Keyword Style data to the import batch
                                    if db != None:
-                                       dbCursor.execute(query, values)
+                                       importBatch.Add(query, values, objectType, lineCount)
 
                            elif objectType == 'Synonym':
                                if synonymGroup != '' and synonym != '':
@@ -1055,6 +1142,11 @@ class XMLImport(Dialogs.GenForm):
                                # Save the Filter data
                                if db != None:
                                    dbCursor.execute(query, values)
+                       # If a batched row (possibly from an earlier record) couldn't be saved ...
+                       except ImportBatchError, e:
+                           # ... tell the user which record it came from, and stop the import
+                           self.ReportBatchError(e)
+                           contin = False
                        except:
 
                            # If we haven't been told to skip error messages of this type ...
@@ -1193,22 +1285,35 @@ class XMLImport(Dialogs.GenForm):
                    # to add the lstrip() call here.
                    if lineUpper.lstrip() in ['</XMLTEXT>', '</RTFTEXT>']:
                        dataType = None
+                       # If we collected text lines ...
+                       if textBuffer != None:
+                           # ... join them into the object's text
+                           currentObj.text = ''.join(textBuffer)
+                           textBuffer = None
 
                    elif dataType in ['XMLText', 'RTFText']:
                        # Add Line Breaks to the text to match the incoming lines.
                        # Otherwise, the transcript might be messed up, with the first word of the next line
                        # being truncated.
 
+                       # If this is the first line of this text, start the text buffer with the object's existing text
+                       if textBuffer == None:
+                           textBuffer = [currentObj.text]
+                           textHasContent = (currentObj.text != '')
+
                        # If this is the FIRST LINE ...
-                       if currentObj.text == '':
+                       if not textHasContent:
                            # If we have an XML richtext specification ...
                            if line[:10] == '<richtext ':
                                # ... add the XML Header, which was stripped out during export because it breaks XML
-                               currentObj.text = '<?xml version="1.0" encoding="UTF-8"?>\n'
+                               textBuffer.append('<?xml version="1.0" encoding="UTF-8"?>\n')
+                               textHasContent = True
                        else:
-                           currentObj.text = currentObj.text + '\n'
+                           textBuffer.append('\n')
 
-                       currentObj.text = currentObj.text + line
+                       textBuffer.append(line)
+                       # Note whether we now have text
+                       textHasContent = textHasContent or (line != '')
                        # We DO NOT reset DataType here, as RTFText may be many lines long!
                        # dataType = None
 
@@ -1884,7 +1989,20 @@ class XMLImport(Dialogs.GenForm):
                if not contin:
                    break
 
+           if contin:
+               # Send any remaining batched rows to the database
+               try:
+                   importBatch.Flush()
+               # If a row couldn't be saved ...
+               except ImportBatchError, e:
+                   # ... tell the user which record it came from, and stop the import
+                   self.ReportBatchError(e)
+                   contin = False
+
            if contin: 
+               # Record the import rate for the final section
+               self.FinishSection(sectionName, sectionRecords, sectionStart)
+
                # Since Clips were imported before Transcripts, the Originating Transcript Numbers in the Clip Records
                # are incorrect.  We must update them now.
                if (self.importData == None) or not ('wxMac' in wx.PlatformInfo):
@@ -1906,7 +2024,7 @@ class XMLImport(Dialogs.GenForm):
                        # It is possible that the originating Transcript has been deleted.  If so,
                        # we need to set the TranscriptNum to 0.  We accomplish this by adding the
                        # missing Transcript Number to our recNumbers list with a value of 0
-                       if not(SourceTranscriptNum in recNumbers['Transcript'].keys()):
+                       if not recNumbers['Transcript'].has_key(SourceTranscriptNum):
                            recNumbers['Transcript'][SourceTranscriptNum] = 0
                        dbCursor2.execute(SQLText, (recNumbers['Transcript'][SourceTranscriptNum], TranscriptNum))
 
@@ -2020,6 +2138,12 @@ class XMLImport(Dialogs.GenForm):
        except:
            pass
 
+       # Imported records may not have Text Index entries.  The next Text Search will index them.
+       DBInterface.InvalidateTextIndex()
+       # Many imported rows bypass the data objects' saves, so cached query results and Library Map data may be out of date
+       DBInterface.InvalidateQueryCache()
+       LibraryMap.ClearSeriesCache()
+
        # If importData is NOT passed in ...
        if self.importData == None:
            # .. then we need to update Transana's Database Tree, which we don't need to do when importData IS passed in.
@@ -2077,7 +2201,11 @@ class XMLImport(Dialogs.GenForm):
             f.close()
             dbCursor.close()
 
-
+        # Imported records may not have Text Index entries.  The next Text Search will index them.
+        DBInterface.InvalidateTextIndex()
+        # Many imported rows bypass the data objects' saves, so cached query results and Library Map data may be out of date
+        DBInterface.InvalidateQueryCache()
+        LibraryMap.ClearSeriesCache()
 
         # If importData is NOT passed in ...
         if self.importData == None:
@@ -2085,6 +2213,53 @@ class XMLImport(Dialogs.GenForm):
             TransanaGlobal.menuWindow.ControlObject.DataWindow.DBTab.tree.refresh_tree()
 
 
+    def ReportBatchError(self, error):
+        """ Tell the user about a batched record that could not be saved, and where to correct it in the XML file """
+        # Note the error in the Error Log
+        print
+        print error.excInfo[0], error.excInfo[1]
+        print
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_('A problem has been detected importing a %s record'), 'utf8')
+        else:
+            prompt = _('A problem has been detected importing a %s record')
+        msg = prompt % error.objectType
+        # Quote Positions are identified by their Quote
+        if error.objectType == 'QuotePosition':
+            prompt = unicode('for Quote %s.', 'utf8')
+            msg = msg +  ' ' + prompt % error.recordNum
+        else:
+            msg = msg + '.'
+        # Tell the user where to intervene
+        if 'unicode' in wx.PlatformInfo:
+            # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+            prompt = unicode(_('You need to correct this record in XML file %s.'), 'utf8')
+            prompt2 = unicode(_('The %s record ends at line %d.'), 'utf8')
+        else:
+            prompt = _('You need to correct this record in XML file %s.')
+            prompt2 = _('The %s record ends at line %d.')
+        msg = msg + '\n' +  prompt % self.XMLFile.GetValue() + '\n' + prompt2 % (error.objectType, error.lineNum)
+        msg += u"\n\n%s\n%s" % (error.excInfo[0], error.excInfo[1])
+        # Display the error message
+        errordlg = Dialogs.ErrorDialog(None, msg)
+        errordlg.ShowModal()
+        errordlg.Destroy()
+
+    def FinishSection(self, sectionName, sectionRecords, sectionStart):
+        """ Record the number of records and the import rate for a completed section of the import file """
+        # If there was no section, there's nothing to record
+        if sectionName == None:
+            return
+        # Determine how long the section took
+        seconds = time.time() - sectionStart
+        # Add the section to the import statistics
+        self.importStatistics.append((sectionName, sectionRecords, seconds))
+
+        if DEBUG:
+            print "XMLImport:  %s  %d records in %0.2f seconds (%0.1f records/second)" % \
+                  (sectionName, sectionRecords, seconds, sectionRecords / max(seconds, 0.001))
+
     def CalcPercent(self, num):
         """ Calculate the Percent value to be displayed in the Progress Bar """
         numCategories = 22.0
@@ -2105,10 +2280,8 @@ class XMLImport(Dialogs.GenForm):
                 #        In essence, we need txt.decode('utf8').decode(self.importEncoding), but that 
 
                 if self.importEncoding != 'latin1':
-                    # For each character in the unicode TXT string ...
-                    for x in txt.decode('utf8'):
-                        # ... add the appropriate character to the string S variable
-                        s += chr(ord(x))
+                    # For each character in the unicode TXT string, add the appropriate character to the string S variable
+                    s = ''.join([chr(ord(x)) for x in txt.decode('utf8')])
                 else:
                     s = txt
 
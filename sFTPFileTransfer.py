@@ -16,37 +16,56 @@
 
 """This module implements the sFTP File Transfer logic for the File Management window for Transana.  It can 
    also be run as a stand-alone utility.  More specifically, this module presents a File Transfer Dialog
-   and manages all the sFTP Connection logic behind moving files between the sFTP Server and a local computer.  """
+   and manages all the sFTP Connection logic behind moving files between the sFTP Server and a local computer.
+   Files are transferred as a queue over several simultaneous sFTP streams on the same connection, with reads
+   and writes pipelined so each stream isn't waiting on the server for every block.  Files are written under a
+   temporary name until they are complete, so an interrupted transfer can be resumed where it left off.  """
 
 __author__ = 'David Woods <dwoods@transana.com>'
 
 import wx  # import wxPython
+import hashlib
 import os
+import Queue
+import socket
 import string
 import sys
-import ctypes
-# import Python exceptions
-import exceptions
+import threading
 import time
+# import paramiko for sFTP functionality
+import paramiko
 import Dialogs
-import FileManagement
 import TransanaGlobal
 
 # Define Transfer Direction constants
 sFTP_UPLOAD   = wx.NewId()
 sFTP_DOWNLOAD = wx.NewId()
 
-
-
-class sFTPFileTransfer(wx.Dialog):
-    """ This object transfers files between the sFTP Server and the local file system and displays transfer progress. """
-    def __init__(self, parent, title, fileName, localDir, remoteDir, direction):
+# The number of simultaneous sFTP streams used to transfer a queue of files
+sFTP_STREAMS = 4
+# The size of each read or write request.  (This is the largest request all sFTP servers accept.)
+sFTP_CHUNK_SIZE = 32768
+# The number of read requests kept outstanding on a stream while downloading
+sFTP_PIPELINE_CHUNKS = 128
+# The number of bytes at the end of a partial file that are checked against the source before resuming
+sFTP_RESUME_CHECK_SIZE = 1048576
+# Files are transferred under their own name plus this suffix, and renamed when they are complete
+sFTP_PARTIAL_SUFFIX = '.part'
+
+
+class sFTPTransferQueue(wx.Dialog):
+    """ This object transfers a queue of files between the sFTP Server and the local file system and displays
+        the progress of the whole queue.  Add files with AddFile(), then call Run(). """
+    def __init__(self, parent, title, streams=sFTP_STREAMS):
         """ Set up the Dialog Box and all GUI Widgets. """
         # Initialize the last update time
         self.lastUpdate = time.time()
         
         # Set up local variables
         self.parent = parent
+        # The transfer streams are opened on the parent's sFTP connection
+        self.transport = parent.sFTPTransport
+        self.streams = streams
 
         size = (350,200)
         # Create the Dialog Box itself, with no minimize/maximize/close buttons
@@ -61,7 +80,7 @@ class sFTPFileTransfer(wx.Dialog):
             prompt = unicode(_("File: %s"), 'utf8')
         else:
             prompt = _("File: %s")
-        self.lblFile = wx.StaticText(self, -1, prompt % fileName, style=wx.ST_NO_AUTORESIZE)
+        self.lblFile = wx.StaticText(self, -1, prompt % '', style=wx.ST_NO_AUTORESIZE)
         # Add the label to the Main Sizer
         mainSizer.Add(self.lblFile, 0, wx.ALL, 10)
 
@@ -145,53 +164,261 @@ class sFTPFileTransfer(wx.Dialog):
         self.Layout()
         # Center on the Screen
         TransanaGlobal.CenterOnPrimary(self)
-        # Show the form
-        self.Show()
-        # make sure the loca directory ends with the proper path seperator character
-        if localDir[-1] != os.sep:
-            localDir = localDir + os.sep
-        # Initialize variables used in file transfer
-        BytesRead = 0
+
+        # The queued files, as (direction, local directory, remote directory, file name)
+        self.files = []
+        # The files that have been transferred completely
+        self.completedFiles = []
+        # Error messages from failed transfers
+        self.errors = []
         # "cancelled" is intialized to false.  If the user cancels the file transfer,
         # this variable gets set to true to signal the need to interrupt the transfer.
         self.cancelled = False
+        # The total size of the queued files.  (Download sizes are added as each download starts.)
+        self.totalBytes = 0
+        # Bytes transferred, and bytes of partial files that didn't need to be transferred again
+        self.bytesTransferred = 0
+        self.bytesResumed = 0
+        # The number of files started, and the name of the latest one
+        self.filesStarted = 0
+        self.currentFile = ''
+        # Lock to protect the progress values, which the transfer threads update
+        self.lock = threading.Lock()
+
+    def AddFile(self, direction, localDir, remoteDir, fileName):
+        """ Add a file to the transfer queue """
+        # Detect Strings (instead of Unicode objects) and decode them if needed.
+        if isinstance(localDir, str):
+            localDir = localDir.decode(TransanaGlobal.encoding)
+        if isinstance(remoteDir, str):
+            remoteDir = remoteDir.decode(TransanaGlobal.encoding)
+        if isinstance(fileName, str):
+            fileName = fileName.decode(TransanaGlobal.encoding)
+        self.files.append((direction, localDir, remoteDir, fileName))
+        # We know the size of local files up front
+        if direction == sFTP_UPLOAD:
+            self.totalBytes += os.path.getsize(os.path.join(localDir, fileName))
+
+    def Run(self):
+        """ Transfer all the queued files, updating the display until the transfers are done """
+        # Set the title for the direction of the transfers
+        directions = [f[0] for f in self.files]
+        if not sFTP_UPLOAD in directions:
+            self.SetTitle(_('Downloading . . .'))
+        elif not sFTP_DOWNLOAD in directions:
+            self.SetTitle(_('Uploading . . .'))
+        # Show the form
+        self.Show()
         # Note the starting time of the transfer for progress reporting purposes
         self.StartTime = time.time()
-
-        # If we are sending files from the sFTP Server to the local File System...
-        if direction == sFTP_DOWNLOAD:
-            self.SetTitle(_('Downloading . . .'))
-
+        # Put the files in a queue the transfer threads can share
+        fileQueue = Queue.Queue()
+        for f in self.files:
+            fileQueue.put(f)
+        # Start a transfer thread for each stream, but not more than there are files
+        threads = []
+        for stream in range(min(self.streams, len(self.files))):
+            thread = threading.Thread(target=self.TransferThread, args=(fileQueue, ))
+            # prevent the application from hanging on Close
+            thread.setDaemon(1)
+            thread.start()
+            threads.append(thread)
+        # Until all the transfer threads are done ...
+        while len([thread for thread in threads if thread.isAlive()]) > 0:
+            # ... keep the display up to date ...
+            self.UpdateDisplay()
+            # ... allow the screen to update and accept User Input (Cancel Button press, for example) ...
+            wx.Yield()
+            # ... and give the transfer threads the time
+            time.sleep(0.05)
+        # Show the final results
+        self.lastUpdate = 0
+        self.UpdateDisplay()
+        # If any transfers failed, tell the user
+        if len(self.errors) > 0:
+            prompt = unicode(_("Input / Output Error"), 'utf8') + "\n%s\n" + unicode(_('Please press "Refresh".'), 'utf8')
+            dlg = Dialogs.ErrorDialog(self, prompt % string.join(self.errors, '\n'))
+            dlg.ShowModal()
+            dlg.Destroy()
+
+    def TransferThread(self, fileQueue):
+        """ Transfer files from the queue, one at a time, over this thread's own sFTP stream """
+        # Open an sFTP stream on the shared connection
+        try:
+            sFTPClient = paramiko.SFTPClient.from_transport(self.transport)
+        except (paramiko.SSHException, EOFError, socket.error):
+            self.lock.acquire()
+            self.errors.append(unicode(sys.exc_info()[1]))
+            self.lock.release()
+            return
+        try:
+            # Keep going until the queue is empty or the user cancels
+            while not self.cancelled:
+                try:
+                    (direction, localDir, remoteDir, fileName) = fileQueue.get_nowait()
+                except Queue.Empty:
+                    break
+                # Note the file we're working on
+                self.lock.acquire()
+                self.filesStarted += 1
+                self.currentFile = fileName
+                self.lock.release()
+                localFile = os.path.join(localDir, fileName)
+                remoteFile = string.join([remoteDir, fileName], '/')
+                try:
+                    if direction == sFTP_DOWNLOAD:
+                        success = self.Download(sFTPClient, remoteFile, localFile)
+                    else:
+                        success = self.Upload(sFTPClient, localFile, remoteFile)
+                # If the transfer fails, note the error and move on to the next file.  The partial file is
+                # kept so the transfer can be resumed.
+                except (IOError, OSError, paramiko.SSHException):
+                    success = False
+                    self.lock.acquire()
+                    self.errors.append(u'%s:  %s' % (fileName, sys.exc_info()[1]))
+                    self.lock.release()
+                if success:
+                    self.lock.acquire()
+                    self.completedFiles.append((direction, localDir, remoteDir, fileName))
+                    self.lock.release()
+        finally:
+            sFTPClient.close()
+
+    def AddProgress(self, bytesTransferred=0, bytesResumed=0, totalBytes=0):
+        """ Add to the progress values from a transfer thread """
+        self.lock.acquire()
+        self.bytesTransferred += bytesTransferred
+        self.bytesResumed += bytesResumed
+        self.totalBytes += totalBytes
+        self.lock.release()
+
+    def PartialMatches(self, remoteFile, localPath, offset):
+        """ Check that a partial file matches its source, comparing checksums of the last part of the partial
+            file.  remoteFile is an open sFTP file and localPath a local file, one of which is the partial file. """
+        start = max(0, offset - sFTP_RESUME_CHECK_SIZE)
+        remoteFile.seek(start)
+        remoteChecksum = hashlib.sha1(remoteFile.read(offset - start)).digest()
+        localFile = open(localPath, 'rb')
+        try:
+            localFile.seek(start)
+            localChecksum = hashlib.sha1(localFile.read(offset - start)).digest()
+        finally:
+            localFile.close()
+        return remoteChecksum == localChecksum
+
+    def Download(self, sFTPClient, remoteFile, localFile):
+        """ Download a file from the sFTP Server, resuming a partial download if there is one.
+            Returns True if the file was transferred completely. """
+        partialFile = localFile + sFTP_PARTIAL_SUFFIX
+        source = sFTPClient.open(remoteFile, 'rb')
+        try:
+            sourceStat = source.stat()
+            fileSize = sourceStat.st_size
+            self.AddProgress(totalBytes=fileSize)
+            # If there's a partial download, and it matches the file on the server, resume after it
+            offset = 0
+            if os.path.exists(partialFile):
+                offset = os.path.getsize(partialFile)
+                if (offset > fileSize) or not self.PartialMatches(source, partialFile, offset):
+                    offset = 0
+            self.AddProgress(bytesResumed=offset)
+            if offset > 0:
+                dest = open(partialFile, 'r+b')
+                dest.seek(offset)
+                dest.truncate()
+            else:
+                dest = open(partialFile, 'wb')
             try:
-                FileResult = parent.sFTPClient.get(string.join([remoteDir, fileName], '/'), os.path.join(localDir, fileName), callback = self.UpdateDisplay)
-            except IOError:
-                prompt = unicode(_("Input / Output Error"), 'utf8') + "\n%s\n" + unicode(_('Please press "Refresh".'), 'utf8')
-                dlg = Dialogs.ErrorDialog(self, prompt % (sys.exc_info()[1]))
-                dlg.ShowModal()
-                dlg.Destroy()
-
-        # If we are sending data from the local file system to the sFTP Server ...
-        elif direction == sFTP_UPLOAD:
-            self.SetTitle(_('Uploading . . .'))
-
+                # Request the file sFTP_PIPELINE_CHUNKS blocks at a time, so the server is sending the next
+                # blocks while we write the ones that have arrived
+                while (offset < fileSize) and not self.cancelled:
+                    chunks = []
+                    for start in range(offset, min(fileSize, offset + sFTP_CHUNK_SIZE * sFTP_PIPELINE_CHUNKS), sFTP_CHUNK_SIZE):
+                        chunks.append((start, min(sFTP_CHUNK_SIZE, fileSize - start)))
+                    for data in source.readv(chunks):
+                        dest.write(data)
+                        offset += len(data)
+                        self.AddProgress(bytesTransferred=len(data))
+                        if self.cancelled:
+                            break
+            finally:
+                dest.close()
+        finally:
+            source.close()
+        # If the transfer was interrupted, leave the partial file to be resumed later
+        if offset < fileSize:
+            return False
+        # The download is complete, so give it its real name.  (A file being replaced has to be removed first on Windows.)
+        if os.path.exists(localFile):
+            os.remove(localFile)
+        os.rename(partialFile, localFile)
+        # Keep the file's modification time, so the copy can be recognized as unchanged later
+        os.utime(localFile, (sourceStat.st_atime, sourceStat.st_mtime))
+        return True
+
+    def Upload(self, sFTPClient, localFile, remoteFile):
+        """ Upload a file to the sFTP Server, resuming a partial upload if there is one.
+            Returns True if the file was transferred completely. """
+        partialFile = remoteFile + sFTP_PARTIAL_SUFFIX
+        fileSize = os.path.getsize(localFile)
+        # If there's a partial upload, and it matches the local file, resume after it
+        offset = 0
+        try:
+            offset = sFTPClient.stat(partialFile).st_size
+        except IOError:
+            pass
+        if offset > 0:
+            dest = sFTPClient.open(partialFile, 'r+b')
+            if (offset > fileSize) or not self.PartialMatches(dest, localFile, offset):
+                dest.close()
+                offset = 0
+        if offset == 0:
+            dest = sFTPClient.open(partialFile, 'wb')
+        self.AddProgress(bytesResumed=offset)
+        try:
+            dest.seek(offset)
+            # Don't wait for the server to acknowledge each block before sending the next.  (Errors are reported on close.)
+            dest.set_pipelined(True)
+            source = open(localFile, 'rb')
             try:
-                # Detect Strings (instead of Unicode objects) and decode them if needed.
-                if isinstance(localDir, str):
-                    localDir = localDir.decode(TransanaGlobal.encoding)
-                if isinstance(remoteDir, str):
-                    remoteDir = remoteDir.decode(TransanaGlobal.encoding)
-                # Put the file and capture the result
-                FileResult = parent.sFTPClient.put(os.path.join(localDir, fileName), string.join([remoteDir, fileName], '/'), callback = self.UpdateDisplay)
-            except IOError:
-                prompt = unicode(_("Input / Output Error"), 'utf8') + "\n%s\n" + unicode(_('Please press "Refresh".'), 'utf8')
-                dlg = Dialogs.ErrorDialog(self, prompt % (sys.exc_info()[1]))
-                dlg.ShowModal()
-                dlg.Destroy()
+                source.seek(offset)
+                while (offset < fileSize) and not self.cancelled:
+                    data = source.read(sFTP_CHUNK_SIZE)
+                    if len(data) == 0:
+                        break
+                    dest.write(data)
+                    offset += len(data)
+                    self.AddProgress(bytesTransferred=len(data))
+            finally:
+                source.close()
+        finally:
+            dest.close()
+        # If the transfer was interrupted, leave the partial file to be resumed later
+        if (offset < fileSize) or (sFTPClient.stat(partialFile).st_size != fileSize):
+            return False
+        # The upload is complete, so give it its real name.  (sFTP won't rename over a file being replaced.)
+        try:
+            sFTPClient.remove(remoteFile)
+        except IOError:
+            pass
+        sFTPClient.rename(partialFile, remoteFile)
+        # Keep the file's modification time, so the copy can be recognized as unchanged later
+        sourceStat = os.stat(localFile)
+        try:
+            sFTPClient.utime(remoteFile, (int(sourceStat.st_atime), int(sourceStat.st_mtime)))
+        # Not all servers allow this, and the file has been transferred either way
+        except IOError:
+            pass
+        return True
 
     def TransferSuccessful(self):
         # This class needs to return whether the transfer succeeded so that the delete portion of
         # a cancelled Move can be skipped.
-        return not self.cancelled
+        return (not self.cancelled) and (len(self.completedFiles) == len(self.files))
+
+    def GetCompletedFiles(self):
+        """ Return the (direction, local directory, remote directory, file name) of each file transferred completely """
+        return self.completedFiles
 
     def HoursMinutesSeconds(self, time):
         if time > 3600:
@@ -206,7 +433,7 @@ class sFTPFileTransfer(wx.Dialog):
         secs = time % 60
         return (hours, mins, secs)
 
-    def UpdateDisplay(self, bytesTransferred, totalBytes):
+    def UpdateDisplay(self):
         """ Update the Transfer Dialog Box labels and progress bar """
 
         # If the dialog has updated within the half last second ...
@@ -218,19 +445,43 @@ class sFTPFileTransfer(wx.Dialog):
         else:
             self.lastUpdate = time.time()
 
+        # Get a consistent set of progress values
+        self.lock.acquire()
+        bytesTransferred = self.bytesTransferred
+        bytesDone = self.bytesTransferred + self.bytesResumed
+        totalBytes = self.totalBytes
+        filesStarted = self.filesStarted
+        currentFile = self.currentFile
+        self.lock.release()
+
+        # Display the latest file started
+        if len(self.files) > 1:
+            if 'unicode' in wx.PlatformInfo:
+                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                prompt = unicode(_("File %d of %d: %s"), 'utf8')
+            else:
+                prompt = _("File %d of %d: %s")
+            self.lblFile.SetLabel(prompt % (filesStarted, len(self.files), currentFile))
+        else:
+            if 'unicode' in wx.PlatformInfo:
+                # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
+                prompt = unicode(_("File: %s"), 'utf8')
+            else:
+                prompt = _("File: %s")
+            self.lblFile.SetLabel(prompt % currentFile)
         # Display Number of Bytes tranferred
         if 'unicode' in wx.PlatformInfo:
             # Encode with UTF-8 rather than TransanaGlobal.encoding because this is a prompt, not DB Data.
             prompt = unicode(_("%d bytes of %d transferred"), 'utf8')
         else:
             prompt = _("%d bytes of %d transferred")
-        self.lblBytes.SetLabel(prompt % (bytesTransferred, totalBytes))
+        self.lblBytes.SetLabel(prompt % (bytesDone, totalBytes))
         # Avoiding division by zero problems ...
-        if bytesTransferred > 0:
+        if bytesDone > 0:
             # ... display % of total bytes transferred
-            self.lblPercent.SetLabel("%5.1f %%" % (float(bytesTransferred) / float(totalBytes) * 100))
+            self.lblPercent.SetLabel("%5.1f %%" % (float(bytesDone) / float(totalBytes) * 100))
             # Update the Progress Bar
-            self.progressBar.SetValue(int(float(bytesTransferred) / float(totalBytes) * 100))
+            self.progressBar.SetValue(int(float(bytesDone) / float(totalBytes) * 100))
         # Calculate Elapsed Time and display it
         elapsedTime = time.time() - self.StartTime
 
@@ -241,13 +492,14 @@ class sFTPFileTransfer(wx.Dialog):
         else:
             prompt = _("Elapsed Time: %d:%02d:%02d")
         self.lblElapsedTime.SetLabel(prompt % (hours, mins, secs))
-        if elapsedTime > 0:
+        # The speed only counts data actually transferred, not resumed partial files
+        if (elapsedTime > 0) and (bytesTransferred > 0):
             # Calculate the Transfer Speed.  (Dividing by 1024 gives k/sec rather than bytes/sec).
             # (kilobytes transferred divided by elapsed time = rate of transfer in k/sec)
             speed = (bytesTransferred / 1024.0) / elapsedTime
             # Estimate the amount of time it will take to transfer the remaining data.
             # (kilobytes of data remaining divided by the transfer speed = time remaining for transfer in seconds)
-            timeRemaining = (((totalBytes - bytesTransferred) / 1024.0) / (speed))
+            timeRemaining = (((totalBytes - bytesDone) / 1024.0) / (speed))
             # Display the results of these calculations
 
             (hours, mins, secs) = self.HoursMinutesSeconds(timeRemaining)
@@ -263,9 +515,6 @@ class sFTPFileTransfer(wx.Dialog):
             else:
                 prompt = _("Transfer Speed: %6.1f k/sec")
             self.lblTransferSpeed.SetLabel(prompt % speed)
-        # Allow the screen to update and accept User Input (Cancel Button press, for example).
-        # (wxYield allows Windows to process Windows Messages)
-        wx.Yield()
         
     def OnCancel(self, event):
         """ Respond to the user pressing the "Cancel" button to interrupt the file transfer """
@@ -273,3 +522,15 @@ class sFTPFileTransfer(wx.Dialog):
         self.cancelled = True
         self.btnCancel.SetLabel(_('Cancel requested.'))
         self.btnCancel.Enable(False)
+
+
+class sFTPFileTransfer(sFTPTransferQueue):
+    """ This object transfers a single file between the sFTP Server and the local file system and displays transfer progress. """
+    def __init__(self, parent, title, fileName, localDir, remoteDir, direction):
+        """ Set up the Dialog Box and transfer the file """
+        sFTPTransferQueue.__init__(self, parent, title)
+        # make sure the loca directory ends with the proper path seperator character
+        if localDir[-1] != os.sep:
+            localDir = localDir + os.sep
+        self.AddFile(direction, localDir, remoteDir, fileName)
+        self.Run()